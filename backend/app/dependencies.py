@@ -1,7 +1,14 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.services.auth_service import AuthService
+from app.services.shared_cache import get_shared_cache
+from app.services.token_denylist import get_token_denylist
 from typing import Optional
+import hashlib
+import time
+
+# Tempo máximo que um token verificado fica no cache compartilhado
+TOKEN_CACHE_TTL_SECONDS = 300
 
 # Security scheme
 security = HTTPBearer()
@@ -12,6 +19,29 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     """
     token = credentials.credentials
     
+    # Token já verificado por algum worker
+    cache = get_shared_cache()
+    cache_key = "token:" + hashlib.sha256(token.encode()).hexdigest()[:40]
+    user = cache.get(cache_key)
+    if user is None:
+        user = _verify_access_token(token)
+        
+        # Nunca mantém no cache além da expiração do próprio token
+        ttl = min(TOKEN_CACHE_TTL_SECONDS, user["exp"] - time.time())
+        if ttl > 0:
+            cache.set(cache_key, user, ttl=ttl)
+    
+    # Revogação checada em memória a cada requisição (inclusive com cache)
+    if get_token_denylist().is_revoked(user):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sessão encerrada",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return user
+
+def _verify_access_token(token: str) -> dict:
     payload = AuthService.verify_token(token)
     
     if payload is None:
@@ -33,7 +63,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     
     return {
         "id": user_id,
-        "email": email
+        "email": email,
+        "jti": payload["jti"],
+        "fam": payload.get("fam"),
+        "exp": payload["exp"]
     }
 
 async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)) -> Optional[dict]:
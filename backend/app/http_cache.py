@@ -0,0 +1,84 @@
+import hashlib
+import json
+from fastapi import Request, Response, status
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+
+# Conteúdo versionado não muda nunca: pode ficar em cache por 1 ano
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Mesmo caso, mas com dados do usuário (não vai para caches compartilhados)
+PRIVATE_IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# URL sem versão: cache curto, revalidado por ETag
+REVALIDATE_CACHE_CONTROL = "public, max-age=3600, must-revalidate"
+# Respostas calculadas a partir de parâmetros da URL
+SHORT_CACHE_CONTROL = "public, max-age=300"
+
+
+def encode_json(data) -> bytes:
+    """Serializa JSON de forma determinística (mesmo conteúdo = mesmos bytes)"""
+    return json.dumps(
+        data, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def compute_etag(body: bytes) -> str:
+    """ETag forte derivado do conteúdo"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Verifica se o If-None-Match do cliente corresponde ao ETag atual"""
+    if_none_match = request.headers.get("if-none-match", "")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags
+
+
+def cached_json_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """
+    Resposta JSON pré-serializada com ETag
+    Retorna 304 quando o cliente já possui a mesma versão
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Tipos que valem a pena comprimir na hora (imagens, zip/xlsx e PDF já são comprimidos)
+COMPRESSIBLE_TYPES = ("text/html", "text/plain", "text/csv", "text/css", "application/json", "application/javascript", "image/svg+xml")
+
+
+class _CompressibleGZipResponder(GZipResponder):
+    async def send_with_gzip(self, message):
+        if message["type"] == "http.response.pathsend":
+            # O servidor manda o arquivo direto do disco: passa sem comprimir
+            # (o GZipResponder do Starlette descarta essa mensagem)
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+        await super().send_with_gzip(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if not content_type.startswith(COMPRESSIBLE_TYPES):
+                # Mesmo caminho de quando já existe Content-Encoding: passa sem mexer
+                self.content_encoding_set = True
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    gzip dinâmico para respostas de texto/JSON acima de minimum_size bytes
+    Respostas já comprimidas (assets estáticos) e binárias passam direto
+    """
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("accept-encoding", ""):
+            responder = _CompressibleGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.services.auth_service import AuthService
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+
+
+class StoredResponse:
+    __slots__ = ("fingerprint", "status", "headers", "body", "expires_at")
+    
+    def __init__(self, fingerprint: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, expires_at: float):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+
+class IdempotencyStore:
+    """
+    Primeira resposta de cada (usuário, Idempotency-Key), com TTL
+    
+    Limitado por número de entradas e total de bytes: passando do
+    limite, as menos usadas saem primeiro (LRU).
+    """
+    
+    def __init__(self, ttl_seconds: float = 86400, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, StoredResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Requisições em andamento por chave (as repetidas esperam por elas)
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.counters = {"executed": 0, "stored": 0, "hits": 0, "coalesced": 0, "conflicts": 0}
+    
+    @classmethod
+    def from_env(cls) -> "IdempotencyStore":
+        return cls(
+            ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400")),
+            max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000")),
+            max_bytes=int(os.getenv("IDEMPOTENCY_MAX_BYTES", str(64 * 1024 * 1024))),
+        )
+    
+    def get(self, key: str) -> Optional[StoredResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def put(self, key: str, fingerprint: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = StoredResponse(fingerprint, status, headers, body, time.time() + self.ttl_seconds)
+            self._bytes += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._discard(next(iter(self._entries)))
+    
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+    
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "in_flight": len(self.in_flight),
+        }
+
+
+def _error(status: int, detail: str) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode("utf-8")
+    return status, [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())], body
+
+
+class IdempotencyMiddleware:
+    """
+    Idempotency-Key para POSTs com efeito colateral
+    
+    A primeira resposta bem-sucedida (status < 400) de uma chave é
+    guardada e devolvida nas repetições com o cabeçalho
+    Idempotent-Replayed. Repetições que chegam enquanto a primeira ainda
+    está rodando esperam por ela em vez de executar de novo. Reusar a
+    chave com outro corpo ou rota devolve 422.
+    """
+    
+    MAX_KEY_LENGTH = 255
+    MAX_STORED_BODY = 1024 * 1024
+    WAIT_TIMEOUT_SECONDS = 30.0
+    
+    def __init__(self, app, store: IdempotencyStore, methods: Tuple[str, ...] = ("POST",)):
+        self.app = app
+        self.store = store
+        self.methods = methods
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.methods:
+            return await self.app(scope, receive, send)
+        
+        headers = dict(scope["headers"])
+        raw_key = headers.get(IDEMPOTENCY_HEADER)
+        if not raw_key:
+            return await self.app(scope, receive, send)
+        if len(raw_key) > self.MAX_KEY_LENGTH:
+            return await self._send(send, *_error(400, f"Idempotency-Key maior que {self.MAX_KEY_LENGTH} caracteres"))
+        
+        body = await self._read_body(receive)
+        fingerprint = hashlib.sha256(
+            b"\n".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+        key = f"{self._owner(scope, headers)}:{raw_key.decode('latin-1')}"
+        
+        waited = False
+        while True:
+            stored = self.store.get(key)
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    self.store.counters["conflicts"] += 1
+                    return await self._send(send, *_error(422, "Idempotency-Key já usada com outra requisição"))
+                self.store.counters["hits"] += 1
+                return await self._send(send, stored.status, stored.headers + [(REPLAYED_HEADER, b"true")], stored.body)
+            
+            pending = self.store.in_flight.get(key)
+            if pending is None:
+                break
+            if not waited:
+                waited = True
+                self.store.counters["coalesced"] += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(pending), self.WAIT_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                return await self._send(send, *_error(409, "Requisição com esta Idempotency-Key ainda em andamento"))
+        
+        future = asyncio.get_running_loop().create_future()
+        self.store.in_flight[key] = future
+        self.store.counters["executed"] += 1
+        try:
+            await self._execute(scope, body, receive, send, key, fingerprint)
+        finally:
+            del self.store.in_flight[key]
+            future.set_result(None)
+    
+    async def _execute(self, scope, body: bytes, receive, send, key: str, fingerprint: str):
+        response = {"status": 500, "headers": [], "chunks": [], "size": 0, "storable": True}
+        body_sent = False
+        
+        async def replay_receive():
+            # Corpo já lido uma vez; depois disso só resta esperar o disconnect
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body" and response["storable"]:
+                chunk = message.get("body", b"")
+                response["size"] += len(chunk)
+                if response["size"] > self.MAX_STORED_BODY:
+                    response["storable"], response["chunks"] = False, []
+                else:
+                    response["chunks"].append(chunk)
+            await send(message)
+        
+        await self.app(scope, replay_receive, capture_send)
+        
+        # Erros não são guardados: a repetição executa de novo
+        if response["storable"] and response["status"] < 400:
+            self.store.put(key, fingerprint, response["status"], response["headers"], b"".join(response["chunks"]))
+            self.store.counters["stored"] += 1
+    
+    @staticmethod
+    def _owner(scope, headers: dict) -> str:
+        """Usuário do token (ou o IP, nas rotas sem login como o cadastro)"""
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if authorization.lower().startswith("bearer "):
+            payload = AuthService.verify_token(authorization[7:].strip())
+            if payload:
+                return f"user:{payload['sub']}"
+        client = scope.get("client")
+        return f"anon:{client[0] if client else ''}"
+    
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+    
+    @staticmethod
+    async def _send(send, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,39 +1,177 @@
-from fastapi import FastAPI, HTTPException, Depends, status, Form, Request
+from fastapi import FastAPI, HTTPException, Depends, status, Form, Request, Response, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
-from app.models import CalculatorInput, CalculatorResult, UserCreate
+from fastapi.responses import StreamingResponse, JSONResponse
+from app.models import CalculatorInput, CalculatorResult, SimulationInput, ProjectionInput, RegimePlanInput, ProposalInput, RefreshTokenInput, UserCreate, BillingSchedule, TimeEntriesBulkInput, TimerStartInput, ReadjustmentInput
 from app.services.calculator_service import CalculatorService
-from app.services.auth_service import AuthService
+from app.services.auth_service import AuthService, REFRESH_TOKEN, REFRESH_TOKEN_EXPIRE_DAYS, REFRESH_GRACE_SECONDS
+from app.services.token_denylist import get_token_denylist, SupabaseRevocationStore
+from app.services.tax_rules_service import TaxRulesService
+from app.services.simulation_service import SimulationService
+from app.services.projection_service import ProjectionService
+from app.services.regime_planner_service import RegimePlannerService
+from app.services.break_even_service import BreakEvenService
+from app.services.compare_service import CompareService
+from app.services.export_service import ExportService, EXPORTS, FORMATS
+from app.services.search_service import SearchService, SEARCH_FIELDS
+from app.services.billing_schedule_service import BillingScheduleService
+from app.services.time_tracking_service import TimeTrackingService, SupabaseTimeStore, TimeConflictError
+from app.services.sync_service import SyncService, SupabaseChangeLogStore
+from app.services.reconciliation_service import ReconciliationService, MercadoPagoPaymentSearch, SupabaseSubscriptionStore
+from app.services.inflation_service import InflationService, INDICES, parse_month
+from app.services.session_service import SessionService, RequestCoalescer
+from app.services.proposal_service import ProposalService, MEDIA_TYPES as PROPOSAL_MEDIA_TYPES, format_brl
+from app.http_cache import (
+    cached_json_response,
+    encode_json,
+    compute_etag,
+    etag_matches,
+    IMMUTABLE_CACHE_CONTROL,
+    PRIVATE_IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    SHORT_CACHE_CONTROL,
+    CompressionMiddleware,
+)
+from app.static_site import StaticSite, StaticSiteMiddleware
 from app.dependencies import get_current_user
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.structured_logging import get_log_pipeline, parse_sample_rates, RequestLogMiddleware
+from app.services.shared_cache import get_shared_cache
+from app.services.job_queue import get_job_queue
+from app.services.due_date_scheduler import get_due_date_scheduler, SupabasePaymentStore
+from app.services.payment_events import get_payment_event_broker, parse_last_event_id
+from app.services.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    GuardedSupabase,
+    GuardedMercadoPago,
+    is_supabase_failure,
+    is_mercadopago_failure,
+    is_mercadopago_failure_result,
+)
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from starlette.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from supabase import create_client, Client, ClientOptions
 import mercadopago
+from mercadopago.config import RequestOptions
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, List
+from fractions import Fraction
+from math import ceil
+from contextlib import asynccontextmanager
+import re
+import time
+import logging
 
 load_dotenv()
 
+# Logs JSON via fila + thread (nenhum handler espera por I/O)
+log_pipeline = get_log_pipeline()
+logger = logging.getLogger("app.api")
+
+# Circuit breakers: dependência lenta ou fora falha rápido em vez de
+# prender a requisição (estado em /health)
+supabase_breaker = CircuitBreaker.from_env("supabase", is_failure=is_supabase_failure)
+mercadopago_breaker = CircuitBreaker.from_env(
+    "mercadopago", is_failure=is_mercadopago_failure, is_failure_result=is_mercadopago_failure_result
+)
+
 # Inicializar Supabase
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_ANON_KEY")
 supabase: Client = None
 
 if supabase_url and supabase_key:
-    supabase = create_client(supabase_url, supabase_key)
+    supabase = GuardedSupabase(create_client(supabase_url, supabase_key, options=ClientOptions(
+        postgrest_client_timeout=float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "5"))
+    )), supabase_breaker)
 
 # Inicializar Mercado Pago
 mp_access_token = os.getenv("MERCADOPAGO_ACCESS_TOKEN")
 mp = None
 if mp_access_token:
-    mp = mercadopago.SDK(mp_access_token)
+    mp = GuardedMercadoPago(mercadopago.SDK(mp_access_token, request_options=RequestOptions(
+        connection_timeout=float(os.getenv("MERCADOPAGO_TIMEOUT_SECONDS", "10")),
+        max_retries=1
+    )), mercadopago_breaker)
+
+# Tokens revogados (logout, refresh tokens já usados)
+token_denylist = get_token_denylist()
+if supabase:
+    token_denylist.store = SupabaseRevocationStore(supabase)
+
+# Fila de jobs em segundo plano (handlers registrados junto das rotas)
+job_queue = get_job_queue()
+
+# Intervalo da varredura de assinaturas expiradas
+EXPIRY_SWEEP_INTERVAL_SECONDS = 3600
+
+# Extensão diária do horizonte das cobranças recorrentes
+BILLING_EXTEND_INTERVAL_SECONDS = 86400
+
+# Compactação diária dos tombstones do log de sincronização
+SYNC_COMPACT_INTERVAL_SECONDS = 86400
+
+# Reconciliação dos pagamentos do Mercado Pago (webhooks perdidos)
+RECONCILE_INTERVAL_SECONDS = int(os.getenv("MERCADOPAGO_RECONCILE_INTERVAL_SECONDS", "3600"))
+
+# Carregamentos de sessão simultâneos do mesmo usuário viram uma consulta
+session_coalescer = RequestCoalescer()
+
+# Eventos de pagamento para as páginas abertas (SSE), em vez de polling
+payment_events = get_payment_event_broker()
+
+# Vencimentos de pagamentos (marca OVERDUE e agenda lembretes)
+due_date_scheduler = get_due_date_scheduler()
+if supabase:
+    due_date_scheduler.store = SupabasePaymentStore(supabase)
+
+def enqueue_payment_reminders(payments: List[dict]):
+    """Cada lembrete vira um job (a entrega roda fora do loop de vencimentos)"""
+    for payment in payments:
+        job_queue.enqueue(
+            "payment.due_reminder",
+            {key: payment[key] for key in ("id", "user_id", "project_id", "amount", "due_date")},
+            dedupe_key=f"payment.due_reminder:{payment['id']}:{payment['due_date']}"
+        )
+
+due_date_scheduler.on_reminder = enqueue_payment_reminders
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_pipeline.start()
+    await token_denylist.start()
+    await job_queue.start()
+    await due_date_scheduler.start()
+    await payment_events.start()
+    if supabase:
+        job_queue.enqueue("subscription.expiry_sweep", dedupe_key="subscription.expiry_sweep")
+        job_queue.enqueue("billing.extend_schedules", dedupe_key="billing.extend_schedules")
+        job_queue.enqueue("sync.compact_tombstones", dedupe_key="sync.compact_tombstones")
+    if supabase and mp:
+        job_queue.enqueue("mercadopago.reconcile", dedupe_key="mercadopago.reconcile")
+    yield
+    await payment_events.stop()
+    await due_date_scheduler.stop()
+    await job_queue.stop()
+    await token_denylist.stop()
+    # Encerrar workers de renderização
+    ProposalService.shutdown()
+    log_pipeline.stop()
 
 # Inicializar FastAPI
 app = FastAPI(
     title="FreelaBR API",
     description="API completa para gestão de freelancers brasileiros",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Idempotency-Key nos POSTs (registrado antes do CORS para ficar por dentro dele)
+idempotency_store = IdempotencyStore.from_env()
+app.add_middleware(IdempotencyMiddleware, store=idempotency_store)
+
 # Configurar CORS - CORRIGIDO
 frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
 allowed_origins = [
@@ -51,6 +189,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Content-Disposition", "Idempotent-Replayed", "X-Request-ID"],
+)
+
+# Frontend servido pela própria API (opcional): assets com hash, pré-comprimidos
+if os.getenv("SERVE_FRONTEND", "false").lower() == "true":
+    app.add_middleware(StaticSiteMiddleware, site=StaticSite().build())
+
+# gzip dinâmico para respostas de texto/JSON maiores que GZIP_MIN_SIZE bytes
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("GZIP_MIN_SIZE", "1024")), compresslevel=6)
+
+# Id da requisição e log de acesso (por fora de tudo, para cobrir todas as respostas)
+app.add_middleware(
+    RequestLogMiddleware,
+    sample_rates=parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "/api/calculator/calculate=0.1")),
+    slow_ms=float(os.getenv("LOG_SLOW_MS", "1000")),
 )
 
 # ==================== HEALTH CHECK ====================
@@ -65,15 +218,46 @@ async def root():
         "message": "🚀 API funcionando perfeitamente!"
     }
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """Dependência fora: 503 imediato, com a espera até o próximo teste"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Serviço temporariamente indisponível. Tente novamente em instantes"},
+        headers={"Retry-After": str(max(1, ceil(exc.retry_after)))}
+    )
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
+    breakers = {breaker.name: breaker.stats() for breaker in (supabase_breaker, mercadopago_breaker)}
     return {
-        "status": "healthy",
+        "status": "healthy" if all(b["state"] == CircuitBreaker.CLOSED for b in breakers.values()) else "degraded",
         "environment": os.getenv("ENVIRONMENT", "development"),
-        "database": "connected" if supabase else "not_configured"
+        "database": "connected" if supabase else "not_configured",
+        "circuit_breakers": breakers
     }
 
+@app.get("/health/jobs")
+async def jobs_metrics():
+    """Profundidade e latência da fila de jobs"""
+    return await run_in_threadpool(job_queue.metrics)
+
+@app.get("/health/idempotency")
+async def idempotency_metrics():
+    """Respostas guardadas e repetições atendidas pelo Idempotency-Key"""
+    return idempotency_store.stats()
+
+@app.get("/health/logging")
+async def logging_metrics():
+    """Registros na fila de log e descartados por fila cheia"""
+    return log_pipeline.stats()
+
+@app.get("/health/events")
+async def events_metrics():
+    """Conexões SSE abertas neste worker e eventos entregues"""
+    return payment_events.stats()
+
 # ==================== AUTH ROUTES ====================
 
 @app.post("/api/auth/register")
@@ -114,14 +298,11 @@ async def register(user_data: UserCreate):
         
         user = result.data[0]
         
-        # Cria token
-        access_token = AuthService.create_access_token(
-            data={"sub": user["id"], "email": user["email"]}
-        )
+        # Cria tokens (acesso curto + refresh)
+        tokens = AuthService.create_token_pair(user["id"], user["email"])
         
         return {
-            "access_token": access_token,
-            "token_type": "bearer",
+            **tokens,
             "user": {
                 "id": user["id"],
                 "email": user["email"],
@@ -129,7 +310,7 @@ async def register(user_data: UserCreate):
             }
         }
         
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -171,14 +352,11 @@ async def login(
                 detail="Email ou senha incorretos"
             )
         
-        # Cria token
-        access_token = AuthService.create_access_token(
-            data={"sub": user["id"], "email": user["email"]}
-        )
+        # Cria tokens (acesso curto + refresh)
+        tokens = AuthService.create_token_pair(user["id"], user["email"])
         
         return {
-            "access_token": access_token,
-            "token_type": "bearer",
+            **tokens,
             "user": {
                 "id": user["id"],
                 "email": user["email"],
@@ -186,7 +364,7 @@ async def login(
             }
         }
         
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -194,6 +372,51 @@ async def login(
             detail=f"Erro ao fazer login: {str(e)}"
         )
 
+def _session_revocation_expiry() -> float:
+    # Nenhum token da sessão vive mais que o último refresh token emitido
+    return (datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)).timestamp()
+
+@app.post("/api/auth/refresh")
+async def refresh_tokens(input_data: RefreshTokenInput):
+    """
+    Troca o refresh token por um novo par de tokens
+    Cada refresh token vale uma vez: a troca é registrada no banco (INSERT
+    com chave única), então dois workers não trocam o mesmo token. Repetir
+    a troca em até REFRESH_GRACE_SECONDS devolve o mesmo par; depois disso,
+    reutilizar um token antigo encerra a sessão
+    """
+    payload = AuthService.verify_token(input_data.refresh_token, REFRESH_TOKEN)
+    if payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido ou expirado"
+        )
+    
+    if token_denylist.is_family_revoked(payload["fam"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sessão encerrada"
+        )
+    
+    first, rotated_at = await run_in_threadpool(token_denylist.consume, payload)
+    if not first and time.time() - rotated_at > REFRESH_GRACE_SECONDS:
+        # Token já trocado sendo usado de novo: possível vazamento
+        await run_in_threadpool(token_denylist.revoke_family, payload["fam"], _session_revocation_expiry())
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sessão encerrada"
+        )
+    
+    return AuthService.rotate_token_pair(payload, rotated_at)
+
+@app.post("/api/auth/logout")
+async def logout(current_user: dict = Depends(get_current_user)):
+    """
+    Encerra a sessão: revoga o token de acesso e o refresh token dela
+    """
+    await run_in_threadpool(token_denylist.revoke_family, current_user["fam"], _session_revocation_expiry())
+    return {"message": "Sessão encerrada"}
+
 @app.get("/api/auth/me")
 async def get_me(current_user: dict = Depends(get_current_user)):
     """
@@ -216,7 +439,7 @@ async def get_me(current_user: dict = Depends(get_current_user)):
         
         return result.data[0]
         
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -224,6 +447,35 @@ async def get_me(current_user: dict = Depends(get_current_user)):
             detail=f"Erro ao buscar usuário: {str(e)}"
         )
 
+@app.get("/api/session")
+async def get_session(current_user: dict = Depends(get_current_user)):
+    """
+    Tudo que a página precisa ao abrir, numa requisição: perfil, status
+    da assinatura e contagens do painel (clientes, projetos, cálculos e
+    pagamentos pendentes/vencidos), lidos num único SELECT
+    """
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database não configurado"
+        )
+    
+    user_id = current_user["id"]
+    
+    def load():
+        row = SessionService.fetch(supabase, user_id)
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Usuário não encontrado"
+            )
+        session, _, _ = SessionService.bootstrap(row, SUBSCRIPTION_CACHE_TTL_SECONDS)
+        # Aquece o cache usado por /api/subscription/status
+        cache_subscription_status(user_id, row)
+        return session
+    
+    return await session_coalescer.run(f"session:{user_id}", lambda: run_in_threadpool(load))
+
 @app.put("/api/auth/update-profile")
 async def update_profile(
     update_data: dict,
@@ -316,7 +568,7 @@ async def update_profile(
             "message": "Perfil atualizado com sucesso"
         }
         
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -341,133 +593,837 @@ async def calculate_rates(input_data: CalculatorInput, current_user: dict = Depe
         raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/api/calculator/tax-info/{tax_regime}")
-async def get_tax_info(tax_regime: str):
+async def get_tax_info(tax_regime: str, request: Request):
     """
     Retorna informações sobre regime tributário
     """
-    valid_regimes = ["MEI", "PJ_SIMPLES", "PJ_PRESUMIDO", "AUTONOMO"]
+    cached = TaxRulesService.tax_info(tax_regime)
     
-    if tax_regime not in valid_regimes:
+    if cached is None:
         raise HTTPException(
             status_code=400,
-            detail=f"Regime inválido. Use: {', '.join(valid_regimes)}"
+            detail=f"Regime inválido. Use: {', '.join(TaxRulesService.regimes())}"
         )
     
-    info = CalculatorService.get_tax_info(tax_regime)
-    return info
+    body, etag = cached
+    return cached_json_response(request, body, etag, REVALIDATE_CACHE_CONTROL)
+
+@app.get("/api/calculator/tax-rules")
+async def get_tax_rules(request: Request):
+    """
+    Manifesto com todas as regras tributárias usadas pela calculadora
+    Permite que o PWA calcule offline sem chamar a API
+    """
+    body, etag = TaxRulesService.manifest()
+    response = cached_json_response(request, body, etag, REVALIDATE_CACHE_CONTROL)
+    response.headers["X-Tax-Rules-Version"] = TaxRulesService.version()
+    return response
+
+@app.get("/api/calculator/tax-rules/{version}")
+async def get_tax_rules_version(version: str, request: Request):
+    """
+    Manifesto de uma versão específica (imutável)
+    """
+    if version != TaxRulesService.version():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Versão não encontrada. Versão atual: {TaxRulesService.version()}"
+        )
+    
+    body, etag = TaxRulesService.manifest()
+    return cached_json_response(request, body, etag, IMMUTABLE_CACHE_CONTROL)
+
+# Limite de pontos por requisição na comparação em lote
+MAX_COMPARE_INCOMES = 500
 
 @app.get("/api/calculator/compare")
-async def compare_tax_regimes(monthly_income: float = 5000):
+async def compare_tax_regimes(
+    request: Request,
+    monthly_income: float = 5000,
+    incomes: Optional[List[float]] = Query(default=None),
+    income_start: Optional[float] = None,
+    income_end: Optional[float] = None,
+    income_step: Optional[float] = None,
+    hours_per_day: int = 8,
+    days_per_week: int = 5,
+    vacation_weeks: int = 4,
+    include_13th_salary: bool = True,
+    include_vacation_bonus: bool = True,
+    monthly_expenses: float = 500,
+    variable_expenses: float = 200,
+    profit_margin_percentage: float = 20,
+):
     """
     Compara custos entre diferentes regimes tributários
+    
+    Com `incomes` (repetido) ou `income_start`/`income_end`/`income_step`,
+    retorna a matriz regimes × rendas em formato colunar (um array por métrica)
     """
-    regimes = ["MEI", "PJ_SIMPLES", "PJ_PRESUMIDO", "AUTONOMO"]
-    comparisons = []
+    regimes = TaxRulesService.regimes()
+    
+    # Lista de rendas: explícita, intervalo ou a renda única
+    if incomes:
+        income_list = incomes
+    elif income_start is not None and income_end is not None:
+        step = income_step or (income_end - income_start) / 99 or 1
+        if step <= 0 or income_end < income_start:
+            raise HTTPException(status_code=400, detail="Intervalo de rendas inválido")
+        count = int((income_end - income_start) / step + 1e-9) + 1
+        if count > MAX_COMPARE_INCOMES:
+            raise HTTPException(status_code=400, detail=f"Máximo de {MAX_COMPARE_INCOMES} rendas por comparação")
+        income_list = [round(income_start + step * index, 2) for index in range(count)]
+    else:
+        income_list = None
+    
+    if income_list is not None and len(income_list) > MAX_COMPARE_INCOMES:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_COMPARE_INCOMES} rendas por comparação")
     
-    for regime in regimes:
-        input_data = CalculatorInput(
-            desired_monthly_income=monthly_income,
-            hours_per_day=8,
-            days_per_week=5,
-            vacation_weeks=4,
-            tax_regime=regime,
-            include_13th_salary=True,
-            include_vacation_bonus=True,
-            monthly_expenses=500,
-            variable_expenses=200,
-            profit_margin_percentage=20
+    # Validação única dos parâmetros; o cálculo em lote não reconstrói modelos
+    try:
+        base_input = CalculatorInput(
+            desired_monthly_income=min(income_list) if income_list else monthly_income,
+            hours_per_day=hours_per_day,
+            days_per_week=days_per_week,
+            vacation_weeks=vacation_weeks,
+            tax_regime=regimes[0],
+            include_13th_salary=include_13th_salary,
+            include_vacation_bonus=include_vacation_bonus,
+            monthly_expenses=monthly_expenses,
+            variable_expenses=variable_expenses,
+            profit_margin_percentage=profit_margin_percentage
         )
-        
-        result = CalculatorService.calculate(input_data)
-        
-        comparisons.append({
-            "regime": regime,
-            "info": CalculatorService.get_tax_info(regime),
-            "monthly_taxes": float(result.monthly_taxes),
-            "hourly_rate": float(result.hourly_rate),
-            "total_monthly_cost": float(result.total_monthly_costs)
-        })
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if base_input.profit_margin_percentage >= 100:
+        raise HTTPException(status_code=400, detail="Margem de lucro deve ser menor que 100%")
     
-    return {
-        "monthly_income": monthly_income,
-        "comparisons": comparisons
-    }
+    matrix = CompareService.matrix(base_input, income_list or [monthly_income], regimes)
+    
+    if income_list is None:
+        comparisons = []
+        for row, regime in enumerate(regimes):
+            comparisons.append({
+                "regime": regime,
+                "info": CalculatorService.get_tax_info(regime),
+                "monthly_taxes": float(matrix["monthly_taxes"][row, 0]),
+                "hourly_rate": float(matrix["hourly_rate"][row, 0]),
+                "total_monthly_cost": float(matrix["total_monthly_cost"][row, 0])
+            })
+        payload = {
+            "monthly_income": monthly_income,
+            "comparisons": comparisons
+        }
+    else:
+        payload = {
+            "incomes": income_list,
+            "regimes": regimes,
+            "info": {regime: CalculatorService.get_tax_info(regime) for regime in regimes},
+            "metrics": {metric: values.tolist() for metric, values in matrix.items()}
+        }
+    
+    body = encode_json(payload)
+    return cached_json_response(request, body, compute_etag(body), SHORT_CACHE_CONTROL)
+
+@app.post("/api/calculator/simulate")
+async def simulate_income(input_data: SimulationInput, current_user: dict = Depends(get_current_user)):
+    """
+    Simulação Monte Carlo da renda líquida com horas faturadas incertas
+    (utilização, perda de clientes e tamanho dos projetos)
+    Retorna faixas de percentis e o valor/hora necessário para a meta
+    
+    **Requer autenticação**
+    """
+    try:
+        # Cálculo vetorizado roda fora do event loop
+        return await run_in_threadpool(SimulationService.simulate, input_data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/calculator/projection")
+async def project_revenue(input_data: ProjectionInput, current_user: dict = Depends(get_current_user)):
+    """
+    Projeção mês a mês do faturamento (12/24 meses) com RBT12,
+    faixas do Simples Nacional e limite anual do MEI
+    Aceita vários cenários/curvas de crescimento por requisição
+    
+    **Requer autenticação**
+    """
+    try:
+        return await run_in_threadpool(ProjectionService.project, input_data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/calculator/regime-plan")
+async def plan_regimes(input_data: RegimePlanInput, current_user: dict = Depends(get_current_user)):
+    """
+    Sequência de regimes tributários de menor custo para uma projeção de
+    faturamento (quando sair do MEI, quando ir para Simples/Presumido)
+    
+    **Requer autenticação**
+    """
+    try:
+        return RegimePlannerService.plan(input_data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/calculator/break-even")
+async def get_break_even(
+    request: Request,
+    monthly_expenses: float = 0,
+    variable_expenses: float = 0,
+    profit_margin_percentage: float = 20,
+    include_13th_salary: bool = True,
+    include_vacation_bonus: bool = True,
+    regimes: Optional[List[str]] = Query(default=None),
+):
+    """
+    Pró-labore desejado (e faturamento correspondente) a partir do qual um
+    regime fica mais barato que outro, no mesmo modelo de /api/calculator/compare
+    (cruzamentos exatos, pré-calculados por versão da tabela)
+    """
+    if regimes and not set(regimes) <= set(TaxRulesService.regimes()):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Regime inválido. Use: {', '.join(TaxRulesService.regimes())}"
+        )
+    if not 0 <= profit_margin_percentage < 100 or monthly_expenses < 0 or variable_expenses < 0:
+        raise HTTPException(status_code=400, detail="Parâmetros inválidos")
+    
+    result = BreakEvenService.lookup(
+        monthly_expenses=Fraction(str(monthly_expenses)),
+        variable_expenses=Fraction(str(variable_expenses)),
+        profit_margin_percentage=Fraction(str(profit_margin_percentage)),
+        include_13th_salary=include_13th_salary,
+        include_vacation_bonus=include_vacation_bonus,
+        regimes=regimes,
+    )
+    body = encode_json(result)
+    return cached_json_response(request, body, compute_etag(body), SHORT_CACHE_CONTROL)
 
 # ==================== EXAMPLES ENDPOINT ====================
 
+# Exemplos são estáticos: calculados e serializados uma única vez
+CALCULATOR_EXAMPLES = [
+    {
+        "name": "Freelancer Iniciante (MEI)",
+        "description": "Desenvolvedor júnior começando como MEI",
+        "input": {
+            "desired_monthly_income": 3000,
+            "hours_per_day": 6,
+            "days_per_week": 5,
+            "vacation_weeks": 2,
+            "tax_regime": "MEI",
+            "include_13th_salary": True,
+            "include_vacation_bonus": True,
+            "monthly_expenses": 300,
+            "variable_expenses": 100,
+            "profit_margin_percentage": 15
+        }
+    },
+    {
+        "name": "Freelancer Intermediário (PJ Simples)",
+        "description": "Designer com experiência, PJ Simples",
+        "input": {
+            "desired_monthly_income": 7000,
+            "hours_per_day": 8,
+            "days_per_week": 5,
+            "vacation_weeks": 4,
+            "tax_regime": "PJ_SIMPLES",
+            "include_13th_salary": True,
+            "include_vacation_bonus": True,
+            "monthly_expenses": 800,
+            "variable_expenses": 400,
+            "profit_margin_percentage": 25
+        }
+    },
+    {
+        "name": "Freelancer Sênior (PJ Presumido)",
+        "description": "Consultor experiente, faturamento alto",
+        "input": {
+            "desired_monthly_income": 15000,
+            "hours_per_day": 8,
+            "days_per_week": 5,
+            "vacation_weeks": 6,
+            "tax_regime": "PJ_PRESUMIDO",
+            "include_13th_salary": True,
+            "include_vacation_bonus": True,
+            "monthly_expenses": 2000,
+            "variable_expenses": 1000,
+            "profit_margin_percentage": 30
+        }
+    }
+]
+
+_examples_cache = None
+
+def _build_examples() -> tuple:
+    """Calcula os exemplos e retorna (bytes, etag)"""
+    examples = []
+    for example in CALCULATOR_EXAMPLES:
+        input_data = CalculatorInput(**example["input"])
+        result = CalculatorService.calculate(input_data)
+        examples.append({
+            **example,
+            "result": {
+                "hourly_rate": float(result.hourly_rate),
+                "daily_rate": float(result.daily_rate),
+                "monthly_rate": float(result.monthly_rate),
+                "small_project": float(result.small_project_value),
+                "medium_project": float(result.medium_project_value),
+                "large_project": float(result.large_project_value)
+            }
+        })
+    
+    body = encode_json(examples)
+    return body, compute_etag(body)
+
 @app.get("/api/examples")
-async def get_examples():
+async def get_examples(request: Request):
     """
     Retorna exemplos de cálculos prontos
     """
-    examples = [
-        {
-            "name": "Freelancer Iniciante (MEI)",
-            "description": "Desenvolvedor júnior começando como MEI",
-            "input": {
-                "desired_monthly_income": 3000,
-                "hours_per_day": 6,
-                "days_per_week": 5,
-                "vacation_weeks": 2,
-                "tax_regime": "MEI",
-                "include_13th_salary": True,
-                "include_vacation_bonus": True,
-                "monthly_expenses": 300,
-                "variable_expenses": 100,
-                "profit_margin_percentage": 15
-            }
-        },
-        {
-            "name": "Freelancer Intermediário (PJ Simples)",
-            "description": "Designer com experiência, PJ Simples",
-            "input": {
-                "desired_monthly_income": 7000,
-                "hours_per_day": 8,
-                "days_per_week": 5,
-                "vacation_weeks": 4,
-                "tax_regime": "PJ_SIMPLES",
-                "include_13th_salary": True,
-                "include_vacation_bonus": True,
-                "monthly_expenses": 800,
-                "variable_expenses": 400,
-                "profit_margin_percentage": 25
-            }
-        },
-        {
-            "name": "Freelancer Sênior (PJ Presumido)",
-            "description": "Consultor experiente, faturamento alto",
-            "input": {
-                "desired_monthly_income": 15000,
-                "hours_per_day": 8,
-                "days_per_week": 5,
-                "vacation_weeks": 6,
-                "tax_regime": "PJ_PRESUMIDO",
-                "include_13th_salary": True,
-                "include_vacation_bonus": True,
-                "monthly_expenses": 2000,
-                "variable_expenses": 1000,
-                "profit_margin_percentage": 30
-            }
-        }
-    ]
+    global _examples_cache
+    if _examples_cache is None:
+        _examples_cache = _build_examples()
     
-    # Calcular os resultados
-    for example in examples:
-        input_data = CalculatorInput(**example["input"])
-        result = CalculatorService.calculate(input_data)
-        example["result"] = {
-            "hourly_rate": float(result.hourly_rate),
-            "daily_rate": float(result.daily_rate),
-            "monthly_rate": float(result.monthly_rate),
-            "small_project": float(result.small_project_value),
-            "medium_project": float(result.medium_project_value),
-            "large_project": float(result.large_project_value)
+    body, etag = _examples_cache
+    return cached_json_response(request, body, etag, REVALIDATE_CACHE_CONTROL)
+
+# ==================== EXPORT ROUTES ====================
+
+@app.get("/api/export/{entity}")
+async def export_history(
+    entity: str,
+    format: str = Query(default="csv", description="csv ou xlsx"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Exporta projetos, pagamentos ou cálculos salvos do usuário
+    O arquivo é gerado em streaming, página a página
+    """
+    if entity not in EXPORTS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Exportação inválida. Use: {', '.join(EXPORTS)}"
+        )
+    
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Formato inválido. Use: {', '.join(FORMATS)}"
+        )
+    
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database não configurado"
+        )
+    
+    fetch_page = ExportService.supabase_fetcher(supabase, current_user["id"])
+    filename = f"freelabr-{entity}-{datetime.now().strftime('%Y%m%d')}.{format}"
+    
+    # Gerador síncrono: o Starlette consome cada página numa thread
+    return StreamingResponse(
+        ExportService.stream(entity, format, fetch_page),
+        media_type=ExportService.media_type(format),
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
         }
+    )
+
+# ==================== SEARCH ROUTES ====================
+
+@app.get("/api/search")
+async def search(
+    q: str = Query(min_length=1, max_length=100, description="Texto buscado"),
+    kind: Optional[str] = Query(default=None, description="clients ou projects"),
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Busca clientes e projetos do usuário (sem acento, por prefixo e trecho)
+    O índice é montado na primeira busca e mantido em memória; o
+    sync_heads.seq do usuário diz se há escritas a aplicar
+    """
+    if kind is not None and kind not in SEARCH_FIELDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo inválido. Use: {', '.join(SEARCH_FIELDS)}"
+        )
+    
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database não configurado"
+        )
+    
+    loader = SearchService.supabase_loader(supabase)
+    return await run_in_threadpool(
+        SearchService.search, current_user["id"], q, loader, limit, kind, SupabaseChangeLogStore(supabase)
+    )
+
+# ==================== SYNC ROUTES ====================
+
+@app.get("/api/sync")
+async def sync_changes(
+    since: Optional[str] = Query(default=None, description="Cursor devolvido pela sincronização anterior"),
+    limit: int = Query(default=SyncService.DEFAULT_LIMIT, ge=1, le=2000),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Sincronização incremental do PWA: clientes, projetos, pagamentos e
+    cálculos salvos alterados ou apagados depois do cursor
+    
+    Sem cursor (ou com cursor antigo demais) devolve o estado completo
+    com "reset": true. Com "has_more": true, chamar de novo com o novo
+    cursor.
+    """
+    try:
+        cursor = SyncService.parse_cursor(since)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database não configurado"
+        )
+    
+    store = SupabaseChangeLogStore(supabase)
+    return await run_in_threadpool(SyncService.pull, store, current_user["id"], cursor, limit)
+
+# ==================== BILLING SCHEDULE ROUTES ====================
+
+def apply_billing_schedule(user_id: str, project: dict) -> dict:
+    """Grava as parcelas e avisa o agendador de vencimentos"""
+    result = BillingScheduleService.apply(supabase, user_id, project)
+    for row in result.pop("changed_rows"):
+        due_date_scheduler.track(row)
+    for payment_id in result.pop("removed_ids"):
+        due_date_scheduler.untrack(payment_id)
+    return result
+
+def _get_project(project_id: str, user_id: str) -> dict:
+    project = supabase.table("projects").select("id, value, status").eq(
+        "id", project_id
+    ).eq("user_id", user_id).execute()
+    if not project.data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Projeto não encontrado"
+        )
+    return project.data[0]
+
+@app.put("/api/projects/{project_id}/billing-schedule")
+async def set_billing_schedule(
+    project_id: str,
+    schedule: BillingSchedule,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Define ou altera a cobrança recorrente do projeto (mensal, quinzenal,
+    N parcelas, data final). As parcelas dos próximos
+    BILLING_HORIZON_DAYS dias são geradas em lote; na edição, só as
+    parcelas futuras pendentes que mudaram são regravadas.
+    """
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database não configurado"
+        )
+    
+    try:
+        BillingScheduleService.validate(schedule)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    def update():
+        project = _get_project(project_id, current_user["id"])
+        project["billing_schedule"] = schedule.model_dump(mode="json")
+        supabase.table("projects").update({
+            "billing_schedule": project["billing_schedule"]
+        }).eq("id", project_id).execute()
+        return apply_billing_schedule(current_user["id"], project)
+    
+    result = await run_in_threadpool(update)
+    return {"billing_schedule": schedule.model_dump(mode="json"), **result}
+
+@app.delete("/api/projects/{project_id}/billing-schedule")
+async def delete_billing_schedule(project_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Encerra a cobrança recorrente e remove as parcelas futuras ainda pendentes
+    """
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database não configurado"
+        )
+    
+    def delete():
+        project = _get_project(project_id, current_user["id"])
+        supabase.table("projects").update({"billing_schedule": None}).eq("id", project_id).execute()
+        project["billing_schedule"] = None
+        return apply_billing_schedule(current_user["id"], project)
+    
+    return await run_in_threadpool(delete)
+
+# ==================== TIME TRACKING ROUTES ====================
+
+def _time_store() -> SupabaseTimeStore:
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database não configurado"
+        )
+    return SupabaseTimeStore(supabase)
+
+def _check_projects(user_id: str, project_ids: set):
+    found = supabase.table("projects").select("id").eq("user_id", user_id).in_("id", list(project_ids)).execute()
+    missing = project_ids - {project["id"] for project in found.data}
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Projeto não encontrado: {', '.join(sorted(missing))}"
+        )
+
+@app.post("/api/time/entries")
+async def create_time_entries(input_data: TimeEntriesBulkInput, current_user: dict = Depends(get_current_user)):
+    """
+    Lança horas em lote (até 500 lançamentos por requisição)
+    """
+    store = _time_store()
+    rows = []
+    for entry in input_data.entries:
+        try:
+            TimeTrackingService.validate(entry.started_at, entry.ended_at)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        rows.append(TimeTrackingService.entry_row(
+            current_user["id"], entry.project_id, entry.started_at, entry.ended_at, entry.notes
+        ))
+    
+    def create():
+        _check_projects(current_user["id"], {row["project_id"] for row in rows})
+        return TimeTrackingService.record(store, current_user["id"], rows)
+    
+    entries = await run_in_threadpool(create)
+    return {"created": len(entries), "entries": entries}
+
+@app.post("/api/time/entries/{entry_id}/void")
+async def void_time_entry(entry_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Anula um lançamento (os lançamentos nunca são editados nem apagados)
+    """
+    store = _time_store()
+    try:
+        entry = await run_in_threadpool(TimeTrackingService.void, store, current_user["id"], entry_id)
+    except TimeConflictError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Lançamento já anulado"
+        )
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Lançamento não encontrado ou é uma anulação"
+        )
+    return entry
+
+@app.get("/api/time/timer")
+async def get_timer(current_user: dict = Depends(get_current_user)):
+    """Timer rodando (ou null)"""
+    store = _time_store()
+    return {"timer": await run_in_threadpool(store.get_timer, current_user["id"])}
+
+@app.post("/api/time/timer/start")
+async def start_timer(input_data: TimerStartInput, current_user: dict = Depends(get_current_user)):
+    """Inicia o timer de um projeto (um por vez)"""
+    store = _time_store()
+    
+    def start():
+        _check_projects(current_user["id"], {input_data.project_id})
+        return TimeTrackingService.start_timer(store, current_user["id"], input_data.project_id, input_data.notes)
+    
+    timer = await run_in_threadpool(start)
+    if timer is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Já existe um timer rodando"
+        )
+    return {"timer": timer}
+
+@app.post("/api/time/timer/stop")
+async def stop_timer(current_user: dict = Depends(get_current_user)):
+    """Para o timer e grava o lançamento"""
+    store = _time_store()
+    entry = await run_in_threadpool(TimeTrackingService.stop_timer, store, current_user["id"])
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Nenhum timer rodando"
+        )
+    return entry
+
+@app.get("/api/time/analytics")
+async def time_analytics(
+    calculation_id: Optional[str] = Query(default=None, description="Cálculo usado como referência (padrão: o mais recente)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Valor/hora efetivo por projeto e cliente comparado ao valor/hora
+    recomendado pela calculadora. Lê só os totais por projeto e mês.
+    """
+    store = _time_store()
+    user_id = current_user["id"]
+    
+    def load():
+        rollups = store.rollups(user_id)
+        project_ids = list({row["project_id"] for row in rollups})
+        projects = supabase.table("projects").select("id, title, value, client_id").eq(
+            "user_id", user_id
+        ).in_("id", project_ids).execute().data if project_ids else []
+        client_ids = list({project["client_id"] for project in projects if project.get("client_id")})
+        clients = supabase.table("clients").select("id, name").eq(
+            "user_id", user_id
+        ).in_("id", client_ids).execute().data if client_ids else []
+        
+        query = supabase.table("calculations").select("input_data").eq("user_id", user_id)
+        if calculation_id:
+            query = query.eq("id", calculation_id)
+        calculation = query.order("created_at", desc=True).limit(1).execute().data
+        return rollups, projects, clients, calculation
+    
+    rollups, projects, clients, calculation = await run_in_threadpool(load)
+    
+    recommended = None
+    if calculation:
+        try:
+            recommended = CalculatorService.calculate(CalculatorInput(**calculation[0]["input_data"])).hourly_rate
+        except (ValidationError, TypeError):
+            recommended = None
+    
+    return TimeTrackingService.analytics(rollups, projects, clients, recommended)
+
+# ==================== READJUSTMENT ROUTES ====================
+
+@app.get("/api/inflation/{index}")
+async def get_accumulated_inflation(
+    index: str,
+    start: str = Query(description="Primeiro mês (AAAA-MM)"),
+    end: str = Query(description="Último mês (AAAA-MM)")
+):
+    """
+    IPCA ou INPC acumulado entre dois meses (inclusive)
+    """
+    index = index.upper()
+    if index not in INDICES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Índice não encontrado. Use: {', '.join(INDICES)}"
+        )
+    try:
+        accumulated = InflationService.accumulated(index, parse_month(start), parse_month(end))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"index": index, "start": start, "end": end, "accumulated_percentage": round(accumulated, 4)}
+
+@app.post("/api/readjustments")
+async def readjust_values(input_data: ReadjustmentInput, current_user: dict = Depends(get_current_user)):
+    """
+    Reajusta cálculos salvos e valores de projetos pelo IPCA/INPC
+    acumulado desde a data de cada um e devolve os novos valores
+    hora/dia/mês. Com apply=true, grava tudo em lote junto com o mês do
+    reajuste (readjusted_through), que vira a base do próximo: aplicar de
+    novo para o mesmo mês não muda nada.
+    """
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database não configurado"
+        )
+    
+    user_id = current_user["id"]
+    reference = parse_month(input_data.reference_month) if input_data.reference_month else None
+    
+    def readjust():
+        calculations = supabase.table("calculations").select("*").eq("user_id", user_id)
+        if input_data.calculation_ids is not None:
+            calculations = calculations.in_("id", input_data.calculation_ids)
+        projects = supabase.table("projects").select("*").eq("user_id", user_id)
+        if input_data.project_ids is not None:
+            projects = projects.in_("id", input_data.project_ids)
+        else:
+            projects = projects.in_("status", ["PROPOSAL", "IN_PROGRESS"])
+        calculation_rows = calculations.execute().data if input_data.calculation_ids != [] else []
+        project_rows = projects.execute().data if input_data.project_ids != [] else []
+        
+        result = InflationService.readjust(calculation_rows, project_rows, input_data.index, reference)
+        
+        if input_data.apply:
+            # Linhas completas num upsert por lote (evita um UPDATE por linha)
+            by_id = {row["id"]: row for row in calculation_rows}
+            updated = [
+                {
+                    **by_id[item["id"]],
+                    "input_data": item["input_data"],
+                    "result_data": item["result_data"],
+                    "readjusted_through": item["reference_month"],
+                }
+                for item in result["calculations"]
+            ]
+            for start in range(0, len(updated), 100):
+                supabase.table("calculations").upsert(updated[start:start + 100]).execute()
+            by_id = {row["id"]: row for row in project_rows}
+            updated = [
+                {
+                    **by_id[item["id"]],
+                    "value": str(item["value"]),
+                    "readjusted_through": item["reference_month"],
+                    "updated_at": datetime.now().isoformat(),
+                }
+                for item in result["projects"]
+            ]
+            for start in range(0, len(updated), 100):
+                supabase.table("projects").upsert(updated[start:start + 100]).execute()
+            # Parcelas futuras das cobranças recorrentes acompanham o novo valor
+            for project in updated:
+                if project.get("billing_schedule"):
+                    apply_billing_schedule(user_id, project)
+        
+        for item in result["calculations"]:
+            del item["input_data"], item["result_data"]
+        return result
+    
+    try:
+        result = await run_in_threadpool(readjust)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {**result, "applied": input_data.apply}
+
+# ==================== PROPOSAL ROUTES ====================
+
+PROPOSAL_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def _proposal_response(request: Request, digest: str, fmt: str, data: bytes, headers: Optional[dict] = None) -> Response:
+    etag = f'"{digest}"'
+    response_headers = {
+        "ETag": etag,
+        "Cache-Control": PRIVATE_IMMUTABLE_CACHE_CONTROL,
+        "Content-Disposition": f'inline; filename="proposta-{digest[:12]}.{fmt}"',
+        **(headers or {}),
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=response_headers)
+    return Response(content=data, media_type=PROPOSAL_MEDIA_TYPES[fmt], headers=response_headers)
+
+@app.post("/api/proposals")
+async def create_proposal(
+    input_data: ProposalInput,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Gera a proposta comercial (PDF ou HTML) com os pacotes do cálculo
+    Propostas idênticas são servidas do armazenamento, sem nova renderização
+    
+    **Requer autenticação**
+    """
+    try:
+        context = ProposalService.build_context(input_data, current_user["email"])
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    digest, data, stored = await ProposalService.render(context, input_data.format)
+    
+    return _proposal_response(request, digest, input_data.format, data, {
+        "Location": f"/api/proposals/{digest}.{input_data.format}",
+        "X-Proposal-Cache": "hit" if stored else "miss",
+    })
+
+@app.get("/api/proposals/{proposal_id}.{fmt}")
+async def get_proposal(
+    proposal_id: str,
+    fmt: str,
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Baixa uma proposta já gerada pelo seu hash
+    """
+    if not PROPOSAL_ID_PATTERN.match(proposal_id) or fmt not in PROPOSAL_MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Proposta não encontrada")
+    
+    data = await run_in_threadpool(ProposalService.load, proposal_id, fmt)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Proposta não encontrada")
+    
+    return _proposal_response(request, proposal_id, fmt, data)
+
+# ==================== NOTIFICATION ROUTES ====================
+
+@app.get("/api/notifications")
+async def list_notifications(
+    limit: int = Query(default=50, ge=1, le=200),
+    current_user: dict = Depends(get_current_user)
+):
+    """Avisos mais recentes do usuário (lembretes de vencimento)"""
+    if not supabase:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database não configurado"
+        )
     
-    return examples
+    response = await run_in_threadpool(
+        supabase.table("notifications").select("id, type, payment_id, due_date, message, created_at").eq(
+            "user_id", current_user["id"]
+        ).order("created_at", desc=True).limit(limit).execute
+    )
+    return {"notifications": response.data}
 
 # ==================== PRO SUBSCRIPTION ROUTES ====================
 
+# Status da assinatura fica no cache compartilhado; mudanças invalidam a chave
+SUBSCRIPTION_CACHE_TTL_SECONDS = 60
+
+# Cópia de reserva do status, servida só com o Supabase fora
+SUBSCRIPTION_STALE_TTL_SECONDS = int(os.getenv("SUBSCRIPTION_STALE_TTL_SECONDS", "86400"))
+
+def _subscription_cache_key(user_id: str) -> str:
+    return f"subscription:{user_id}"
+
+def _subscription_stale_key(user_id: str) -> str:
+    return f"subscription:stale:{user_id}"
+
+def invalidate_subscription_status(user_id: str):
+    """Remove o status em cache de todos os workers"""
+    cache = get_shared_cache()
+    cache.delete(_subscription_cache_key(user_id))
+    cache.delete(_subscription_stale_key(user_id))
+
+def cache_subscription_status(user_id: str, user_data: dict) -> dict:
+    """
+    Status atual da assinatura no cache (rebaixa no banco se venceu)
+    A cópia de reserva também nunca passa do vencimento
+    """
+    subscription_status, cache_ttl, newly_expired = SessionService.subscription_state(
+        user_data, SUBSCRIPTION_CACHE_TTL_SECONDS
+    )
+    if newly_expired:
+        expire_subscription(user_id)
+    _, stale_ttl, _ = SessionService.subscription_state(user_data, SUBSCRIPTION_STALE_TTL_SECONDS)
+    cache = get_shared_cache()
+    cache.set(_subscription_cache_key(user_id), subscription_status, ttl=cache_ttl)
+    cache.set(_subscription_stale_key(user_id), subscription_status, ttl=stale_ttl)
+    return subscription_status
+
+def expire_subscription(user_id: str):
+    """Rebaixa a assinatura que venceu (antes da varredura horária)"""
+    supabase.table("users").update({
+        "is_pro": False,
+        "subscription_status": "expired"
+    }).eq("id", user_id).execute()
+
 @app.get("/api/subscription/status")
 async def get_subscription_status(current_user: dict = Depends(get_current_user)):
     """
@@ -479,6 +1435,13 @@ async def get_subscription_status(current_user: dict = Depends(get_current_user)
             detail="Database não configurado"
         )
     
+    # Status recente compartilhado entre os workers
+    cache = get_shared_cache()
+    cache_key = _subscription_cache_key(current_user["id"])
+    cached_status = cache.get(cache_key)
+    if cached_status is not None:
+        return cached_status
+    
     try:
         # Buscar informações do usuário
         user_result = supabase.table("users").select(
@@ -491,39 +1454,47 @@ async def get_subscription_status(current_user: dict = Depends(get_current_user)
                 detail="Usuário não encontrado"
             )
         
-        user_data = user_result.data[0]
-        
         # Verificar se assinatura expirou
-        is_expired = False
-        if user_data.get("subscription_end_date"):
-            end_date = datetime.fromisoformat(user_data["subscription_end_date"].replace("Z", "+00:00"))
-            is_expired = end_date < datetime.now()
-            
-            if is_expired and user_data.get("is_pro"):
-                # Atualizar status se expirou
-                supabase.table("users").update({
-                    "is_pro": False,
-                    "subscription_status": "expired"
-                }).eq("id", current_user["id"]).execute()
-                user_data["is_pro"] = False
-                user_data["subscription_status"] = "expired"
-        
-        return {
-            "is_pro": user_data.get("is_pro", False),
-            "status": user_data.get("subscription_status", "free"),
-            "plan": user_data.get("subscription_plan"),
-            "end_date": user_data.get("subscription_end_date"),
-            "is_expired": is_expired
-        }
+        return cache_subscription_status(current_user["id"], user_result.data[0])
         
     except HTTPException:
         raise
     except Exception as e:
+        # Supabase lento ou fora: último status conhecido, marcado como stale
+        stale_status = cache.get(_subscription_stale_key(current_user["id"]))
+        if stale_status is not None:
+            logger.warning("Status da assinatura servido do cache de reserva", extra={"error": str(e)})
+            return {**stale_status, "stale": True}
+        if isinstance(e, CircuitOpenError):
+            raise
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao verificar status: {str(e)}"
         )
 
+@app.get("/api/subscription/events")
+async def subscription_events(
+    current_user: dict = Depends(get_current_user),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Eventos de pagamento do usuário (text/event-stream)
+    Substitui o polling de /api/subscription/status enquanto o pagamento
+    aguarda aprovação; o reconnect com Last-Event-ID recebe o que perdeu
+    """
+    if payment_events.is_full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitas conexões abertas. Tente novamente em instantes",
+            headers={"Retry-After": "10"}
+        )
+    
+    return StreamingResponse(
+        payment_events.stream(current_user["id"], parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/subscription/create-preference")
 async def create_payment_preference(
     plan_type: str,  # 'monthly' ou 'annual'
@@ -611,7 +1582,7 @@ async def create_payment_preference(
             "sandbox_init_point": preference.get("sandbox_init_point")
         }
         
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception as e:
         raise HTTPException(
@@ -619,10 +1590,188 @@ async def create_payment_preference(
             detail=f"Erro ao criar preferência: {str(e)}"
         )
 
+@job_queue.handler("mercadopago.payment", concurrency=2, max_attempts=8, backoff_seconds=10)
+def process_mercadopago_payment(payload: dict):
+    """
+    Processa um pagamento notificado pelo Mercado Pago
+    Erros sobem para a fila, que tenta de novo com backoff
+    """
+    payment_id = payload["payment_id"]
+    
+    # Buscar informações do pagamento
+    payment_info = mp.payment().get(payment_id)
+    payment = payment_info["response"]
+    
+    # Extrair user_id e plan_type do external_reference
+    external_ref = payment.get("external_reference", "")
+    if "|" not in external_ref:
+        return
+    user_id, plan_type = external_ref.split("|")
+    
+    # Pagamento recusado: avisa a página que aguarda a aprovação
+    if payment["status"] in ("rejected", "cancelled"):
+        payment_events.publish(user_id, "payment", {
+            "status": payment["status"],
+            "status_detail": payment.get("status_detail"),
+            "payment_id": str(payment_id),
+        })
+        return
+    
+    # Verificar se pagamento foi aprovado
+    if payment["status"] != "approved":
+        return
+    
+    # Notificação repetida: assinatura já registrada para este pagamento
+    existing = supabase.table("subscriptions").select("id").eq(
+        "mercadopago_payment_id", str(payment_id)
+    ).execute()
+    if existing.data:
+        return
+    
+    # Calcular data de expiração
+    start_date = datetime.now()
+    if plan_type == "monthly":
+        end_date = start_date + timedelta(days=30)
+    else:  # annual
+        end_date = start_date + timedelta(days=365)
+    
+    # Atualizar usuário para PRO
+    supabase.table("users").update({
+        "is_pro": True,
+        "subscription_status": "active",
+        "subscription_plan": plan_type,
+        "subscription_start_date": start_date.isoformat(),
+        "subscription_end_date": end_date.isoformat(),
+        "mercadopago_customer_id": payment.get("payer", {}).get("id")
+    }).eq("id", user_id).execute()
+    
+    # Criar registro de assinatura (mercadopago_payment_id é único)
+    subscription_data = {
+        "user_id": user_id,
+        "plan_type": plan_type,
+        "plan_price": payment["transaction_amount"],
+        "status": "active",
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "mercadopago_payment_id": str(payment_id)
+    }
+    created = supabase.table("subscriptions").upsert(
+        subscription_data, on_conflict="mercadopago_payment_id", ignore_duplicates=True
+    ).execute()
+    if not created.data:
+        # A reconciliação gravou este pagamento no meio tempo: já processado
+        invalidate_subscription_status(user_id)
+        return
+    
+    # Criar registro de pagamento
+    payment_data = {
+        "user_id": user_id,
+        "subscription_id": None,  # Será preenchido depois
+        "amount": payment["transaction_amount"],
+        "status": "approved",
+        "payment_method": payment.get("payment_method_id"),
+        "mercadopago_payment_id": str(payment_id),
+        "mercadopago_status": payment["status"],
+        "mercadopago_status_detail": payment.get("status_detail"),
+        "paid_at": datetime.now().isoformat()
+    }
+    supabase.table("payments").upsert(
+        payment_data, on_conflict="mercadopago_payment_id", ignore_duplicates=True
+    ).execute()
+    
+    invalidate_subscription_status(user_id)
+    payment_events.publish(user_id, "payment", {
+        "status": "approved",
+        "payment_id": str(payment_id),
+        "plan": plan_type,
+        "is_pro": True,
+    })
+
+@job_queue.handler("mercadopago.reconcile", max_attempts=3, backoff_seconds=60, interval_seconds=RECONCILE_INTERVAL_SECONDS)
+def reconcile_mercadopago_payments(payload: dict):
+    """
+    Ativa assinaturas de pagamentos aprovados cujo webhook se perdeu
+    (roda a cada hora sobre as últimas MERCADOPAGO_RECONCILE_WINDOW_HOURS)
+    """
+    summary = ReconciliationService.run(
+        MercadoPagoPaymentSearch(mp, max_concurrency=int(os.getenv("MERCADOPAGO_SEARCH_CONCURRENCY", "4"))),
+        SupabaseSubscriptionStore(supabase),
+        window_hours=payload.get("window_hours"),
+    )
+    # Mesmo evento do webhook, para a página que aguarda a aprovação
+    for activation in summary["activations"]:
+        invalidate_subscription_status(activation["user_id"])
+        payment_events.publish(activation["user_id"], "payment", {
+            "status": "approved",
+            "payment_id": activation["payment_id"],
+            "plan": activation["plan"],
+            "is_pro": True,
+        })
+    if summary["subscriptions_created"] or summary["payments_created"]:
+        logger.warning("Pagamentos do Mercado Pago reconciliados", extra=summary)
+
+@job_queue.handler("subscription.expiry_sweep", max_attempts=3, interval_seconds=EXPIRY_SWEEP_INTERVAL_SECONDS)
+def sweep_expired_subscriptions(payload: dict):
+    """
+    Rebaixa assinaturas PRO vencidas (roda a cada hora)
+    """
+    expired = supabase.table("users").select("id").eq("is_pro", True).lt(
+        "subscription_end_date", datetime.now().isoformat()
+    ).execute()
+    user_ids = [user["id"] for user in expired.data]
+    
+    if user_ids:
+        supabase.table("users").update({
+            "is_pro": False,
+            "subscription_status": "expired"
+        }).in_("id", user_ids).execute()
+        for user_id in user_ids:
+            invalidate_subscription_status(user_id)
+
+@job_queue.handler("billing.extend_schedules", max_attempts=3, interval_seconds=BILLING_EXTEND_INTERVAL_SECONDS)
+def extend_billing_schedules(payload: dict):
+    """
+    Gera as parcelas que entraram no horizonte (roda uma vez por dia)
+    """
+    start = 0
+    while True:
+        projects = supabase.table("projects").select("id, user_id, value, billing_schedule").not_.is_(
+            "billing_schedule", "null"
+        ).in_("status", ["PROPOSAL", "IN_PROGRESS"]).order("id").range(
+            start, start + BillingScheduleService.BATCH_SIZE - 1
+        ).execute().data
+        for project in projects:
+            apply_billing_schedule(project["user_id"], project)
+        if len(projects) < BillingScheduleService.BATCH_SIZE:
+            return
+        start += BillingScheduleService.BATCH_SIZE
+
+@job_queue.handler("sync.compact_tombstones", max_attempts=3, interval_seconds=SYNC_COMPACT_INTERVAL_SECONDS)
+def compact_sync_tombstones(payload: dict):
+    """
+    Remove exclusões antigas do log de sincronização (roda uma vez por dia)
+    """
+    SyncService.compact(SupabaseChangeLogStore(supabase))
+
+@job_queue.handler("payment.due_reminder", concurrency=2, max_attempts=5, backoff_seconds=30)
+def send_payment_reminder(payload: dict):
+    """
+    Registra o lembrete de vencimento para o usuário (GET /api/notifications)
+    Idempotente: o unique (payment_id, type, due_date) descarta o aviso repetido
+    """
+    supabase.table("notifications").upsert({
+        "user_id": payload["user_id"],
+        "type": "payment_due",
+        "payment_id": payload["id"],
+        "due_date": payload["due_date"],
+        "message": f"Pagamento de {format_brl(payload['amount'])} vence em {payload['due_date'][:10]}",
+    }, on_conflict="payment_id,type,due_date", ignore_duplicates=True).execute()
+
 @app.post("/api/subscription/webhook")
 async def mercadopago_webhook(request: Request):
     """
     Recebe notificações de pagamento do Mercado Pago
+    O processamento vai para a fila; a resposta é imediata
     """
     if not mp or not supabase:
         return {"status": "service_unavailable"}
@@ -635,64 +1784,19 @@ async def mercadopago_webhook(request: Request):
         if data.get("type") == "payment":
             payment_id = data["data"]["id"]
             
-            # Buscar informações do pagamento
-            payment_info = mp.payment().get(payment_id)
-            payment = payment_info["response"]
-            
-            # Verificar se pagamento foi aprovado
-            if payment["status"] == "approved":
-                # Extrair user_id e plan_type do external_reference
-                external_ref = payment.get("external_reference", "")
-                if "|" in external_ref:
-                    user_id, plan_type = external_ref.split("|")
-                    
-                    # Calcular data de expiração
-                    start_date = datetime.now()
-                    if plan_type == "monthly":
-                        end_date = start_date + timedelta(days=30)
-                    else:  # annual
-                        end_date = start_date + timedelta(days=365)
-                    
-                    # Atualizar usuário para PRO
-                    supabase.table("users").update({
-                        "is_pro": True,
-                        "subscription_status": "active",
-                        "subscription_plan": plan_type,
-                        "subscription_start_date": start_date.isoformat(),
-                        "subscription_end_date": end_date.isoformat(),
-                        "mercadopago_customer_id": payment.get("payer", {}).get("id")
-                    }).eq("id", user_id).execute()
-                    
-                    # Criar registro de assinatura
-                    subscription_data = {
-                        "user_id": user_id,
-                        "plan_type": plan_type,
-                        "plan_price": payment["transaction_amount"],
-                        "status": "active",
-                        "start_date": start_date.isoformat(),
-                        "end_date": end_date.isoformat(),
-                        "mercadopago_payment_id": str(payment_id)
-                    }
-                    supabase.table("subscriptions").insert(subscription_data).execute()
-                    
-                    # Criar registro de pagamento
-                    payment_data = {
-                        "user_id": user_id,
-                        "subscription_id": None,  # Será preenchido depois
-                        "amount": payment["transaction_amount"],
-                        "status": "approved",
-                        "payment_method": payment.get("payment_method_id"),
-                        "mercadopago_payment_id": str(payment_id),
-                        "mercadopago_status": payment["status"],
-                        "mercadopago_status_detail": payment.get("status_detail"),
-                        "paid_at": datetime.now().isoformat()
-                    }
-                    supabase.table("payments").insert(payment_data).execute()
+            # Notificações repetidas do mesmo pagamento viram um único job
+            job_id = await run_in_threadpool(
+                job_queue.enqueue,
+                "mercadopago.payment",
+                {"payment_id": payment_id},
+                dedupe_key=f"mercadopago.payment:{payment_id}"
+            )
+            return {"status": "queued", "job_id": job_id}
         
         return {"status": "ok"}
         
     except Exception as e:
-        print(f"Erro no webhook: {str(e)}")
+        logger.exception("Erro no webhook")
         return {"status": "error", "message": str(e)}
 
 @app.post("/api/subscription/cancel")
@@ -718,8 +1822,12 @@ async def cancel_subscription(current_user: dict = Depends(get_current_user)):
             "canceled_at": datetime.now().isoformat()
         }).eq("user_id", current_user["id"]).eq("status", "active").execute()
         
+        invalidate_subscription_status(current_user["id"])
+        
         return {"message": "Assinatura cancelada com sucesso"}
         
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, Literal
-from datetime import datetime
+from typing import Optional, Literal, List
+from datetime import datetime, date
 from decimal import Decimal
 
 # ==================== USER MODELS ====================
@@ -18,6 +18,9 @@ class UserUpdate(BaseModel):
     new_password: Optional[str] = None
     current_password: str  # Sempre obrigatório para confirmar
 
+class RefreshTokenInput(BaseModel):
+    refresh_token: str
+
 class User(UserBase):
     id: str
     created_at: datetime
@@ -48,11 +51,11 @@ class CalculatorInput(BaseModel):
     include_vacation_bonus: bool = Field(default=True)
     
     # Despesas
-    monthly_expenses: Decimal = Field(ge=0, default=0, description="Despesas fixas mensais")
-    variable_expenses: Decimal = Field(ge=0, default=0, description="Despesas variáveis mensais")
+    monthly_expenses: Decimal = Field(ge=0, default=Decimal("0"), description="Despesas fixas mensais")
+    variable_expenses: Decimal = Field(ge=0, default=Decimal("0"), description="Despesas variáveis mensais")
     
     # Margem
-    profit_margin_percentage: Decimal = Field(ge=0, le=100, default=20, description="Margem de lucro desejada")
+    profit_margin_percentage: Decimal = Field(ge=0, le=100, default=Decimal("20"), description="Margem de lucro desejada")
 
 class CalculatorResult(BaseModel):
     # Valores calculados
@@ -78,6 +81,57 @@ class CalculatorResult(BaseModel):
     medium_project_value: Decimal  # 80-120h
     large_project_value: Decimal  # 160-240h
 
+class SimulationInput(CalculatorInput):
+    # Valor/hora praticado (padrão: valor recomendado pela calculadora)
+    hourly_rate: Optional[Decimal] = Field(gt=0, default=None, description="Valor/hora praticado")
+    
+    # Utilização: fração das horas disponíveis que é faturada em cada mês
+    utilization_mean: float = Field(gt=0, le=1, default=0.7, description="Utilização média")
+    utilization_std: float = Field(ge=0, le=0.5, default=0.15, description="Desvio padrão da utilização")
+    
+    # Clientes e projetos
+    churn_probability: float = Field(ge=0, le=1, default=0.3, description="Chance de não renovar ao fim de um projeto")
+    mean_gap_months: float = Field(ge=0, le=12, default=1, description="Meses médios sem projeto após perder um cliente")
+    project_hours_mean: float = Field(gt=0, le=5000, default=100, description="Tamanho médio do projeto (horas)")
+    project_hours_cv: float = Field(ge=0, le=3, default=0.5, description="Coeficiente de variação do tamanho do projeto")
+    
+    # Parâmetros da simulação
+    months: int = Field(ge=1, le=36, default=12, description="Horizonte em meses")
+    scenarios: int = Field(ge=100, le=100000, default=20000, description="Número de cenários")
+    confidence: float = Field(gt=0, lt=1, default=0.8, description="Confiança para o valor/hora necessário")
+    seed: Optional[int] = Field(default=None, description="Semente para resultados reproduzíveis")
+
+class ProjectionScenario(BaseModel):
+    name: Optional[str] = Field(default=None, max_length=100)
+    
+    # Curva de crescimento (usada quando revenues não é informado)
+    initial_monthly_revenue: Optional[Decimal] = Field(gt=0, default=None, description="Faturamento do primeiro mês")
+    monthly_growth_percentage: Decimal = Field(ge=-50, le=100, default=Decimal("0"), description="Crescimento mensal composto")
+    
+    # Série explícita de faturamento mensal
+    revenues: Optional[List[Decimal]] = Field(default=None, max_length=60)
+    
+    # Faturamento dos meses anteriores (mais antigo primeiro) para compor o RBT12
+    previous_revenues: List[Decimal] = Field(default_factory=list, max_length=12)
+
+class ProjectionInput(BaseModel):
+    scenarios: List[ProjectionScenario] = Field(min_length=1, max_length=1000)
+    months: int = Field(ge=1, le=60, default=12, description="Horizonte em meses")
+    start_month: int = Field(ge=1, le=12, default=1, description="Mês do calendário do primeiro mês projetado")
+
+class RegimePlanInput(BaseModel):
+    scenario: ProjectionScenario
+    months: int = Field(ge=1, le=120, default=36, description="Horizonte em meses")
+    start_month: int = Field(ge=1, le=12, default=1, description="Mês do calendário do primeiro mês projetado")
+    
+    # Restrições de troca
+    initial_regime: Optional[Literal["MEI", "PJ_SIMPLES", "PJ_PRESUMIDO", "AUTONOMO"]] = None
+    allowed_regimes: List[Literal["MEI", "PJ_SIMPLES", "PJ_PRESUMIDO", "AUTONOMO"]] = Field(
+        default_factory=lambda: ["MEI", "PJ_SIMPLES", "PJ_PRESUMIDO", "AUTONOMO"], min_length=1
+    )
+    switch_month: int = Field(ge=1, le=12, default=1, description="Mês do ano em que a empresa pode trocar de regime")
+    switch_cost: Decimal = Field(ge=0, default=Decimal("0"), description="Custo de cada troca (contador, abertura de CNPJ)")
+
 class CalculatorSaved(BaseModel):
     id: str
     user_id: str
@@ -114,8 +168,30 @@ class Client(ClientBase):
     class Config:
         from_attributes = True
 
+class ProposalInput(BaseModel):
+    calculation: CalculatorInput
+    client: ClientBase
+    project_title: str = Field(min_length=1, max_length=200)
+    project_description: Optional[str] = Field(default=None, max_length=2000)
+    freelancer_name: Optional[str] = Field(default=None, max_length=200)
+    notes: Optional[str] = Field(default=None, max_length=2000)
+    valid_days: int = Field(ge=1, le=90, default=15, description="Validade da proposta em dias")
+    brand_color: str = Field(default="#667eea", pattern=r"^#[0-9a-fA-F]{6}$")
+    format: Literal["pdf", "html"] = "pdf"
+
 # ==================== PROJECT MODELS ====================
 
+class BillingSchedule(BaseModel):
+    """
+    Cobrança recorrente de um projeto (retainer ou parcelado)
+    Sem amount, o valor do projeto é dividido entre as parcelas
+    """
+    frequency: Literal["MONTHLY", "BIWEEKLY"] = "MONTHLY"
+    start_date: date
+    amount: Optional[Decimal] = Field(gt=0, default=None, description="Valor de cada parcela")
+    installments: Optional[int] = Field(ge=1, le=360, default=None, description="Número de parcelas")
+    end_date: Optional[date] = None
+
 class ProjectStatus(str):
     PROPOSAL = "PROPOSAL"
     IN_PROGRESS = "IN_PROGRESS"
@@ -131,6 +207,7 @@ class ProjectBase(BaseModel):
     status: Literal["PROPOSAL", "IN_PROGRESS", "COMPLETED", "CANCELLED"] = "PROPOSAL"
     start_date: Optional[datetime] = None
     deadline: Optional[datetime] = None
+    billing_schedule: Optional[BillingSchedule] = None
 
 class ProjectCreate(ProjectBase):
     pass
@@ -143,6 +220,7 @@ class ProjectUpdate(BaseModel):
     status: Optional[Literal["PROPOSAL", "IN_PROGRESS", "COMPLETED", "CANCELLED"]] = None
     start_date: Optional[datetime] = None
     deadline: Optional[datetime] = None
+    billing_schedule: Optional[BillingSchedule] = None
 
 class Project(ProjectBase):
     id: str
@@ -168,6 +246,7 @@ class PaymentBase(BaseModel):
     status: Literal["PENDING", "PAID", "OVERDUE", "CANCELLED"] = "PENDING"
     payment_date: Optional[datetime] = None
     notes: Optional[str] = None
+    installment_number: Optional[int] = Field(ge=1, default=None, description="Parcela gerada pela cobrança recorrente")
 
 class PaymentCreate(PaymentBase):
     pass
@@ -188,6 +267,31 @@ class Payment(PaymentBase):
     class Config:
         from_attributes = True
 
+# ==================== TIME TRACKING MODELS ====================
+
+class TimeEntryInput(BaseModel):
+    project_id: str
+    started_at: datetime
+    ended_at: datetime
+    notes: Optional[str] = Field(default=None, max_length=500)
+
+class TimeEntriesBulkInput(BaseModel):
+    entries: List[TimeEntryInput] = Field(min_length=1, max_length=500)
+
+class TimerStartInput(BaseModel):
+    project_id: str
+    notes: Optional[str] = Field(default=None, max_length=500)
+
+# ==================== READJUSTMENT MODELS ====================
+
+class ReadjustmentInput(BaseModel):
+    index: Literal["IPCA", "INPC"] = "IPCA"
+    reference_month: Optional[str] = Field(default=None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Último mês do reajuste (padrão: último publicado)")
+    # Sem ids: todos os cálculos salvos e os projetos em andamento
+    calculation_ids: Optional[List[str]] = Field(default=None, max_length=500)
+    project_ids: Optional[List[str]] = Field(default=None, max_length=500)
+    apply: bool = Field(default=False, description="Grava os novos valores (senão só simula)")
+
 # ==================== DASHBOARD MODELS ====================
 
 class DashboardStats(BaseModel):
@@ -0,0 +1,136 @@
+import zlib
+from typing import List, Tuple
+
+# Página A4 em pontos
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+
+Color = Tuple[float, float, float]
+
+BLACK: Color = (0, 0, 0)
+WHITE: Color = (1, 1, 1)
+
+_FONTS = {False: "F1", True: "F2"}
+
+
+def _char_width(char: str) -> int:
+    """Largura aproximada de um caractere Helvetica (milésimos de em)"""
+    if char == " ":
+        return 278
+    if char.isdigit():
+        return 556
+    if char.isupper():
+        return 667
+    if char.islower():
+        return 500
+    return 400
+
+
+def text_width(text: str, size: float, bold: bool = False) -> float:
+    width = sum(_char_width(char) for char in text) * size / 1000
+    return width * 1.05 if bold else width
+
+
+def wrap_text(text: str, size: float, max_width: float, bold: bool = False) -> List[str]:
+    """Quebra o texto em linhas que cabem na largura"""
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and text_width(candidate, size, bold) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def _escape(text: str) -> bytes:
+    # Fontes padrão com WinAnsiEncoding cobrem os acentos do português
+    encoded = text.encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+class PDFDocument:
+    """
+    Gerador mínimo de PDF (texto, retângulos e linhas)
+    Usa apenas as fontes padrão Helvetica, sem dependências externas
+    """
+    
+    def __init__(self, title: str = ""):
+        self.title = title
+        self._pages: List[List[bytes]] = []
+        self.add_page()
+    
+    def add_page(self):
+        self._pages.append([])
+    
+    @property
+    def _ops(self) -> List[bytes]:
+        return self._pages[-1]
+    
+    def text(self, x: float, y: float, text: str, size: float = 11, bold: bool = False, color: Color = BLACK):
+        """Escreve uma linha com a base em y (origem no canto inferior esquerdo)"""
+        self._ops.append(
+            b"BT /%s %.2f Tf %.3f %.3f %.3f rg %.2f %.2f Td (%s) Tj ET" % (
+                _FONTS[bold].encode(), size, *color, x, y, _escape(text)
+            )
+        )
+    
+    def text_right(self, right: float, y: float, text: str, size: float = 11, bold: bool = False, color: Color = BLACK):
+        self.text(right - text_width(text, size, bold), y, text, size, bold, color)
+    
+    def rect(self, x: float, y: float, width: float, height: float, color: Color):
+        self._ops.append(b"%.3f %.3f %.3f rg %.2f %.2f %.2f %.2f re f" % (*color, x, y, width, height))
+    
+    def line(self, x1: float, y1: float, x2: float, y2: float, color: Color = BLACK, width: float = 0.5):
+        self._ops.append(
+            b"%.3f %.3f %.3f RG %.2f w %.2f %.2f m %.2f %.2f l S" % (*color, width, x1, y1, x2, y2)
+        )
+    
+    def to_bytes(self) -> bytes:
+        objects: List[bytes] = []
+        
+        def add(body: bytes) -> int:
+            objects.append(body)
+            return len(objects)
+        
+        catalog = add(b"")  # preenchido depois que as páginas existirem
+        pages = add(b"")
+        regular = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        bold = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+        info = add(b"<< /Title (%s) /Producer (FreelaBR) >>" % _escape(self.title))
+        
+        page_ids = []
+        for ops in self._pages:
+            stream = zlib.compress(b"\n".join(ops))
+            content = add(
+                b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream)
+            )
+            page_ids.append(add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+                b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>" % (
+                    pages, PAGE_WIDTH, PAGE_HEIGHT, regular, bold, content
+                )
+            ))
+        
+        objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages
+        kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+        objects[pages - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+        
+        output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        
+        xref = len(output)
+        output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        for offset in offsets:
+            output += b"%010d 00000 n \n" % offset
+        output += b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(objects) + 1, catalog, info, xref
+        )
+        return bytes(output)
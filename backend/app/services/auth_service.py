@@ -3,11 +3,20 @@ from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
 import os
+import uuid
 
 # Configurações de segurança
 SECRET_KEY = os.getenv("SECRET_KEY", "sua-chave-secreta-super-segura-mude-isso")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 dias
+ACCESS_TOKEN_EXPIRE_MINUTES = 15
+REFRESH_TOKEN_EXPIRE_DAYS = 30
+# Reuso do refresh token logo após a troca (abas ou requisições simultâneas)
+# devolve o mesmo par novo em vez de encerrar a sessão
+REFRESH_GRACE_SECONDS = float(os.getenv("REFRESH_GRACE_SECONDS", "30"))
+
+# Tipos de token (claim "type")
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
 
 # Contexto para hash de senha
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -25,25 +34,81 @@ class AuthService:
         """Gera hash da senha"""
         return pwd_context.hash(password)
     
+    @staticmethod
+    def _encode(claims: dict, token_type: str, expires_delta: timedelta,
+                jti: Optional[str] = None, now: Optional[datetime] = None) -> str:
+        now = now or datetime.utcnow()
+        to_encode = claims.copy()
+        to_encode.update({
+            "type": token_type,
+            "jti": jti or uuid.uuid4().hex,
+            "iat": now,
+            "exp": now + expires_delta,
+        })
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-        """Cria token JWT"""
-        to_encode = data.copy()
-        
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        """
+        Cria token JWT de acesso (curta duração)
+        `fam` liga o token à sessão, para revogar tudo de uma vez no logout
+        """
+        claims = {"fam": uuid.uuid4().hex, **data}
+        return AuthService._encode(
+            claims, ACCESS_TOKEN, expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+    
+    @staticmethod
+    def create_refresh_token(data: dict, family: str) -> str:
+        """Cria refresh token (uso único: é trocado a cada renovação)"""
+        return AuthService._encode(
+            {**data, "fam": family}, REFRESH_TOKEN, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+    
+    @staticmethod
+    def create_token_pair(user_id: str, email: str, family: Optional[str] = None) -> dict:
+        """Par access + refresh da mesma sessão (família)"""
+        family = family or uuid.uuid4().hex
+        data = {"sub": user_id, "email": email, "fam": family}
+        return {
+            "access_token": AuthService.create_access_token(data),
+            "refresh_token": AuthService.create_refresh_token(data, family),
+            "token_type": "bearer",
+            "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        }
+    
+    @staticmethod
+    def rotate_token_pair(refresh_payload: dict, rotated_at: float) -> dict:
+        """
+        Par que substitui o refresh token, determinístico
         
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-        return encoded_jwt
+        jti e iat saem do token trocado e do momento da troca, então
+        qualquer worker que repetir a troca dentro da janela de tolerância
+        assina exatamente o mesmo par (sem guardar tokens em lugar nenhum).
+        """
+        now = datetime.utcfromtimestamp(int(rotated_at))
+        data = {"sub": refresh_payload["sub"], "email": refresh_payload["email"], "fam": refresh_payload["fam"]}
+        jti = lambda kind: uuid.uuid5(uuid.NAMESPACE_URL, f"{refresh_payload['jti']}:{kind}").hex
+        return {
+            "access_token": AuthService._encode(
+                data, ACCESS_TOKEN, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES), jti(ACCESS_TOKEN), now
+            ),
+            "refresh_token": AuthService._encode(
+                data, REFRESH_TOKEN, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS), jti(REFRESH_TOKEN), now
+            ),
+            "token_type": "bearer",
+            "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        }
     
     @staticmethod
-    def verify_token(token: str) -> Optional[dict]:
-        """Verifica e decodifica token JWT"""
+    def verify_token(token: str, token_type: str = ACCESS_TOKEN) -> Optional[dict]:
+        """Verifica e decodifica token JWT do tipo esperado"""
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
         except JWTError:
             return None
+        
+        # Tokens sem jti (emitidos antes da revogação) não são aceitos
+        if payload.get("type") != token_type or not payload.get("jti"):
+            return None
+        return payload
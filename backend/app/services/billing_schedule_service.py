@@ -0,0 +1,184 @@
+import calendar
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, List, Optional, Tuple
+from app.models import BillingSchedule
+
+PENDING = "PENDING"
+
+CENT = Decimal("0.01")
+
+
+def add_months(start: date, months: int) -> date:
+    """Mesmo dia N meses depois (31/01 + 1 mês = 28/02 ou 29/02)"""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date()
+
+
+class BillingScheduleService:
+    """
+    Parcelas geradas a partir da cobrança recorrente de um projeto
+    
+    As parcelas são criadas só até HORIZON_DAYS à frente (um job diário
+    estende o horizonte) e gravadas em lote. Ao editar a cobrança, só as
+    parcelas futuras ainda pendentes que mudaram são regravadas; pagas e
+    vencidas ficam como estão.
+    """
+    
+    HORIZON_DAYS = int(os.getenv("BILLING_HORIZON_DAYS", "90"))
+    BATCH_SIZE = 500
+    COLUMNS = "id, installment_number, due_date, amount, status"
+    
+    @staticmethod
+    def validate(schedule: BillingSchedule):
+        if schedule.amount is None and schedule.installments is None:
+            raise ValueError("Informe o valor da parcela (amount) ou o número de parcelas (installments)")
+        if schedule.end_date is not None and schedule.end_date < schedule.start_date:
+            raise ValueError("end_date deve ser depois de start_date")
+    
+    @staticmethod
+    def due_date(schedule: BillingSchedule, number: int) -> date:
+        """Vencimento da parcela `number` (a primeira é 1)"""
+        if schedule.frequency == "BIWEEKLY":
+            return schedule.start_date + timedelta(days=14 * (number - 1))
+        return add_months(schedule.start_date, number - 1)
+    
+    @classmethod
+    def installment(cls, schedule: BillingSchedule, project_value: Decimal, number: int) -> Optional[Tuple[date, Decimal]]:
+        """(vencimento, valor) da parcela, ou None se ela não faz parte da cobrança"""
+        if schedule.installments is not None and number > schedule.installments:
+            return None
+        due = cls.due_date(schedule, number)
+        if schedule.end_date is not None and due > schedule.end_date:
+            return None
+        
+        if schedule.amount is not None:
+            return due, schedule.amount
+        # Valor do projeto dividido; os centavos que sobram vão na última parcela
+        value = Decimal(project_value)
+        base = (value / schedule.installments).quantize(CENT, rounding=ROUND_DOWN)
+        if number == schedule.installments:
+            return due, value - base * (schedule.installments - 1)
+        return due, base
+    
+    @classmethod
+    def plan(cls, schedule: BillingSchedule, project_value: Decimal, today: date) -> List[dict]:
+        """Parcelas com vencimento de hoje até o fim do horizonte"""
+        until = today + timedelta(days=cls.HORIZON_DAYS)
+        installments = []
+        number = 1
+        while True:
+            current = cls.installment(schedule, project_value, number)
+            if current is None or current[0] > until:
+                return installments
+            if current[0] >= today:
+                installments.append({"installment_number": number, "due_date": current[0], "amount": current[1]})
+            number += 1
+    
+    @classmethod
+    def diff(
+        cls,
+        schedule: Optional[BillingSchedule],
+        project_value: Decimal,
+        existing: List[dict],
+        today: date,
+    ) -> Dict[str, list]:
+        """
+        O que muda nas parcelas já gravadas (installment_number preenchido)
+        
+        Retorna insert (parcelas novas), update (pendentes futuras com
+        vencimento ou valor diferente), delete (ids de pendentes futuras
+        que saíram da cobrança) e kept (quantas ficaram como estavam).
+        """
+        changes = {"insert": [], "update": [], "delete": [], "kept": 0}
+        numbers = set()
+        for row in existing:
+            numbers.add(row["installment_number"])
+            editable = row["status"] == PENDING and _as_date(row["due_date"]) >= today
+            if not editable:
+                changes["kept"] += 1
+                continue
+            
+            expected = cls.installment(schedule, project_value, row["installment_number"]) if schedule else None
+            if expected is None:
+                changes["delete"].append(row["id"])
+            elif expected != (_as_date(row["due_date"]), Decimal(str(row["amount"]))):
+                changes["update"].append({
+                    "id": row["id"],
+                    "installment_number": row["installment_number"],
+                    "due_date": expected[0],
+                    "amount": expected[1],
+                })
+            else:
+                changes["kept"] += 1
+        
+        if schedule is not None:
+            changes["insert"] = [
+                installment for installment in cls.plan(schedule, project_value, today)
+                if installment["installment_number"] not in numbers
+            ]
+        return changes
+    
+    # ==================== SUPABASE ====================
+    
+    @classmethod
+    def _row(cls, user_id: str, project_id: str, installment: dict, total: Optional[int]) -> dict:
+        number = installment["installment_number"]
+        row = {
+            "user_id": user_id,
+            "project_id": project_id,
+            "installment_number": number,
+            "amount": float(installment["amount"]),
+            "due_date": datetime.combine(installment["due_date"], datetime.min.time()).isoformat(),
+            "status": PENDING,
+            "notes": f"Parcela {number}/{total}" if total else f"Parcela {number}",
+            # O agendador de vencimentos sincroniza por updated_at
+            "updated_at": datetime.now().isoformat(),
+        }
+        if "id" in installment:
+            row["id"] = installment["id"]
+        return row
+    
+    @classmethod
+    def apply(cls, client, user_id: str, project: dict, today: Optional[date] = None) -> dict:
+        """
+        Sincroniza as parcelas do projeto com a cobrança (uma leitura e
+        no máximo um insert, um upsert e um delete por lote)
+        """
+        today = today or date.today()
+        schedule = BillingSchedule(**project["billing_schedule"]) if project.get("billing_schedule") else None
+        
+        existing = client.table("payments").select(cls.COLUMNS).eq(
+            "project_id", project["id"]
+        ).eq("user_id", user_id).not_.is_("installment_number", "null").execute().data
+        changes = cls.diff(schedule, project["value"], existing, today)
+        
+        total = schedule.installments if schedule else None
+        inserted, updated = [], []
+        for start in range(0, len(changes["insert"]), cls.BATCH_SIZE):
+            batch = [cls._row(user_id, project["id"], item, total) for item in changes["insert"][start:start + cls.BATCH_SIZE]]
+            inserted.extend(client.table("payments").insert(batch).execute().data)
+        for start in range(0, len(changes["update"]), cls.BATCH_SIZE):
+            batch = [cls._row(user_id, project["id"], item, total) for item in changes["update"][start:start + cls.BATCH_SIZE]]
+            updated.extend(client.table("payments").upsert(batch).execute().data)
+        for start in range(0, len(changes["delete"]), cls.BATCH_SIZE):
+            client.table("payments").delete().in_("id", changes["delete"][start:start + cls.BATCH_SIZE]).execute()
+        
+        return {
+            "created": len(changes["insert"]),
+            "updated": len(changes["update"]),
+            "removed": len(changes["delete"]),
+            "kept": changes["kept"],
+            "changed_rows": inserted + updated,
+            "removed_ids": changes["delete"],
+        }
@@ -0,0 +1,224 @@
+from fractions import Fraction
+from typing import Optional
+from app.services.calculator_service import CalculatorService
+
+REGIMES = ["MEI", "PJ_SIMPLES", "PJ_PRESUMIDO", "AUTONOMO"]
+
+
+class BreakEvenService:
+    """
+    Índice de pontos de equilíbrio entre regimes tributários
+    
+    Mesmo modelo do CalculatorService (e do /api/calculator/compare): o
+    imposto mensal é função do pró-labore desejado I, linear por partes:
+    imposto = a + b * I em cada faixa (DAS fixo do MEI, alíquota do Simples
+    e do Presumido, INSS + IR progressivo do autônomo). Provisões, despesas
+    e margem entram igualmente em todos os regimes, então os cruzamentos
+    não dependem delas: são calculados de forma exata (frações) uma vez
+    por versão da tabela e depois apenas consultados.
+    """
+    
+    _index: dict = {}
+    
+    @staticmethod
+    def _pieces(tax_regime: str) -> list:
+        """Partes lineares (início exclusivo, fim inclusivo, a, b) do imposto mensal; fim None = sem limite"""
+        C = CalculatorService
+        
+        if tax_regime == "MEI":
+            return [(Fraction(0), None, Fraction(C.MEI_DAS_VALUE), Fraction(0))]
+        
+        elif tax_regime in ("PJ_SIMPLES", "PJ_PRESUMIDO"):
+            rate = Fraction(C.TAX_RATES[tax_regime]["percentage"]) / 100
+            return [(Fraction(0), None, Fraction(0), rate)]
+        
+        elif tax_regime == "AUTONOMO":
+            inss = Fraction(C.MINIMUM_WAGE) * Fraction(C.TAX_RATES["AUTONOMO"]["inss"]) / 100
+            pieces = []
+            start = Fraction(0)
+            for limit, rate, deduction in C.IR_BRACKETS:
+                end = Fraction(limit) if limit is not None else None
+                if rate == 0:
+                    pieces.append((start, end, inss, Fraction(0)))
+                else:
+                    pieces.append((start, end, inss - Fraction(deduction), Fraction(rate)))
+                start = end
+            return pieces
+        
+        raise ValueError(f"Regime inválido: {tax_regime}")
+    
+    @classmethod
+    def _domain_end(cls, tax_regime: str) -> Optional[Fraction]:
+        return cls._pieces(tax_regime)[-1][1]
+    
+    @staticmethod
+    def _piece_at(pieces: list, revenue: Fraction):
+        """Parte que contém o faturamento (intervalo (início, fim])"""
+        for start, end, a, b in pieces:
+            if end is None or revenue <= end:
+                return a, b
+        return None
+    
+    @classmethod
+    def tax(cls, tax_regime: str, income: Fraction) -> Optional[Fraction]:
+        """Imposto mensal exato sobre o pró-labore; None fora do domínio do regime"""
+        piece = cls._piece_at(cls._pieces(tax_regime), income)
+        if piece is None:
+            return None
+        a, b = piece
+        return a + b * income
+    
+    @staticmethod
+    def _sign(value: Fraction) -> int:
+        return (value > 0) - (value < 0)
+    
+    @classmethod
+    def _pair_crossovers(cls, first: str, second: str) -> list:
+        """
+        Percorre a união das faixas dos dois regimes. Em cada intervalo a
+        diferença de imposto é linear: a raiz (se houver) é exata. Saltos de
+        sinal entre intervalos (tabelas descontínuas) também contam.
+        """
+        first_pieces = cls._pieces(first)
+        second_pieces = cls._pieces(second)
+        
+        ends = [cls._domain_end(first), cls._domain_end(second)]
+        domain_end = min((end for end in ends if end is not None), default=None)
+        
+        breakpoints = sorted({
+            end for _, end, _, _ in first_pieces + second_pieces
+            if end is not None and (domain_end is None or end <= domain_end)
+        })
+        if domain_end is None:
+            breakpoints.append(None)
+        
+        crossovers = []
+        previous_sign = 0
+        start = Fraction(0)
+        for end in breakpoints:
+            probe = end if end is not None else start + 1
+            a1, b1 = cls._piece_at(first_pieces, probe)
+            a2, b2 = cls._piece_at(second_pieces, probe)
+            alpha, beta = a1 - a2, b1 - b2
+            
+            # Sinal logo após o início do intervalo e no fim (ou no infinito)
+            left = alpha + beta * start
+            left_sign = cls._sign(left) if left != 0 else cls._sign(beta)
+            right_sign = cls._sign(alpha + beta * end) if end is not None else (cls._sign(beta) or cls._sign(alpha))
+            
+            # Troca de sinal na fronteira: raiz exata na divisa ou salto da tabela
+            if previous_sign and left_sign and left_sign != previous_sign:
+                kind = "root" if left == 0 else "step"
+                crossovers.append(cls._crossover(first, second, start, previous_sign, kind))
+            
+            if beta != 0 and left_sign and right_sign and left_sign != right_sign:
+                root = -alpha / beta
+                crossovers.append(cls._crossover(first, second, root, left_sign, "root"))
+            
+            # Raiz exatamente no fim do intervalo é tratada na próxima fronteira
+            previous_sign = right_sign or left_sign
+            start = end
+        
+        return [crossover for crossover in crossovers if crossover["income"] > 0]
+    
+    @staticmethod
+    def _crossover(first: str, second: str, income: Fraction, sign_below: int, kind: str) -> dict:
+        # Diferença positiva = primeiro regime paga mais = segundo mais barato
+        cheaper_below = second if sign_below > 0 else first
+        cheaper_above = first if cheaper_below == second else second
+        return {
+            "regimes": [first, second],
+            "income": income,
+            "cheaper_below": cheaper_below,
+            "cheaper_above": cheaper_above,
+            "kind": kind,
+        }
+    
+    @classmethod
+    def index(cls) -> dict:
+        """Índice pré-computado (um por versão da tabela)"""
+        version = CalculatorService.TAX_TABLE_VERSION
+        if version not in cls._index:
+            crossovers = []
+            for i, first in enumerate(REGIMES):
+                for second in REGIMES[i + 1:]:
+                    crossovers.extend(cls._pair_crossovers(first, second))
+            crossovers.sort(key=lambda crossover: crossover["income"])
+            
+            cls._index = {version: {
+                "crossovers": crossovers,
+                # Limites de enquadramento são de faturamento (mensal)
+                "regime_limits": {"MEI": Fraction(CalculatorService.MEI_ANNUAL_LIMIT) / 12},
+            }}
+        return cls._index[version]
+    
+    @classmethod
+    def lookup(
+        cls,
+        monthly_expenses: Fraction = Fraction(0),
+        variable_expenses: Fraction = Fraction(0),
+        profit_margin_percentage: Fraction = Fraction(20),
+        include_13th_salary: bool = True,
+        include_vacation_bonus: bool = True,
+        regimes: Optional[list] = None,
+    ) -> dict:
+        """
+        Cruzamentos em pró-labore desejado, com o faturamento mensal
+        correspondente
+        
+        Como na calculadora: faturamento * (1 - margem) = pró-labore +
+        provisões + despesas + impostos, com provisões proporcionais ao
+        pró-labore. Despesas e margem só mudam o faturamento de cada
+        cruzamento (e o pró-labore máximo dentro do limite do MEI).
+        """
+        index = cls.index()
+        margin = Fraction(profit_margin_percentage) / 100
+        expenses = Fraction(monthly_expenses) + Fraction(variable_expenses)
+        provisions = Fraction(0)
+        if include_13th_salary:
+            provisions += Fraction(1, 12)
+        if include_vacation_bonus:
+            provisions += Fraction(1, 36)
+        
+        def revenue_for(income: Fraction, regime: str) -> Fraction:
+            return (income * (1 + provisions) + expenses + cls.tax(regime, income)) / (1 - margin)
+        
+        # Pró-labore cujo faturamento (no próprio regime) chega ao limite
+        income_limits = {
+            regime: (limit * (1 - margin) - expenses - cls.tax(regime, Fraction(0))) / (1 + provisions)
+            for regime, limit in index["regime_limits"].items()
+        }
+        
+        results = []
+        for crossover in index["crossovers"]:
+            if regimes and not set(crossover["regimes"]) <= set(regimes):
+                continue
+            
+            income = crossover["income"]
+            # No cruzamento os dois regimes custam o mesmo (salvo saltos da tabela)
+            revenue = revenue_for(income, crossover["cheaper_below"])
+            
+            results.append({
+                "regimes": crossover["regimes"],
+                "cheaper_below": crossover["cheaper_below"],
+                "cheaper_above": crossover["cheaper_above"],
+                "kind": crossover["kind"],
+                "desired_monthly_income": round(float(income), 2),
+                "monthly_revenue": round(float(revenue), 2),
+                "annual_revenue": round(float(revenue * 12), 2),
+                "within_limits": all(
+                    income <= income_limits[regime] for regime in crossover["regimes"] if regime in income_limits
+                ),
+            })
+        
+        return {
+            "tax_table_version": CalculatorService.TAX_TABLE_VERSION,
+            "crossovers": results,
+            "regime_limits": {
+                regime: {
+                    "monthly_revenue": round(float(limit), 2),
+                    "desired_monthly_income": round(float(max(income_limits[regime], Fraction(0))), 2),
+                }
+                for regime, limit in index["regime_limits"].items()
+            },
+        }
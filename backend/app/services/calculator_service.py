@@ -7,9 +7,14 @@ class CalculatorService:
     Considera impostos brasileiros por regime tributário
     """
     
+    # Versão da tabela de regras (alterar sempre que qualquer valor abaixo mudar)
+    TAX_TABLE_VERSION = "2025.2"
+    
     # Valores fixos 2025
     MEI_DAS_VALUE = Decimal("81.90")  # DAS MEI 2025 para serviços
     MINIMUM_WAGE = Decimal("1518.00")  # Salário mínimo 2025
+    MEI_ANNUAL_LIMIT = Decimal("81000.00")  # Faturamento anual máximo do MEI
+    MEI_EXCESS_TOLERANCE = Decimal("0.20")  # Excesso de até 20% só desenquadra no ano seguinte
     
     # Alíquotas por regime
     TAX_RATES = {
@@ -29,6 +34,69 @@ class CalculatorService:
         }
     }
     
+    # Tabela IR 2025 (simplificada): (limite superior, alíquota, dedução)
+    IR_BRACKETS = [
+        (Decimal("2259.20"), Decimal("0"), Decimal("0")),
+        (Decimal("2828.65"), Decimal("0.075"), Decimal("169.44")),
+        (Decimal("3751.05"), Decimal("0.15"), Decimal("381.44")),
+        (Decimal("4664.68"), Decimal("0.225"), Decimal("662.77")),
+        (None, Decimal("0.275"), Decimal("896.00")),
+    ]
+    
+    # Simples Nacional - Anexo III: (RBT12 até, alíquota nominal, parcela a deduzir)
+    # Alíquota efetiva = (RBT12 * nominal - dedução) / RBT12
+    SIMPLES_ANEXO_III_BRACKETS = [
+        (Decimal("180000.00"), Decimal("0.06"), Decimal("0")),
+        (Decimal("360000.00"), Decimal("0.112"), Decimal("9360.00")),
+        (Decimal("720000.00"), Decimal("0.135"), Decimal("17640.00")),
+        (Decimal("1800000.00"), Decimal("0.16"), Decimal("35640.00")),
+        (Decimal("3600000.00"), Decimal("0.21"), Decimal("125640.00")),
+        (Decimal("4800000.00"), Decimal("0.33"), Decimal("648000.00")),
+    ]
+    
+    # Horas de referência para sugestão de projetos
+    PROJECT_HOURS = {
+        "small": Decimal("30"),
+        "medium": Decimal("100"),
+        "large": Decimal("200"),
+    }
+    
+    # Informações descritivas por regime
+    TAX_INFO = {
+        "MEI": {
+            "name": "Microempreendedor Individual (MEI)",
+            "monthly_cost": float(MEI_DAS_VALUE),
+            "description": "Valor fixo mensal de R$ 81,90 (DAS 2025)",
+            "limit": "Faturamento anual até R$ 81.000",
+            "benefits": ["Simples", "Barato", "Poucos obrigações"],
+            "drawbacks": ["Limite de faturamento", "Apenas 1 funcionário"]
+        },
+        "PJ_SIMPLES": {
+            "name": "Simples Nacional - Anexo III",
+            "percentage": "6% a 33%",
+            "description": "Alíquota inicial de 6% sobre faturamento",
+            "limit": "Faturamento anual até R$ 4,8 milhões",
+            "benefits": ["Menos burocracia", "Alíquota progressiva"],
+            "drawbacks": ["Aumenta com faturamento", "Obrigações acessórias"]
+        },
+        "PJ_PRESUMIDO": {
+            "name": "Lucro Presumido",
+            "percentage": "~16,33%",
+            "description": "IR + CSLL + PIS/COFINS + ISS",
+            "limit": "Faturamento anual até R$ 78 milhões",
+            "benefits": ["Previsível", "Bom para margens altas"],
+            "drawbacks": ["Mais complexo", "Mais caro que Simples inicial"]
+        },
+        "AUTONOMO": {
+            "name": "Autônomo (Pessoa Física)",
+            "percentage": "20% INSS + IR progressivo",
+            "description": "INSS 20% sobre salário mínimo + IR progressivo",
+            "limit": "Sem limite",
+            "benefits": ["Flexível", "Sem burocracia"],
+            "drawbacks": ["IR progressivo alto", "Menos benefícios"]
+        }
+    }
+    
     @classmethod
     def calculate(cls, input_data: CalculatorInput) -> CalculatorResult:
         """Calcula todos os valores baseado nos inputs"""
@@ -74,9 +142,9 @@ class CalculatorService:
         weekly_rate = daily_rate * Decimal(str(working_days_per_week))
         
         # 7. Sugerir valores para projetos
-        small_project_value = hourly_rate * Decimal("30")   # ~30h
-        medium_project_value = hourly_rate * Decimal("100")  # ~100h
-        large_project_value = hourly_rate * Decimal("200")   # ~200h
+        small_project_value = hourly_rate * cls.PROJECT_HOURS["small"]    # ~30h
+        medium_project_value = hourly_rate * cls.PROJECT_HOURS["medium"]  # ~100h
+        large_project_value = hourly_rate * cls.PROJECT_HOURS["large"]    # ~200h
         
         # 8. Retornar resultado
         return CalculatorResult(
@@ -120,7 +188,7 @@ class CalculatorService:
         
         elif tax_regime == "AUTONOMO":
             # Autônomo - INSS + IR progressivo
-            inss = cls.MINIMUM_WAGE * Decimal("0.20")  # 20% sobre salário mínimo
+            inss = cls.MINIMUM_WAGE * (cls.TAX_RATES["AUTONOMO"]["inss"] / 100)  # 20% sobre salário mínimo
             ir = cls._calculate_progressive_ir(monthly_income)
             return inss + ir
         
@@ -131,55 +199,52 @@ class CalculatorService:
         """
         Calcula Imposto de Renda progressivo (Tabela 2025)
         """
-        # Tabela IR 2025 (simplificada)
-        if monthly_income <= Decimal("2259.20"):
-            return Decimal("0")
-        elif monthly_income <= Decimal("2828.65"):
-            return (monthly_income * Decimal("0.075")) - Decimal("169.44")
-        elif monthly_income <= Decimal("3751.05"):
-            return (monthly_income * Decimal("0.15")) - Decimal("381.44")
-        elif monthly_income <= Decimal("4664.68"):
-            return (monthly_income * Decimal("0.225")) - Decimal("662.77")
-        else:
-            return (monthly_income * Decimal("0.275")) - Decimal("896.00")
+        for limit, rate, deduction in cls.IR_BRACKETS:
+            if limit is None or monthly_income <= limit:
+                if rate == 0:
+                    return Decimal("0")
+                return (monthly_income * rate) - deduction
+        return Decimal("0")
     
     @classmethod
     def get_tax_info(cls, tax_regime: str) -> dict:
         """Retorna informações sobre o regime tributário"""
         
-        tax_info = {
-            "MEI": {
-                "name": "Microempreendedor Individual (MEI)",
-                "monthly_cost": float(cls.MEI_DAS_VALUE),
-                "description": "Valor fixo mensal de R$ 81,90 (DAS 2025)",
-                "limit": "Faturamento anual até R$ 81.000",
-                "benefits": ["Simples", "Barato", "Poucos obrigações"],
-                "drawbacks": ["Limite de faturamento", "Apenas 1 funcionário"]
-            },
-            "PJ_SIMPLES": {
-                "name": "Simples Nacional - Anexo III",
-                "percentage": "6% a 33%",
-                "description": "Alíquota inicial de 6% sobre faturamento",
-                "limit": "Faturamento anual até R$ 4,8 milhões",
-                "benefits": ["Menos burocracia", "Alíquota progressiva"],
-                "drawbacks": ["Aumenta com faturamento", "Obrigações acessórias"]
-            },
-            "PJ_PRESUMIDO": {
-                "name": "Lucro Presumido",
-                "percentage": "~16,33%",
-                "description": "IR + CSLL + PIS/COFINS + ISS",
-                "limit": "Faturamento anual até R$ 78 milhões",
-                "benefits": ["Previsível", "Bom para margens altas"],
-                "drawbacks": ["Mais complexo", "Mais caro que Simples inicial"]
+        return dict(cls.TAX_INFO.get(tax_regime, {}))
+    
+    @classmethod
+    def get_tax_rules(cls) -> dict:
+        """
+        Retorna todas as regras usadas no cálculo em formato serializável
+        Fonte única para o manifesto consumido pelo frontend
+        """
+        return {
+            "version": cls.TAX_TABLE_VERSION,
+            "mei_das_value": float(cls.MEI_DAS_VALUE),
+            "mei_annual_limit": float(cls.MEI_ANNUAL_LIMIT),
+            "mei_excess_tolerance": float(cls.MEI_EXCESS_TOLERANCE),
+            "minimum_wage": float(cls.MINIMUM_WAGE),
+            "rates": {
+                "PJ_SIMPLES": float(cls.TAX_RATES["PJ_SIMPLES"]["percentage"]),
+                "PJ_PRESUMIDO": float(cls.TAX_RATES["PJ_PRESUMIDO"]["percentage"]),
+                "AUTONOMO_INSS": float(cls.TAX_RATES["AUTONOMO"]["inss"]),
             },
-            "AUTONOMO": {
-                "name": "Autônomo (Pessoa Física)",
-                "percentage": "20% INSS + IR progressivo",
-                "description": "INSS 20% sobre salário mínimo + IR progressivo",
-                "limit": "Sem limite",
-                "benefits": ["Flexível", "Sem burocracia"],
-                "drawbacks": ["IR progressivo alto", "Menos benefícios"]
-            }
+            "ir_brackets": [
+                {
+                    "up_to": float(limit) if limit is not None else None,
+                    "rate": float(rate),
+                    "deduction": float(deduction),
+                }
+                for limit, rate, deduction in cls.IR_BRACKETS
+            ],
+            "simples_anexo_iii_brackets": [
+                {
+                    "rbt12_up_to": float(limit),
+                    "rate": float(rate),
+                    "deduction": float(deduction),
+                }
+                for limit, rate, deduction in cls.SIMPLES_ANEXO_III_BRACKETS
+            ],
+            "project_hours": {name: int(hours) for name, hours in cls.PROJECT_HOURS.items()},
+            "regimes": cls.TAX_INFO,
         }
-        
-        return tax_info.get(tax_regime, {})
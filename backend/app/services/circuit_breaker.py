@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+import httpx
+import requests
+from postgrest.exceptions import APIError
+
+# Códigos do PostgREST/Postgres que indicam banco indisponível ou lento
+# (PGRST000-003: sem conexão/pool esgotado; 57014: statement timeout)
+_SUPABASE_UNAVAILABLE_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003", "57014"}
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem tentar: a dependência está fora"""
+    
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} indisponível (circuito aberto)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_supabase_failure(error: Exception) -> bool:
+    """Rede, timeout ou 5xx contam; erros de consulta (4xx) não"""
+    if isinstance(error, APIError):
+        code = error.code
+        return (isinstance(code, int) and code >= 500) or str(code) in _SUPABASE_UNAVAILABLE_CODES
+    return isinstance(error, (httpx.HTTPError, OSError, TimeoutError))
+
+
+def is_mercadopago_failure(error: Exception) -> bool:
+    return isinstance(error, (requests.RequestException, OSError, TimeoutError))
+
+
+def is_mercadopago_failure_result(result: Any) -> bool:
+    # O SDK não levanta exceção para respostas HTTP de erro
+    return isinstance(result, dict) and (result.get("status") or 0) >= 500
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de uma dependência externa
+    
+    Fechado: as chamadas passam; failure_threshold falhas seguidas abrem
+    o circuito. Aberto: as chamadas falham na hora (CircuitOpenError) por
+    reset_timeout segundos. Meio aberto: uma chamada de teste passa por
+    vez; sucesso fecha o circuito, falha abre de novo.
+    
+    O tempo máximo de cada chamada é o timeout do próprio client (httpx do
+    Supabase, requests do Mercado Pago); timeout conta como falha.
+    """
+    
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 is_failure: Callable[[Exception], bool] = lambda error: True,
+                 is_failure_result: Callable[[Any], bool] = lambda result: False,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self.is_failure_result = is_failure_result
+        self.clock = clock
+        
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        
+        # Estatísticas do processo
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self.last_error: Optional[str] = None
+    
+    @classmethod
+    def from_env(cls, name: str, **kwargs) -> "CircuitBreaker":
+        prefix = name.upper()
+        return cls(
+            name,
+            failure_threshold=int(os.getenv(f"{prefix}_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv(f"{prefix}_BREAKER_RESET_SECONDS", "30")),
+            **kwargs
+        )
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+    
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+    
+    def _acquire(self) -> bool:
+        """Libera a chamada (True se for a chamada de teste do meio aberto)"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return False
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            retry_after = max(0.0, self.reset_timeout - (self.clock() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_after)
+    
+    def _record(self, failed: bool, probe: bool, error: Optional[str] = None):
+        with self._lock:
+            self.calls += 1
+            if probe:
+                self._probing = False
+            if not failed:
+                self._failures = 0
+                if probe:
+                    self._state = self.CLOSED
+                return
+            self.failures += 1
+            self._failures += 1
+            self.last_error = error
+            if probe or (self._state == self.CLOSED and self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+                self.opened += 1
+    
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        probe = self._acquire()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            failed = isinstance(e, Exception) and self.is_failure(e)
+            self._record(failed, probe, f"{type(e).__name__}: {e}"[:200] if failed else None)
+            raise
+        failed = self.is_failure_result(result)
+        self._record(failed, probe, f"resposta {result.get('status')}" if failed else None)
+        return result
+    
+    def stats(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_after": round(max(0.0, self.reset_timeout - (self.clock() - self._opened_at)), 1)
+                if state == self.OPEN else 0,
+                "calls": self.calls,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "opened": self.opened,
+                "last_error": self.last_error,
+            }
+
+
+class _GuardedQuery:
+    """Builder do PostgREST cujo execute() passa pelo breaker"""
+    
+    def __init__(self, builder, breaker: CircuitBreaker):
+        self._builder = builder
+        self._breaker = breaker
+    
+    def execute(self):
+        return self._breaker.call(self._builder.execute)
+    
+    def _wrap(self, value):
+        return _GuardedQuery(value, self._breaker) if hasattr(value, "execute") else value
+    
+    def __getattr__(self, name: str):
+        attr = getattr(self._builder, name)
+        if callable(attr):
+            return lambda *args, **kwargs: self._wrap(attr(*args, **kwargs))
+        # Propriedades como .not_ devolvem outro builder
+        return self._wrap(attr)
+
+
+class GuardedSupabase:
+    """
+    Client do Supabase com as consultas protegidas pelo breaker
+    
+    table(...) devolve o builder de sempre; só o execute() final passa
+    pelo breaker, então o resto do código não muda.
+    """
+    
+    def __init__(self, client, breaker: CircuitBreaker):
+        self._client = client
+        self.breaker = breaker
+    
+    def table(self, name: str) -> _GuardedQuery:
+        return _GuardedQuery(self._client.table(name), self.breaker)
+    
+    def rpc(self, fn: str, params: Optional[dict] = None) -> _GuardedQuery:
+        return _GuardedQuery(self._client.rpc(fn, params or {}), self.breaker)
+    
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+class _GuardedResource:
+    def __init__(self, resource, breaker: CircuitBreaker):
+        self._resource = resource
+        self._breaker = breaker
+    
+    def __getattr__(self, name: str):
+        method = getattr(self._resource, name)
+        return lambda *args, **kwargs: self._breaker.call(method, *args, **kwargs)
+
+
+class GuardedMercadoPago:
+    """SDK do Mercado Pago com as chamadas (payment().get, preference().create...) pelo breaker"""
+    
+    def __init__(self, sdk, breaker: CircuitBreaker):
+        self._sdk = sdk
+        self.breaker = breaker
+    
+    def __getattr__(self, name: str):
+        factory = getattr(self._sdk, name)
+        return lambda *args, **kwargs: _GuardedResource(factory(*args, **kwargs), self.breaker)
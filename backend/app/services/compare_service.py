@@ -0,0 +1,48 @@
+import numpy as np
+from app.models import CalculatorInput
+from app.services.tax_arrays import monthly_taxes
+
+METRICS = ["monthly_taxes", "monthly_provisions", "total_monthly_cost", "monthly_rate", "hourly_rate", "daily_rate"]
+
+
+class CompareService:
+    """
+    Comparação de regimes para várias rendas de uma vez
+    Mesmas contas do CalculatorService.calculate, vetorizadas sobre as rendas
+    """
+    
+    @staticmethod
+    def matrix(input_data: CalculatorInput, incomes, regimes: list) -> dict:
+        """
+        Retorna {métrica: matriz regimes × rendas}
+        input_data já validado fornece os demais parâmetros (tax_regime e
+        desired_monthly_income são ignorados)
+        """
+        incomes = np.asarray(incomes, dtype=float)
+        
+        working_days_per_month = input_data.days_per_week * (52 - input_data.vacation_weeks) / 12
+        working_hours_per_month = input_data.hours_per_day * working_days_per_month
+        
+        provisions = np.zeros_like(incomes)
+        if input_data.include_13th_salary:
+            provisions += incomes / 12
+        if input_data.include_vacation_bonus:
+            provisions += (incomes / 3) / 12
+        
+        expenses = float(input_data.monthly_expenses + input_data.variable_expenses)
+        margin = float(input_data.profit_margin_percentage) / 100
+        
+        taxes = np.vstack([monthly_taxes(incomes, regime) for regime in regimes])
+        total_costs = incomes + taxes + provisions + expenses
+        monthly_rate = total_costs / (1 - margin)
+        hourly_rate = monthly_rate / working_hours_per_month
+        
+        values = {
+            "monthly_taxes": taxes,
+            "monthly_provisions": np.broadcast_to(provisions, taxes.shape),
+            "total_monthly_cost": total_costs,
+            "monthly_rate": monthly_rate,
+            "hourly_rate": hourly_rate,
+            "daily_rate": hourly_rate * input_data.hours_per_day,
+        }
+        return {metric: np.round(values[metric], 2) for metric in METRICS}
@@ -0,0 +1,307 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING = "PENDING"
+OVERDUE = "OVERDUE"
+
+# Eventos do heap
+DUE = "due"
+REMINDER = "reminder"
+
+# (momento, sequência, evento, payment_id, vencimento)
+Entry = Tuple[float, int, str, str, float]
+
+
+def _due_deadline(value) -> Optional[float]:
+    """
+    Momento em que o pagamento passa a estar vencido
+    Vencimento só com data (ou à meia-noite) vale o dia inteiro: vence no fim do dia
+    """
+    if not value:
+        return None
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.time() == dt_time.min:
+        parsed += timedelta(days=1)
+    return parsed.timestamp()
+
+
+class SupabasePaymentStore:
+    """Pagamentos dos projetos (tabela payments) no Supabase"""
+    
+    TABLE = "payments"
+    PAGE_SIZE = 1000
+    COLUMNS = "id, user_id, project_id, amount, due_date, status, updated_at"
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def fetch_changed(self, since: Optional[str]) -> List[dict]:
+        """
+        Pagamentos alterados a partir de `since` (todos os pendentes na carga inicial)
+        """
+        rows, cursor = [], since
+        while True:
+            query = self.client.table(self.TABLE).select(self.COLUMNS)
+            if cursor:
+                # gte: alterações no mesmo instante do cursor são relidas (idempotente)
+                query = query.gte("updated_at", cursor)
+            else:
+                query = query.eq("status", PENDING).not_.is_("due_date", "null")
+            page = query.order("updated_at").limit(self.PAGE_SIZE).execute().data
+            rows.extend(page)
+            if len(page) < self.PAGE_SIZE or page[-1]["updated_at"] == cursor:
+                return rows
+            cursor = page[-1]["updated_at"]
+    
+    def mark_overdue(self, payment_ids: List[str]) -> List[dict]:
+        """Um único UPDATE para o lote; só quem ainda está pendente muda"""
+        return self.client.table(self.TABLE).update({
+            "status": OVERDUE,
+            "updated_at": datetime.now().isoformat(),
+        }).in_("id", payment_ids).eq("status", PENDING).execute().data
+
+
+class DueDateScheduler:
+    """
+    Vencimentos dos pagamentos pendentes num min-heap
+    
+    O loop dorme até o próximo vencimento (ou lembrete) e, ao acordar,
+    tira do topo do heap tudo que já venceu e marca como OVERDUE em
+    lotes. Mudanças nos pagamentos entram com track()/untrack(); as
+    entradas antigas ficam no heap e são ignoradas quando chegam ao
+    topo. Vencimento sem hora só conta no fim do dia. Lembretes saem
+    REMINDER_DAYS dias antes do vencimento.
+    """
+    
+    REMINDER_DAYS = float(os.getenv("PAYMENT_REMINDER_DAYS", "3"))
+    BATCH_SIZE = 200
+    SYNC_INTERVAL_SECONDS = float(os.getenv("DUE_DATE_SYNC_SECONDS", "300"))
+    
+    def __init__(
+        self,
+        store=None,
+        on_reminder: Optional[Callable[[List[dict]], None]] = None,
+        reminder_days: Optional[float] = None,
+    ):
+        self.store = store
+        self.on_reminder = on_reminder
+        self.reminder_days = self.REMINDER_DAYS if reminder_days is None else reminder_days
+        self._heap: List[Entry] = []
+        self._payments: Dict[str, dict] = {}
+        self._reminded: Dict[str, float] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._cursor: Optional[str] = None
+        self._next_sync = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+    
+    def __len__(self) -> int:
+        return len(self._payments)
+    
+    # ==================== ATUALIZAÇÃO ====================
+    
+    def _push(self, when: float, event: str, payment_id: str, due_at: float):
+        heapq.heappush(self._heap, (when, next(self._sequence), event, payment_id, due_at))
+    
+    def track(self, payment: dict):
+        """Inclui, reagenda ou tira um pagamento conforme status e vencimento"""
+        due_at = _due_deadline(payment.get("due_date"))
+        if payment.get("status") != PENDING or due_at is None:
+            self.untrack(payment["id"])
+            return
+        
+        with self._lock:
+            current = self._payments.get(payment["id"])
+            self._payments[payment["id"]] = {
+                "id": payment["id"],
+                "user_id": payment.get("user_id"),
+                "project_id": payment.get("project_id"),
+                "amount": payment.get("amount"),
+                "due_date": payment.get("due_date"),
+                "due_at": due_at,
+            }
+            if current is not None and current["due_at"] == due_at:
+                return
+            
+            earliest = self._heap[0][0] if self._heap else None
+            self._push(due_at, DUE, payment["id"], due_at)
+            remind_at = due_at - self.reminder_days * 86400
+            if self.reminder_days > 0 and self._reminded.get(payment["id"]) != due_at:
+                self._push(remind_at, REMINDER, payment["id"], due_at)
+            woke_earlier = earliest is None or self._heap[0][0] < earliest
+        
+        if woke_earlier:
+            self._notify()
+    
+    def untrack(self, payment_id: str):
+        with self._lock:
+            self._payments.pop(payment_id, None)
+            self._reminded.pop(payment_id, None)
+    
+    def load(self, payments: List[dict]):
+        """Carga inicial: monta o heap de uma vez (heapify é O(n))"""
+        with self._lock:
+            for payment in payments:
+                due_at = _due_deadline(payment.get("due_date"))
+                if payment.get("status") != PENDING or due_at is None:
+                    continue
+                current = self._payments.get(payment["id"])
+                if current is not None and current["due_at"] == due_at:
+                    continue
+                self._payments[payment["id"]] = {
+                    "id": payment["id"],
+                    "user_id": payment.get("user_id"),
+                    "project_id": payment.get("project_id"),
+                    "amount": payment.get("amount"),
+                    "due_date": payment.get("due_date"),
+                    "due_at": due_at,
+                }
+                self._heap.append((due_at, next(self._sequence), DUE, payment["id"], due_at))
+                if self.reminder_days > 0:
+                    remind_at = due_at - self.reminder_days * 86400
+                    self._heap.append((remind_at, next(self._sequence), REMINDER, payment["id"], due_at))
+            heapq.heapify(self._heap)
+        self._notify()
+    
+    # ==================== VENCIMENTOS ====================
+    
+    def next_event_at(self) -> Optional[float]:
+        """Momento do próximo evento válido (descarta entradas obsoletas do topo)"""
+        with self._lock:
+            while self._heap and not self._is_current(self._heap[0]):
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+    
+    def _is_current(self, entry: Entry) -> bool:
+        _, _, event, payment_id, due_at = entry
+        payment = self._payments.get(payment_id)
+        if payment is None or payment["due_at"] != due_at:
+            return False
+        return event == DUE or self._reminded.get(payment_id) != due_at
+    
+    def pop_due(self, now: Optional[float] = None) -> Tuple[List[dict], List[dict]]:
+        """Tira do heap o que já venceu: (pagamentos vencidos, lembretes)"""
+        now = time.time() if now is None else now
+        overdue, reminders = [], []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                if not self._is_current(entry):
+                    continue
+                payment = self._payments[entry[3]]
+                if entry[2] == DUE:
+                    overdue.append(payment)
+                elif payment["due_at"] > now:
+                    # Lembrete que perdeu a hora mas o pagamento ainda não venceu
+                    self._reminded[payment["id"]] = payment["due_at"]
+                    reminders.append(payment)
+        return overdue, reminders
+    
+    def run_due(self, now: Optional[float] = None) -> dict:
+        """Marca os vencidos como OVERDUE em lotes e dispara os lembretes"""
+        overdue, reminders = self.pop_due(now)
+        
+        marked = []
+        for start in range(0, len(overdue), self.BATCH_SIZE):
+            batch = overdue[start:start + self.BATCH_SIZE]
+            try:
+                if self.store is not None:
+                    self.store.mark_overdue([payment["id"] for payment in batch])
+            except Exception:
+                # Volta tudo o que não foi gravado para a próxima rodada
+                with self._lock:
+                    for payment in overdue[start:]:
+                        self._push(payment["due_at"], DUE, payment["id"], payment["due_at"])
+                raise
+            with self._lock:
+                for payment in batch:
+                    # Se o vencimento mudou enquanto isso, o pagamento continua no heap
+                    current = self._payments.get(payment["id"])
+                    if current is not None and current["due_at"] == payment["due_at"]:
+                        del self._payments[payment["id"]]
+                        self._reminded.pop(payment["id"], None)
+            marked.extend(batch)
+        
+        if reminders and self.on_reminder:
+            self.on_reminder(reminders)
+        return {"overdue": len(marked), "reminders": len(reminders)}
+    
+    # ==================== SINCRONIZAÇÃO ====================
+    
+    def sync(self):
+        """Traz do armazenamento os pagamentos alterados (incremental)"""
+        if self.store is None:
+            return
+        rows = self.store.fetch_changed(self._cursor)
+        if self._cursor is None:
+            self.load(rows)
+        else:
+            for row in rows:
+                self.track(row)
+        for row in rows:
+            if row.get("updated_at") and (self._cursor is None or row["updated_at"] > self._cursor):
+                self._cursor = row["updated_at"]
+    
+    def _notify(self):
+        # track() pode vir de uma thread do threadpool
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+    
+    async def _run_loop(self):
+        while True:
+            try:
+                if time.time() >= self._next_sync:
+                    self._next_sync = time.time() + self.SYNC_INTERVAL_SECONDS
+                    await asyncio.to_thread(self.sync)
+                await asyncio.to_thread(self.run_due)
+            except Exception:
+                logger.exception("Erro ao processar vencimentos")
+            
+            wake_at = self._next_sync
+            next_event = self.next_event_at()
+            if next_event is not None:
+                wake_at = min(wake_at, next_event)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, wake_at - time.time()))
+            except asyncio.TimeoutError:
+                pass
+    
+    async def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run_loop())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._loop = None
+            self._wake = None
+
+
+_due_date_scheduler: Optional[DueDateScheduler] = None
+
+
+def get_due_date_scheduler() -> DueDateScheduler:
+    """Instância única por processo"""
+    global _due_date_scheduler
+    if _due_date_scheduler is None:
+        _due_date_scheduler = DueDateScheduler()
+    return _due_date_scheduler
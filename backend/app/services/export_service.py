@@ -0,0 +1,310 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+# Função que busca uma página: (tabela, colunas, cursor, tamanho) -> linhas
+FetchPage = Callable[[str, str, Optional[Tuple[str, str]], int], List[dict]]
+
+
+def _json_field(field: str, key: str) -> Callable[[dict], object]:
+    return lambda row: (row.get(field) or {}).get(key)
+
+
+# Colunas de cada exportação: (cabeçalho, campo ou função que extrai o valor)
+EXPORTS = {
+    "projects": {
+        "table": "projects",
+        "sheet": "Projetos",
+        "columns": [
+            ("id", "id"),
+            ("cliente_id", "client_id"),
+            ("titulo", "title"),
+            ("descricao", "description"),
+            ("valor", "value"),
+            ("horas_estimadas", "estimated_hours"),
+            ("status", "status"),
+            ("inicio", "start_date"),
+            ("prazo", "deadline"),
+            ("criado_em", "created_at"),
+            ("atualizado_em", "updated_at"),
+        ],
+    },
+    "payments": {
+        "table": "payments",
+        "sheet": "Pagamentos",
+        # Pagamentos da assinatura (Mercado Pago) não têm projeto
+        "not_null": ["project_id"],
+        "columns": [
+            ("id", "id"),
+            ("projeto_id", "project_id"),
+            ("valor", "amount"),
+            ("vencimento", "due_date"),
+            ("status", "status"),
+            ("data_pagamento", "payment_date"),
+            ("observacoes", "notes"),
+            ("criado_em", "created_at"),
+            ("atualizado_em", "updated_at"),
+        ],
+    },
+    "calculations": {
+        "table": "calculations",
+        "sheet": "Calculos",
+        "columns": [
+            ("id", "id"),
+            ("nome", "name"),
+            ("regime", _json_field("input_data", "tax_regime")),
+            ("renda_desejada", _json_field("input_data", "desired_monthly_income")),
+            ("valor_hora", _json_field("result_data", "hourly_rate")),
+            ("valor_mensal", _json_field("result_data", "monthly_rate")),
+            ("entrada", "input_data"),
+            ("resultado", "result_data"),
+            ("criado_em", "created_at"),
+        ],
+    },
+}
+
+_NOT_NULL = {export["table"]: export.get("not_null", []) for export in EXPORTS.values()}
+
+FORMATS = ("csv", "xlsx")
+
+# Prefixos que o Excel/LibreOffice interpretam como fórmula ao abrir o CSV
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class _ChunkBuffer:
+    """
+    Destino de escrita que acumula bytes até serem drenados
+    Não tem tell/seek: o zipfile grava em modo streaming (data descriptors)
+    """
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+    
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+
+_XLSX_SHEET_END = '</sheetData></worksheet>'
+
+
+class ExportService:
+    """
+    Exportação do histórico do usuário em CSV ou XLSX
+    
+    As linhas são lidas em páginas por cursor (created_at, id) e escritas
+    na resposta à medida que chegam, então a memória usada não depende do
+    tamanho do histórico.
+    """
+    
+    PAGE_SIZE = 500
+    CHUNK_SIZE = 64 * 1024
+    
+    @classmethod
+    def columns(cls, entity: str) -> List[Tuple[str, object]]:
+        return EXPORTS[entity]["columns"]
+    
+    @classmethod
+    def media_type(cls, fmt: str) -> str:
+        if fmt == "xlsx":
+            return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        return "text/csv; charset=utf-8"
+    
+    # ==================== LEITURA PAGINADA ====================
+    
+    @classmethod
+    def supabase_fetcher(cls, client, user_id: str) -> FetchPage:
+        """Busca páginas no Supabase filtrando pelo usuário"""
+        def fetch_page(table: str, columns: str, cursor: Optional[Tuple[str, str]], limit: int) -> List[dict]:
+            query = client.table(table).select(columns).eq("user_id", user_id)
+            for field in _NOT_NULL.get(table, ()):
+                query = query.not_.is_(field, "null")
+            if cursor is not None:
+                created_at, row_id = cursor
+                # Keyset: (created_at, id) estritamente depois do cursor
+                query = query.or_(
+                    f'created_at.gt."{created_at}",'
+                    f'and(created_at.eq."{created_at}",id.gt."{row_id}")'
+                )
+            result = query.order("created_at").order("id").limit(limit).execute()
+            return result.data
+        
+        return fetch_page
+    
+    @classmethod
+    def iter_rows(cls, entity: str, fetch_page: FetchPage, page_size: Optional[int] = None) -> Iterator[dict]:
+        """Percorre todas as linhas, uma página por vez"""
+        page_size = page_size or cls.PAGE_SIZE
+        table = EXPORTS[entity]["table"]
+        fields = {field for _, field in cls.columns(entity) if isinstance(field, str)}
+        fields.update({"id", "created_at"})
+        select = ",".join(sorted(fields))
+        
+        cursor = None
+        while True:
+            page = fetch_page(table, select, cursor, page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            last = page[-1]
+            cursor = (last["created_at"], last["id"])
+    
+    @staticmethod
+    def _cell(row: dict, field) -> object:
+        value = field(row) if callable(field) else row.get(field)
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        return value
+    
+    @classmethod
+    def _values(cls, rows: Iterable[dict], columns) -> Iterator[list]:
+        for row in rows:
+            yield [cls._cell(row, field) for _, field in columns]
+    
+    # ==================== CSV ====================
+    
+    @staticmethod
+    def _csv_cell(value) -> object:
+        """
+        Neutraliza injeção de fórmula em texto vindo do usuário (nome,
+        observações): prefixa com ' o que começa com =, +, -, @, tab ou CR
+        Números (inclusive negativos) saem como estão
+        """
+        if value is None:
+            return ""
+        if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+            try:
+                float(value)
+                return value
+            except ValueError:
+                return "'" + value
+        return value
+    
+    @classmethod
+    def stream_csv(cls, entity: str, rows: Iterable[dict]) -> Iterator[bytes]:
+        """
+        CSV em blocos de ~64KB
+        Usa ';' e BOM UTF-8 para abrir direto no Excel em português
+        """
+        columns = cls.columns(entity)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=";", lineterminator="\r\n")
+        
+        buffer.write("\ufeff")
+        writer.writerow([header for header, _ in columns])
+        
+        for values in cls._values(rows, columns):
+            writer.writerow([cls._csv_cell(value) for value in values])
+            if buffer.tell() >= cls.CHUNK_SIZE:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    
+    # ==================== XLSX ====================
+    
+    @staticmethod
+    def _xlsx_cell(value) -> str:
+        if value is None:
+            return "<c/>"
+        if isinstance(value, bool):
+            return f'<c t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float, Decimal)):
+            return f"<c><v>{value}</v></c>"
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+    
+    @classmethod
+    def _xlsx_row(cls, values: list) -> str:
+        return "<row>" + "".join(cls._xlsx_cell(value) for value in values) + "</row>"
+    
+    @classmethod
+    def stream_xlsx(cls, entity: str, rows: Iterable[dict]) -> Iterator[bytes]:
+        """
+        Planilha escrita linha a linha dentro de um zip em modo streaming
+        Strings inline (sem sharedStrings), então nada fica acumulado
+        """
+        columns = cls.columns(entity)
+        output = _ChunkBuffer()
+        
+        with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("[Content_Types].xml", _XLSX_CONTENT_TYPES)
+            archive.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+            archive.writestr("xl/workbook.xml", _XLSX_WORKBOOK.format(sheet=EXPORTS[entity]["sheet"]))
+            archive.writestr("xl/_rels/workbook.xml.rels", _XLSX_WORKBOOK_RELS)
+            
+            with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+                sheet.write(_XLSX_SHEET_START.encode("utf-8"))
+                sheet.write(cls._xlsx_row([header for header, _ in columns]).encode("utf-8"))
+                
+                for values in cls._values(rows, columns):
+                    sheet.write(cls._xlsx_row(values).encode("utf-8"))
+                    if output.size >= cls.CHUNK_SIZE:
+                        yield output.drain()
+                
+                sheet.write(_XLSX_SHEET_END.encode("utf-8"))
+        
+        yield output.drain()
+    
+    @classmethod
+    def stream(cls, entity: str, fmt: str, fetch_page: FetchPage) -> Iterator[bytes]:
+        rows = cls.iter_rows(entity, fetch_page)
+        if fmt == "xlsx":
+            return cls.stream_xlsx(entity, rows)
+        return cls.stream_csv(entity, rows)
@@ -0,0 +1,184 @@
+import csv
+import os
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from pydantic import ValidationError
+from app.models import CalculatorInput
+from app.services.calculator_service import CalculatorService
+
+# Variação mensal (%) do IPCA e do INPC (IBGE), uma linha por mês
+SERIES_PATH = Path(os.getenv("INFLATION_SERIES_PATH", Path(__file__).resolve().parents[1] / "data" / "inflation_br.csv"))
+
+INDICES = ("IPCA", "INPC")
+
+# Campos em reais do input da calculadora que acompanham a inflação
+MONETARY_INPUT_FIELDS = ("desired_monthly_income", "monthly_expenses", "variable_expenses")
+
+
+def parse_month(value: str) -> Tuple[int, int]:
+    """ "2024-03" -> (2024, 3) """
+    try:
+        year, month = (int(part) for part in str(value)[:7].split("-"))
+    except ValueError:
+        raise ValueError(f"Mês inválido: {value} (use AAAA-MM)")
+    if not 1 <= month <= 12:
+        raise ValueError(f"Mês inválido: {value} (use AAAA-MM)")
+    return year, month
+
+
+class InflationSeries:
+    """
+    Série mensal de um índice com os produtos acumulados pré-calculados
+    
+    cumulative[i] é o fator acumulado dos i primeiros meses da série
+    (cumulative[0] = 1), então a inflação de qualquer período é a razão
+    de duas posições do array.
+    """
+    
+    def __init__(self, name: str, first_month: Tuple[int, int], monthly_rates: List[float]):
+        self.name = name
+        self.first_month = first_month
+        self.rates = np.asarray(monthly_rates, dtype=np.float64)
+        self.cumulative = np.concatenate(([1.0], np.cumprod(1 + self.rates / 100)))
+    
+    def _position(self, year: int, month: int) -> int:
+        return (year - self.first_month[0]) * 12 + (month - self.first_month[1])
+    
+    @property
+    def last_month(self) -> Tuple[int, int]:
+        position = self.first_month[1] - 1 + len(self.rates) - 1
+        return self.first_month[0] + position // 12, position % 12 + 1
+    
+    def factor(self, start: Tuple[int, int], end: Tuple[int, int]) -> float:
+        """Fator acumulado dos meses start a end, inclusive"""
+        first, last = self._position(*start), self._position(*end)
+        if first < 0 or last >= len(self.rates):
+            raise ValueError(
+                f"{self.name} disponível de {self.first_month[0]}-{self.first_month[1]:02d} "
+                f"a {self.last_month[0]}-{self.last_month[1]:02d}"
+            )
+        if last < first:
+            return 1.0
+        return float(self.cumulative[last + 1] / self.cumulative[first])
+
+
+def load_series(path: Path = SERIES_PATH) -> Dict[str, InflationSeries]:
+    with open(path, newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    first_month = parse_month(rows[0]["month"])
+    return {
+        name: InflationSeries(name, first_month, [float(row[name.lower()]) for row in rows])
+        for name in INDICES
+    }
+
+
+class InflationService:
+    """Reajuste de valores pelo IPCA/INPC acumulado"""
+    
+    _series: Optional[Dict[str, InflationSeries]] = None
+    
+    @classmethod
+    def series(cls, index: str) -> InflationSeries:
+        # Carregada uma vez por processo
+        if cls._series is None:
+            cls._series = load_series()
+        return cls._series[index]
+    
+    @staticmethod
+    def _next_month(year: int, month: int) -> Tuple[int, int]:
+        return (year + 1, 1) if month == 12 else (year, month + 1)
+    
+    @classmethod
+    def readjustment_factor(cls, index: str, base_month: Tuple[int, int],
+                            reference_month: Optional[Tuple[int, int]] = None) -> Tuple[Decimal, Tuple[int, int]]:
+        """
+        Fator para levar um valor definido em base_month até reference_month
+        (padrão: último mês publicado): inflação dos meses seguintes ao
+        base_month até reference_month. Meses além da série ficam no último publicado.
+        """
+        series = cls.series(index)
+        last = series.last_month
+        reference = min(reference_month or last, last)
+        factor = series.factor(cls._next_month(*base_month), reference)
+        return Decimal(str(round(factor, 8))), reference
+    
+    @classmethod
+    def _factor_since(cls, base_month: Tuple[int, int], index: str,
+                      reference_month: Optional[Tuple[int, int]]) -> Tuple[Decimal, Tuple[int, int]]:
+        # Já reajustado até a referência (ou depois): nada a fazer
+        factor, reference = cls.readjustment_factor(index, base_month, reference_month)
+        if base_month >= reference:
+            raise ValueError(f"Já reajustado até {base_month[0]}-{base_month[1]:02d}")
+        return factor, reference
+    
+    @classmethod
+    def accumulated(cls, index: str, start: Tuple[int, int], end: Tuple[int, int]) -> Decimal:
+        """Inflação acumulada (%) de start a end, inclusive"""
+        factor = cls.series(index).factor(start, end)
+        return (Decimal(str(factor)) - 1) * 100
+    
+    @classmethod
+    def readjust_calculation(cls, calculation: dict, index: str,
+                             reference_month: Optional[Tuple[int, int]] = None) -> dict:
+        """
+        Corrige os valores em reais do input e refaz o cálculo (impostos
+        não são proporcionais: o DAS do MEI é fixo, o IR é progressivo)
+        A base é o mês do último reajuste gravado (readjusted_through) ou a criação
+        """
+        base = parse_month(calculation.get("readjusted_through") or calculation["created_at"])
+        factor, reference = cls._factor_since(base, index, reference_month)
+        input_data = dict(calculation["input_data"])
+        for field in MONETARY_INPUT_FIELDS:
+            if input_data.get(field) is not None:
+                input_data[field] = str((Decimal(str(input_data[field])) * factor).quantize(Decimal("0.01")))
+        readjusted_input = CalculatorInput(**input_data)
+        result = CalculatorService.calculate(readjusted_input)
+        before = calculation.get("result_data") or {}
+        return {
+            "id": calculation["id"],
+            "name": calculation.get("name"),
+            "factor": factor,
+            "reference_month": f"{reference[0]}-{reference[1]:02d}",
+            "input_data": readjusted_input.model_dump(mode="json"),
+            "result_data": result.model_dump(mode="json"),
+            "previous": {key: before.get(key) for key in ("hourly_rate", "daily_rate", "monthly_rate")},
+            "hourly_rate": result.hourly_rate,
+            "daily_rate": result.daily_rate,
+            "monthly_rate": result.monthly_rate,
+        }
+    
+    @classmethod
+    def readjust_project(cls, project: dict, index: str,
+                         reference_month: Optional[Tuple[int, int]] = None) -> dict:
+        """Valor do projeto corrigido desde o último reajuste gravado (ou o início, ou a criação)"""
+        base = parse_month(project.get("readjusted_through") or project.get("start_date") or project["created_at"])
+        factor, reference = cls._factor_since(base, index, reference_month)
+        value = Decimal(str(project["value"]))
+        return {
+            "id": project["id"],
+            "title": project.get("title"),
+            "factor": factor,
+            "reference_month": f"{reference[0]}-{reference[1]:02d}",
+            "previous_value": value,
+            "value": (value * factor).quantize(Decimal("0.01")),
+        }
+    
+    @classmethod
+    def readjust(cls, calculations: List[dict], projects: List[dict], index: str,
+                 reference_month: Optional[Tuple[int, int]] = None) -> dict:
+        """Reajuste em lote; itens fora da série ou com input inválido vão para "skipped" """
+        if index not in INDICES:
+            raise ValueError(f"Índice inválido. Use: {', '.join(INDICES)}")
+        result = {"index": index, "calculations": [], "projects": [], "skipped": []}
+        for kind, rows, readjust in (
+            ("calculations", calculations, cls.readjust_calculation),
+            ("projects", [row for row in projects if row.get("value") is not None], cls.readjust_project),
+        ):
+            for row in rows:
+                try:
+                    result[kind].append(readjust(row, index, reference_month))
+                except (ValueError, ValidationError, TypeError, KeyError) as e:
+                    result["skipped"].append({"id": row.get("id"), "type": kind, "reason": str(e)})
+        return result
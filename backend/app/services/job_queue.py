@@ -0,0 +1,437 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Estados de um job no journal
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    dedupe_key TEXT,
+    run_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL,
+    worker TEXT,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (type, status, run_at);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key)
+    WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running');
+"""
+
+Handler = Callable[[dict], Union[Any, Awaitable[Any]]]
+
+
+@dataclass
+class JobType:
+    handler: Handler
+    concurrency: int = 1
+    max_attempts: int = 5
+    backoff_seconds: float = 5.0
+    max_backoff_seconds: float = 3600.0
+    timeout_seconds: float = 300.0
+    # Jobs periódicos: a próxima execução é agendada ao terminar esta
+    interval_seconds: Optional[float] = None
+
+
+class JobQueue:
+    """
+    Fila de jobs em segundo plano com journal em SQLite
+    
+    Os jobs sobrevivem a reinícios: cada execução "aluga" o job por
+    timeout_seconds, e um job cujo worker morreu volta para a fila quando
+    o aluguel vence. Vários processos podem usar o mesmo arquivo.
+    """
+    
+    # Jobs concluídos ficam no journal por 7 dias
+    RETENTION_SECONDS = 7 * 24 * 3600
+    # Amostras guardadas para as métricas de latência
+    METRICS_WINDOW = 200
+    
+    def __init__(self, path: str, poll_interval: float = 1.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.job_types: Dict[str, JobType] = {}
+        
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._active: Dict[str, int] = {}
+        self._last_prune = 0.0
+        
+        # Métricas do processo
+        self._wait_times: Dict[str, deque] = {}
+        self._run_times: Dict[str, deque] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+    
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        path = os.getenv("JOB_QUEUE_PATH", os.path.join(tempfile.gettempdir(), "freelabr-jobs.sqlite3"))
+        return cls(path, poll_interval=float(os.getenv("JOB_QUEUE_POLL_SECONDS", "1")))
+    
+    # ==================== JOURNAL ====================
+    
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        with self._db_lock:
+            return self._db().execute(sql, params).lastrowid
+    
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._db_lock:
+            return self._db().execute(sql, params).fetchall()
+    
+    # ==================== REGISTRO E ENFILEIRAMENTO ====================
+    
+    def handler(self, job_type: str, **options) -> Callable[[Handler], Handler]:
+        """
+        Registra a função que processa um tipo de job
+        Aceita funções síncronas (rodam numa thread) ou assíncronas
+        """
+        def decorator(func: Handler) -> Handler:
+            self.job_types[job_type] = JobType(handler=func, **options)
+            return func
+        
+        return decorator
+    
+    def enqueue(
+        self,
+        job_type: str,
+        payload: Optional[dict] = None,
+        delay: float = 0.0,
+        run_at: Optional[float] = None,
+        dedupe_key: Optional[str] = None,
+        max_attempts: Optional[int] = None,
+    ) -> int:
+        """
+        Grava o job no journal e retorna o id
+        Com dedupe_key, um job igual ainda pendente é reaproveitado
+        """
+        now = time.time()
+        spec = self.job_types.get(job_type)
+        attempts = max_attempts or (spec.max_attempts if spec else JobType.max_attempts)
+        while True:
+            try:
+                job_id = self._execute(
+                    "INSERT INTO jobs (type, payload, status, max_attempts, dedupe_key, run_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (job_type, json.dumps(payload or {}), QUEUED, attempts, dedupe_key, run_at or now + delay, now)
+                )
+                break
+            except sqlite3.IntegrityError:
+                rows = self._query(
+                    "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN (?, ?)",
+                    (dedupe_key, QUEUED, RUNNING)
+                )
+                if rows:
+                    return rows[0]["id"]
+                # O job igual terminou entre o INSERT e o SELECT: tenta de novo
+        
+        self._notify()
+        return job_id
+    
+    def get(self, job_id: int) -> Optional[dict]:
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job["payload"] = json.loads(job["payload"])
+        return job
+    
+    def _notify(self):
+        """Acorda o despachante (pode ser chamado de outra thread)"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+    
+    # ==================== CICLO DE VIDA ====================
+    
+    async def start(self):
+        if self._dispatcher is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        await asyncio.to_thread(self._db)
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+    
+    async def stop(self, timeout: float = 10.0):
+        """Para de buscar jobs e espera os que estão rodando"""
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher = None
+        
+        running = list(self._tasks.values())
+        if running:
+            _, pending = await asyncio.wait(running, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        self._loop = None
+        self._wakeup = None
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    # ==================== DESPACHO ====================
+    
+    async def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            for job_type, spec in self.job_types.items():
+                free = spec.concurrency - self._active.get(job_type, 0)
+                if free <= 0:
+                    continue
+                jobs = await asyncio.to_thread(self._claim, job_type, free, spec.timeout_seconds)
+                for job in jobs:
+                    self._active[job_type] = self._active.get(job_type, 0) + 1
+                    task = asyncio.create_task(self._run(spec, job))
+                    self._tasks[job["id"]] = task
+            
+            if time.time() - self._last_prune > 3600:
+                await asyncio.to_thread(self._prune)
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+    
+    def _claim(self, job_type: str, limit: int, lease_seconds: float) -> list:
+        """Reserva até `limit` jobs vencidos (ou com aluguel expirado) numa transação"""
+        now = time.time()
+        with self._db_lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Aluguel vencido sem tentativas restantes: o worker morreu na última
+                expired = conn.execute(
+                    "SELECT * FROM jobs WHERE type = ? AND status = ? AND lease_until < ? "
+                    "AND attempts >= max_attempts",
+                    (job_type, RUNNING, now)
+                ).fetchall()
+                if expired:
+                    marks = ",".join("?" * len(expired))
+                    conn.execute(
+                        f"UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL, "
+                        f"last_error = ? WHERE id IN ({marks})",
+                        (FAILED, now, "Aluguel expirou na última tentativa", *[row["id"] for row in expired])
+                    )
+                ids = [row["id"] for row in conn.execute(
+                    "SELECT id FROM jobs WHERE type = ? AND ("
+                    "(status = ? AND run_at <= ?) OR (status = ? AND lease_until < ?)"
+                    ") ORDER BY run_at, id LIMIT ?",
+                    (job_type, QUEUED, now, RUNNING, now, limit)
+                )]
+                rows = []
+                if ids:
+                    marks = ",".join("?" * len(ids))
+                    conn.execute(
+                        f"UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ?, "
+                        f"lease_until = ?, worker = ? WHERE id IN ({marks})",
+                        (RUNNING, now, now + lease_seconds, self.worker_id, *ids)
+                    )
+                    rows = conn.execute(f"SELECT * FROM jobs WHERE id IN ({marks})", ids).fetchall()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        
+        spec = self.job_types.get(job_type)
+        for row in expired:
+            logger.warning(
+                "Job %s (%s) falhou: aluguel expirou na última tentativa", row["id"], job_type,
+                extra={"job_id": row["id"], "job_type": job_type, "attempts": row["attempts"], "outcome": "failed"}
+            )
+            if spec is not None:
+                self._count(job_type, "failed")
+                job = dict(row)
+                job["payload"] = json.loads(job["payload"])
+                self._reschedule(spec, job)
+        
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["payload"] = json.loads(job["payload"])
+            jobs.append(job)
+        return jobs
+    
+    async def _run(self, spec: JobType, job: dict):
+        job_type = job["type"]
+        started = time.time()
+        self._sample(self._wait_times, job_type, started - job["run_at"])
+        try:
+            if asyncio.iscoroutinefunction(spec.handler):
+                await asyncio.wait_for(spec.handler(job["payload"]), timeout=spec.timeout_seconds)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(spec.handler, job["payload"]), timeout=spec.timeout_seconds)
+        except asyncio.CancelledError:
+            # Desligamento: devolve o job sem contar a tentativa
+            await asyncio.to_thread(self._release, job["id"])
+            raise
+        except Exception as e:
+            await asyncio.to_thread(self._fail, spec, job, e)
+            outcome = "retried" if job["attempts"] < job["max_attempts"] else "failed"
+            self._count(job_type, outcome)
+            logger.warning(
+                "Job %s (%s) falhou: %s", job["id"], job_type, e,
+                extra={"job_id": job["id"], "job_type": job_type, "attempts": job["attempts"], "outcome": outcome}
+            )
+        else:
+            await asyncio.to_thread(self._complete, spec, job)
+            self._count(job_type, "done")
+        finally:
+            self._sample(self._run_times, job_type, time.time() - started)
+            self._active[job_type] -= 1
+            self._tasks.pop(job["id"], None)
+            self._notify()
+    
+    def _complete(self, spec: JobType, job: dict):
+        self._execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+            (DONE, time.time(), job["id"])
+        )
+        self._reschedule(spec, job)
+    
+    def _reschedule(self, spec: JobType, job: dict):
+        if not spec.interval_seconds:
+            return
+        try:
+            self.enqueue(
+                job["type"],
+                job["payload"],
+                delay=spec.interval_seconds,
+                dedupe_key=job["dedupe_key"],
+                max_attempts=job["max_attempts"]
+            )
+        except sqlite3.IntegrityError:
+            pass
+    
+    def _release(self, job_id: int):
+        self._execute(
+            "UPDATE jobs SET status = ?, attempts = attempts - 1, lease_until = NULL WHERE id = ?",
+            (QUEUED, job_id)
+        )
+    
+    def _fail(self, spec: JobType, job: dict, error: Exception):
+        now = time.time()
+        message = f"{type(error).__name__}: {error}"
+        if job["attempts"] >= job["max_attempts"]:
+            self._execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, lease_until = NULL, last_error = ? WHERE id = ?",
+                (FAILED, now, message, job["id"])
+            )
+            self._reschedule(spec, job)
+            return
+        
+        # Backoff exponencial com jitter para não sincronizar as novas tentativas
+        delay = min(spec.max_backoff_seconds, spec.backoff_seconds * 2 ** (job["attempts"] - 1))
+        delay *= random.uniform(0.8, 1.2)
+        self._execute(
+            "UPDATE jobs SET status = ?, run_at = ?, lease_until = NULL, last_error = ? WHERE id = ?",
+            (QUEUED, now + delay, message, job["id"])
+        )
+    
+    def _prune(self):
+        self._last_prune = time.time()
+        self._execute(
+            "DELETE FROM jobs WHERE status = ? AND finished_at < ?",
+            (DONE, self._last_prune - self.RETENTION_SECONDS)
+        )
+    
+    # ==================== MÉTRICAS ====================
+    
+    def _sample(self, samples: Dict[str, deque], job_type: str, value: float):
+        samples.setdefault(job_type, deque(maxlen=self.METRICS_WINDOW)).append(max(value, 0.0))
+    
+    def _count(self, job_type: str, outcome: str):
+        counters = self._counters.setdefault(job_type, {"done": 0, "retried": 0, "failed": 0})
+        counters[outcome] += 1
+    
+    @staticmethod
+    def _percentiles(values) -> dict:
+        if not values:
+            return {"p50": None, "p95": None}
+        ordered = sorted(values)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4)
+        return {"p50": pick(0.5), "p95": pick(0.95)}
+    
+    def metrics(self) -> dict:
+        """Profundidade da fila (journal) e latências deste processo"""
+        now = time.time()
+        rows = self._query(
+            "SELECT type, status, COUNT(*) AS total, MIN(CASE WHEN run_at <= ? THEN run_at END) AS oldest_due "
+            "FROM jobs GROUP BY type, status",
+            (now,)
+        )
+        
+        types = {}
+        for job_type in set(self.job_types) | {row["type"] for row in rows}:
+            types[job_type] = {
+                "depth": {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0},
+                "oldest_due_seconds": None,
+                "active": self._active.get(job_type, 0),
+                "concurrency": self.job_types[job_type].concurrency if job_type in self.job_types else None,
+                "wait_seconds": self._percentiles(self._wait_times.get(job_type)),
+                "run_seconds": self._percentiles(self._run_times.get(job_type)),
+                "processed": self._counters.get(job_type, {"done": 0, "retried": 0, "failed": 0}),
+            }
+        
+        for row in rows:
+            entry = types[row["type"]]
+            entry["depth"][row["status"]] = row["total"]
+            if row["status"] == QUEUED and row["oldest_due"] is not None:
+                entry["oldest_due_seconds"] = round(now - row["oldest_due"], 3)
+        
+        return {
+            "worker": self.worker_id,
+            "running": self._dispatcher is not None,
+            "types": types,
+        }
+
+
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Instância única por processo"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue.from_env()
+    return _job_queue
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Dict, Optional, Set
+from app.services.shared_cache import get_shared_cache
+
+# Último evento de pagamento de cada usuário (visível a todos os workers)
+_EVENT_KEY = "payment_event:{user_id}"
+
+
+class ConnectionLimitError(Exception):
+    """Worker já está no limite de conexões de eventos"""
+
+
+class Subscription:
+    """Uma conexão SSE: fila própria e o id do último evento entregue"""
+    
+    def __init__(self, user_id: str, last_event_id: int, queue_size: int):
+        self.user_id = user_id
+        self.last_event_id = last_event_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+    
+    def deliver(self, event: Optional[dict]) -> bool:
+        """Enfileira o evento se ainda não foi entregue (None encerra a conexão)"""
+        if event is not None:
+            if event["id"] <= self.last_event_id:
+                return False
+            self.last_event_id = event["id"]
+        if event is None and self.queue.full():
+            # Encerramento tem prioridade sobre eventos ainda não lidos
+            self.queue.get_nowait()
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente lento: no reconnect, o Last-Event-ID traz o que faltou
+            self.dropped += 1
+            return False
+        return True
+
+
+class PaymentEventBroker:
+    """
+    Pub/sub em processo dos eventos de pagamento, para as conexões SSE
+    
+    publish() pode ser chamado de qualquer thread (os jobs rodam fora do
+    loop): entrega na hora às conexões deste worker e grava o evento no
+    cache compartilhado. Um laço por worker lê esse cache só para os
+    usuários com conexão aberta, então o evento publicado por outro worker
+    chega em até poll_interval segundos, sem consulta ao banco.
+    
+    O id do evento é o horário em milissegundos; só o último evento de
+    cada usuário fica guardado (event_ttl), o suficiente para o reconnect
+    com Last-Event-ID não perder a aprovação.
+    """
+    
+    # Espera do EventSource antes de reconectar
+    RECONNECT_MS = 3000
+    
+    def __init__(self, cache=None, max_connections: int = 500, heartbeat_seconds: float = 15.0,
+                 poll_interval: float = 1.0, event_ttl: float = 900.0, queue_size: int = 16):
+        self.cache = cache or get_shared_cache()
+        self.max_connections = max_connections
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_interval = poll_interval
+        self.event_ttl = event_ttl
+        self.queue_size = queue_size
+        
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._connections = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        
+        self.published = 0
+        self.delivered = 0
+        self.rejected = 0
+    
+    @classmethod
+    def from_env(cls) -> "PaymentEventBroker":
+        return cls(
+            max_connections=int(os.getenv("SSE_MAX_CONNECTIONS", "500")),
+            heartbeat_seconds=float(os.getenv("SSE_HEARTBEAT_SECONDS", "15")),
+            poll_interval=float(os.getenv("SSE_POLL_INTERVAL_SECONDS", "1")),
+        )
+    
+    # ==================== CICLO DE VIDA ====================
+    
+    async def start(self):
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._watch_loop())
+    
+    async def stop(self):
+        """Encerra o laço e fecha as conexões abertas (desligamento)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.deliver(None)
+    
+    # ==================== PUBLICAÇÃO ====================
+    
+    def publish(self, user_id: str, event_type: str, data: dict) -> dict:
+        event = {"id": time.time_ns() // 1_000_000, "event": event_type, "data": data}
+        self.cache.set(_EVENT_KEY.format(user_id=user_id), event, ttl=self.event_ttl)
+        self.published += 1
+        
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            if running is loop:
+                self._dispatch(user_id, event)
+            else:
+                loop.call_soon_threadsafe(self._dispatch, user_id, event)
+        return event
+    
+    def _dispatch(self, user_id: str, event: dict):
+        for subscription in list(self._subscribers.get(user_id, ())):
+            if subscription.deliver(event):
+                self.delivered += 1
+    
+    async def _watch_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for user_id in list(self._subscribers):
+                event = self.cache.get(_EVENT_KEY.format(user_id=user_id))
+                if event is not None:
+                    self._dispatch(user_id, event)
+    
+    # ==================== CONEXÕES ====================
+    
+    def subscribe(self, user_id: str, last_event_id: int = 0) -> Subscription:
+        if self._connections >= self.max_connections:
+            self.rejected += 1
+            raise ConnectionLimitError(f"Limite de {self.max_connections} conexões atingido")
+        subscription = Subscription(user_id, last_event_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        self._connections += 1
+        
+        # Evento publicado enquanto o cliente estava desconectado
+        event = self.cache.get(_EVENT_KEY.format(user_id=user_id))
+        if event is not None and subscription.deliver(event):
+            self.delivered += 1
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions and subscription in subscriptions:
+            subscriptions.discard(subscription)
+            self._connections -= 1
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+    
+    def is_full(self) -> bool:
+        return self._connections >= self.max_connections
+    
+    @staticmethod
+    def format_event(event: dict) -> str:
+        return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+    
+    async def stream(self, user_id: str, last_event_id: int = 0) -> AsyncIterator[str]:
+        """
+        Corpo text/event-stream de uma conexão
+        
+        A inscrição acontece dentro do gerador para que o finally sempre a
+        desfaça. Sem evento, um comentário a cada heartbeat_seconds mantém
+        a conexão viva através de proxies.
+        """
+        try:
+            subscription = self.subscribe(user_id, last_event_id)
+        except ConnectionLimitError:
+            # Chegou junto com outras conexões depois da checagem da rota
+            yield "retry: 10000\n\n"
+            return
+        
+        try:
+            yield f"retry: {self.RECONNECT_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                yield self.format_event(event)
+        finally:
+            self.unsubscribe(subscription)
+    
+    def stats(self) -> dict:
+        return {
+            "connections": self._connections,
+            "max_connections": self.max_connections,
+            "users": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "rejected": self.rejected,
+            "dropped": sum(s.dropped for subs in self._subscribers.values() for s in subs),
+        }
+
+
+def parse_last_event_id(value: Optional[str]) -> int:
+    """Last-Event-ID inválido ou ausente vale 0 (recebe o último evento guardado)"""
+    return int(value) if value and value.isdigit() else 0
+
+
+_payment_event_broker: Optional[PaymentEventBroker] = None
+
+
+def get_payment_event_broker() -> PaymentEventBroker:
+    """Instância única por processo"""
+    global _payment_event_broker
+    if _payment_event_broker is None:
+        _payment_event_broker = PaymentEventBroker.from_env()
+    return _payment_event_broker
@@ -0,0 +1,157 @@
+import numpy as np
+from app.models import ProjectionInput, ProjectionScenario
+from app.services.calculator_service import CalculatorService
+from app.services.tax_arrays import simples_bracket, simples_effective_rate, SIMPLES_LIMITS
+
+
+class ProjectionService:
+    """
+    Projeção mês a mês do faturamento com RBT12 (receita bruta dos 12 meses
+    anteriores), faixas do Simples Nacional e limite anual do MEI
+    Todos os cenários são processados juntos (matriz cenários × meses)
+    """
+    
+    @classmethod
+    def project(cls, input_data: ProjectionInput) -> dict:
+        """Monta as séries de faturamento e executa a projeção em lote"""
+        revenues = np.vstack([
+            cls.revenue_series(scenario, input_data.months)
+            for scenario in input_data.scenarios
+        ])
+        history = np.vstack([cls.history_window(scenario) for scenario in input_data.scenarios])
+        history_months = np.array([len(scenario.previous_revenues) for scenario in input_data.scenarios])
+        
+        result = cls.project_matrix(revenues, history, history_months, input_data.start_month)
+        
+        scenarios = []
+        for index, scenario in enumerate(input_data.scenarios):
+            scenarios.append({
+                "name": scenario.name,
+                **cls._scenario_summary(result, index),
+            })
+        
+        return {
+            "months": input_data.months,
+            "start_month": input_data.start_month,
+            "tax_table_version": CalculatorService.TAX_TABLE_VERSION,
+            "scenarios": scenarios,
+        }
+    
+    @staticmethod
+    def revenue_series(scenario: ProjectionScenario, months: int) -> np.ndarray:
+        if scenario.revenues is not None:
+            series = np.array([float(value) for value in scenario.revenues], dtype=float)
+            if len(series) < months:
+                # Mantém o último valor informado até o fim do horizonte
+                last = series[-1] if len(series) else 0.0
+                series = np.concatenate([series, np.full(months - len(series), last)])
+            return series[:months]
+        
+        if scenario.initial_monthly_revenue is None:
+            raise ValueError("Informe revenues ou initial_monthly_revenue em cada cenário")
+        
+        growth = 1 + float(scenario.monthly_growth_percentage) / 100
+        return float(scenario.initial_monthly_revenue) * growth ** np.arange(months)
+    
+    @staticmethod
+    def history_window(scenario: ProjectionScenario) -> np.ndarray:
+        """Janela de 12 meses alinhada à direita (zeros antes do histórico)"""
+        window = np.zeros(12)
+        previous = [float(value) for value in scenario.previous_revenues]
+        if previous:
+            window[12 - len(previous):] = previous
+        return window
+    
+    @staticmethod
+    def project_matrix(revenues: np.ndarray, history: np.ndarray, history_months: np.ndarray, start_month: int = 1) -> dict:
+        """
+        Núcleo vetorizado da projeção
+        
+        revenues: cenários × meses; history: cenários × 12 (mais antigo primeiro,
+        zeros onde não há histórico); history_months: meses de histórico reais.
+        
+        O RBT12 é mantido numa janela circular com soma corrente: a cada mês
+        entra o faturamento do mês e sai o de 12 meses atrás, custo O(1) por
+        mês e cenário. Empresas com menos de 12 meses usam a média mensal × 12
+        (e o próprio mês × 12 no primeiro mês), como no Simples Nacional.
+        """
+        revenues = np.asarray(revenues, dtype=float)
+        n, months = revenues.shape
+        
+        window = np.array(history, dtype=float, copy=True)
+        running_sum = window.sum(axis=1)
+        elapsed = np.minimum(np.asarray(history_months), 12).astype(float)
+        
+        mei_limit = float(CalculatorService.MEI_ANNUAL_LIMIT)
+        mei_tolerance = mei_limit * (1 + float(CalculatorService.MEI_EXCESS_TOLERANCE))
+        # Meses do histórico que caem no ano-calendário corrente contam para o MEI
+        months_before_start = start_month - 1
+        mei_year_to_date = window[:, 12 - months_before_start:].sum(axis=1) if months_before_start else np.zeros(n)
+        
+        rbt12 = np.zeros((n, months))
+        year_to_date = np.zeros((n, months))
+        
+        for month in range(months):
+            revenue = revenues[:, month]
+            
+            # RBT12 do mês (receita dos 12 meses anteriores, proporcionalizada no início)
+            rbt12[:, month] = np.where(
+                elapsed >= 12,
+                running_sum,
+                np.where(elapsed > 0, running_sum / np.maximum(elapsed, 1) * 12, revenue * 12),
+            )
+            
+            # Atualização incremental da janela circular
+            slot = month % 12
+            running_sum += revenue - window[:, slot]
+            window[:, slot] = revenue
+            elapsed = np.minimum(elapsed + 1, 12)
+            
+            # Faturamento acumulado no ano-calendário (limite do MEI)
+            if month > 0 and (start_month - 1 + month) % 12 == 0:
+                mei_year_to_date[:] = 0
+            mei_year_to_date += revenue
+            year_to_date[:, month] = mei_year_to_date
+        
+        effective_rate = simples_effective_rate(rbt12)
+        
+        return {
+            "revenue": revenues,
+            "rbt12": rbt12,
+            "simples_bracket": simples_bracket(rbt12) + 1,
+            "simples_effective_rate": effective_rate,
+            "simples_tax": revenues * effective_rate,
+            "simples_limit_exceeded": rbt12 > SIMPLES_LIMITS[-1],
+            "mei_year_to_date": year_to_date,
+            "mei_limit_exceeded": year_to_date > mei_limit,
+            "mei_limit_exceeded_over_tolerance": year_to_date > mei_tolerance,
+        }
+    
+    @staticmethod
+    def _first_month(flags: np.ndarray):
+        """Índice (1 = primeiro mês projetado) do primeiro True, ou None"""
+        hits = np.flatnonzero(flags)
+        return int(hits[0]) + 1 if len(hits) else None
+    
+    @classmethod
+    def _scenario_summary(cls, result: dict, index: int) -> dict:
+        brackets = result["simples_bracket"][index]
+        changes = np.flatnonzero(np.diff(brackets)) + 1
+        
+        return {
+            "revenue": np.round(result["revenue"][index], 2).tolist(),
+            "rbt12": np.round(result["rbt12"][index], 2).tolist(),
+            "simples_bracket": brackets.tolist(),
+            "simples_effective_rate": np.round(result["simples_effective_rate"][index] * 100, 4).tolist(),
+            "simples_tax": np.round(result["simples_tax"][index], 2).tolist(),
+            "mei_year_to_date": np.round(result["mei_year_to_date"][index], 2).tolist(),
+            "bracket_changes": [
+                {"month": int(month) + 1, "from": int(brackets[month - 1]), "to": int(brackets[month])}
+                for month in changes
+            ],
+            "total_revenue": round(float(result["revenue"][index].sum()), 2),
+            "total_simples_tax": round(float(result["simples_tax"][index].sum()), 2),
+            "mei_limit_exceeded_month": cls._first_month(result["mei_limit_exceeded"][index]),
+            "mei_limit_exceeded_over_tolerance_month": cls._first_month(result["mei_limit_exceeded_over_tolerance"][index]),
+            "simples_limit_exceeded_month": cls._first_month(result["simples_limit_exceeded"][index]),
+        }
@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+from typing import Optional, Tuple
+from app.models import ProposalInput
+from app.pdf_writer import PDFDocument, PAGE_WIDTH, PAGE_HEIGHT, WHITE, wrap_text
+from app.services.calculator_service import CalculatorService
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+# Muda quando o layout muda, para não servir documentos antigos do armazenamento
+TEMPLATE_VERSION = "1"
+
+PACKAGES = [
+    ("small", "Pacote Essencial", "small_project_value"),
+    ("medium", "Pacote Completo", "medium_project_value"),
+    ("large", "Pacote Premium", "large_project_value"),
+]
+
+_PACKAGE_ROW = Template(
+    '                <tr><td>$label</td><td>${hours}h</td><td class="value">$value</td></tr>'
+)
+
+MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "html": "text/html; charset=utf-8",
+}
+
+
+def format_brl(value) -> str:
+    """R$ 1.234,56"""
+    formatted = f"{Decimal(value):,.2f}"
+    return "R$ " + formatted.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+@lru_cache(maxsize=None)
+def _template(name: str) -> Template:
+    """Lê e compila o template uma vez por processo"""
+    return Template((TEMPLATES_DIR / name).read_text(encoding="utf-8"))
+
+
+def _hex_to_rgb(color: str) -> Tuple[float, float, float]:
+    return tuple(int(color[i:i + 2], 16) / 255 for i in (1, 3, 5))
+
+
+def _render_html(context: dict) -> bytes:
+    escaped = {
+        key: html.escape(value)
+        for key, value in context.items()
+        if isinstance(value, str)
+    }
+    escaped["client_details"] = "<br>".join(html.escape(detail) for detail in context["client_details"])
+    escaped["package_rows"] = "\n".join(
+        _PACKAGE_ROW.substitute({key: html.escape(str(value)) for key, value in package.items()})
+        for package in context["packages"]
+    )
+    return _template("proposal.html").substitute(escaped).encode("utf-8")
+
+
+def _render_pdf(context: dict) -> bytes:
+    margin = 50
+    content_width = PAGE_WIDTH - 2 * margin
+    bottom = 70  # abaixo disso fica só o rodapé
+    brand = _hex_to_rgb(context["brand_color"])
+    muted = (0.42, 0.45, 0.5)
+    footer = f"Valores calculados com base no regime {context['tax_regime']}. Gerado por FreelaBR."
+    
+    pdf = PDFDocument(title=f"Proposta Comercial - {context['project_title']}")
+    page = 1
+    
+    def draw_frame():
+        """Cabeçalho e rodapé da página atual; devolve o y onde o conteúdo começa"""
+        pdf.text(margin, 40, footer, size=8, color=muted)
+        pdf.text_right(PAGE_WIDTH - margin, 40, f"Página {page}", size=8, color=muted)
+        if page == 1:
+            # Faixa com a cor da marca
+            pdf.rect(0, PAGE_HEIGHT - 90, PAGE_WIDTH, 90, brand)
+            pdf.text(margin, PAGE_HEIGHT - 48, "Proposta Comercial", size=22, bold=True, color=WHITE)
+            pdf.text(margin, PAGE_HEIGHT - 70, context["freelancer_name"], size=12, color=WHITE)
+            return PAGE_HEIGHT - 125
+        # Continuação: faixa estreita
+        pdf.rect(0, PAGE_HEIGHT - 40, PAGE_WIDTH, 40, brand)
+        pdf.text(margin, PAGE_HEIGHT - 25, "Proposta Comercial", size=12, bold=True, color=WHITE)
+        pdf.text_right(PAGE_WIDTH - margin, PAGE_HEIGHT - 25, context["freelancer_name"], size=10, color=WHITE)
+        return PAGE_HEIGHT - 70
+    
+    def ensure_space(height: float) -> bool:
+        """Abre uma página nova se o próximo bloco não couber acima do rodapé"""
+        nonlocal y, page
+        if y - height >= bottom:
+            return False
+        pdf.add_page()
+        page += 1
+        y = draw_frame()
+        return True
+    
+    def package_header():
+        nonlocal y
+        pdf.text(margin, y, "Pacote", size=10, bold=True, color=muted)
+        pdf.text(margin + 250, y, "Horas estimadas", size=10, bold=True, color=muted)
+        pdf.text_right(PAGE_WIDTH - margin, y, "Investimento", size=10, bold=True, color=muted)
+        y -= 8
+        pdf.line(margin, y, PAGE_WIDTH - margin, y, color=muted)
+    
+    y = draw_frame()
+    pdf.text(margin, y, "CLIENTE", size=9, bold=True, color=muted)
+    pdf.text(PAGE_WIDTH - margin - 150, y, "DATA", size=9, bold=True, color=muted)
+    y -= 16
+    pdf.text(margin, y, context["client_name"], size=12, bold=True)
+    pdf.text(PAGE_WIDTH - margin - 150, y, context["issue_date"], size=11)
+    for index, detail in enumerate(context["client_details"]):
+        pdf.text(margin, y - 15 * (index + 1), detail, size=10)
+    pdf.text(PAGE_WIDTH - margin - 150, y - 15, f"Válida até {context['valid_until']}", size=10)
+    
+    y -= 30 + 15 * max(len(context["client_details"]), 1)
+    for line in wrap_text(context["project_title"], 16, content_width, bold=True):
+        ensure_space(0)
+        pdf.text(margin, y, line, size=16, bold=True)
+        y -= 22
+    for line in wrap_text(context["project_description"], 11, content_width):
+        ensure_space(0)
+        pdf.text(margin, y, line, size=11)
+        y -= 15
+    
+    # Tabela de pacotes (o cabeçalho vai junto com a primeira linha)
+    y -= 15
+    ensure_space(38)
+    package_header()
+    for package in context["packages"]:
+        if ensure_space(30):
+            package_header()
+        y -= 22
+        pdf.text(margin, y, package["label"], size=11)
+        pdf.text(margin + 250, y, f"{package['hours']}h", size=11)
+        pdf.text_right(PAGE_WIDTH - margin, y, package["value"], size=11, bold=True)
+        y -= 8
+        pdf.line(margin, y, PAGE_WIDTH - margin, y, color=(0.9, 0.91, 0.92))
+    
+    y -= 25
+    ensure_space(0)
+    pdf.text(margin, y, f"Valor/hora de referência: {context['hourly_rate']}", size=11, bold=True)
+    y -= 25
+    for line in wrap_text(context["notes"], 10, content_width):
+        ensure_space(0)
+        pdf.text(margin, y, line, size=10)
+        y -= 14
+    
+    return pdf.to_bytes()
+
+
+_RENDERERS = {
+    "html": _render_html,
+    "pdf": _render_pdf,
+}
+
+
+def render_document(fmt: str, context: dict) -> bytes:
+    """Ponto de entrada dos workers (precisa ser função de módulo)"""
+    return _RENDERERS[fmt](context)
+
+
+class ProposalService:
+    """
+    Geração de propostas comerciais a partir de um cálculo
+    
+    O documento é renderizado num pool de processos, fora do event loop,
+    e guardado pelo hash do conteúdo: a mesma proposta não é renderizada
+    duas vezes.
+    """
+    
+    WORKERS = int(os.getenv("PROPOSAL_WORKERS", "2"))
+    STORAGE_DIR = Path(os.getenv(
+        "PROPOSAL_STORAGE_DIR",
+        os.path.join(tempfile.gettempdir(), "freelabr-proposals")
+    ))
+    
+    _executor: Optional[ProcessPoolExecutor] = None
+    _pending: dict = {}
+    
+    @classmethod
+    def build_context(cls, input_data: ProposalInput, freelancer_name: str, issued_on: Optional[date] = None) -> dict:
+        """Dados da proposta já formatados (só tipos simples, para hash e pickle)"""
+        issued_on = issued_on or date.today()
+        result = CalculatorService.calculate(input_data.calculation)
+        client = input_data.client
+        
+        client_details = [
+            detail for detail in (client.company, client.email, client.phone) if detail
+        ]
+        packages = [
+            {
+                "label": label,
+                "hours": int(CalculatorService.PROJECT_HOURS[size]),
+                "value": format_brl(getattr(result, field)),
+            }
+            for size, label, field in PACKAGES
+        ]
+        
+        return {
+            "freelancer_name": input_data.freelancer_name or freelancer_name,
+            "client_name": client.name,
+            "client_details": client_details,
+            "project_title": input_data.project_title,
+            "project_description": input_data.project_description or "",
+            "notes": input_data.notes or "",
+            "issue_date": issued_on.strftime("%d/%m/%Y"),
+            "valid_until": (issued_on + timedelta(days=input_data.valid_days)).strftime("%d/%m/%Y"),
+            "brand_color": input_data.brand_color,
+            "hourly_rate": format_brl(result.hourly_rate),
+            "tax_regime": result.tax_regime,
+            "packages": packages,
+        }
+    
+    @classmethod
+    def content_hash(cls, context: dict, fmt: str) -> str:
+        payload = json.dumps(context, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{TEMPLATE_VERSION}:{fmt}:{payload}".encode("utf-8")).hexdigest()
+    
+    # ==================== ARMAZENAMENTO ====================
+    
+    @classmethod
+    def _path(cls, digest: str, fmt: str) -> Path:
+        return cls.STORAGE_DIR / f"{digest}.{fmt}"
+    
+    @classmethod
+    def load(cls, digest: str, fmt: str) -> Optional[bytes]:
+        path = cls._path(digest, fmt)
+        if not path.is_file():
+            return None
+        return path.read_bytes()
+    
+    @classmethod
+    def _store(cls, digest: str, fmt: str, data: bytes):
+        cls.STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+        # Grava em arquivo temporário e renomeia: leitores nunca veem arquivo pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=cls.STORAGE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, cls._path(digest, fmt))
+    
+    # ==================== RENDERIZAÇÃO ====================
+    
+    @classmethod
+    def executor(cls) -> ProcessPoolExecutor:
+        if cls._executor is None:
+            # spawn: os workers não herdam threads nem conexões do servidor
+            cls._executor = ProcessPoolExecutor(
+                max_workers=cls.WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return cls._executor
+    
+    @classmethod
+    def shutdown(cls):
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+    
+    @classmethod
+    async def render(cls, context: dict, fmt: str) -> Tuple[str, bytes, bool]:
+        """
+        Retorna (hash, documento, veio do armazenamento)
+        Pedidos simultâneos da mesma proposta compartilham a renderização
+        """
+        digest = cls.content_hash(context, fmt)
+        loop = asyncio.get_running_loop()
+        
+        stored = await loop.run_in_executor(None, cls.load, digest, fmt)
+        if stored is not None:
+            return digest, stored, True
+        
+        key = (digest, fmt)
+        pending = cls._pending.get(key)
+        if pending is None:
+            pending = loop.run_in_executor(cls.executor(), render_document, fmt, context)
+            cls._pending[key] = pending
+            try:
+                data = await asyncio.shield(pending)
+                await loop.run_in_executor(None, cls._store, digest, fmt, data)
+            finally:
+                cls._pending.pop(key, None)
+            return digest, data, False
+        
+        return digest, await asyncio.shield(pending), False
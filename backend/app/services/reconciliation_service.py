@@ -0,0 +1,237 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+
+# Duração de cada plano (igual ao processamento do webhook)
+PLAN_DAYS = {"monthly": 30, "annual": 365}
+
+
+def _parse(value) -> datetime:
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _batches(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class MercadoPagoPaymentSearch:
+    """
+    Pagamentos aprovados numa janela de tempo, via /v1/payments/search
+    
+    A primeira página traz o total; as demais são buscadas em paralelo,
+    no máximo max_concurrency por vez. A busca não pagina além de
+    MAX_OFFSET resultados: janelas maiores são divididas ao meio.
+    """
+    
+    PAGE_SIZE = 100
+    MAX_OFFSET = 10000
+    
+    def __init__(self, sdk, max_concurrency: int = 4):
+        self.sdk = sdk
+        self.max_concurrency = max_concurrency
+    
+    @staticmethod
+    def _format(moment: datetime) -> str:
+        return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000-00:00")
+    
+    def _page(self, begin: datetime, end: datetime, offset: int) -> dict:
+        result = self.sdk.payment().search(filters={
+            "status": "approved",
+            "range": "date_approved",
+            "begin_date": self._format(begin),
+            "end_date": self._format(end),
+            "sort": "date_approved",
+            "criteria": "asc",
+            "offset": offset,
+            "limit": self.PAGE_SIZE,
+        })
+        if result.get("status") != 200:
+            raise RuntimeError(f"Busca de pagamentos falhou ({result.get('status')}): {result.get('response')}")
+        return result["response"]
+    
+    def fetch(self, begin: datetime, end: datetime) -> List[dict]:
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return self._fetch_window(pool, begin, end)
+    
+    def _fetch_window(self, pool: ThreadPoolExecutor, begin: datetime, end: datetime) -> List[dict]:
+        first = self._page(begin, end, 0)
+        total = first["paging"]["total"]
+        if total > self.MAX_OFFSET and end - begin > timedelta(seconds=2):
+            middle = begin + (end - begin) / 2
+            return self._fetch_window(pool, begin, middle) + self._fetch_window(pool, middle, end)
+        
+        results = list(first["results"])
+        offsets = range(self.PAGE_SIZE, min(total, self.MAX_OFFSET), self.PAGE_SIZE)
+        for page in pool.map(lambda offset: self._page(begin, end, offset), offsets):
+            results.extend(page["results"])
+        return results
+
+
+class SupabaseSubscriptionStore:
+    """
+    Tabelas subscriptions, payments e users, lidas e gravadas em lote
+    
+    mercadopago_payment_id é único em subscriptions e payments
+    (sql/mercadopago_payments.sql): linha que o webhook gravou no meio
+    tempo é ignorada (ON CONFLICT DO NOTHING) e conta como já processada.
+    """
+    
+    BATCH_SIZE = 100
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def _in(self, table: str, columns: str, field: str, values: List[str]) -> List[dict]:
+        rows = []
+        for batch in _batches(values, self.BATCH_SIZE):
+            rows.extend(self.client.table(table).select(columns).in_(field, batch).execute().data)
+        return rows
+    
+    def subscriptions_for(self, payment_ids: List[str]) -> List[dict]:
+        return self._in("subscriptions", "mercadopago_payment_id", "mercadopago_payment_id", payment_ids)
+    
+    def payments_for(self, payment_ids: List[str]) -> List[dict]:
+        return self._in("payments", "mercadopago_payment_id", "mercadopago_payment_id", payment_ids)
+    
+    def users(self, user_ids: List[str]) -> List[dict]:
+        return self._in("users", "id, subscription_end_date", "id", user_ids)
+    
+    def _insert_new(self, table: str, rows: List[dict]) -> List[dict]:
+        """Grava em lote e devolve só as linhas que não existiam"""
+        inserted = []
+        for batch in _batches(rows, self.BATCH_SIZE):
+            inserted.extend(self.client.table(table).upsert(
+                batch, on_conflict="mercadopago_payment_id", ignore_duplicates=True
+            ).execute().data)
+        return inserted
+    
+    def insert_subscriptions(self, rows: List[dict]) -> List[dict]:
+        return self._insert_new("subscriptions", rows)
+    
+    def insert_payments(self, rows: List[dict]) -> List[dict]:
+        return self._insert_new("payments", rows)
+    
+    def activate_user(self, user_id: str, fields: dict):
+        self.client.table("users").update(fields).eq("id", user_id).execute()
+
+
+class ReconciliationService:
+    """
+    Reconciliação dos pagamentos do Mercado Pago com o banco
+    
+    Recupera ativações cujo webhook se perdeu: busca os pagamentos
+    aprovados da janela, cruza numa passada só com subscriptions e
+    payments (hash join por mercadopago_payment_id) e grava o que falta
+    em lote. Os últimos GRACE_MINUTES ficam de fora para não disputar
+    com webhooks ainda na fila.
+    """
+    
+    WINDOW_HOURS = int(os.getenv("MERCADOPAGO_RECONCILE_WINDOW_HOURS", "72"))
+    GRACE_MINUTES = 10
+    
+    @staticmethod
+    def parse_reference(payment: dict) -> Optional[Tuple[str, str]]:
+        """external_reference "user_id|plano" -> (user_id, plano)"""
+        user_id, _, plan_type = (payment.get("external_reference") or "").partition("|")
+        if not user_id or plan_type not in PLAN_DAYS:
+            return None
+        return user_id, plan_type
+    
+    @classmethod
+    def diff(cls, remote: List[dict], subscriptions: List[dict], payments: List[dict],
+             users: List[dict], now: datetime) -> dict:
+        """O que falta gravar para cada pagamento aprovado (sem consultas)"""
+        subscribed = {str(row["mercadopago_payment_id"]) for row in subscriptions}
+        recorded = {str(row["mercadopago_payment_id"]) for row in payments}
+        current_end = {
+            user["id"]: _parse(user["subscription_end_date"]) if user.get("subscription_end_date") else None
+            for user in users
+        }
+        
+        plan = {"subscriptions": [], "payments": [], "users": {}, "activations": {}}
+        seen = set()
+        for payment in remote:
+            payment_id = str(payment["id"])
+            reference = cls.parse_reference(payment)
+            if payment_id in seen or payment.get("status") != "approved" or reference is None:
+                continue
+            seen.add(payment_id)
+            user_id, plan_type = reference
+            approved_at = _parse(payment.get("date_approved") or payment["date_created"])
+            
+            if payment_id not in subscribed:
+                end_date = approved_at + timedelta(days=PLAN_DAYS[plan_type])
+                plan["subscriptions"].append({
+                    "user_id": user_id,
+                    "plan_type": plan_type,
+                    "plan_price": payment["transaction_amount"],
+                    "status": "active" if end_date > now else "expired",
+                    "start_date": approved_at.isoformat(),
+                    "end_date": end_date.isoformat(),
+                    "mercadopago_payment_id": payment_id,
+                })
+                # Só estende o PRO: uma assinatura mais longa já gravada prevalece
+                best = plan["users"].get(user_id)
+                best_end = _parse(best["subscription_end_date"]) if best else current_end.get(user_id)
+                if end_date > now and (best_end is None or end_date > best_end):
+                    plan["users"][user_id] = {
+                        "is_pro": True,
+                        "subscription_status": "active",
+                        "subscription_plan": plan_type,
+                        "subscription_start_date": approved_at.isoformat(),
+                        "subscription_end_date": end_date.isoformat(),
+                        "mercadopago_customer_id": (payment.get("payer") or {}).get("id"),
+                    }
+                    plan["activations"][user_id] = {"payment_id": payment_id, "plan": plan_type}
+            
+            if payment_id not in recorded:
+                plan["payments"].append({
+                    "user_id": user_id,
+                    "subscription_id": None,
+                    "amount": payment["transaction_amount"],
+                    "status": "approved",
+                    "payment_method": payment.get("payment_method_id"),
+                    "mercadopago_payment_id": payment_id,
+                    "mercadopago_status": payment["status"],
+                    "mercadopago_status_detail": payment.get("status_detail"),
+                    "paid_at": approved_at.isoformat(),
+                })
+        return plan
+    
+    @classmethod
+    def run(cls, search: MercadoPagoPaymentSearch, store, now: Optional[datetime] = None,
+            window_hours: Optional[int] = None) -> dict:
+        now = now or datetime.now(timezone.utc)
+        end = now - timedelta(minutes=cls.GRACE_MINUTES)
+        begin = end - timedelta(hours=window_hours or cls.WINDOW_HOURS)
+        remote = search.fetch(begin, end)
+        
+        references = {str(payment["id"]): cls.parse_reference(payment) for payment in remote}
+        payment_ids = [payment_id for payment_id, reference in references.items() if reference]
+        user_ids = sorted({reference[0] for reference in references.values() if reference})
+        
+        plan = cls.diff(
+            remote,
+            store.subscriptions_for(payment_ids),
+            store.payments_for(payment_ids),
+            store.users(user_ids),
+            now,
+        )
+        # A assinatura marca o pagamento como processado: vai por último,
+        # para uma falha no meio ser refeita na próxima execução
+        for user_id, fields in plan["users"].items():
+            store.activate_user(user_id, fields)
+        payments = store.insert_payments(plan["payments"])
+        subscriptions = store.insert_subscriptions(plan["subscriptions"])
+        
+        return {
+            "fetched": len(remote),
+            # Conflito na chave única: o webhook gravou antes, já processado
+            "subscriptions_created": len(subscriptions),
+            "payments_created": len(payments),
+            "activated_user_ids": list(plan["users"]),
+            "activations": [{"user_id": user_id, **activation} for user_id, activation in plan["activations"].items()],
+        }
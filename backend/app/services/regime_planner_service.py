@@ -0,0 +1,165 @@
+import time
+import numpy as np
+from app.models import RegimePlanInput
+from app.services.calculator_service import CalculatorService
+from app.services.projection_service import ProjectionService
+from app.services.tax_arrays import monthly_taxes
+
+REGIMES = ["MEI", "PJ_SIMPLES", "PJ_PRESUMIDO", "AUTONOMO"]
+
+
+class RegimePlannerService:
+    """
+    Planejador da sequência de regimes tributários de menor custo
+    Programação dinâmica sobre meses × regimes, com trocas de regime da
+    empresa apenas na janela anual e MEI limitado ao teto de faturamento
+    """
+    
+    @classmethod
+    def plan(cls, input_data: RegimePlanInput) -> dict:
+        started = time.perf_counter()
+        
+        scenario = input_data.scenario
+        revenue = ProjectionService.revenue_series(scenario, input_data.months)
+        history = ProjectionService.history_window(scenario)
+        
+        costs = cls.monthly_costs(
+            revenue, history, len(scenario.previous_revenues), input_data.start_month
+        )
+        
+        regimes = [regime for regime in REGIMES if regime in input_data.allowed_regimes]
+        columns = [REGIMES.index(regime) for regime in regimes]
+        costs = costs[:, columns]
+        
+        switch_allowed = cls._switch_windows(input_data.months, input_data.start_month, input_data.switch_month)
+        if input_data.initial_regime is not None and input_data.initial_regime not in regimes:
+            raise ValueError("Regime inicial precisa estar entre os regimes permitidos")
+        initial = regimes.index(input_data.initial_regime) if input_data.initial_regime is not None else None
+        
+        path, total = cls.solve(
+            costs, switch_allowed, regimes, float(input_data.switch_cost), initial
+        )
+        
+        static_totals = {
+            regime: (round(float(costs[:, index].sum()), 2) if np.isfinite(costs[:, index]).all() else None)
+            for index, regime in enumerate(regimes)
+        }
+        feasible_static = {regime: value for regime, value in static_totals.items() if value is not None}
+        best_static = min(feasible_static, key=feasible_static.get) if feasible_static else None
+        
+        monthly_regimes = [regimes[index] for index in path] if path is not None else []
+        monthly_tax = [round(float(costs[month, index]), 2) for month, index in enumerate(path)] if path is not None else []
+        
+        return {
+            "months": input_data.months,
+            "start_month": input_data.start_month,
+            "tax_table_version": CalculatorService.TAX_TABLE_VERSION,
+            "feasible": path is not None,
+            "plan": cls._segments(monthly_regimes, monthly_tax),
+            "monthly_regimes": monthly_regimes,
+            "monthly_taxes": monthly_tax,
+            "total_cost": round(total, 2) if path is not None else None,
+            "static_regimes": static_totals,
+            "best_static_regime": best_static,
+            "savings_vs_best_static": (
+                round(feasible_static[best_static] - total, 2)
+                if best_static is not None and path is not None else None
+            ),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+    
+    @staticmethod
+    def monthly_costs(revenue: np.ndarray, history: np.ndarray, history_months: int, start_month: int) -> np.ndarray:
+        """
+        Custo tributário de cada regime em cada mês (matriz meses × REGIMES)
+        Calculado numa única passada vetorizada; MEI fica com custo infinito
+        nos anos-calendário em que o faturamento passa do teto
+        """
+        projection = ProjectionService.project_matrix(
+            revenue[None, :], history[None, :], np.array([history_months]), start_month
+        )
+        
+        months = len(revenue)
+        costs = np.empty((months, len(REGIMES)))
+        costs[:, 0] = monthly_taxes(revenue, "MEI")
+        costs[:, 1] = projection["simples_tax"][0]
+        costs[:, 2] = monthly_taxes(revenue, "PJ_PRESUMIDO")
+        costs[:, 3] = monthly_taxes(revenue, "AUTONOMO")
+        
+        # Faturamento total de cada ano-calendário dentro do horizonte
+        year = (start_month - 1 + np.arange(months)) // 12
+        year_totals = np.zeros(year[-1] + 1)
+        np.maximum.at(year_totals, year, projection["mei_year_to_date"][0])
+        over_limit = year_totals[year] > float(CalculatorService.MEI_ANNUAL_LIMIT)
+        costs[over_limit, 0] = np.inf
+        
+        return costs
+    
+    @staticmethod
+    def _switch_windows(months: int, start_month: int, switch_month: int) -> np.ndarray:
+        """Meses (índice) em que a empresa pode mudar de regime"""
+        calendar_month = (start_month - 1 + np.arange(months)) % 12 + 1
+        return calendar_month == switch_month
+    
+    @staticmethod
+    def solve(costs: np.ndarray, switch_allowed: np.ndarray, regimes: list, switch_cost: float = 0.0, initial=None):
+        """
+        Programação dinâmica: best[t, r] = custo[t, r] + min_p(best[t-1, p] + troca(p, r))
+        
+        Trocas entre regimes de empresa só na janela anual; quem está como
+        Autônomo pode abrir empresa em qualquer mês. Retorna (índices dos
+        regimes por mês, custo total) ou (None, inf) se não houver plano viável.
+        """
+        months, count = costs.shape
+        autonomo = regimes.index("AUTONOMO") if "AUTONOMO" in regimes else None
+        
+        # Matrizes de transição (anterior × próximo): fora e dentro da janela
+        stay = np.where(np.eye(count, dtype=bool), 0.0, np.inf)
+        if autonomo is not None:
+            stay[autonomo, :] = switch_cost
+            stay[autonomo, autonomo] = 0.0
+        window = np.full((count, count), switch_cost)
+        np.fill_diagonal(window, 0.0)
+        
+        best = costs[0].copy()
+        if initial is not None:
+            start = window[initial] if switch_allowed[0] else stay[initial]
+            best = best + start
+        
+        choice = np.zeros((months, count), dtype=np.int64)
+        for month in range(1, months):
+            transition = window if switch_allowed[month] else stay
+            candidates = best[:, None] + transition
+            choice[month] = candidates.argmin(axis=0)
+            best = candidates[choice[month], np.arange(count)] + costs[month]
+        
+        last = int(best.argmin())
+        total = float(best[last])
+        if not np.isfinite(total):
+            return None, float("inf")
+        
+        path = [last]
+        for month in range(months - 1, 0, -1):
+            path.append(int(choice[month, path[-1]]))
+        path.reverse()
+        return path, total
+    
+    @staticmethod
+    def _segments(monthly_regimes: list, monthly_tax: list) -> list:
+        """Agrupa meses consecutivos no mesmo regime"""
+        segments = []
+        for month, regime in enumerate(monthly_regimes, start=1):
+            if segments and segments[-1]["regime"] == regime:
+                segment = segments[-1]
+                segment["end_month"] = month
+                segment["months"] += 1
+                segment["tax"] = round(segment["tax"] + monthly_tax[month - 1], 2)
+            else:
+                segments.append({
+                    "regime": regime,
+                    "start_month": month,
+                    "end_month": month,
+                    "months": 1,
+                    "tax": monthly_tax[month - 1],
+                })
+        return segments
@@ -0,0 +1,457 @@
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Set
+from app.services.export_service import ExportService
+
+# Campos indexados por tipo de registro, com o peso de cada um no ranking
+SEARCH_FIELDS = {
+    "clients": {"name": 3.0, "company": 2.0, "notes": 1.0},
+    "projects": {"title": 3.0, "description": 1.0},
+}
+
+# Campos exibidos no resultado (título, subtítulo)
+DISPLAY_FIELDS = {
+    "clients": ("name", "company"),
+    "projects": ("title", "status"),
+}
+
+# Campos em ordem de peso (resultados no campo mais importante vêm antes)
+FIELDS_BY_WEIGHT = [
+    field for field, _ in sorted(
+        ((field, weight) for fields in SEARCH_FIELDS.values() for field, weight in fields.items()),
+        key=lambda item: -item[1]
+    )
+]
+
+# Fração mínima dos trigramas da busca que o registro precisa ter
+MIN_COVERAGE = 0.5
+# Candidatos avaliados em detalhe (os de maior cobertura), por resultado pedido
+CANDIDATES_PER_RESULT = 3
+MIN_CANDIDATES = 60
+
+Loader = Callable[[str], Iterable[tuple]]
+
+
+_COMBINING = re.compile("[\u0300-\u036f]")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Minúsculas e sem acentos ("São João" -> "sao joao")"""
+    if not text:
+        return ""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return _COMBINING.sub("", unicodedata.normalize("NFKD", text))
+
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text)
+
+
+def trigrams(text: str, partial_last: bool = False) -> Set[str]:
+    """
+    Trigramas no estilo do pg_trgm (duas posições de espaço antes e uma
+    depois de cada palavra). Com partial_last, a última palavra é tratada
+    como prefixo (busca enquanto digita) e não ganha o espaço final.
+    """
+    words = _words(text)
+    if not words:
+        return set()
+    grams = set().union(*map(_word_grams, words[:-1] if partial_last else words))
+    if partial_last:
+        grams |= _word_grams(words[-1], prefix=True)
+    return grams
+
+
+@lru_cache(maxsize=65536)
+def _word_grams(word: str, prefix: bool = False) -> frozenset:
+    # O vocabulário se repete muito entre registros, então o cache poupa a maior parte do trabalho
+    padded = "  " + word if prefix else "  " + word + " "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _slots(bits: int, limit: int) -> List[int]:
+    """Posições dos bits ligados (até `limit`), da menor para a maior"""
+    digits = bin(bits)[:1:-1]
+    slots = []
+    position = digits.find("1")
+    while position != -1 and len(slots) < limit:
+        slots.append(position)
+        position = digits.find("1", position + 1)
+    return slots
+
+
+class UserSearchIndex:
+    """
+    Índice invertido de trigramas dos clientes e projetos de um usuário
+    
+    Cada registro ocupa uma posição (slot) e cada posting é um inteiro
+    usado como bitset, então "tem todos os trigramas" é um AND de inteiros,
+    feito em C mesmo com dezenas de milhares de registros.
+    """
+    
+    def __init__(self):
+        # trigrama -> bitset (qualquer campo) e campo -> trigrama -> bitset
+        self.postings: Dict[str, int] = {}
+        self.field_postings: Dict[str, Dict[str, int]] = {
+            field: {} for fields in SEARCH_FIELDS.values() for field in fields
+        }
+        self.kind_bits: Dict[str, int] = {kind: 0 for kind in SEARCH_FIELDS}
+        self.documents: List[Optional[dict]] = []
+        self.slot_of: Dict[str, int] = {}
+        self.free_slots: List[int] = []
+        self.lock = threading.Lock()
+        # sync_heads.seq do usuário já refletido no índice
+        self.seq = 0
+    
+    def __len__(self) -> int:
+        return len(self.slot_of)
+    
+    @staticmethod
+    def _document(kind: str, row: dict) -> dict:
+        # Só o texto normalizado fica guardado; os trigramas vivem nos bitsets
+        title_field, subtitle_field = DISPLAY_FIELDS[kind]
+        return {
+            "key": f"{kind}:{row['id']}",
+            "kind": kind,
+            "id": row["id"],
+            "title": row.get(title_field),
+            "subtitle": row.get(subtitle_field),
+            "fields": {field: normalize(row.get(field)) for field in SEARCH_FIELDS[kind]},
+        }
+    
+    def load(self, rows: Iterable[tuple]):
+        """Carga inicial: monta cada bitset uma vez só (bem mais rápido que upserts)"""
+        slot_lists: Dict[tuple, List[int]] = {}
+        with self.lock:
+            for kind, row in rows:
+                document = self._document(kind, row)
+                if document["key"] in self.slot_of:
+                    continue
+                slot = len(self.documents)
+                self.documents.append(document)
+                self.slot_of[document["key"]] = slot
+                slot_lists.setdefault(("kind", kind), []).append(slot)
+                for field, value in document["fields"].items():
+                    for gram in trigrams(value):
+                        slot_lists.setdefault((field, gram), []).append(slot)
+            
+            size = len(self.documents) // 8 + 1
+            for (field, gram), slots in slot_lists.items():
+                buffer = bytearray(size)
+                for slot in slots:
+                    buffer[slot >> 3] |= 1 << (slot & 7)
+                bits = int.from_bytes(buffer, "little")
+                if field == "kind":
+                    self.kind_bits[gram] |= bits
+                    continue
+                self.field_postings[field][gram] = self.field_postings[field].get(gram, 0) | bits
+                self.postings[gram] = self.postings.get(gram, 0) | bits
+    
+    def upsert(self, kind: str, row: dict):
+        document = self._document(kind, row)
+        with self.lock:
+            self._remove(document["key"])
+            slot = self.free_slots.pop() if self.free_slots else len(self.documents)
+            if slot == len(self.documents):
+                self.documents.append(None)
+            self.documents[slot] = document
+            self.slot_of[document["key"]] = slot
+            
+            bit = 1 << slot
+            self.kind_bits[kind] |= bit
+            for field, value in document["fields"].items():
+                postings = self.field_postings[field]
+                for gram in trigrams(value):
+                    postings[gram] = postings.get(gram, 0) | bit
+                    self.postings[gram] = self.postings.get(gram, 0) | bit
+    
+    def remove(self, kind: str, row_id: str):
+        with self.lock:
+            self._remove(f"{kind}:{row_id}")
+    
+    def _remove(self, key: str):
+        slot = self.slot_of.pop(key, None)
+        if slot is None:
+            return
+        document = self.documents[slot]
+        mask = ~(1 << slot)
+        self.kind_bits[document["kind"]] &= mask
+        for field, value in document["fields"].items():
+            postings = self.field_postings[field]
+            for gram in trigrams(value):
+                postings[gram] &= mask
+                self.postings[gram] &= mask
+        self.documents[slot] = None
+        self.free_slots.append(slot)
+    
+    def search(self, query: str, limit: int = 20, kind: Optional[str] = None) -> List[dict]:
+        normalized = normalize(query)
+        query_grams = trigrams(normalized, partial_last=not normalized.endswith(" "))
+        if not query_grams:
+            return []
+        
+        pool = max(MIN_CANDIDATES, limit * CANDIDATES_PER_RESULT)
+        
+        with self.lock:
+            mask = self.kind_bits[kind] if kind else -1
+            candidates = self._exact_candidates(query_grams, mask, pool)
+            if len(candidates) < pool:
+                candidates.extend(self._fuzzy_candidates(query_grams, mask, pool - len(candidates), candidates))
+            documents = [(self.documents[slot], count) for slot, count in candidates]
+        
+        phrase = normalized.strip()
+        query_words = _words(phrase)
+        results = []
+        for document, count in documents:
+            score, matched = self._rank(document, phrase, query_words, count / len(query_grams))
+            results.append({
+                "kind": document["kind"],
+                "id": document["id"],
+                "title": document["title"],
+                "subtitle": document["subtitle"],
+                "matched_field": matched,
+                "score": round(score, 4),
+            })
+        
+        results.sort(key=lambda result: (-result["score"], result["title"] or ""))
+        return results[:limit]
+    
+    def _exact_candidates(self, query_grams: Set[str], mask: int, pool: int) -> List[tuple]:
+        """
+        Registros com todos os trigramas da busca
+        Primeiro os que os têm no campo de maior peso (nome/título)
+        """
+        matching = mask
+        for gram in query_grams:
+            matching &= self.postings.get(gram, 0)
+            if not matching:
+                return []
+        
+        candidates, taken = [], 0
+        for field in FIELDS_BY_WEIGHT:
+            in_field = matching & ~taken
+            postings = self.field_postings[field]
+            for gram in query_grams:
+                in_field &= postings.get(gram, 0)
+                if not in_field:
+                    break
+            if in_field:
+                slots = _slots(in_field, pool - len(candidates))
+                candidates.extend((slot, len(query_grams)) for slot in slots)
+                taken |= sum(1 << slot for slot in slots)
+            if len(candidates) >= pool:
+                return candidates
+        
+        # Trigramas espalhados entre campos diferentes
+        rest = _slots(matching & ~taken, pool - len(candidates))
+        candidates.extend((slot, len(query_grams)) for slot in rest)
+        return candidates
+    
+    def _fuzzy_candidates(self, query_grams: Set[str], mask: int, wanted: int, exclude: List[tuple]) -> List[tuple]:
+        """
+        Registros com parte dos trigramas (erros de digitação)
+        A contagem de trigramas de todos os registros é somada de uma vez
+        em "planos" de bits (planes[i] é o bit i da contagem), então achar
+        quem tem exatamente k trigramas também é só AND de inteiros.
+        """
+        planes: List[int] = []
+        for gram in query_grams:
+            carry = self.postings.get(gram, 0)
+            for i, plane in enumerate(planes):
+                planes[i], carry = plane ^ carry, plane & carry
+                if not carry:
+                    break
+            if carry:
+                planes.append(carry)
+        
+        available = mask
+        for slot, _ in exclude:
+            available &= ~(1 << slot)
+        
+        candidates = []
+        needed = max(1, math.ceil(MIN_COVERAGE * len(query_grams)))
+        for count in range(len(query_grams), needed - 1, -1):
+            if count >> len(planes):
+                continue
+            matching = available
+            for i, plane in enumerate(planes):
+                matching &= plane if count >> i & 1 else ~plane
+            if matching:
+                slots = _slots(matching, wanted - len(candidates))
+                candidates.extend((slot, count) for slot in slots)
+                if len(candidates) >= wanted:
+                    break
+        return candidates
+    
+    @staticmethod
+    def _rank(document: dict, phrase: str, query_words: List[str], coverage: float) -> tuple:
+        """Cobertura de trigramas + bônus pelo melhor campo (trecho exato, início de palavra)"""
+        best_bonus, matched = 0.0, None
+        for field, value in document["fields"].items():
+            if not value:
+                continue
+            weight = SEARCH_FIELDS[document["kind"]][field]
+            bonus = 0.0
+            if phrase in value:
+                bonus = 1.0
+                if value.startswith(phrase) or f" {phrase}" in value:
+                    bonus = 1.5
+            else:
+                words = _words(value)
+                hits = sum(any(word.startswith(query_word) for word in words) for query_word in query_words)
+                bonus = 0.75 * hits / len(query_words) if query_words else 0.0
+            bonus *= weight / 3.0
+            if bonus > best_bonus:
+                best_bonus, matched = bonus, field
+        
+        if matched is None:
+            matched = max(
+                document["fields"],
+                key=lambda field: len(trigrams(document["fields"][field]) & trigrams(phrase))
+            )
+        return coverage + best_bonus, matched
+
+
+class SearchService:
+    """
+    Busca (enquanto digita) em clientes e projetos
+    
+    Cada usuário tem um índice em memória, montado na primeira busca e
+    descartado por LRU quando há índices demais no processo. Com o
+    change log (store), cada busca compara o sync_heads.seq do usuário com
+    o seq do índice: se outro worker escreveu, só as linhas do change_log
+    depois dele são aplicadas (upsert/remove); se o log já foi compactado,
+    o índice é montado de novo.
+    """
+    
+    MAX_INDEXES = int(os.getenv("SEARCH_MAX_INDEXES", "200"))
+    # Entradas do change_log lidas por vez ao atualizar o índice
+    CHANGES_PAGE = 1000
+    
+    _indexes: "OrderedDict[str, UserSearchIndex]" = OrderedDict()
+    _lock = threading.Lock()
+    _build_locks: Dict[str, threading.Lock] = {}
+    
+    @classmethod
+    def supabase_loader(cls, client) -> Loader:
+        """Lê todos os clientes e projetos do usuário, página por página (keyset)"""
+        def load(user_id: str):
+            fetch_page = ExportService.supabase_fetcher(client, user_id)
+            for kind in SEARCH_FIELDS:
+                columns = sorted({"id", "created_at", *SEARCH_FIELDS[kind], *DISPLAY_FIELDS[kind]})
+                cursor = None
+                while True:
+                    page = fetch_page(kind, ",".join(columns), cursor, 1000)
+                    for row in page:
+                        yield kind, row
+                    if len(page) < 1000:
+                        break
+                    cursor = (page[-1]["created_at"], page[-1]["id"])
+        
+        return load
+    
+    @classmethod
+    def index_for(cls, user_id: str, loader: Loader, store=None) -> UserSearchIndex:
+        with cls._lock:
+            index = cls._indexes.get(user_id)
+            if index is not None:
+                cls._indexes.move_to_end(user_id)
+            build_lock = cls._build_locks.setdefault(user_id, threading.Lock())
+        
+        # Cursor barato: uma linha de sync_heads por busca
+        head = store.head(user_id) if store is not None else None
+        if index is not None and (head is None or index.seq == head[0]):
+            return index
+        
+        # Um único build (ou atualização) por usuário, sem travar as buscas dos demais
+        with build_lock:
+            with cls._lock:
+                index = cls._indexes.get(user_id)
+            if index is not None and (head is None or cls._catch_up(index, store, user_id, *head)):
+                return index
+            
+            index = UserSearchIndex()
+            # seq lido antes das linhas: o que mudar no meio é reaplicado depois
+            index.seq = head[0] if head else 0
+            index.load(loader(user_id))
+            with cls._lock:
+                cls._indexes[user_id] = index
+                while len(cls._indexes) > cls.MAX_INDEXES:
+                    evicted, _ = cls._indexes.popitem(last=False)
+                    cls._build_locks.pop(evicted, None)
+        return index
+    
+    @classmethod
+    def _catch_up(cls, index: UserSearchIndex, store, user_id: str, seq: int, compacted_seq: int) -> bool:
+        """Aplica o change_log depois de index.seq; False se for preciso remontar"""
+        if index.seq > seq or index.seq < compacted_seq:
+            return False
+        while index.seq < seq:
+            entries = store.changes(user_id, index.seq, cls.CHANGES_PAGE)
+            if not entries:
+                break
+            upserts: Dict[str, List[str]] = {}
+            for entry in entries:
+                if entry["entity"] not in SEARCH_FIELDS:
+                    continue
+                if entry["deleted"]:
+                    index.remove(entry["entity"], entry["row_id"])
+                else:
+                    upserts.setdefault(entry["entity"], []).append(entry["row_id"])
+            for kind, ids in upserts.items():
+                rows = {row["id"]: row for row in store.rows(user_id, kind, ids)}
+                for row_id in ids:
+                    # Linha apagada depois da leitura do log: o tombstone vem depois
+                    if row_id in rows:
+                        index.upsert(kind, rows[row_id])
+            index.seq = entries[-1]["seq"]
+            if len(entries) < cls.CHANGES_PAGE:
+                break
+        return True
+    
+    @classmethod
+    def search(cls, user_id: str, query: str, loader: Loader, limit: int = 20, kind: Optional[str] = None,
+               store=None) -> dict:
+        started = time.perf_counter()
+        index = cls.index_for(user_id, loader, store)
+        results = index.search(query, limit=limit, kind=kind)
+        return {
+            "query": query,
+            "results": results,
+            "indexed": len(index),
+            "took_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+    
+    # ==================== ATUALIZAÇÃO NAS ESCRITAS ====================
+    
+    @classmethod
+    def upsert(cls, user_id: str, kind: str, row: dict):
+        """Atualiza o índice se ele estiver carregado (senão será montado depois)"""
+        with cls._lock:
+            index = cls._indexes.get(user_id)
+        if index is not None:
+            index.upsert(kind, row)
+    
+    @classmethod
+    def remove(cls, user_id: str, kind: str, row_id: str):
+        with cls._lock:
+            index = cls._indexes.get(user_id)
+        if index is not None:
+            index.remove(kind, row_id)
+    
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._indexes.clear()
+            cls._build_locks.clear()
@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Colunas do perfil e da assinatura, lidas junto com as contagens
+PROFILE_FIELDS = ("id", "email", "full_name", "created_at")
+SUBSCRIPTION_FIELDS = ("is_pro", "subscription_status", "subscription_plan", "subscription_end_date")
+
+# Contagens embutidas no mesmo SELECT (alias: tabela relacionada)
+COUNTS = {
+    "clients": "clients",
+    "projects": "projects",
+    "calculations": "calculations",
+    "pending_payments": "payments",
+    "overdue_payments": "payments",
+}
+COUNT_FILTERS = {"pending_payments.status": "PENDING", "overdue_payments.status": "OVERDUE"}
+
+
+class RequestCoalescer:
+    """
+    Chamadas simultâneas com a mesma chave compartilham uma execução
+    
+    A primeira chamada executa; as que chegam enquanto ela roda esperam
+    o mesmo resultado (ou a mesma exceção). Nada fica guardado depois.
+    """
+    
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.counters = {"executed": 0, "coalesced": 0}
+    
+    async def run(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(pending)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.counters["executed"] += 1
+        try:
+            result = await func()
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita o aviso de exceção não lida quando ninguém mais esperava
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+
+class SessionService:
+    """Dados do carregamento de página (perfil, assinatura e contagens)"""
+    
+    @staticmethod
+    def select_columns() -> str:
+        embedded = [
+            f"{alias}:{table}(count)" if alias != table else f"{table}(count)"
+            for alias, table in COUNTS.items()
+        ]
+        return ", ".join(PROFILE_FIELDS + SUBSCRIPTION_FIELDS + tuple(embedded))
+    
+    @staticmethod
+    def subscription_state(user_data: dict, cache_ttl: float) -> Tuple[dict, float, bool]:
+        """
+        (status da assinatura, TTL do cache, expirou agora e precisa ser
+        rebaixado no banco)
+        """
+        is_expired = False
+        newly_expired = False
+        end_value = user_data.get("subscription_end_date")
+        if end_value:
+            end_date = datetime.fromisoformat(end_value.replace("Z", "+00:00"))
+            now = datetime.now(end_date.tzinfo)
+            is_expired = end_date < now
+            if not is_expired:
+                # O cache não pode atravessar a data de expiração
+                cache_ttl = min(cache_ttl, (end_date - now).total_seconds())
+            elif user_data.get("is_pro"):
+                newly_expired = True
+        
+        is_pro = bool(user_data.get("is_pro")) and not is_expired
+        state = {
+            "is_pro": is_pro,
+            "status": "expired" if newly_expired else user_data.get("subscription_status") or "free",
+            "plan": user_data.get("subscription_plan"),
+            "end_date": end_value,
+            "is_expired": is_expired,
+        }
+        return state, cache_ttl, newly_expired
+    
+    @staticmethod
+    def counts(row: dict) -> Dict[str, int]:
+        # PostgREST devolve cada contagem embutida como [{"count": n}]
+        return {alias: (row.get(alias) or [{"count": 0}])[0]["count"] for alias in COUNTS}
+    
+    @classmethod
+    def bootstrap(cls, row: dict, cache_ttl: float) -> Tuple[dict, float, bool]:
+        subscription, ttl, newly_expired = cls.subscription_state(row, cache_ttl)
+        return {
+            "user": {field: row.get(field) for field in PROFILE_FIELDS},
+            "subscription": subscription,
+            "counts": cls.counts(row),
+        }, ttl, newly_expired
+    
+    @classmethod
+    def fetch(cls, client, user_id: str) -> Optional[dict]:
+        """Perfil, assinatura e contagens numa consulta só"""
+        query = client.table("users").select(cls.select_columns()).eq("id", user_id)
+        for column, value in COUNT_FILTERS.items():
+            query = query.eq(column, value)
+        rows = query.execute().data
+        return rows[0] if rows else None
@@ -0,0 +1,303 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+# Cabeçalho do arquivo: identificador, versão do layout, número de slots, tamanhos
+_HEADER = struct.Struct("<8sIIII")
+_HEADER_SIZE = 64
+_MAGIC = b"FLBRCACH"
+_LAYOUT_VERSION = 1
+
+# Cabeçalho de cada slot: estado, tipo, tamanho da chave, tamanho do valor,
+# hash da chave, expiração e último acesso (epoch)
+_SLOT = struct.Struct("<BBHIQdd")
+
+_EMPTY, _USED, _DELETED = 0, 1, 2
+_KIND_JSON, _KIND_COUNTER = 0, 1
+_COUNTER = struct.Struct("<q")
+
+# Quantos slots são examinados a partir da posição da chave
+_PROBE_LIMIT = 16
+
+
+class SharedCache:
+    """
+    Cache compartilhado entre os workers do mesmo host
+    
+    Tabela hash de slots de tamanho fixo num arquivo mapeado em memória
+    (em /dev/shm quando disponível). Cada operação roda sob flock exclusivo,
+    então escritas, invalidações e contadores são atômicos entre processos.
+    Entradas têm TTL; quando a região de sondagem da chave está cheia, a
+    entrada acessada há mais tempo é descartada.
+    """
+    
+    def __init__(self, path: str, slots: int = 4096, key_size: int = 128, value_size: int = 1024):
+        self.path = path
+        self.slots = slots
+        self.key_size = key_size
+        self.value_size = value_size
+        self.slot_size = _SLOT.size + key_size + value_size
+        self.size = _HEADER_SIZE + slots * self.slot_size
+        self._header = _HEADER.pack(_MAGIC, _LAYOUT_VERSION, slots, key_size, value_size)
+        
+        self._lock = threading.RLock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        
+        # Estatísticas do processo
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @classmethod
+    def from_env(cls) -> "SharedCache":
+        default_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        path = os.getenv("SHARED_CACHE_PATH", os.path.join(default_dir, "freelabr-cache"))
+        slots = int(os.getenv("SHARED_CACHE_SLOTS", "4096"))
+        return cls(path, slots=slots)
+    
+    # ==================== ARQUIVO E TRAVAS ====================
+    
+    def _open(self):
+        """Abre (ou cria) o arquivo; reabre após fork"""
+        if self._pid == os.getpid() and self._map is not None:
+            return
+        
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            # O arquivo nunca encolhe: outro worker pode tê-lo mapeado
+            # maior, e ler além do fim do arquivo mata o processo (SIGBUS)
+            if os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            self._fd = fd
+            self._map = mmap.mmap(fd, self.size)
+            self._pid = os.getpid()
+            self._check_layout()
+        finally:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    
+    def _check_layout(self):
+        """
+        Arquivo novo ou gravado com outra configuração: zera os slots e
+        grava o cabeçalho, no lugar e sob o flock. Checado a cada operação,
+        então nenhum processo lê slots no layout de outro.
+        """
+        if self._map[:_HEADER.size] == self._header:
+            return
+        chunk = bytes(1 << 20)
+        for start in range(_HEADER_SIZE, self.size, len(chunk)):
+            end = min(start + len(chunk), self.size)
+            self._map[start:end] = chunk[:end - start]
+        self._map[:_HEADER.size] = self._header
+    
+    @contextmanager
+    def _locked(self):
+        """Trava da thread + flock exclusivo no arquivo (entre processos)"""
+        with self._lock:
+            self._open()
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._check_layout()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+    
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                os.close(self._fd)
+            self._map = None
+            self._fd = None
+            self._pid = None
+    
+    # ==================== SLOTS ====================
+    
+    @staticmethod
+    def _hash(key: bytes) -> int:
+        return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+    
+    def _offset(self, index: int) -> int:
+        return _HEADER_SIZE + index * self.slot_size
+    
+    def _read_slot(self, index: int) -> tuple:
+        return _SLOT.unpack_from(self._map, self._offset(index))
+    
+    def _slot_key(self, index: int, key_len: int) -> bytes:
+        start = self._offset(index) + _SLOT.size
+        return self._map[start:start + key_len]
+    
+    def _slot_value(self, index: int, value_len: int) -> bytes:
+        start = self._offset(index) + _SLOT.size + self.key_size
+        return self._map[start:start + value_len]
+    
+    def _write_slot(self, index: int, kind: int, key: bytes, key_hash: int, value: bytes, expires_at: float, now: float):
+        offset = self._offset(index)
+        key_start = offset + _SLOT.size
+        value_start = key_start + self.key_size
+        self._map[key_start:key_start + len(key)] = key
+        self._map[value_start:value_start + len(value)] = value
+        _SLOT.pack_into(self._map, offset, _USED, kind, len(key), len(value), key_hash, expires_at, now)
+    
+    def _mark_deleted(self, index: int):
+        self._map[self._offset(index)] = _DELETED
+    
+    def _find(self, key: bytes, key_hash: int, now: float) -> tuple:
+        """
+        Procura a chave na região de sondagem
+        Retorna (índice da chave ou None, melhor slot livre ou None, slot LRU)
+        """
+        start = key_hash % self.slots
+        free = None
+        lru_index, lru_access = None, None
+        
+        for step in range(_PROBE_LIMIT):
+            index = (start + step) % self.slots
+            state, _, key_len, _, slot_hash, expires_at, last_access = self._read_slot(index)
+            
+            if state == _EMPTY:
+                return None, free if free is not None else index, lru_index
+            
+            if state == _USED and expires_at and expires_at <= now:
+                # Expirada: vira slot livre
+                self._mark_deleted(index)
+                state = _DELETED
+            
+            if state == _DELETED:
+                if free is None:
+                    free = index
+                continue
+            
+            if slot_hash == key_hash and self._slot_key(index, key_len) == key:
+                return index, free, lru_index
+            
+            if lru_access is None or last_access < lru_access:
+                lru_index, lru_access = index, last_access
+        
+        return None, free, lru_index
+    
+    def _encode_key(self, key: str) -> bytes:
+        encoded = key.encode("utf-8")
+        if len(encoded) > self.key_size:
+            raise ValueError(f"Chave maior que {self.key_size} bytes")
+        return encoded
+    
+    def _store(self, key: bytes, kind: int, value: bytes, ttl: Optional[float], now: float):
+        key_hash = self._hash(key)
+        index, free, lru = self._find(key, key_hash, now)
+        if index is None:
+            index = free
+        if index is None:
+            index = lru
+            self.evictions += 1
+        expires_at = now + ttl if ttl else 0.0
+        self._write_slot(index, kind, key, key_hash, value, expires_at, now)
+    
+    # ==================== API ====================
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        encoded = self._encode_key(key)
+        now = time.time()
+        with self._locked():
+            index, _, _ = self._find(encoded, self._hash(encoded), now)
+            if index is None:
+                self.misses += 1
+                return default
+            
+            _, kind, _, value_len, _, _, _ = self._read_slot(index)
+            # Atualiza o último acesso (usado na escolha de quem sai)
+            struct.pack_into("<d", self._map, self._offset(index) + _SLOT.size - 8, now)
+            raw = self._slot_value(index, value_len)
+        
+        self.hits += 1
+        if kind == _KIND_COUNTER:
+            return _COUNTER.unpack(raw)[0]
+        return json.loads(raw)
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Grava um valor serializável em JSON; False se não couber no slot"""
+        encoded = self._encode_key(key)
+        raw = json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+        if len(raw) > self.value_size:
+            return False
+        with self._locked():
+            self._store(encoded, _KIND_JSON, raw, ttl, time.time())
+        return True
+    
+    def delete(self, key: str) -> bool:
+        """Invalida a chave em todos os processos"""
+        encoded = self._encode_key(key)
+        with self._locked():
+            index, _, _ = self._find(encoded, self._hash(encoded), time.time())
+            if index is None:
+                return False
+            self._mark_deleted(index)
+            return True
+    
+    def incr(self, key: str, delta: int = 1, ttl: Optional[float] = None) -> int:
+        """
+        Incremento atômico; cria o contador (com TTL) se não existir
+        O TTL só é definido na criação, como numa janela de rate limit
+        """
+        encoded = self._encode_key(key)
+        key_hash = self._hash(encoded)
+        now = time.time()
+        with self._locked():
+            index, _, _ = self._find(encoded, key_hash, now)
+            if index is not None:
+                _, kind, _, value_len, _, expires_at, _ = self._read_slot(index)
+                if kind == _KIND_COUNTER:
+                    value = _COUNTER.unpack(self._slot_value(index, value_len))[0] + delta
+                    self._write_slot(index, _KIND_COUNTER, encoded, key_hash, _COUNTER.pack(value), expires_at, now)
+                    return value
+            self._store(encoded, _KIND_COUNTER, _COUNTER.pack(delta), ttl, now)
+            return delta
+    
+    def clear(self):
+        with self._locked():
+            self._map[_HEADER_SIZE:] = bytes(self.size - _HEADER_SIZE)
+    
+    def stats(self) -> dict:
+        now = time.time()
+        used = 0
+        with self._locked():
+            for index in range(self.slots):
+                state, _, _, _, _, expires_at, _ = self._read_slot(index)
+                if state == _USED and not (expires_at and expires_at <= now):
+                    used += 1
+        return {
+            "slots": self.slots,
+            "used": used,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_shared_cache: Optional[SharedCache] = None
+
+
+def get_shared_cache() -> SharedCache:
+    """Instância única por processo (o arquivo é o mesmo para todos os workers)"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SharedCache.from_env()
+    return _shared_cache
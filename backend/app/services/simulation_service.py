@@ -0,0 +1,194 @@
+import time
+import numpy as np
+from app.models import SimulationInput
+from app.services.calculator_service import CalculatorService
+from app.services.tax_arrays import monthly_taxes, marginal_rate, max_marginal_rate
+
+PERCENTILES = [5, 10, 25, 50, 75, 90, 95]
+BAND_PERCENTILES = [10, 50, 90]
+
+
+class SimulationService:
+    """
+    Simulação Monte Carlo da renda líquida do freelancer
+    Usa o modelo de custos do CalculatorService, mas com horas faturadas incertas
+    """
+    
+    # Precisão (R$ na renda do período) e limite de iterações da busca do valor/hora
+    RATE_SEARCH_TOLERANCE = 0.01
+    RATE_SEARCH_MAX_ITERATIONS = 20
+    
+    @classmethod
+    def simulate(cls, input_data: SimulationInput) -> dict:
+        """Executa todos os cenários de uma vez (vetorizado) e resume os percentis"""
+        started = time.perf_counter()
+        rng = np.random.default_rng(input_data.seed)
+        
+        base_result = CalculatorService.calculate(input_data)
+        hourly_rate = float(input_data.hourly_rate or base_result.hourly_rate)
+        
+        # Horas disponíveis por mês (mesma conta da calculadora)
+        working_days_per_month = input_data.days_per_week * (52 - input_data.vacation_weeks) / 12
+        available_hours = input_data.hours_per_day * working_days_per_month
+        
+        billed_hours = cls._simulate_billed_hours(input_data, available_hours, rng)
+        
+        # Custos que não dependem do faturamento
+        monthly_expenses = float(input_data.monthly_expenses + input_data.variable_expenses)
+        
+        # Meta: pró-labore + provisões (13º e férias), como na calculadora
+        monthly_target = float(input_data.desired_monthly_income + base_result.monthly_provisions)
+        target = monthly_target * input_data.months
+        
+        monthly_net = cls._monthly_net_income(
+            hourly_rate, billed_hours, input_data.tax_regime, monthly_expenses
+        )
+        total_net = monthly_net.sum(axis=1)
+        
+        required_rates = cls._required_rates(
+            billed_hours, input_data.tax_regime, monthly_expenses, target
+        )
+        required_rate = float(np.quantile(required_rates, input_data.confidence, method="higher"))
+        
+        annual_hours = billed_hours.sum(axis=1)
+        
+        return {
+            "tax_regime": input_data.tax_regime,
+            "scenarios": input_data.scenarios,
+            "months": input_data.months,
+            "hourly_rate": round(hourly_rate, 2),
+            "recommended_hourly_rate": float(base_result.hourly_rate),
+            "target_net_income": round(target, 2),
+            "net_income": cls._summary(total_net),
+            "monthly_net_income_bands": {
+                f"p{p}": [round(v, 2) for v in band]
+                for p, band in zip(BAND_PERCENTILES, np.percentile(monthly_net, BAND_PERCENTILES, axis=0).tolist())
+            },
+            "billed_hours": cls._summary(annual_hours),
+            "probability_of_target": round(float((total_net >= target).mean()), 4),
+            "confidence": input_data.confidence,
+            "required_hourly_rate": round(required_rate, 2) if np.isfinite(required_rate) else None,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    
+    @classmethod
+    def _simulate_billed_hours(cls, input_data: SimulationInput, available_hours: float, rng) -> np.ndarray:
+        """
+        Horas faturadas por cenário e mês (matriz cenários × meses)
+        
+        Cada cenário começa com um projeto. Ao terminar, o cliente renova com
+        probabilidade 1 - churn; caso contrário o freelancer fica sem projeto
+        por um número geométrico de meses (média mean_gap_months).
+        """
+        n = input_data.scenarios
+        months = input_data.months
+        
+        utilization = cls._sample_utilization(input_data, rng, (n, months))
+        capacity = available_hours * utilization
+        
+        # Chance de conseguir um projeto em cada mês parado
+        start_probability = 1 / (1 + input_data.mean_gap_months)
+        
+        hours = np.zeros((n, months))
+        active = np.ones(n, dtype=bool)
+        remaining = cls._sample_project_hours(input_data, rng, n)
+        
+        for month in range(months):
+            starting = ~active & (rng.random(n) < start_probability)
+            remaining[starting] = cls._sample_project_hours(input_data, rng, int(starting.sum()))
+            active |= starting
+            
+            billed = np.where(active, np.minimum(capacity[:, month], remaining), 0.0)
+            hours[:, month] = billed
+            remaining -= billed
+            
+            finished = active & (remaining <= 1e-9)
+            renewed = finished & (rng.random(n) >= input_data.churn_probability)
+            remaining[renewed] = cls._sample_project_hours(input_data, rng, int(renewed.sum()))
+            active &= ~(finished & ~renewed)
+        
+        return hours
+    
+    @staticmethod
+    def _sample_utilization(input_data: SimulationInput, rng, shape) -> np.ndarray:
+        """Utilização ~ Beta com média e desvio informados"""
+        mean = input_data.utilization_mean
+        std = input_data.utilization_std
+        
+        if std == 0 or mean >= 1:
+            return np.full(shape, mean)
+        
+        # Variância máxima de uma Beta com essa média é mean * (1 - mean)
+        variance = min(std ** 2, mean * (1 - mean) * 0.99)
+        concentration = mean * (1 - mean) / variance - 1
+        return rng.beta(mean * concentration, (1 - mean) * concentration, size=shape)
+    
+    @staticmethod
+    def _sample_project_hours(input_data: SimulationInput, rng, size: int) -> np.ndarray:
+        """Tamanho do projeto ~ LogNormal com média e coeficiente de variação informados"""
+        mean = input_data.project_hours_mean
+        cv = input_data.project_hours_cv
+        
+        if cv == 0:
+            return np.full(size, mean)
+        
+        sigma = np.sqrt(np.log1p(cv ** 2))
+        mu = np.log(mean) - sigma ** 2 / 2
+        return rng.lognormal(mu, sigma, size=size)
+    
+    @staticmethod
+    def _monthly_net_income(hourly_rate, billed_hours: np.ndarray, tax_regime: str, monthly_expenses: float) -> np.ndarray:
+        """Faturamento - impostos - despesas, por cenário e mês"""
+        revenue = hourly_rate * billed_hours
+        return revenue - monthly_taxes(revenue, tax_regime) - monthly_expenses
+    
+    @classmethod
+    def _required_rates(cls, billed_hours: np.ndarray, tax_regime: str, monthly_expenses: float, target: float) -> np.ndarray:
+        """
+        Valor/hora mínimo para atingir a meta em cada cenário
+        
+        A renda líquida é linear por partes no valor/hora (uma parte por faixa
+        de IR). Partindo de (meta + custos fixos) / horas, que nunca passa da
+        resposta, o método de Newton avança faixa a faixa e é exato quando
+        chega à última: nos regimes lineares converge em um passo. Cenários
+        sem horas faturadas ficam com valor infinito.
+        """
+        months = billed_hours.shape[1]
+        total_hours = billed_hours.sum(axis=1)
+        rates = np.full(len(total_hours), np.inf)
+        
+        has_hours = total_hours > 0
+        hours = billed_hours[has_hours]
+        
+        fixed_taxes = float(monthly_taxes(np.zeros(1), tax_regime)[0])
+        fixed_costs = (monthly_expenses + fixed_taxes) * months
+        rate = (target + fixed_costs) / total_hours[has_hours]
+        ceiling = rate / (1 - max_marginal_rate(tax_regime))
+        
+        pending = np.arange(len(rate))
+        for _ in range(cls.RATE_SEARCH_MAX_ITERATIONS):
+            revenue = rate[pending, None] * hours[pending]
+            net = (revenue - monthly_taxes(revenue, tax_regime)).sum(axis=1) - monthly_expenses * months
+            slope = (hours[pending] * (1 - marginal_rate(revenue, tax_regime))).sum(axis=1)
+            
+            missing = target - net
+            unresolved = missing > cls.RATE_SEARCH_TOLERANCE
+            if not unresolved.any():
+                break
+            
+            pending = pending[unresolved]
+            rate[pending] = np.minimum(
+                rate[pending] + missing[unresolved] / slope[unresolved], ceiling[pending]
+            )
+        
+        rates[has_hours] = rate
+        return rates
+    
+    @staticmethod
+    def _summary(values: np.ndarray) -> dict:
+        summary = {
+            f"p{p}": round(v, 2)
+            for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES).tolist())
+        }
+        summary["mean"] = round(float(values.mean()), 2)
+        return summary
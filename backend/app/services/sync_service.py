@@ -0,0 +1,168 @@
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+# Colunas enviadas ao PWA por tabela (user_id fica de fora)
+SYNC_TABLES = {
+    "clients": ["id", "name", "email", "phone", "company", "notes", "created_at", "updated_at"],
+    "projects": [
+        "id", "client_id", "title", "description", "value", "estimated_hours", "status",
+        "start_date", "deadline", "billing_schedule", "created_at", "updated_at",
+    ],
+    "payments": [
+        "id", "project_id", "amount", "due_date", "status", "payment_date", "notes",
+        "installment_number", "created_at", "updated_at",
+    ],
+    "calculations": ["id", "name", "input_data", "result_data", "created_at"],
+}
+
+# Tombstones (exclusões) ficam no log por esse tempo; depois, quem ficou
+# mais tempo sem sincronizar recebe o estado completo de novo
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+
+class SupabaseChangeLogStore:
+    """
+    Tabelas sync_heads (user_id, seq, compacted_seq) e change_log
+    (user_id, seq, entity, row_id, deleted, changed_at)
+    
+    Ambas são mantidas por triggers em clients, projects, payments e
+    calculations. Cada escrita incrementa sync_heads.seq do usuário; a
+    linha travada serializa os escritores, então seq cresce na ordem de
+    commit. O trigger faz upsert de (user_id, entity, row_id) no
+    change_log com o novo seq, e assim o log guarda no máximo uma entrada
+    por linha (viva ou apagada). Tabelas e triggers: sql/sync_change_log.sql
+    """
+    
+    HEADS = "sync_heads"
+    LOG = "change_log"
+    # Ids por consulta .in_() (limite de tamanho da URL)
+    IN_BATCH = 100
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def head(self, user_id: str) -> Tuple[int, int]:
+        rows = self.client.table(self.HEADS).select("seq, compacted_seq").eq("user_id", user_id).execute().data
+        return (rows[0]["seq"], rows[0]["compacted_seq"]) if rows else (0, 0)
+    
+    def changes(self, user_id: str, since: int, limit: int) -> List[dict]:
+        return self.client.table(self.LOG).select("seq, entity, row_id, deleted").eq(
+            "user_id", user_id
+        ).gt("seq", since).order("seq").limit(limit).execute().data
+    
+    def rows(self, user_id: str, entity: str, ids: Optional[List[str]] = None) -> List[dict]:
+        columns = ", ".join(SYNC_TABLES[entity])
+        if ids is None:
+            return self.client.table(entity).select(columns).eq("user_id", user_id).order("id").execute().data
+        rows = []
+        for start in range(0, len(ids), self.IN_BATCH):
+            rows.extend(self.client.table(entity).select(columns).eq("user_id", user_id).in_(
+                "id", ids[start:start + self.IN_BATCH]
+            ).execute().data)
+        return rows
+    
+    def expired_tombstones(self, cutoff: str, limit: int) -> List[dict]:
+        return self.client.table(self.LOG).select("user_id, seq").eq("deleted", True).lt(
+            "changed_at", cutoff
+        ).order("seq").limit(limit).execute().data
+    
+    def advance_compacted(self, user_id: str, seq: int):
+        self.client.table(self.HEADS).update({"compacted_seq": seq}).eq("user_id", user_id).lt(
+            "compacted_seq", seq
+        ).execute()
+    
+    def delete_tombstones(self, user_id: str, max_seq: int, cutoff: str):
+        self.client.table(self.LOG).delete().eq("user_id", user_id).eq("deleted", True).lte(
+            "seq", max_seq
+        ).lt("changed_at", cutoff).execute()
+
+
+class SyncService:
+    """
+    Sincronização incremental do PWA
+    
+    O cliente guarda o cursor da última resposta e pede só o que mudou
+    depois dele: linhas alteradas em formato colunar (nomes das colunas
+    uma vez por tabela) e ids apagados. Sem cursor, com cursor anterior
+    à última compactação de tombstones ou desconhecido, vai o estado
+    completo (reset).
+    """
+    
+    DEFAULT_LIMIT = 500
+    COMPACT_BATCH = 1000
+    
+    @staticmethod
+    def parse_cursor(value: Optional[str]) -> Optional[int]:
+        if value is None or value == "":
+            return None
+        if not value.isdigit():
+            raise ValueError("Cursor inválido")
+        return int(value)
+    
+    @staticmethod
+    def pack(entity: str, rows: List[dict]) -> dict:
+        columns = SYNC_TABLES[entity]
+        return {"columns": columns, "rows": [[row.get(column) for column in columns] for row in rows]}
+    
+    @classmethod
+    def pull(cls, store, user_id: str, since: Optional[int], limit: int = DEFAULT_LIMIT) -> dict:
+        seq, compacted_seq = store.head(user_id)
+        
+        if since is None or since < compacted_seq or since > seq:
+            # O head é lido antes das linhas: o que mudar no meio vem de novo na próxima chamada
+            changes = {}
+            for entity in SYNC_TABLES:
+                rows = store.rows(user_id, entity)
+                if rows:
+                    changes[entity] = cls.pack(entity, rows)
+            return {"cursor": str(seq), "reset": True, "has_more": False, "changes": changes, "deleted": {}}
+        
+        entries = store.changes(user_id, since, limit + 1)
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        
+        upserts: Dict[str, List[str]] = defaultdict(list)
+        deleted: Dict[str, List[str]] = defaultdict(list)
+        for entry in entries:
+            (deleted if entry["deleted"] else upserts)[entry["entity"]].append(entry["row_id"])
+        
+        changes = {}
+        for entity, ids in upserts.items():
+            # Linha apagada depois da leitura do log: o tombstone vem na próxima chamada
+            rows = store.rows(user_id, entity, ids)
+            if rows:
+                changes[entity] = cls.pack(entity, rows)
+        
+        return {
+            "cursor": str(entries[-1]["seq"] if entries else since),
+            "reset": False,
+            "has_more": has_more,
+            "changes": changes,
+            "deleted": dict(deleted),
+        }
+    
+    @classmethod
+    def compact(cls, store, now: Optional[datetime] = None) -> int:
+        """
+        Remove tombstones mais antigos que TOMBSTONE_RETENTION_DAYS
+        
+        O compacted_seq do usuário avança antes da remoção: um cliente
+        com cursor anterior recebe reset em vez de perder a exclusão.
+        Devolve quantos usuários foram compactados.
+        """
+        now = now or datetime.now(timezone.utc)
+        cutoff = (now - timedelta(days=TOMBSTONE_RETENTION_DAYS)).isoformat()
+        compacted = set()
+        while True:
+            tombstones = store.expired_tombstones(cutoff, cls.COMPACT_BATCH)
+            if not tombstones:
+                return len(compacted)
+            max_seq: Dict[str, int] = {}
+            for tombstone in tombstones:
+                max_seq[tombstone["user_id"]] = max(max_seq.get(tombstone["user_id"], 0), tombstone["seq"])
+            for user_id, seq in max_seq.items():
+                store.advance_compacted(user_id, seq)
+                store.delete_tombstones(user_id, seq, cutoff)
+            compacted.update(max_seq)
@@ -0,0 +1,81 @@
+import numpy as np
+from app.services.calculator_service import CalculatorService
+
+# Versão vetorizada (NumPy) das regras de CalculatorService._calculate_monthly_taxes
+# Usada pelas simulações que avaliam milhares de cenários de uma vez
+
+_IR_LIMITS = np.array(
+    [float(limit) for limit, _, _ in CalculatorService.IR_BRACKETS if limit is not None]
+)
+_IR_RATES = np.array([float(rate) for _, rate, _ in CalculatorService.IR_BRACKETS])
+_IR_DEDUCTIONS = np.array([float(deduction) for _, _, deduction in CalculatorService.IR_BRACKETS])
+
+SIMPLES_LIMITS = np.array([float(limit) for limit, _, _ in CalculatorService.SIMPLES_ANEXO_III_BRACKETS])
+_SIMPLES_RATES = np.array([float(rate) for _, rate, _ in CalculatorService.SIMPLES_ANEXO_III_BRACKETS])
+_SIMPLES_DEDUCTIONS = np.array([float(deduction) for _, _, deduction in CalculatorService.SIMPLES_ANEXO_III_BRACKETS])
+
+
+def progressive_ir(monthly_income: np.ndarray) -> np.ndarray:
+    """IR progressivo mensal para um array de rendas"""
+    monthly_income = np.asarray(monthly_income, dtype=float)
+    bracket = np.searchsorted(_IR_LIMITS, monthly_income, side="left")
+    ir = monthly_income * _IR_RATES[bracket] - _IR_DEDUCTIONS[bracket]
+    return np.where(_IR_RATES[bracket] == 0, 0.0, ir)
+
+
+def simples_bracket(rbt12: np.ndarray) -> np.ndarray:
+    """Índice (0 a 5) da faixa do Anexo III para cada RBT12; acima do teto fica na última"""
+    bracket = np.searchsorted(SIMPLES_LIMITS, np.asarray(rbt12, dtype=float), side="left")
+    return np.minimum(bracket, len(SIMPLES_LIMITS) - 1)
+
+
+def simples_effective_rate(rbt12: np.ndarray) -> np.ndarray:
+    """Alíquota efetiva do Simples (Anexo III) para cada receita bruta acumulada de 12 meses"""
+    rbt12 = np.asarray(rbt12, dtype=float)
+    bracket = simples_bracket(rbt12)
+    safe_rbt12 = np.where(rbt12 > 0, rbt12, 1.0)
+    effective = (safe_rbt12 * _SIMPLES_RATES[bracket] - _SIMPLES_DEDUCTIONS[bracket]) / safe_rbt12
+    return np.where(rbt12 > 0, effective, _SIMPLES_RATES[0])
+
+
+def marginal_rate(monthly_income: np.ndarray, tax_regime: str) -> np.ndarray:
+    """Alíquota marginal (derivada do imposto) para um array de valores"""
+    monthly_income = np.asarray(monthly_income, dtype=float)
+    
+    if tax_regime in ("PJ_SIMPLES", "PJ_PRESUMIDO"):
+        rate = float(CalculatorService.TAX_RATES[tax_regime]["percentage"]) / 100
+        return np.full_like(monthly_income, rate)
+    
+    elif tax_regime == "AUTONOMO":
+        bracket = np.searchsorted(_IR_LIMITS, monthly_income, side="left")
+        return _IR_RATES[bracket]
+    
+    return np.zeros_like(monthly_income)
+
+
+def monthly_taxes(monthly_income: np.ndarray, tax_regime: str) -> np.ndarray:
+    """Impostos mensais para um array de valores, no regime informado"""
+    monthly_income = np.asarray(monthly_income, dtype=float)
+    
+    if tax_regime == "MEI":
+        return np.full_like(monthly_income, float(CalculatorService.MEI_DAS_VALUE))
+    
+    elif tax_regime in ("PJ_SIMPLES", "PJ_PRESUMIDO"):
+        rate = float(CalculatorService.TAX_RATES[tax_regime]["percentage"]) / 100
+        return monthly_income * rate
+    
+    elif tax_regime == "AUTONOMO":
+        inss_rate = float(CalculatorService.TAX_RATES["AUTONOMO"]["inss"]) / 100
+        inss = float(CalculatorService.MINIMUM_WAGE) * inss_rate
+        return inss + progressive_ir(monthly_income)
+    
+    return np.zeros_like(monthly_income)
+
+
+def max_marginal_rate(tax_regime: str) -> float:
+    """Maior alíquota marginal do regime (limita quanto do faturamento vira imposto)"""
+    if tax_regime in ("PJ_SIMPLES", "PJ_PRESUMIDO"):
+        return float(CalculatorService.TAX_RATES[tax_regime]["percentage"]) / 100
+    elif tax_regime == "AUTONOMO":
+        return float(_IR_RATES.max())
+    return 0.0
@@ -0,0 +1,55 @@
+from typing import Optional
+from app.http_cache import encode_json, compute_etag
+from app.services.calculator_service import CalculatorService
+
+
+class TaxRulesService:
+    """
+    Manifesto de regras tributárias pré-serializado
+    Os bytes e ETags são gerados uma única vez a partir do CalculatorService
+    """
+    
+    _manifest: Optional[bytes] = None
+    _manifest_etag: Optional[str] = None
+    _tax_info: dict = {}
+    
+    @classmethod
+    def _build(cls):
+        rules = CalculatorService.get_tax_rules()
+        cls._manifest = encode_json(rules)
+        cls._manifest_etag = compute_etag(cls._manifest)
+        
+        tax_info = {}
+        for regime in rules["regimes"]:
+            body = encode_json(CalculatorService.get_tax_info(regime))
+            tax_info[regime] = (body, compute_etag(body))
+        cls._tax_info = tax_info
+    
+    @classmethod
+    def version(cls) -> str:
+        return CalculatorService.TAX_TABLE_VERSION
+    
+    @classmethod
+    def manifest(cls) -> tuple:
+        """Retorna (bytes, etag) do manifesto completo"""
+        if cls._manifest is None:
+            cls._build()
+        return cls._manifest, cls._manifest_etag
+    
+    @classmethod
+    def tax_info(cls, tax_regime: str) -> Optional[tuple]:
+        """Retorna (bytes, etag) das informações de um regime, ou None se inválido"""
+        if cls._manifest is None:
+            cls._build()
+        return cls._tax_info.get(tax_regime)
+    
+    @classmethod
+    def regimes(cls) -> list:
+        return list(CalculatorService.TAX_INFO.keys())
+    
+    @classmethod
+    def reset(cls):
+        """Descarta os bytes pré-computados (usar após alterar as regras)"""
+        cls._manifest = None
+        cls._manifest_etag = None
+        cls._tax_info = {}
@@ -0,0 +1,264 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from postgrest.exceptions import APIError
+
+# Lançamento manual mais longo aceito
+MAX_ENTRY_HOURS = 24
+
+# (project_id, mês "AAAA-MM") -> (segundos, lançamentos)
+RollupDeltas = Dict[Tuple[str, str], Tuple[int, int]]
+
+
+class TimeConflictError(Exception):
+    """Gravação barrada por uma constraint única (timer já rodando ou lançamento já anulado)"""
+
+
+def _parse(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def split_by_month(started_at: datetime, ended_at: datetime) -> List[Tuple[str, int]]:
+    """Segundos de um intervalo em cada mês (um timer na virada do mês conta nos dois)"""
+    parts = []
+    current = started_at
+    while current < ended_at:
+        next_month = (current.replace(day=1, hour=0, minute=0, second=0, microsecond=0) + timedelta(days=32)).replace(day=1)
+        end = min(ended_at, next_month)
+        parts.append((current.strftime("%Y-%m"), round((end - current).total_seconds())))
+        current = end
+    return parts
+
+
+class SupabaseTimeStore:
+    """
+    Tabelas time_entries (só inserção), time_rollups
+    (user_id, project_id, month, seconds, entries) e time_timers
+    (um timer rodando por usuário); ver sql/time_tracking.sql
+    """
+    
+    ENTRIES = "time_entries"
+    ROLLUPS = "time_rollups"
+    TIMERS = "time_timers"
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def record(self, user_id: str, rows: List[dict], rollups: List[dict]) -> List[dict]:
+        """
+        Insere os lançamentos e soma os deltas nos rollups numa transação
+        (função record_time_entries: INSERT ... ON CONFLICT DO UPDATE
+        SET seconds = seconds + EXCLUDED.seconds)
+        """
+        try:
+            return self.client.rpc("record_time_entries", {
+                "p_user_id": user_id,
+                "p_entries": rows,
+                "p_rollups": rollups,
+            }).execute().data
+        except APIError as e:
+            if e.code == "23505":  # unique_violation (time_entries_voids)
+                raise TimeConflictError(str(e.message)) from e
+            raise
+    
+    def get_entry(self, user_id: str, entry_id: str) -> Optional[dict]:
+        rows = self.client.table(self.ENTRIES).select("*").eq("user_id", user_id).eq("id", entry_id).execute().data
+        return rows[0] if rows else None
+    
+    def is_voided(self, user_id: str, entry_id: str) -> bool:
+        return bool(self.client.table(self.ENTRIES).select("id").eq("user_id", user_id).eq("voids", entry_id).execute().data)
+    
+    def rollups(self, user_id: str, project_ids: Optional[Iterable[str]] = None) -> List[dict]:
+        query = self.client.table(self.ROLLUPS).select("project_id, month, seconds, entries").eq("user_id", user_id)
+        if project_ids is not None:
+            query = query.in_("project_id", list(project_ids))
+        return query.execute().data
+    
+    def get_timer(self, user_id: str) -> Optional[dict]:
+        rows = self.client.table(self.TIMERS).select("*").eq("user_id", user_id).execute().data
+        return rows[0] if rows else None
+    
+    def start_timer(self, row: dict):
+        try:
+            self.client.table(self.TIMERS).insert(row).execute()
+        except APIError as e:
+            if e.code == "23505":  # unique_violation (primary key user_id)
+                raise TimeConflictError(str(e.message)) from e
+            raise
+    
+    def stop_timer(self, user_id: str) -> Optional[dict]:
+        rows = self.client.table(self.TIMERS).delete().eq("user_id", user_id).execute().data
+        return rows[0] if rows else None
+
+
+class TimeTrackingService:
+    """
+    Horas trabalhadas por projeto
+    
+    Lançamentos nunca são alterados: uma correção é um novo lançamento
+    que anula o original (segundos negativos, voids = id). A cada
+    gravação, os totais por projeto e mês (rollups) são somados no banco,
+    na mesma transação dos lançamentos, e as análises leem só os rollups.
+    """
+    
+    @staticmethod
+    def validate(started_at: datetime, ended_at: datetime):
+        if ended_at <= started_at:
+            raise ValueError("ended_at deve ser depois de started_at")
+        if ended_at - started_at > timedelta(hours=MAX_ENTRY_HOURS):
+            raise ValueError(f"Lançamento maior que {MAX_ENTRY_HOURS} horas")
+    
+    @staticmethod
+    def entry_row(user_id: str, project_id: str, started_at: datetime, ended_at: datetime, notes: Optional[str] = None) -> dict:
+        return {
+            "user_id": user_id,
+            "project_id": project_id,
+            "started_at": started_at.isoformat(),
+            "ended_at": ended_at.isoformat(),
+            "seconds": round((ended_at - started_at).total_seconds()),
+            "notes": notes,
+            "voids": None,
+        }
+    
+    @staticmethod
+    def rollup_deltas(rows: Iterable[dict]) -> RollupDeltas:
+        """Quanto cada lançamento soma (ou subtrai, se anula outro) em cada mês"""
+        deltas: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+        for row in rows:
+            sign = -1 if row.get("voids") else 1
+            for month, seconds in split_by_month(_parse(row["started_at"]), _parse(row["ended_at"])):
+                delta = deltas[(row["project_id"], month)]
+                delta[0] += sign * seconds
+                delta[1] += sign
+        return {key: (seconds, entries) for key, (seconds, entries) in deltas.items()}
+    
+    @classmethod
+    def record(cls, store, user_id: str, rows: List[dict]) -> List[dict]:
+        """
+        Grava os lançamentos em lote e soma nos rollups
+        O incremento é atômico no banco: gravações simultâneas (outros
+        workers) não se sobrescrevem
+        """
+        deltas = cls.rollup_deltas(rows)
+        return store.record(user_id, rows, [
+            {"project_id": project_id, "month": month, "seconds": seconds, "entries": entries}
+            for (project_id, month), (seconds, entries) in deltas.items()
+        ])
+    
+    @classmethod
+    def void(cls, store, user_id: str, entry_id: str) -> Optional[dict]:
+        """
+        Anula um lançamento com um lançamento inverso (None se não existe)
+        TimeConflictError se já foi anulado, inclusive por outra requisição
+        simultânea (o índice único em time_entries.voids decide)
+        """
+        entry = store.get_entry(user_id, entry_id)
+        if entry is None or entry.get("voids"):
+            return None
+        if store.is_voided(user_id, entry_id):
+            raise TimeConflictError(f"Lançamento {entry_id} já anulado")
+        row = {
+            **{key: entry[key] for key in ("user_id", "project_id", "started_at", "ended_at", "notes")},
+            "seconds": -entry["seconds"],
+            "voids": entry_id,
+        }
+        return cls.record(store, user_id, [row])[0]
+    
+    # ==================== TIMER ====================
+    
+    @classmethod
+    def start_timer(cls, store, user_id: str, project_id: str, notes: Optional[str] = None, now: Optional[datetime] = None) -> Optional[dict]:
+        """None se já existe um timer rodando (a primary key user_id barra a corrida)"""
+        if store.get_timer(user_id) is not None:
+            return None
+        timer = {
+            "user_id": user_id,
+            "project_id": project_id,
+            "started_at": (now or datetime.now()).isoformat(),
+            "notes": notes,
+        }
+        try:
+            store.start_timer(timer)
+        except TimeConflictError:
+            return None
+        return timer
+    
+    @classmethod
+    def stop_timer(cls, store, user_id: str, now: Optional[datetime] = None) -> Optional[dict]:
+        """Fecha o timer como um lançamento (None se não havia timer)"""
+        timer = store.stop_timer(user_id)
+        if timer is None:
+            return None
+        started_at = _parse(timer["started_at"])
+        ended_at = now or datetime.now(started_at.tzinfo)
+        row = cls.entry_row(user_id, timer["project_id"], started_at, max(ended_at, started_at), timer.get("notes"))
+        return cls.record(store, user_id, [row])[0]
+    
+    # ==================== ANÁLISE ====================
+    
+    @staticmethod
+    def analytics(
+        rollups: List[dict],
+        projects: List[dict],
+        clients: List[dict],
+        recommended_hourly_rate: Optional[Decimal],
+    ) -> dict:
+        """
+        Valor/hora efetivo por projeto e por cliente (valor do projeto
+        dividido pelas horas lançadas) comparado ao valor/hora recomendado
+        """
+        seconds_by_project: Dict[str, int] = defaultdict(int)
+        seconds_by_month: Dict[str, int] = defaultdict(int)
+        for row in rollups:
+            seconds_by_project[row["project_id"]] += row["seconds"]
+            seconds_by_month[row["month"]] += row["seconds"]
+        
+        recommended = Decimal(recommended_hourly_rate) if recommended_hourly_rate else None
+        
+        def rates(value: Decimal, seconds: int) -> dict:
+            hours = Decimal(seconds) / 3600
+            effective = value / hours if hours > 0 else None
+            return {
+                "hours": round(float(hours), 2),
+                "effective_hourly_rate": round(float(effective), 2) if effective is not None else None,
+                "vs_recommended": round(float(effective / recommended), 4) if effective is not None and recommended else None,
+            }
+        
+        client_names = {client["id"]: client.get("name") for client in clients}
+        by_client: Dict[str, List[Decimal]] = defaultdict(lambda: [Decimal("0"), 0])
+        project_results = []
+        for project in projects:
+            seconds = seconds_by_project.get(project["id"], 0)
+            if seconds <= 0:
+                continue
+            value = Decimal(str(project["value"]))
+            project_results.append({
+                "project_id": project["id"],
+                "title": project.get("title"),
+                "client_id": project.get("client_id"),
+                "value": float(value),
+                **rates(value, seconds),
+            })
+            totals = by_client[project.get("client_id")]
+            totals[0] += value
+            totals[1] += seconds
+        
+        client_results = [
+            {"client_id": client_id, "name": client_names.get(client_id), "value": float(value), **rates(value, seconds)}
+            for client_id, (value, seconds) in by_client.items()
+        ]
+        project_results.sort(key=lambda item: item["effective_hourly_rate"])
+        client_results.sort(key=lambda item: item["effective_hourly_rate"])
+        
+        return {
+            "recommended_hourly_rate": round(float(recommended), 2) if recommended else None,
+            "projects": project_results,
+            "clients": client_results,
+            "months": [
+                {"month": month, "hours": round(seconds / 3600, 2)}
+                for month, seconds in sorted(seconds_by_month.items())
+            ],
+        }
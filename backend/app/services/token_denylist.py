@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from postgrest.exceptions import APIError
+
+logger = logging.getLogger(__name__)
+
+# (chave revogada, expiração epoch, momento da revogação ISO)
+Revocation = Tuple[str, float, str]
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def _epoch(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+class SupabaseRevocationStore:
+    """Tabela revoked_tokens (key primary key, expires_at, revoked_at) no Supabase"""
+    
+    TABLE = "revoked_tokens"
+    PAGE_SIZE = 1000
+    
+    def __init__(self, client):
+        self.client = client
+    
+    def add(self, key: str, expires_at: float):
+        self.client.table(self.TABLE).upsert({
+            "key": key,
+            "expires_at": _iso(expires_at),
+            "revoked_at": _iso(time.time()),
+        }).execute()
+    
+    def claim(self, key: str, expires_at: float) -> Tuple[bool, float]:
+        """
+        Grava a chave só se ela ainda não existir (a primary key decide)
+        Retorna se esta chamada gravou e o revoked_at da linha que ficou
+        """
+        revoked_at = _iso(time.time())
+        try:
+            self.client.table(self.TABLE).insert({
+                "key": key,
+                "expires_at": _iso(expires_at),
+                "revoked_at": revoked_at,
+            }).execute()
+            return True, _epoch(revoked_at)
+        except APIError as e:
+            if e.code != "23505":  # unique_violation
+                raise
+        
+        rows = self.client.table(self.TABLE).select("revoked_at").eq("key", key).execute().data
+        return False, _epoch(rows[0]["revoked_at"])
+    
+    def fetch_since(self, since: Optional[str]) -> List[Revocation]:
+        """Revogações feitas a partir de `since` que ainda não expiraram"""
+        revocations = []
+        cursor = since
+        while True:
+            query = self.client.table(self.TABLE).select("key, expires_at, revoked_at").gt(
+                "expires_at", _iso(time.time())
+            )
+            if cursor:
+                # gte: revogações no mesmo instante do cursor são relidas (idempotente)
+                query = query.gte("revoked_at", cursor)
+            rows = query.order("revoked_at").limit(self.PAGE_SIZE).execute().data
+            revocations.extend((row["key"], _epoch(row["expires_at"]), row["revoked_at"]) for row in rows)
+            if len(rows) < self.PAGE_SIZE or rows[-1]["revoked_at"] == cursor:
+                return revocations
+            cursor = rows[-1]["revoked_at"]
+
+
+class TokenDenylist:
+    """
+    Lista de tokens revogados mantida em memória
+    
+    A checagem por requisição é uma consulta a um dict (sem banco).
+    As revogações são gravadas no armazenamento e cada processo busca
+    periodicamente só as novas, então um logout em um worker chega aos
+    outros em até SYNC_INTERVAL_SECONDS. Entradas saem da lista quando o
+    token que elas bloqueiam expira.
+    """
+    
+    SYNC_INTERVAL_SECONDS = float(os.getenv("TOKEN_DENYLIST_SYNC_SECONDS", "10"))
+    
+    def __init__(self, store=None):
+        self.store = store
+        self._entries: Dict[str, float] = {}
+        # Sem armazenamento: chave consumida -> (momento da troca, expiração)
+        self._consumed: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._cursor: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._next_purge = 0.0
+    
+    @staticmethod
+    def token_key(jti: str) -> str:
+        return f"jti:{jti}"
+    
+    @staticmethod
+    def family_key(family: str) -> str:
+        return f"fam:{family}"
+    
+    # ==================== CONSULTA ====================
+    
+    def is_revoked(self, payload: dict) -> bool:
+        """O token ou a sessão (família) dele foram revogados?"""
+        now = time.time()
+        keys = [self.token_key(payload.get("jti", ""))]
+        if payload.get("fam"):
+            keys.append(self.family_key(payload["fam"]))
+        for key in keys:
+            expires_at = self._entries.get(key)
+            if expires_at is not None and expires_at > now:
+                return True
+        return False
+    
+    # ==================== REVOGAÇÃO ====================
+    
+    def _remember(self, key: str, expires_at: float):
+        with self._lock:
+            if expires_at > self._entries.get(key, 0):
+                self._entries[key] = expires_at
+    
+    def revoke(self, key: str, expires_at: float):
+        """Revoga localmente na hora e grava para os demais processos"""
+        self._remember(key, expires_at)
+        if self.store is not None:
+            self.store.add(key, expires_at)
+    
+    def revoke_token(self, payload: dict):
+        self.revoke(self.token_key(payload["jti"]), payload["exp"])
+    
+    def revoke_family(self, family: str, expires_at: float):
+        self.revoke(self.family_key(family), expires_at)
+    
+    def is_family_revoked(self, family: str) -> bool:
+        return self._entries.get(self.family_key(family), 0) > time.time()
+    
+    def consume(self, payload: dict) -> Tuple[bool, float]:
+        """
+        Marca o refresh token como usado, de forma atômica no armazenamento
+        
+        Entre workers, só o INSERT que vence a primary key conta como a
+        primeira troca; a memória local não decide nada aqui. Retorna
+        (primeira troca?, momento da primeira troca).
+        """
+        key = self.token_key(payload["jti"])
+        if self.store is not None:
+            first, consumed_at = self.store.claim(key, payload["exp"])
+        else:
+            with self._lock:
+                first = key not in self._consumed
+                consumed_at = self._consumed.setdefault(key, (time.time(), payload["exp"]))[0]
+        self._remember(key, payload["exp"])
+        return first, consumed_at
+    
+    # ==================== SINCRONIZAÇÃO ====================
+    
+    def sync(self):
+        """Traz do armazenamento as revogações novas (incremental)"""
+        if self.store is not None:
+            for key, expires_at, revoked_at in self.store.fetch_since(self._cursor):
+                self._remember(key, expires_at)
+                if self._cursor is None or revoked_at > self._cursor:
+                    self._cursor = revoked_at
+        
+        now = time.time()
+        if now >= self._next_purge:
+            self._next_purge = now + 60
+            with self._lock:
+                self._entries = {key: exp for key, exp in self._entries.items() if exp > now}
+                self._consumed = {key: value for key, value in self._consumed.items() if value[1] > now}
+    
+    async def _sync_loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception:
+                logger.exception("Erro ao sincronizar tokens revogados")
+            await asyncio.sleep(self.SYNC_INTERVAL_SECONDS)
+    
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_token_denylist: Optional[TokenDenylist] = None
+
+
+def get_token_denylist() -> TokenDenylist:
+    """Instância única por processo"""
+    global _token_denylist
+    if _token_denylist is None:
+        _token_denylist = TokenDenylist()
+    return _token_denylist
@@ -0,0 +1,246 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+from app.http_cache import IMMUTABLE_CACHE_CONTROL
+
+FRONTEND_DIR = Path(os.getenv("FRONTEND_DIR", Path(__file__).resolve().parents[2] / "frontend"))
+BUILD_DIR = Path(os.getenv("STATIC_BUILD_DIR", Path(tempfile.gettempdir()) / "freelabr-static"))
+
+# Páginas e o service worker ficam no mesmo endereço: revalidados a cada acesso
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".js", ".css", ".json", ".svg", ".txt", ".webmanifest", ".xml"}
+# Compressão que não economiza ao menos isso é descartada
+MIN_SAVING = 0.9
+
+# Arquivos que não ganham hash no nome (endereço fixo)
+STABLE_NAMES = {"service-worker.js"}
+SKIP_NAMES = {"update-precache.js"}
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+mimetypes.add_type("image/svg+xml", ".svg")
+
+
+class Variant:
+    """Uma codificação do asset (identity, br ou gzip), já em memória"""
+    
+    __slots__ = ("path", "data", "etag", "encoding")
+    
+    def __init__(self, path: Path, data: bytes, etag: str, encoding: Optional[str]):
+        self.path = path
+        self.data = data
+        self.etag = etag
+        self.encoding = encoding
+
+
+class Asset:
+    __slots__ = ("media_type", "cache_control", "variants")
+    
+    def __init__(self, media_type: str, cache_control: str, variants: Dict[str, Variant]):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.variants = variants
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    "bytes=início-fim" -> (início, fim inclusive); None se inválido ou
+    com vários intervalos (nesse caso vai o arquivo inteiro)
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    start, end = match.groups()
+    if start == "":
+        length = int(end)
+        return (max(0, size - length), size - 1) if length else (size, size - 1)
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    return start, end
+
+
+def _accepts(accept_encoding: str) -> set:
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticSite:
+    """
+    Frontend (PWA) servido pela própria API
+    
+    No build, cada asset ganha um nome com hash do conteúdo
+    (app.3f2a9c01d4e5.js, cache imutável de 1 ano) e as páginas e o
+    service worker passam a apontar para esses nomes. Tudo é
+    pré-comprimido em brotli (se instalado) e gzip e fica em memória:
+    a resposta inteira é o próprio objeto bytes pronto, sem cópia nem
+    compressão por requisição. Suporta ETag/304 e Range.
+    """
+    
+    def __init__(self, source_dir: Path = FRONTEND_DIR, build_dir: Path = BUILD_DIR):
+        self.source_dir = Path(source_dir)
+        self.build_dir = Path(build_dir)
+        self.assets: Dict[str, Asset] = {}
+        self.hashed_names: Dict[str, str] = {}
+    
+    # ==================== BUILD ====================
+    
+    def _sources(self) -> List[Path]:
+        return sorted(
+            path for path in self.source_dir.iterdir()
+            if path.is_file() and not path.name.startswith(".") and path.name not in SKIP_NAMES
+        )
+    
+    @staticmethod
+    def _hashed_name(path: Path, digest: str) -> str:
+        return f"{path.stem}.{digest[:12]}{path.suffix}"
+    
+    def _rewrite(self, text: str) -> str:
+        """Troca referências a assets ("app.js", '/icon.svg') pelos nomes com hash"""
+        def replace(match):
+            quote, slash, name = match.groups()
+            return f"{quote}/{self.hashed_names[name]}" if name in self.hashed_names else match.group(0)
+        return re.sub(r"""(["'])(/?)([\w.-]+\.\w+)(?=["'?#])""", replace, text)
+    
+    def build(self) -> "StaticSite":
+        if self.build_dir.exists():
+            shutil.rmtree(self.build_dir)
+        self.build_dir.mkdir(parents=True)
+        
+        sources = self._sources()
+        contents = {path.name: path.read_bytes() for path in sources}
+        stable = {path.name for path in sources if path.suffix == ".html" or path.name in STABLE_NAMES}
+        
+        # Só páginas e o service worker são reescritos; o hash dos demais vem do conteúdo original
+        for path in sources:
+            if path.name not in stable:
+                self.hashed_names[path.name] = self._hashed_name(path, hashlib.sha256(contents[path.name]).hexdigest())
+        
+        for path in sources:
+            data = contents[path.name]
+            if path.name in stable:
+                data = self._rewrite(data.decode("utf-8")).encode("utf-8")
+                self._add(f"/{path.name}", path, data, REVALIDATE)
+            else:
+                self._add(f"/{self.hashed_names[path.name]}", path, data, IMMUTABLE_CACHE_CONTROL)
+                # Nome original continua respondendo (service workers e páginas antigas)
+                self._add(f"/{path.name}", path, data, REVALIDATE)
+        
+        if "/index.html" in self.assets:
+            self.assets["/"] = self.assets["/index.html"]
+        return self
+    
+    def _add(self, url: str, source: Path, data: bytes, cache_control: str):
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        target = self.build_dir / url.lstrip("/")
+        target.write_bytes(data)
+        variants = {"identity": Variant(target, data, f'"{digest}"', None)}
+        
+        if source.suffix in COMPRESSIBLE_EXTENSIONS:
+            encoded = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                encoded["br"] = brotli.compress(data, quality=11)
+            for encoding, compressed in encoded.items():
+                if len(compressed) <= len(data) * MIN_SAVING:
+                    suffix = ".gz" if encoding == "gzip" else ".br"
+                    path = target.with_name(target.name + suffix)
+                    path.write_bytes(compressed)
+                    variants[encoding] = Variant(path, compressed, f'"{digest}-{suffix[1:]}"', encoding)
+        
+        media_type = mimetypes.guess_type(source.name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type.endswith(("javascript", "json")):
+            media_type += "; charset=utf-8"
+        self.assets[url] = Asset(media_type, cache_control, variants)
+    
+    # ==================== SERVIDOR ASGI ====================
+    
+    def _variant(self, asset: Asset, headers: dict) -> Variant:
+        # Range só vale para o conteúdo sem compressão
+        if b"range" in headers:
+            return asset.variants["identity"]
+        accepted = _accepts(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in asset.variants:
+                return asset.variants[encoding]
+        return asset.variants["identity"]
+    
+    def matches(self, scope) -> bool:
+        # Inclui "/" (index.html); o health check fica em /health
+        return scope["method"] in ("GET", "HEAD") and scope["path"] in self.assets
+    
+    async def __call__(self, scope, receive, send):
+        asset = self.assets[scope["path"]]
+        headers = dict(scope["headers"])
+        variant = self._variant(asset, headers)
+        response_headers = [
+            (b"content-type", asset.media_type.encode()),
+            (b"cache-control", asset.cache_control.encode()),
+            (b"etag", variant.etag.encode()),
+            (b"vary", b"Accept-Encoding"),
+            (b"accept-ranges", b"bytes"),
+        ]
+        if variant.encoding:
+            response_headers.append((b"content-encoding", variant.encoding.encode()))
+        
+        if_none_match = headers.get(b"if-none-match", b"").decode("latin-1")
+        if if_none_match and (if_none_match.strip() == "*" or variant.etag in [
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ]):
+            return await self._send(send, 304, response_headers, b"")
+        
+        data, status = variant.data, 200
+        range_header = headers.get(b"range", b"").decode("latin-1")
+        if_range = headers.get(b"if-range", b"").decode("latin-1")
+        if range_header and (not if_range or if_range == variant.etag):
+            byte_range = _parse_range(range_header, len(data))
+            if byte_range is not None:
+                start, end = byte_range
+                if start > end or start >= len(data):
+                    response_headers.append((b"content-range", f"bytes */{len(data)}".encode()))
+                    return await self._send(send, 416, response_headers, b"")
+                response_headers.append((b"content-range", f"bytes {start}-{end}/{len(data)}".encode()))
+                data, status = data[start:end + 1], 206
+        
+        response_headers.append((b"content-length", str(len(data)).encode()))
+        if scope["method"] == "HEAD":
+            return await self._send(send, status, response_headers, b"")
+        
+        # Servidor com a extensão pathsend (ex.: Granian, Hypercorn) manda o arquivo direto
+        if status == 200 and "http.response.pathsend" in scope.get("extensions", {}):
+            await send({"type": "http.response.start", "status": status, "headers": response_headers})
+            return await send({"type": "http.response.pathsend", "path": str(variant.path)})
+        await self._send(send, status, response_headers, data)
+    
+    @staticmethod
+    async def _send(send, status: int, headers: list, body):
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class StaticSiteMiddleware:
+    """Responde os assets do frontend antes das rotas da API (que não usam esses caminhos)"""
+    
+    def __init__(self, app, site: StaticSite):
+        self.app = app
+        self.site = site
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.site.matches(scope):
+            return await self.site(scope, receive, send)
+        await self.app(scope, receive, send)
@@ -0,0 +1,196 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# Id da requisição atual (a thread do threadpool herda o contexto)
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Atributos padrão do LogRecord; o resto veio em extra={...}
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+_VALID_REQUEST_ID = re.compile(r"[\w.:-]{1,64}")
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro, com os campos de extra={...}"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Só coloca o registro na fila; a formatação e a escrita ficam com a
+    thread do listener. Fila cheia descarta o registro (e conta) em vez
+    de travar a requisição.
+    """
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve agora o que depende da thread/contexto de quem logou
+        record.request_id = request_id_var.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """
+    Logs estruturados sem I/O no caminho da requisição
+    
+    Os loggers do pacote "app" escrevem numa fila limitada; uma thread
+    (QueueListener) tira os registros da fila, formata em JSON e escreve
+    no destino (stdout por padrão).
+    """
+    
+    def __init__(self, stream=None, level: str = "INFO", queue_size: int = 10000, logger_name: str = "app"):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.output = logging.StreamHandler(stream or sys.stdout)
+        self.output.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.queue, self.output, respect_handler_level=True)
+        self.logger = logging.getLogger(logger_name)
+        self.logger.setLevel(level)
+        self.logger.addHandler(self.handler)
+        self.logger.propagate = False
+        self._running = False
+    
+    @classmethod
+    def from_env(cls) -> "LogPipeline":
+        return cls(
+            level=os.getenv("LOG_LEVEL", "INFO").upper(),
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        )
+    
+    def start(self):
+        if not self._running:
+            self._running = True
+            self.listener.start()
+    
+    def stop(self):
+        """Esvazia a fila e para a thread (desligamento)"""
+        if self._running:
+            self._running = False
+            self.listener.stop()
+    
+    def close(self):
+        self.stop()
+        self.logger.removeHandler(self.handler)
+    
+    def stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "dropped": self.handler.dropped, "running": self._running}
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """ "/api/a=0.1,/api/b=0.5" -> {"/api/a": 0.1, "/api/b": 0.5} """
+    rates = {}
+    for item in value.split(","):
+        path, _, rate = item.strip().partition("=")
+        if path and rate:
+            rates[path.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class RequestLogMiddleware:
+    """
+    Id por requisição e log de acesso
+    
+    Reaproveita o X-Request-ID do cliente (ou gera um), devolve no
+    cabeçalho da resposta e deixa disponível para todo log feito durante
+    a requisição. Rotas de alto volume são amostradas (sample_rates);
+    erros 5xx e requisições lentas são sempre registrados.
+    """
+    
+    def __init__(self, app, logger: Optional[logging.Logger] = None,
+                 sample_rates: Optional[Dict[str, float]] = None, slow_ms: float = 1000.0):
+        self.app = app
+        self.logger = logger or logging.getLogger("app.access")
+        self.sample_rates = sample_rates or {}
+        self.slow_ms = slow_ms
+        self.random = random.random
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        incoming = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        request_id = incoming if _VALID_REQUEST_ID.fullmatch(incoming) else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+        
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            rate = self.sample_rates.get(scope["path"], 1.0)
+            if status >= 500 or duration_ms >= self.slow_ms or rate >= 1.0 or self.random() < rate:
+                self.logger.info(
+                    "%s %s %s", scope["method"], scope["path"], status,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status,
+                        "duration_ms": round(duration_ms, 2),
+                        "sample_rate": rate,
+                    }
+                )
+            request_id_var.reset(token)
+
+
+_log_pipeline: Optional[LogPipeline] = None
+
+
+def get_log_pipeline() -> LogPipeline:
+    """Instância única por processo"""
+    global _log_pipeline
+    if _log_pipeline is None:
+        _log_pipeline = LogPipeline.from_env()
+    return _log_pipeline
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo dos logs por requisição
+
+Compara a mesma rota sem log de acesso, com o log de acesso indo pela
+fila (LogPipeline) e com um StreamHandler comum escrevendo direto num
+destino lento (simula stdout bloqueado sob carga).
+
+    python bench_logging.py [requisições]
+"""
+
+import asyncio
+import io
+import logging
+import sys
+import time
+from fastapi import FastAPI
+from app.structured_logging import JsonFormatter, LogPipeline, RequestLogMiddleware
+
+SLOW_WRITE_SECONDS = 0.0005
+
+
+class SlowStream(io.StringIO):
+    """Destino que demora a cada escrita (pipe cheio, disco lento)"""
+    
+    def write(self, text):
+        time.sleep(SLOW_WRITE_SECONDS)
+        return super().write(text)
+
+
+def make_app():
+    app = FastAPI()
+    
+    @app.get("/api/calculator/calculate")
+    async def calculate():
+        return {"hourly_rate": 125.5}
+    
+    return app
+
+
+async def call(app, path: str):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        pass
+    
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+
+
+def measure(app, requests: int) -> float:
+    async def run():
+        for _ in range(100):
+            await call(app, "/api/calculator/calculate")
+        started = time.perf_counter()
+        for _ in range(requests):
+            await call(app, "/api/calculator/calculate")
+        return (time.perf_counter() - started) / requests * 1e6
+    return asyncio.run(run())
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    results = {"sem log de acesso": measure(make_app(), requests)}
+    
+    pipeline = LogPipeline(stream=SlowStream(), queue_size=requests + 1000, logger_name="app.bench.queue")
+    pipeline.start()
+    results["fila + thread, tudo registrado"] = measure(
+        RequestLogMiddleware(make_app(), logger=logging.getLogger("app.bench.queue")), requests
+    )
+    results["fila + thread, amostragem 10%"] = measure(
+        RequestLogMiddleware(
+            make_app(), logger=logging.getLogger("app.bench.queue"),
+            sample_rates={"/api/calculator/calculate": 0.1}
+        ), requests
+    )
+    pipeline.close()
+    
+    direct = logging.getLogger("app.bench.direct")
+    direct.propagate = False
+    direct.setLevel(logging.INFO)
+    handler = logging.StreamHandler(SlowStream())
+    handler.setFormatter(JsonFormatter())
+    direct.addHandler(handler)
+    results["StreamHandler direto (bloqueante)"] = measure(RequestLogMiddleware(make_app(), logger=direct), requests)
+    
+    baseline = results["sem log de acesso"]
+    print(f"{requests} requisições, escrita lenta de {SLOW_WRITE_SECONDS * 1e6:.0f}µs por linha")
+    for name, micros in results.items():
+        print(f"  {name:<36} {micros:8.1f} µs/req  (+{micros - baseline:7.1f} µs)")
+
+
+if __name__ == "__main__":
+    main()
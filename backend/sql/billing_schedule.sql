@@ -0,0 +1,25 @@
+-- Cobrança recorrente dos projetos: configuração no projeto e número da parcela em cada pagamento
+-- Gravados por BillingScheduleService.apply (billing_schedule_service.py)
+
+alter table projects add column if not exists billing_schedule jsonb;
+alter table payments add column if not exists installment_number integer;
+
+-- O agendador de vencimentos sincroniza por updated_at: toda alteração precisa movê-lo,
+-- inclusive as feitas fora do backend
+create or replace function touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists payments_touch_updated_at on payments;
+create trigger payments_touch_updated_at before update on payments
+    for each row execute function touch_updated_at();
+
+drop trigger if exists projects_touch_updated_at on projects;
+create trigger projects_touch_updated_at before update on projects
+    for each row execute function touch_updated_at();
@@ -0,0 +1,16 @@
+-- Pagamentos do Mercado Pago: cada pagamento gera no máximo uma assinatura e um registro
+-- O webhook e a reconciliação gravam com ON CONFLICT DO NOTHING; conflito = já processado
+-- (NULL não conflita: pagamentos de projeto não têm mercadopago_payment_id)
+
+do $$
+begin
+    if not exists (select 1 from pg_constraint where conname = 'subscriptions_mercadopago_payment_id_key') then
+        alter table subscriptions
+            add constraint subscriptions_mercadopago_payment_id_key unique (mercadopago_payment_id);
+    end if;
+    if not exists (select 1 from pg_constraint where conname = 'payments_mercadopago_payment_id_key') then
+        alter table payments
+            add constraint payments_mercadopago_payment_id_key unique (mercadopago_payment_id);
+    end if;
+end;
+$$;
@@ -0,0 +1,16 @@
+-- Avisos do usuário (lembrete de vencimento de pagamento)
+-- Gravados pelo job payment.due_reminder com ON CONFLICT DO NOTHING e lidos por GET /api/notifications
+
+create table if not exists notifications (
+    id uuid primary key default gen_random_uuid(),
+    user_id uuid not null references users (id) on delete cascade,
+    type text not null,
+    payment_id uuid references payments (id) on delete cascade,
+    due_date timestamptz,
+    message text not null,
+    created_at timestamptz not null default now(),
+    -- Um aviso por pagamento/vencimento: job repetido ou workers concorrentes não duplicam
+    unique (payment_id, type, due_date)
+);
+
+create index if not exists notifications_user_created on notifications (user_id, created_at desc);
@@ -0,0 +1,5 @@
+-- Reajuste pela inflação: último mês já aplicado em cada cálculo e projeto
+-- Gravado por POST /api/readjustments com apply=true; o próximo reajuste parte dele
+
+alter table calculations add column if not exists readjusted_through text;
+alter table projects add column if not exists readjusted_through text;
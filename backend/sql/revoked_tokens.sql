@@ -0,0 +1,13 @@
+-- Denylist compartilhada de tokens revogados (logout e rotação de refresh token)
+-- Lida e gravada por SupabaseRevocationStore (token_denylist.py)
+
+create table if not exists revoked_tokens (
+    -- "jti:<jti>" (token) ou "fam:<família>" (sessão de refresh inteira)
+    key text primary key,
+    -- Depois disso o token já expirou sozinho e a linha pode ser removida
+    expires_at timestamptz not null,
+    revoked_at timestamptz not null default now()
+);
+
+-- Sincronização incremental das réplicas: revoked_at >= cursor
+create index if not exists revoked_tokens_revoked_at on revoked_tokens (revoked_at);
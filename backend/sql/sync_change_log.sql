@@ -0,0 +1,75 @@
+-- Sincronização incremental do PWA: cursor por usuário e log de alterações
+-- Lido por SupabaseChangeLogStore (sync_service.py) e pela busca (search_service.py)
+
+create table if not exists sync_heads (
+    user_id uuid primary key references users (id) on delete cascade,
+    -- Último seq atribuído a uma escrita do usuário
+    seq bigint not null default 0,
+    -- Tombstones com seq até aqui já foram removidos (cursor anterior recebe reset)
+    compacted_seq bigint not null default 0
+);
+
+-- No máximo uma entrada por linha (viva ou apagada), com o seq da última escrita
+create table if not exists change_log (
+    user_id uuid not null references users (id) on delete cascade,
+    entity text not null,
+    row_id uuid not null,
+    seq bigint not null,
+    deleted boolean not null default false,
+    changed_at timestamptz not null default now(),
+    primary key (user_id, entity, row_id)
+);
+
+create index if not exists change_log_user_seq on change_log (user_id, seq);
+create index if not exists change_log_tombstones on change_log (changed_at, seq) where deleted;
+
+create or replace function sync_record_change()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_user_id uuid;
+    v_row_id uuid;
+    v_seq bigint;
+begin
+    if tg_op = 'DELETE' then
+        v_user_id := old.user_id;
+        v_row_id := old.id;
+    else
+        v_user_id := new.user_id;
+        v_row_id := new.id;
+    end if;
+    
+    -- O upsert trava a linha do usuário até o commit: escritores do mesmo
+    -- usuário ficam em fila e o seq cresce na ordem de commit
+    insert into sync_heads (user_id, seq)
+    values (v_user_id, 1)
+    on conflict (user_id) do update set seq = sync_heads.seq + 1
+    returning seq into v_seq;
+    
+    insert into change_log (user_id, entity, row_id, seq, deleted, changed_at)
+    values (v_user_id, tg_table_name, v_row_id, v_seq, tg_op = 'DELETE', now())
+    on conflict (user_id, entity, row_id) do update
+        set seq = excluded.seq,
+            deleted = excluded.deleted,
+            changed_at = excluded.changed_at;
+    
+    return null;
+end;
+$$;
+
+drop trigger if exists sync_change_log on clients;
+create trigger sync_change_log after insert or update or delete on clients
+    for each row execute function sync_record_change();
+
+drop trigger if exists sync_change_log on projects;
+create trigger sync_change_log after insert or update or delete on projects
+    for each row execute function sync_record_change();
+
+drop trigger if exists sync_change_log on payments;
+create trigger sync_change_log after insert or update or delete on payments
+    for each row execute function sync_record_change();
+
+drop trigger if exists sync_change_log on calculations;
+create trigger sync_change_log after insert or update or delete on calculations
+    for each row execute function sync_record_change();
@@ -0,0 +1,63 @@
+-- Registro de horas: lançamentos e totais por projeto/mês na mesma transação
+-- Usado por SupabaseTimeStore.record (client.rpc("record_time_entries", ...))
+
+-- Lançamentos só de inserção: uma correção é um lançamento inverso (voids = id do original)
+create table if not exists time_entries (
+    id uuid primary key default gen_random_uuid(),
+    user_id uuid not null references users (id) on delete cascade,
+    project_id uuid not null references projects (id) on delete cascade,
+    started_at timestamptz not null,
+    ended_at timestamptz not null,
+    -- Negativo nos lançamentos que anulam outro
+    seconds integer not null,
+    notes text,
+    voids uuid references time_entries (id),
+    created_at timestamptz not null default now()
+);
+
+-- Cada lançamento só pode ser anulado uma vez (anulações simultâneas: a segunda dá 409)
+create unique index if not exists time_entries_voids on time_entries (voids) where voids is not null;
+create index if not exists time_entries_user_created on time_entries (user_id, created_at);
+
+-- Totais por projeto e mês ("AAAA-MM"), somados na mesma transação dos lançamentos
+create table if not exists time_rollups (
+    user_id uuid not null references users (id) on delete cascade,
+    project_id uuid not null references projects (id) on delete cascade,
+    month text not null,
+    seconds bigint not null default 0,
+    entries integer not null default 0
+);
+
+create unique index if not exists time_rollups_user_project_month
+    on time_rollups (user_id, project_id, month);
+
+-- Um timer rodando por usuário: o segundo start simultâneo esbarra na primary key (409)
+create table if not exists time_timers (
+    user_id uuid primary key references users (id) on delete cascade,
+    project_id uuid not null references projects (id) on delete cascade,
+    started_at timestamptz not null,
+    notes text
+);
+
+create or replace function record_time_entries(p_user_id uuid, p_entries jsonb, p_rollups jsonb)
+returns setof time_entries
+language plpgsql
+as $$
+begin
+    -- Incremento atômico: gravações simultâneas do mesmo mês não se sobrescrevem
+    insert into time_rollups (user_id, project_id, month, seconds, entries)
+    select p_user_id, r.project_id, r.month, r.seconds, r.entries
+    from jsonb_to_recordset(p_rollups) as r(project_id uuid, month text, seconds bigint, entries integer)
+    on conflict (user_id, project_id, month) do update
+        set seconds = time_rollups.seconds + excluded.seconds,
+            entries = time_rollups.entries + excluded.entries;
+    
+    return query
+    insert into time_entries (user_id, project_id, started_at, ended_at, seconds, notes, voids)
+    select p_user_id, e.project_id, e.started_at, e.ended_at, e.seconds, e.notes, e.voids
+    from jsonb_to_recordset(p_entries) as e(
+        project_id uuid, started_at timestamptz, ended_at timestamptz, seconds integer, notes text, voids uuid
+    )
+    returning *;
+end;
+$$;
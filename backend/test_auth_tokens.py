@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Testes dos tokens de acesso curtos, refresh com rotação e revogação
+"""
+
+import time
+from datetime import timedelta
+from jose import jwt
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+from app import main
+from app.main import app, token_denylist
+from app.services.auth_service import AuthService, SECRET_KEY, ALGORITHM
+from app.services.token_denylist import TokenDenylist, SupabaseRevocationStore
+
+
+class MemoryStore:
+    """Armazenamento compartilhado falso (simula a tabela revoked_tokens)"""
+    
+    def __init__(self):
+        self.rows = []
+    
+    def add(self, key, expires_at):
+        self.rows.append((key, expires_at, f"{time.time():.6f}"))
+    
+    def claim(self, key, expires_at):
+        for row in self.rows:
+            if row[0] == key:
+                return False, float(row[2])
+        self.add(key, expires_at)
+        return True, float(self.rows[-1][2])
+    
+    def fetch_since(self, since):
+        return [row for row in self.rows if since is None or row[2] >= since]
+
+
+def auth_header(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_refresh_rotates_and_reuse_ends_session(monkeypatch):
+    monkeypatch.setattr(token_denylist, "store", None)
+    client = TestClient(app)
+    tokens = AuthService.create_token_pair("user-1", "ana@freela.com.br")
+    claims = jwt.decode(tokens["access_token"], SECRET_KEY, algorithms=[ALGORITHM])
+    assert claims["exp"] - claims["iat"] == 15 * 60
+    
+    # Refresh token não serve como token de acesso
+    assert client.post("/api/auth/logout", headers=auth_header(tokens["refresh_token"])).status_code == 401
+    
+    rotated = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert rotated.status_code == 200
+    new_tokens = rotated.json()
+    assert new_tokens["refresh_token"] != tokens["refresh_token"]
+    
+    # Logo após a troca (outra aba, requisição simultânea): o mesmo par novo
+    repeated = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert repeated.status_code == 200
+    assert repeated.json() == new_tokens
+    
+    # Fora da janela, reutilizar o refresh token antigo derruba a sessão inteira
+    monkeypatch.setattr(main, "REFRESH_GRACE_SECONDS", -1)
+    reused = client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert reused.status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": new_tokens["refresh_token"]}).status_code == 401
+    assert client.post("/api/auth/logout", headers=auth_header(new_tokens["access_token"])).status_code == 401
+
+
+def test_logout_revokes_cached_access_token(monkeypatch):
+    monkeypatch.setattr(token_denylist, "store", None)
+    client = TestClient(app)
+    tokens = AuthService.create_token_pair("user-2", "bia@freela.com.br")
+    headers = auth_header(tokens["access_token"])
+    
+    # Primeira chamada coloca o token no cache compartilhado
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+    assert client.post("/api/auth/logout", headers=headers).status_code == 401
+    assert client.post("/api/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    
+    # Tokens antigos, sem jti, não são mais aceitos
+    legacy = jwt.encode(
+        {"sub": "user-2", "email": "bia@freela.com.br", "exp": int(time.time()) + 3600},
+        SECRET_KEY, algorithm=ALGORITHM
+    )
+    assert client.post("/api/auth/logout", headers=auth_header(legacy)).status_code == 401
+    assert len(token_denylist) >= 1
+
+
+def test_revocations_reach_other_workers_incrementally():
+    store = MemoryStore()
+    worker_a, worker_b = TokenDenylist(store), TokenDenylist(store)
+    
+    first = jwt.decode(
+        AuthService.create_access_token({"sub": "u", "email": "e"}, timedelta(minutes=5)),
+        SECRET_KEY, algorithms=[ALGORITHM]
+    )
+    worker_a.revoke_token(first)
+    assert worker_a.is_revoked(first)
+    assert not worker_b.is_revoked(first)
+    
+    worker_b.sync()
+    assert worker_b.is_revoked(first)
+    
+    # Só as revogações novas são relidas depois do cursor
+    second = {"jti": "abc", "exp": time.time() + 60}
+    worker_a.revoke_token(second)
+    seen = []
+    original = store.fetch_since
+    store.fetch_since = lambda since: seen.extend(original(since)) or original(since)
+    worker_b.sync()
+    assert worker_b.is_revoked(second)
+    assert len(seen) <= 2
+    
+    # Entradas de tokens já expirados são descartadas
+    worker_b._remember(TokenDenylist.token_key("old"), time.time() - 1)
+    worker_b._next_purge = 0
+    worker_b.sync()
+    assert TokenDenylist.token_key("old") not in worker_b._entries
+
+
+def test_refresh_is_consumed_once_across_workers():
+    store = MemoryStore()
+    worker_a, worker_b = TokenDenylist(store), TokenDenylist(store)
+    refresh = jwt.decode(
+        AuthService.create_token_pair("user-3", "caio@freela.com.br")["refresh_token"],
+        SECRET_KEY, algorithms=[ALGORITHM]
+    )
+    
+    first, rotated_at = worker_a.consume(refresh)
+    again, seen_at = worker_b.consume(refresh)
+    assert first and not again
+    assert seen_at == rotated_at
+    
+    # Os dois workers assinam exatamente o mesmo par
+    pair = AuthService.rotate_token_pair(refresh, rotated_at)
+    assert AuthService.rotate_token_pair(refresh, seen_at) == pair
+    new_refresh = AuthService.verify_token(pair["refresh_token"], "refresh")
+    assert new_refresh["fam"] == refresh["fam"]
+    assert new_refresh["jti"] != refresh["jti"]
+
+
+class ConflictingTable:
+    """Tabela revoked_tokens falsa: INSERT de chave repetida viola a primary key"""
+    
+    def __init__(self, rows: dict):
+        self.rows = rows
+        self.operation = None
+    
+    def insert(self, row):
+        self.operation = ("insert", row)
+        return self
+    
+    def select(self, columns):
+        return self
+    
+    def eq(self, column, value):
+        self.operation = ("select", value)
+        return self
+    
+    def execute(self):
+        kind, value = self.operation
+        if kind == "insert":
+            if value["key"] in self.rows:
+                raise APIError({"code": "23505", "message": "duplicate key value"})
+            self.rows[value["key"]] = value
+            return type("Result", (), {"data": [value]})()
+        return type("Result", (), {"data": [self.rows[value]]})()
+
+
+def test_supabase_store_claim_uses_unique_key():
+    rows = {}
+    client = type("Client", (), {"table": lambda self, name: ConflictingTable(rows)})()
+    store = SupabaseRevocationStore(client)
+    
+    first, rotated_at = store.claim("jti:abc", time.time() + 60)
+    again, seen_at = store.claim("jti:abc", time.time() + 60)
+    assert first and not again
+    assert seen_at == rotated_at
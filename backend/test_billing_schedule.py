@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Testes da cobrança recorrente (parcelas geradas em lote e edição incremental)
+"""
+
+from datetime import date
+from decimal import Decimal
+from app.models import BillingSchedule
+from app.services.billing_schedule_service import BillingScheduleService, add_months
+
+
+def stored(changes: dict, paid_numbers=()) -> list:
+    """Simula a gravação das parcelas inseridas"""
+    return [
+        {
+            "id": f"pay-{item['installment_number']}",
+            "installment_number": item["installment_number"],
+            "due_date": item["due_date"].isoformat() + "T00:00:00",
+            "amount": str(item["amount"]),
+            "status": "PAID" if item["installment_number"] in paid_numbers else "PENDING",
+        }
+        for item in changes["insert"]
+    ]
+
+
+def test_installments_split_value_and_clamp_month_end():
+    assert add_months(date(2026, 1, 31), 1) == date(2026, 2, 28)
+    assert add_months(date(2026, 11, 30), 3) == date(2027, 2, 28)
+    
+    schedule = BillingSchedule(start_date=date(2026, 1, 31), installments=3)
+    BillingScheduleService.validate(schedule)
+    plan = BillingScheduleService.plan(schedule, Decimal("1000.00"), today=date(2026, 1, 1))
+    assert [item["due_date"] for item in plan] == [date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31)]
+    assert [item["amount"] for item in plan] == [Decimal("333.33"), Decimal("333.33"), Decimal("333.34")]
+    
+    biweekly = BillingSchedule(frequency="BIWEEKLY", start_date=date(2026, 1, 5), amount=Decimal("400"), end_date=date(2026, 2, 20))
+    plan = BillingScheduleService.plan(biweekly, Decimal("1"), today=date(2026, 1, 1))
+    assert [item["due_date"].day for item in plan] == [5, 19, 2, 16]
+    
+    try:
+        BillingScheduleService.validate(BillingSchedule(start_date=date(2026, 1, 1)))
+        assert False, "cobrança sem valor nem parcelas deveria falhar"
+    except ValueError:
+        pass
+
+
+def test_retainer_is_generated_over_rolling_horizon(monkeypatch):
+    monkeypatch.setattr(BillingScheduleService, "HORIZON_DAYS", 90)
+    retainer = BillingSchedule(start_date=date(2026, 1, 10), amount=Decimal("2500"))
+    
+    first = BillingScheduleService.diff(retainer, Decimal("1"), [], today=date(2026, 1, 1))
+    assert [item["installment_number"] for item in first["insert"]] == [1, 2, 3]
+    
+    # Um mês depois o horizonte anda e só a parcela nova é gerada
+    rows = stored(first)
+    later = BillingScheduleService.diff(retainer, Decimal("1"), rows, today=date(2026, 2, 1))
+    assert [item["installment_number"] for item in later["insert"]] == [4]
+    assert later["update"] == [] and later["delete"] == []
+
+
+def test_editing_schedule_only_touches_future_pending_installments(monkeypatch):
+    monkeypatch.setattr(BillingScheduleService, "HORIZON_DAYS", 400)
+    schedule = BillingSchedule(start_date=date(2026, 1, 5), installments=12, amount=Decimal("500"))
+    rows = stored(BillingScheduleService.diff(schedule, Decimal("1"), [], today=date(2026, 1, 1)), paid_numbers={1, 2})
+    assert len(rows) == 12
+    
+    # Reajuste nas parcelas futuras e contrato encurtado para 10 parcelas
+    edited = BillingSchedule(start_date=date(2026, 1, 5), installments=10, amount=Decimal("550"))
+    changes = BillingScheduleService.diff(edited, Decimal("1"), rows, today=date(2026, 3, 20))
+    assert [item["installment_number"] for item in changes["update"]] == [4, 5, 6, 7, 8, 9, 10]
+    assert all(item["amount"] == Decimal("550") for item in changes["update"])
+    assert changes["delete"] == ["pay-11", "pay-12"]
+    assert changes["insert"] == []
+    # Pagas (1, 2) e a pendente vencida (3) ficam como estão
+    assert changes["kept"] == 3
+    
+    # Sem mudança nada é regravado
+    same = BillingScheduleService.diff(schedule, Decimal("1"), rows, today=date(2026, 3, 20))
+    assert same["update"] == [] and same["delete"] == [] and same["kept"] == 12
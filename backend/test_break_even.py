@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Testes do índice de pontos de equilíbrio entre regimes
+Compara os cruzamentos exatos com uma varredura numérica e com o
+/api/calculator/compare (mesmo modelo: pró-labore desejado)
+"""
+
+from decimal import Decimal
+import numpy as np
+from app.models import CalculatorInput
+from app.services.break_even_service import BreakEvenService, REGIMES
+from app.services.compare_service import CompareService
+from app.services.tax_arrays import monthly_taxes
+
+
+def test_crossovers_match_numeric_scan():
+    income = np.arange(1, 60000, 0.5)
+    crossovers = BreakEvenService.lookup()["crossovers"]
+    
+    for i, first in enumerate(REGIMES):
+        for second in REGIMES[i + 1:]:
+            difference = monthly_taxes(income, first) - monthly_taxes(income, second)
+            scanned = income[1:][np.sign(difference[1:]) != np.sign(difference[:-1])]
+            
+            exact = [
+                crossover["desired_monthly_income"] for crossover in crossovers
+                if crossover["regimes"] == [first, second] and crossover["desired_monthly_income"] < 59999
+            ]
+            assert len(exact) == len(scanned), (first, second)
+            for expected, found in zip(exact, scanned):
+                assert abs(expected - found) <= 0.5
+
+
+def test_simples_cheaper_than_mei_only_below_das():
+    result = BreakEvenService.lookup(regimes=["MEI", "PJ_SIMPLES"], monthly_expenses=500, variable_expenses=200)
+    crossover = result["crossovers"][0]
+    
+    # 6% do pró-labore = DAS do MEI
+    assert crossover["desired_monthly_income"] == 1365.0
+    assert crossover["cheaper_above"] == "MEI"
+    # Faturamento: (1365 * (1 + 1/12 + 1/36) + 700 + 81.90) / 0.8
+    assert crossover["monthly_revenue"] == 2873.21
+    assert crossover["within_limits"] is True
+    assert result["regime_limits"]["MEI"]["monthly_revenue"] == 6750.0
+
+
+def test_crossovers_agree_with_compare_service():
+    base = CalculatorInput(
+        desired_monthly_income=Decimal("1000"), hours_per_day=8, days_per_week=5, tax_regime="MEI",
+        monthly_expenses=Decimal("500"), variable_expenses=Decimal("200"),
+    )
+    result = BreakEvenService.lookup(monthly_expenses=500, variable_expenses=200)
+    assert result["crossovers"]
+    for crossover in result["crossovers"]:
+        income = crossover["desired_monthly_income"]
+        matrix = CompareService.matrix(base, [income - 1, income + 1], REGIMES)
+        cost = {regime: matrix["total_monthly_cost"][row] for row, regime in enumerate(REGIMES)}
+        below, above = crossover["cheaper_below"], crossover["cheaper_above"]
+        assert cost[below][0] <= cost[above][0], crossover
+        assert cost[above][1] <= cost[below][1], crossover
+        # Faturamento do cruzamento = monthly_rate do compare no mesmo pró-labore
+        rate = CompareService.matrix(base, [income], [below])["monthly_rate"][0, 0]
+        assert abs(rate - crossover["monthly_revenue"]) <= 0.02
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Testes dos circuit breakers do Supabase e do Mercado Pago
+Usa um PostgREST local com falhas injetadas (fora, lento, erro de consulta)
+"""
+
+import uuid
+import httpx
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+import app.main as main
+from app.main import app, token_denylist
+from app.services.auth_service import AuthService
+from app.services.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    GuardedSupabase,
+    GuardedMercadoPago,
+    is_supabase_failure,
+    is_mercadopago_failure_result,
+)
+from app.services.shared_cache import get_shared_cache
+
+
+class FaultyPostgrest:
+    """
+    Client com a mesma cadeia table().select().eq().execute() do supabase-py
+    
+    mode: "ok", "down" (conexão recusada), "slow" (estoura o timeout do
+    client, como o httpx faz) ou "bad_query" (erro 4xx do PostgREST)
+    """
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.mode = "ok"
+        self.executed = 0
+    
+    def table(self, name):
+        return FaultyQuery(self)
+
+
+class FaultyQuery:
+    def __init__(self, client):
+        self.client = client
+        self.filters = {}
+    
+    def select(self, columns):
+        return self
+    
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+    
+    @property
+    def not_(self):
+        return self
+    
+    def execute(self):
+        self.client.executed += 1
+        mode = self.client.mode
+        if mode == "down":
+            raise httpx.ConnectError("Connection refused")
+        if mode == "slow":
+            raise httpx.ReadTimeout("timed out")
+        if mode == "bad_query":
+            raise APIError({"message": "column does not exist", "code": "42703"})
+        rows = [row for row in self.client.rows if all(row.get(k) == v for k, v in self.filters.items())]
+        return type("Result", (), {"data": rows})()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_opens_fails_fast_and_probes_half_open():
+    clock = Clock()
+    breaker = CircuitBreaker("supabase", failure_threshold=3, reset_timeout=30, is_failure=is_supabase_failure, clock=clock)
+    backend = FaultyPostgrest([{"id": "u1"}])
+    client = GuardedSupabase(backend, breaker)
+    
+    # Erro de consulta não é falha da dependência
+    backend.mode = "bad_query"
+    for _ in range(5):
+        try:
+            client.table("users").select("id").execute()
+        except APIError:
+            pass
+    assert breaker.state == "closed"
+    
+    backend.mode = "slow"
+    for _ in range(3):
+        try:
+            client.table("users").select("id").not_.eq("id", "x").execute()
+        except httpx.ReadTimeout:
+            pass
+    assert breaker.state == "open"
+    
+    # Aberto: nenhuma chamada chega ao backend
+    executed = backend.executed
+    clock.now += 10
+    try:
+        client.table("users").select("id").execute()
+        raise AssertionError("deveria falhar rápido")
+    except CircuitOpenError as e:
+        assert e.retry_after == 20
+    assert backend.executed == executed
+    
+    # Meio aberto: o teste falha e o circuito volta a abrir
+    clock.now += 20
+    assert breaker.state == "half_open"
+    backend.mode = "down"
+    try:
+        client.table("users").select("id").execute()
+    except httpx.ConnectError:
+        pass
+    assert breaker.state == "open" and breaker.opened == 2
+    
+    # Um teste por vez; sucesso fecha o circuito
+    clock.now += 30
+    assert breaker._acquire() is True
+    try:
+        breaker.call(lambda: None)
+        raise AssertionError("só um teste por vez")
+    except CircuitOpenError:
+        pass
+    breaker._record(False, True)
+    backend.mode = "ok"
+    assert client.table("users").select("id").eq("id", "u1").execute().data == [{"id": "u1"}]
+    assert breaker.stats()["state"] == "closed" and breaker.stats()["consecutive_failures"] == 0
+
+
+def test_mercadopago_error_responses_count_as_failures():
+    class FakePayment:
+        def __init__(self):
+            self.status = 500
+        
+        def get(self, payment_id):
+            return {"status": self.status, "response": {"id": payment_id}}
+    
+    payment = FakePayment()
+    sdk = type("SDK", (), {"payment": lambda self: payment})()
+    breaker = CircuitBreaker("mercadopago", failure_threshold=2, is_failure_result=is_mercadopago_failure_result)
+    mp = GuardedMercadoPago(sdk, breaker)
+    
+    assert mp.payment().get(1)["status"] == 500
+    payment.status = 404
+    mp.payment().get(2)
+    payment.status = 500
+    mp.payment().get(3)
+    assert breaker.state == "closed"
+    mp.payment().get(4)
+    assert breaker.state == "open"
+    assert breaker.stats()["last_error"] == "resposta 500"
+
+
+def test_degraded_supabase_serves_stale_status_and_keeps_calculator(monkeypatch):
+    clock = Clock()
+    breaker = CircuitBreaker("supabase", failure_threshold=2, reset_timeout=30, is_failure=is_supabase_failure, clock=clock)
+    user_id = f"user-{uuid.uuid4().hex[:8]}"
+    backend = FaultyPostgrest([{
+        "id": user_id, "is_pro": True, "subscription_status": "active",
+        "subscription_plan": "annual", "subscription_end_date": "2099-01-01T00:00:00+00:00",
+    }])
+    monkeypatch.setattr(token_denylist, "store", None)
+    monkeypatch.setattr(main, "supabase", GuardedSupabase(backend, breaker))
+    monkeypatch.setattr(main, "supabase_breaker", breaker)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {AuthService.create_token_pair(user_id, 'ana@freela.com.br')['access_token']}"}
+    other = {"Authorization": f"Bearer {AuthService.create_token_pair('sem-cache', 'bia@freela.com.br')['access_token']}"}
+    
+    assert client.get("/api/subscription/status", headers=headers).json()["is_pro"] is True
+    assert client.get("/health").json()["circuit_breakers"]["supabase"]["state"] == "closed"
+    
+    # Cache curto expirou e o Supabase caiu: vale o último status conhecido
+    get_shared_cache().delete(main._subscription_cache_key(user_id))
+    backend.mode = "down"
+    degraded = client.get("/api/subscription/status", headers=headers).json()
+    assert degraded["is_pro"] is True and degraded["stale"] is True
+    assert client.get("/api/subscription/status", headers=other).status_code == 500
+    
+    health = client.get("/health").json()
+    assert health["status"] == "degraded"
+    assert health["circuit_breakers"]["supabase"]["state"] == "open"
+    
+    # Aberto: sem reserva, 503 imediato com Retry-After
+    executed = backend.executed
+    unavailable = client.get("/api/subscription/status", headers=other)
+    assert unavailable.status_code == 503 and unavailable.headers["retry-after"] == "30"
+    assert client.get("/api/subscription/status", headers=headers).json()["stale"] is True
+    assert backend.executed == executed
+    
+    # Calculadora não depende do banco
+    calculated = client.post("/api/calculator/calculate", headers=headers, json={
+        "desired_monthly_income": 8000, "hours_per_day": 8, "days_per_week": 5, "tax_regime": "MEI",
+    })
+    assert calculated.status_code == 200 and float(calculated.json()["hourly_rate"]) > 0
+    
+    # Supabase voltou: o teste do meio aberto fecha o circuito
+    backend.mode = "ok"
+    clock.now += 30
+    assert client.get("/api/subscription/status", headers=headers).json().get("stale") is None
+    assert client.get("/health").json()["status"] == "healthy"
+    main.invalidate_subscription_status(user_id)
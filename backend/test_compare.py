@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Testes da comparação de regimes em lote (mesmos números do CalculatorService)
+"""
+
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import CalculatorInput
+from app.services.calculator_service import CalculatorService
+from app.services.compare_service import CompareService
+from app.services.tax_rules_service import TaxRulesService
+
+INCOMES = [500, 1365, 3000, 5000, 6750, 12000, 25000, 60000]
+
+FIELDS = {
+    "monthly_taxes": "monthly_taxes",
+    "monthly_provisions": "monthly_provisions",
+    "total_monthly_cost": "total_monthly_costs",
+    "monthly_rate": "monthly_rate",
+    "hourly_rate": "hourly_rate",
+    "daily_rate": "daily_rate",
+}
+
+
+def test_matrix_matches_calculator_for_every_regime():
+    regimes = TaxRulesService.regimes()
+    for options in (
+        {},
+        {"include_13th_salary": False, "include_vacation_bonus": False, "vacation_weeks": 0, "profit_margin_percentage": Decimal("0")},
+        {"hours_per_day": 6, "days_per_week": 4, "monthly_expenses": Decimal("1500"), "profit_margin_percentage": Decimal("35")},
+    ):
+        base = CalculatorInput(**{
+            "desired_monthly_income": Decimal("1000"), "hours_per_day": 8, "days_per_week": 5, "tax_regime": regimes[0],
+            "monthly_expenses": Decimal("500"), "variable_expenses": Decimal("200"), **options,
+        })
+        matrix = CompareService.matrix(base, INCOMES, regimes)
+        for row, regime in enumerate(regimes):
+            for column, income in enumerate(INCOMES):
+                expected = CalculatorService.calculate(base.model_copy(update={
+                    "desired_monthly_income": Decimal(income), "tax_regime": regime,
+                }))
+                for metric, field in FIELDS.items():
+                    assert abs(float(matrix[metric][row, column]) - float(getattr(expected, field))) <= 0.02, (
+                        regime, income, metric
+                    )
+
+
+def test_compare_route_batch_and_single():
+    client = TestClient(app)
+    batch = client.get("/api/calculator/compare", params={"incomes": [3000, 5000]}).json()
+    single = client.get("/api/calculator/compare", params={"monthly_income": 5000}).json()
+    assert batch["regimes"] == TaxRulesService.regimes()
+    for row, comparison in enumerate(single["comparisons"]):
+        assert comparison["hourly_rate"] == batch["metrics"]["hourly_rate"][row][1]
+        assert comparison["monthly_taxes"] == batch["metrics"]["monthly_taxes"][row][1]
+    
+    assert client.get("/api/calculator/compare", params={"income_start": 1000, "income_end": 100000, "income_step": 1}).status_code == 400
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Testes do agendador de vencimentos (heap de due_date, OVERDUE em lote e lembretes)
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from app.services.due_date_scheduler import DueDateScheduler
+
+DAY = 86400
+
+
+class MemoryStore:
+    """Tabela payments falsa: guarda os lotes marcados como OVERDUE"""
+    
+    def __init__(self, rows=None):
+        self.rows = rows or []
+        self.batches = []
+    
+    def fetch_changed(self, since):
+        return [row for row in self.rows if since is None or row["updated_at"] >= since]
+    
+    def mark_overdue(self, payment_ids):
+        self.batches.append(list(payment_ids))
+        return [{"id": payment_id} for payment_id in payment_ids]
+
+
+def payment(payment_id: str, due_at: float, status: str = "PENDING") -> dict:
+    return {
+        "id": payment_id,
+        "user_id": "user-1",
+        "project_id": "project-1",
+        "amount": "1500.00",
+        "due_date": datetime.fromtimestamp(due_at).isoformat(),
+        "status": status,
+        "updated_at": datetime.fromtimestamp(due_at - 30 * DAY).isoformat(),
+    }
+
+
+def test_overdue_in_batches_and_incremental_changes():
+    now = float(int(time.time()))
+    store = MemoryStore()
+    scheduler = DueDateScheduler(store, reminder_days=0)
+    scheduler.load(
+        [payment(f"late-{i}", now - i - 1) for i in range(450)]
+        + [payment(f"future-{i}", now + DAY) for i in range(10)]
+        + [payment("paid", now - 10, status="PAID")]
+    )
+    assert len(scheduler) == 460
+    
+    result = scheduler.run_due(now)
+    assert result["overdue"] == 450
+    assert [len(batch) for batch in store.batches] == [200, 200, 50]
+    assert len(scheduler) == 10
+    
+    # Pago antes de vencer sai do heap; vencimento adiado não vence na data antiga
+    scheduler.track({**payment("future-0", now + DAY), "status": "PAID"})
+    scheduler.track(payment("future-1", now + 3 * DAY))
+    store.batches.clear()
+    scheduler.run_due(now + DAY)
+    assert sorted(store.batches[0]) == [f"future-{i}" for i in range(2, 10)]
+    assert scheduler.run_due(now + DAY)["overdue"] == 0
+    
+    scheduler.run_due(now + 3 * DAY)
+    assert store.batches[-1] == ["future-1"]
+    assert len(scheduler) == 0
+
+
+def test_reminders_fire_once_before_due_date():
+    now = float(int(time.time()))
+    sent = []
+    scheduler = DueDateScheduler(MemoryStore(), on_reminder=sent.extend, reminder_days=2)
+    scheduler.track(payment("soon", now + DAY))
+    scheduler.track(payment("later", now + 5 * DAY))
+    
+    # "soon" já está dentro da janela de 2 dias
+    scheduler.run_due(now)
+    assert [reminder["id"] for reminder in sent] == ["soon"]
+    scheduler.track(payment("soon", now + DAY))
+    scheduler.run_due(now + 60)
+    assert len(sent) == 1
+    
+    scheduler.run_due(now + 3 * DAY + 1)
+    assert [reminder["id"] for reminder in sent] == ["soon", "later"]
+    
+    # Vencimento remarcado gera um novo lembrete
+    scheduler.track(payment("later", now + 10 * DAY))
+    scheduler.run_due(now + 8 * DAY + 1)
+    assert [reminder["id"] for reminder in sent] == ["soon", "later", "later"]
+
+
+def test_date_only_due_date_expires_at_end_of_day():
+    """Vence em 10/05: ainda em dia às 23:59:59, OVERDUE a partir de 11/05 00:00"""
+    store = MemoryStore()
+    scheduler = DueDateScheduler(store, reminder_days=0)
+    scheduler.track({**payment("date-only", 0), "due_date": "2024-05-10"})
+    scheduler.track({**payment("midnight", 0), "due_date": "2024-05-10T00:00:00"})
+    scheduler.track({**payment("timed", 0), "due_date": "2024-05-10T15:00:00"})
+    
+    scheduler.run_due(datetime(2024, 5, 10, 15, 0).timestamp())
+    assert store.batches == [["timed"]]
+    
+    assert scheduler.run_due(datetime(2024, 5, 10, 23, 59, 59).timestamp())["overdue"] == 0
+    scheduler.run_due(datetime(2024, 5, 11).timestamp())
+    assert sorted(store.batches[-1]) == ["date-only", "midnight"]
+
+def test_loop_wakes_up_at_the_due_time():
+    store = MemoryStore()
+    scheduler = DueDateScheduler(store, reminder_days=0)
+    
+    async def scenario():
+        await scheduler.start()
+        await asyncio.sleep(0.05)
+        due_at = time.time() + 0.3
+        scheduler.track(payment("p1", due_at))
+        while not store.batches:
+            assert time.time() < due_at + 2, "pagamento não foi marcado"
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return time.time() - due_at
+    
+    delay = asyncio.run(scenario())
+    assert 0 <= delay < 0.2
+    assert store.batches == [["p1"]]
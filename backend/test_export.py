@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Testes da exportação em streaming (CSV e XLSX)
+A fonte de dados falsa gera as páginas sob demanda a partir do cursor
+"""
+
+import csv
+import io
+import tracemalloc
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from app.services.export_service import ExportService
+
+BASE_DATE = datetime(2024, 1, 1)
+
+
+def make_fetcher(total: int, calls: list):
+    """Simula a tabela de pagamentos ordenada por (created_at, id)"""
+    def row(i: int) -> dict:
+        # Dois pagamentos por segundo: o id desempata o created_at
+        created_at = (BASE_DATE + timedelta(seconds=i // 2)).isoformat()
+        return {
+            "id": f"pay-{i:08d}",
+            "project_id": f"proj-{i % 7}",
+            "amount": 100 + i,
+            "due_date": created_at,
+            "status": "PAID",
+            "payment_date": None,
+            "notes": "Parcela; \"única\" & <final>",
+            "created_at": created_at,
+            "updated_at": None,
+        }
+    
+    def fetch_page(table, columns, cursor, limit):
+        calls.append(cursor)
+        start = 0
+        if cursor is not None:
+            start = int(cursor[1].split("-")[1]) + 1
+        return [row(i) for i in range(start, min(start + limit, total))]
+    
+    return fetch_page
+
+
+def test_csv_pages_with_cursor_and_keeps_every_row():
+    calls = []
+    total = 1234
+    chunks = list(ExportService.stream("payments", "csv", make_fetcher(total, calls)))
+    text = b"".join(chunks).decode("utf-8")
+    
+    assert text.startswith("﻿")
+    rows = list(csv.reader(io.StringIO(text[1:]), delimiter=";"))
+    assert rows[0][:3] == ["id", "projeto_id", "valor"]
+    assert len(rows) == total + 1
+    assert rows[-1][0] == f"pay-{total - 1:08d}"
+    assert rows[1][6] == "Parcela; \"única\" & <final>"
+    
+    # Uma página a cada 500 linhas, sempre continuando do último cursor
+    assert calls[0] is None
+    assert len(calls) == 3
+    assert all(len(chunk) <= ExportService.CHUNK_SIZE * 2 for chunk in chunks)
+
+
+def test_xlsx_is_valid_workbook():
+    calls = []
+    data = b"".join(ExportService.stream("payments", "xlsx", make_fetcher(800, calls)))
+    
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert "xl/workbook.xml" in archive.namelist()
+        sheet = ET.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    
+    ns = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+    rows = sheet.findall("s:sheetData/s:row", ns)
+    assert len(rows) == 801
+    first = rows[1].findall("s:c", ns)
+    assert first[2].find("s:v", ns).text == "100"
+    assert first[6].find("s:is/s:t", ns).text == "Parcela; \"única\" & <final>"
+
+
+def test_memory_does_not_grow_with_history(monkeypatch):
+    # Blocos menores para atingir o regime estável com menos linhas
+    monkeypatch.setattr(ExportService, "CHUNK_SIZE", 8 * 1024)
+    
+    def peak(total: int, fmt: str) -> int:
+        tracemalloc.start()
+        for _ in ExportService.stream("payments", fmt, make_fetcher(total, [])):
+            pass
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak_bytes
+    
+    for fmt in ("csv", "xlsx"):
+        small = peak(5000, fmt)
+        large = peak(20000, fmt)
+        # 4x mais linhas, praticamente o mesmo pico de memória
+        assert large < small * 1.5, (fmt, small, large)
+
+
+class RecordingQuery:
+    """Builder do PostgREST que só anota os filtros aplicados"""
+    
+    def __init__(self, table: str, log: list):
+        self.table = table
+        self.log = log
+    
+    @property
+    def not_(self):
+        self.log.append(("not",))
+        return self
+    
+    def __getattr__(self, name: str):
+        def method(*args):
+            self.log.append((name,) + args)
+            return self
+        return method
+    
+    def execute(self):
+        return type("Result", (), {"data": []})()
+
+
+def test_payments_export_skips_subscription_payments():
+    logs = {}
+    
+    class Client:
+        def table(self, name):
+            logs[name] = []
+            return RecordingQuery(name, logs[name])
+    
+    fetch_page = ExportService.supabase_fetcher(Client(), "user-1")
+    fetch_page("payments", "id", None, 10)
+    fetch_page("projects", "id", None, 10)
+    
+    assert ("eq", "user_id", "user-1") in logs["payments"]
+    assert ("is_", "project_id", "null") in logs["payments"]
+    assert logs["payments"][logs["payments"].index(("is_", "project_id", "null")) - 1] == ("not",)
+    assert not any(entry[0] in ("not", "is_") for entry in logs["projects"])
+
+
+def test_csv_neutralizes_formula_cells():
+    """Texto que começa com =, +, - ou @ ganha ' na frente; números não"""
+    def fetch_page(table, columns, cursor, limit):
+        if cursor is not None:
+            return []
+        return [{
+            "id": "pay-1",
+            "project_id": "proj-1",
+            "amount": -150.5,
+            "due_date": "-10",
+            "status": "PAID",
+            "payment_date": None,
+            "notes": "=HYPERLINK(\"http://x\")",
+            "created_at": BASE_DATE.isoformat(),
+            "updated_at": "@SUM(A1)",
+        }]
+    
+    text = b"".join(ExportService.stream("payments", "csv", fetch_page)).decode("utf-8")
+    row = list(csv.reader(io.StringIO(text[1:]), delimiter=";"))[1]
+    
+    assert row[2] == "-150.5"
+    assert row[3] == "-10"
+    assert row[6] == "'=HYPERLINK(\"http://x\")"
+    assert "'@SUM(A1)" in row
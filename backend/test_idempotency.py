@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Testes do Idempotency-Key (resposta guardada, single-flight e limites do armazenamento)
+"""
+
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.services.auth_service import AuthService
+
+
+def make_app(store: IdempotencyStore):
+    app = FastAPI()
+    app.add_middleware(IdempotencyMiddleware, store=store)
+    calls = []
+    
+    @app.post("/preference")
+    async def create_preference(payload: dict):
+        calls.append(payload)
+        await asyncio.sleep(0.2)  # chamada remota lenta
+        if payload.get("fail"):
+            raise HTTPException(status_code=400, detail="inválido")
+        return {"preference": len(calls), "plan": payload["plan"]}
+    
+    return app, calls
+
+
+def test_concurrent_duplicates_execute_once():
+    store = IdempotencyStore()
+    app, calls = make_app(store)
+    
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"Idempotency-Key": "checkout-1"}
+            responses = await asyncio.gather(*[
+                client.post("/preference", json={"plan": "monthly"}, headers=headers) for _ in range(5)
+            ])
+            later = await client.post("/preference", json={"plan": "monthly"}, headers=headers)
+            return responses, later
+    
+    responses, later = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {response.json()["preference"] for response in responses + [later]} == {1}
+    assert sum(response.headers.get("idempotent-replayed") == "true" for response in responses) == 4
+    assert later.headers["idempotent-replayed"] == "true"
+    
+    stats = store.stats()
+    assert stats["executed"] == 1 and stats["coalesced"] == 4 and stats["hits"] == 5
+    assert stats["in_flight"] == 0 and stats["entries"] == 1
+
+
+def test_keys_are_scoped_per_user_and_errors_are_not_stored():
+    store = IdempotencyStore()
+    app, calls = make_app(store)
+    client = TestClient(app)
+    ana = {"Authorization": "Bearer " + AuthService.create_access_token({"sub": "ana", "email": "a@x.com"}), "Idempotency-Key": "k1"}
+    bia = {"Authorization": "Bearer " + AuthService.create_access_token({"sub": "bia", "email": "b@x.com"}), "Idempotency-Key": "k1"}
+    
+    assert client.post("/preference", json={"plan": "monthly"}, headers=ana).json()["preference"] == 1
+    # Mesma chave de outro usuário é outra requisição
+    assert client.post("/preference", json={"plan": "monthly"}, headers=bia).json()["preference"] == 2
+    # Mesma chave com outro corpo
+    conflict = client.post("/preference", json={"plan": "yearly"}, headers=ana)
+    assert conflict.status_code == 422
+    
+    # Erro não fica guardado: a repetição executa de novo
+    failing = {**ana, "Idempotency-Key": "k2"}
+    assert client.post("/preference", json={"plan": "x", "fail": True}, headers=failing).status_code == 400
+    assert client.post("/preference", json={"plan": "x", "fail": True}, headers=failing).status_code == 400
+    assert len(calls) == 4
+    assert store.stats()["conflicts"] == 1
+    
+    # Sem chave, nada muda
+    client.post("/preference", json={"plan": "monthly"})
+    client.post("/preference", json={"plan": "monthly"})
+    assert len(calls) == 6
+
+
+def test_store_is_bounded_and_expires():
+    store = IdempotencyStore(ttl_seconds=0.05, max_entries=2, max_bytes=10)
+    store.put("a", "f", 200, [], b"1234")
+    store.put("b", "f", 200, [], b"1234")
+    assert store.get("a") is not None
+    store.put("c", "f", 200, [], b"1234")
+    # "b" era o menos usado
+    assert store.get("b") is None and store.get("a") is not None
+    store.put("d", "f", 200, [], b"123456789")
+    assert store.stats()["bytes"] <= 10
+    time.sleep(0.06)
+    assert store.get("d") is None
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Testes do reajuste por inflação (série IPCA/INPC com produtos acumulados)
+"""
+
+import math
+from decimal import Decimal
+from fastapi.testclient import TestClient
+from app import main
+from app.dependencies import get_current_user
+from app.models import CalculatorInput
+from app.services.calculator_service import CalculatorService
+from app.services.inflation_service import InflationSeries, InflationService
+
+
+def test_cumulative_products_match_compounding():
+    series = InflationSeries("TESTE", (2023, 11), [1.0, 2.0, -0.5, 0.3])
+    assert series.last_month == (2024, 2)
+    assert math.isclose(series.factor((2023, 12), (2024, 2)), 1.02 * 0.995 * 1.003)
+    assert series.factor((2024, 2), (2024, 1)) == 1.0
+    try:
+        series.factor((2023, 10), (2024, 1))
+        assert False, "mês fora da série deveria falhar"
+    except ValueError:
+        pass
+    
+    # Série embutida: IPCA de 2024 (IBGE: 4,83%) e INPC de 2023 (3,71%)
+    assert round(InflationService.accumulated("IPCA", (2024, 1), (2024, 12)), 2) == Decimal("4.83")
+    assert round(InflationService.accumulated("INPC", (2023, 1), (2023, 12)), 2) == Decimal("3.71")
+    
+    # Valor de junho/2023 levado a junho/2024: julho/2023 a junho/2024
+    factor, reference = InflationService.readjustment_factor("IPCA", (2023, 6), (2024, 6))
+    assert reference == (2024, 6)
+    assert factor == Decimal(str(round(InflationService.series("IPCA").factor((2023, 7), (2024, 6)), 8)))
+    # Mês de referência além do publicado fica no último disponível
+    assert InflationService.readjustment_factor("IPCA", (2024, 1), (2099, 1))[1] == InflationService.series("IPCA").last_month
+
+
+def test_batch_readjusts_calculations_and_projects():
+    input_data = CalculatorInput(
+        desired_monthly_income=Decimal("6000"), hours_per_day=8, days_per_week=5, tax_regime="MEI",
+        monthly_expenses=Decimal("500"),
+    )
+    before = CalculatorService.calculate(input_data)
+    calculations = [
+        {"id": "c1", "name": "Base", "created_at": "2023-12-15T10:00:00+00:00",
+         "input_data": input_data.model_dump(mode="json"), "result_data": before.model_dump(mode="json")},
+        {"id": "c2", "created_at": "2015-01-10T10:00:00", "input_data": input_data.model_dump(mode="json")},
+    ]
+    projects = [
+        {"id": "p1", "title": "Site", "value": "10000", "start_date": "2024-01-05", "created_at": "2023-12-01"},
+        {"id": "p2", "title": "Sem valor", "value": None, "created_at": "2024-01-01"},
+    ]
+    
+    result = InflationService.readjust(calculations, projects, "IPCA", (2024, 12))
+    factor = InflationService.readjustment_factor("IPCA", (2023, 12), (2024, 12))[0]
+    assert round(factor, 4) == Decimal("1.0483")
+    
+    calc = result["calculations"][0]
+    assert calc["reference_month"] == "2024-12"
+    assert calc["previous"]["hourly_rate"] == str(before.hourly_rate)
+    assert Decimal(calc["input_data"]["desired_monthly_income"]) == (Decimal("6000") * factor).quantize(Decimal("0.01"))
+    # Recalculado (o DAS do MEI é fixo), não só multiplicado
+    assert calc["hourly_rate"] > before.hourly_rate
+    assert calc["hourly_rate"] != (before.hourly_rate * factor).quantize(Decimal("0.01"))
+    assert calc["daily_rate"] > before.daily_rate and calc["monthly_rate"] > before.monthly_rate
+    
+    project = result["projects"][0]
+    expected = InflationService.readjustment_factor("IPCA", (2024, 1), (2024, 12))[0]
+    assert project["value"] == (Decimal("10000") * expected).quantize(Decimal("0.01"))
+    assert [item["id"] for item in result["projects"]] == ["p1"]
+    
+    # Anterior ao início da série: fica de fora com o motivo
+    assert result["skipped"][0]["id"] == "c2" and "IPCA disponível" in result["skipped"][0]["reason"]
+
+
+class MemoryTable:
+    """Só o que a rota de reajuste usa: select/eq/in_ e upsert por id"""
+    
+    def __init__(self, rows: dict):
+        self.rows = rows
+        self.filters = []
+        self.upserted = None
+    
+    def select(self, columns):
+        return self
+    
+    def eq(self, column, value):
+        self.filters.append((column, [value]))
+        return self
+    
+    def in_(self, column, values):
+        self.filters.append((column, list(values)))
+        return self
+    
+    def upsert(self, rows):
+        self.upserted = rows
+        return self
+    
+    def execute(self):
+        if self.upserted is not None:
+            for row in self.upserted:
+                self.rows[row["id"]] = dict(row)
+            return type("Result", (), {"data": self.upserted})()
+        data = [
+            dict(row) for row in self.rows.values()
+            if all(row.get(column) in values for column, values in self.filters)
+        ]
+        return type("Result", (), {"data": data})()
+
+
+def test_applying_twice_for_the_same_month_does_not_compound(monkeypatch):
+    input_data = CalculatorInput(desired_monthly_income=Decimal("6000"), hours_per_day=8, days_per_week=5, tax_regime="MEI")
+    tables = {
+        "calculations": {"c1": {
+            "id": "c1", "user_id": "u1", "created_at": "2023-12-15T10:00:00+00:00",
+            "input_data": input_data.model_dump(mode="json"),
+            "result_data": CalculatorService.calculate(input_data).model_dump(mode="json"),
+        }},
+        "projects": {"p1": {
+            "id": "p1", "user_id": "u1", "title": "Site", "value": "1000", "status": "IN_PROGRESS",
+            "start_date": "2024-01-05", "created_at": "2023-12-01",
+        }},
+    }
+    client_stub = type("Client", (), {"table": lambda self, name: MemoryTable(tables[name])})()
+    monkeypatch.setattr(main, "supabase", client_stub)
+    main.app.dependency_overrides[get_current_user] = lambda: {"id": "u1"}
+    client = TestClient(main.app)
+    
+    try:
+        body = {"index": "IPCA", "reference_month": "2024-12", "apply": True}
+        first = client.post("/api/readjustments", json=body).json()
+        factor = InflationService.readjustment_factor("IPCA", (2024, 1), (2024, 12))[0]
+        expected = (Decimal("1000") * factor).quantize(Decimal("0.01"))
+        assert Decimal(str(first["projects"][0]["value"])) == expected
+        assert tables["projects"]["p1"]["readjusted_through"] == "2024-12"
+        income = tables["calculations"]["c1"]["input_data"]["desired_monthly_income"]
+        assert tables["calculations"]["c1"]["readjusted_through"] == "2024-12"
+        
+        # Mesmo mês de novo: nada muda
+        second = client.post("/api/readjustments", json=body).json()
+        assert second["projects"] == [] and second["calculations"] == []
+        assert {item["id"] for item in second["skipped"]} == {"c1", "p1"}
+        assert Decimal(tables["projects"]["p1"]["value"]) == expected
+        assert tables["calculations"]["c1"]["input_data"]["desired_monthly_income"] == income
+        
+        # Mês seguinte: só a inflação do novo mês, a partir do valor já reajustado
+        third = client.post("/api/readjustments", json={**body, "reference_month": "2025-01"}).json()
+        step = InflationService.readjustment_factor("IPCA", (2024, 12), (2025, 1))[0]
+        assert Decimal(str(third["projects"][0]["value"])) == (expected * step).quantize(Decimal("0.01"))
+        assert tables["projects"]["p1"]["readjusted_through"] == "2025-01"
+    finally:
+        main.app.dependency_overrides.clear()
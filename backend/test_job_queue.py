@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Testes da fila de jobs com journal em SQLite
+Cada teste usa um arquivo próprio e roda o loop com asyncio.run
+"""
+
+import asyncio
+import time
+from app.services.job_queue import JobQueue, JobType, QUEUED, DONE, FAILED
+
+
+async def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condição não atingida a tempo"
+        await asyncio.sleep(0.01)
+
+
+def test_concurrency_limit_and_delayed_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), poll_interval=0.05)
+    running, peak, done = [0], [0], []
+    
+    @queue.handler("email", concurrency=2)
+    async def send_email(payload):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.05)
+        running[0] -= 1
+        done.append(payload["n"])
+    
+    async def scenario():
+        await queue.start()
+        for n in range(6):
+            queue.enqueue("email", {"n": n})
+        delayed = queue.enqueue("email", {"n": 99}, delay=0.4)
+        
+        await wait_until(lambda: len(done) == 6)
+        assert 99 not in done
+        assert queue.get(delayed)["status"] == QUEUED
+        
+        await wait_until(lambda: queue.metrics()["types"]["email"]["processed"]["done"] == 7)
+        metrics = queue.metrics()["types"]["email"]
+        await queue.stop()
+        return metrics
+    
+    metrics = asyncio.run(scenario())
+    assert peak[0] == 2
+    assert metrics["depth"][DONE] == 7
+    assert metrics["processed"]["done"] == 7
+    assert metrics["wait_seconds"]["p50"] is not None
+
+
+def test_retries_with_backoff_then_fails(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), poll_interval=0.02)
+    calls = []
+    
+    @queue.handler("flaky", max_attempts=3, backoff_seconds=0.05)
+    def flaky(payload):
+        calls.append(time.monotonic())
+        if payload["succeed_on"] and len(calls) >= payload["succeed_on"]:
+            return
+        raise RuntimeError("fora do ar")
+    
+    async def scenario():
+        await queue.start()
+        ok = queue.enqueue("flaky", {"succeed_on": 2})
+        await wait_until(lambda: queue.get(ok)["status"] == DONE)
+        
+        calls.clear()
+        bad = queue.enqueue("flaky", {"succeed_on": 0})
+        await wait_until(lambda: queue.get(bad)["status"] == FAILED)
+        await queue.stop()
+        return queue.get(bad)
+    
+    failed = asyncio.run(scenario())
+    assert failed["attempts"] == 3
+    assert "fora do ar" in failed["last_error"]
+    # Segundo intervalo ~2x o primeiro (0.05s, 0.1s com jitter de 20%)
+    first_gap, second_gap = calls[1] - calls[0], calls[2] - calls[1]
+    assert first_gap >= 0.04 and second_gap >= 0.08
+
+
+def test_journal_survives_restart_and_dedupes(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    
+    # Processo "anterior": enfileira e morre com um job alugado
+    old = JobQueue(path)
+    first = old.enqueue("webhook", {"payment_id": 1}, dedupe_key="payment:1")
+    assert old.enqueue("webhook", {"payment_id": 1}, dedupe_key="payment:1") == first
+    second = old.enqueue("webhook", {"payment_id": 2})
+    old._claim("webhook", 1, lease_seconds=0.1)
+    
+    processed = []
+    queue = JobQueue(path, poll_interval=0.02)
+    queue.handler("webhook")(lambda payload: processed.append(payload["payment_id"]))
+    
+    async def scenario():
+        await queue.start()
+        await wait_until(lambda: len(processed) == 2)
+        await queue.stop()
+    
+    time.sleep(0.15)  # aluguel do job abandonado vence
+    asyncio.run(scenario())
+    assert sorted(processed) == [1, 2]
+    assert queue.get(first)["attempts"] == 2
+    assert queue.get(second)["status"] == DONE
+
+
+def test_expired_lease_on_last_attempt_fails(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.enqueue("report", {"month": 1}, max_attempts=2)
+    
+    # Dois workers morrem com o job alugado: a segunda era a última tentativa
+    assert [job["id"] for job in queue._claim("report", 1, lease_seconds=-1)] == [job_id]
+    assert [job["id"] for job in queue._claim("report", 1, lease_seconds=-1)] == [job_id]
+    assert queue._claim("report", 1, lease_seconds=60) == []
+    
+    job = queue.get(job_id)
+    assert job["status"] == FAILED
+    assert job["attempts"] == 2
+    assert job["lease_until"] is None
+    assert "última tentativa" in job["last_error"]
+
+
+def test_enqueue_retries_when_duplicate_finished_meanwhile(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    first = queue.enqueue("webhook", {"payment_id": 1}, dedupe_key="payment:1")
+    
+    # O job igual termina entre o INSERT que conflitou e o SELECT
+    query = queue._query
+    pending = queue.get(first)
+    
+    def finish_then_query(sql, params=()):
+        queue._complete(JobType(handler=print), pending)
+        return query(sql, params)
+    
+    queue._query = finish_then_query
+    second = queue.enqueue("webhook", {"payment_id": 1}, dedupe_key="payment:1")
+    queue._query = query
+    
+    assert second != first
+    assert queue.get(first)["status"] == DONE
+    assert queue.get(second)["status"] == QUEUED
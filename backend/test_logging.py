@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Testes dos logs estruturados (JSON via fila, id da requisição e amostragem)
+"""
+
+import io
+import json
+import logging
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.structured_logging import LogPipeline, RequestLogMiddleware, parse_sample_rates
+
+
+def make_app(sample_rates=None) -> RequestLogMiddleware:
+    app = FastAPI()
+    logger = logging.getLogger("app.test_logging.routes")
+    
+    @app.get("/api/calculator/calculate")
+    async def calculate():
+        return {"ok": True}
+    
+    @app.get("/api/sync")
+    def sync_route():
+        # Rotas síncronas rodam no threadpool e herdam o id da requisição
+        logger.info("dentro da rota", extra={"client_id": "c1"})
+        return {"ok": True}
+    
+    @app.get("/api/boom")
+    async def boom():
+        raise RuntimeError("falhou")
+    
+    return RequestLogMiddleware(app, logger=logging.getLogger("app.test_logging.access"), sample_rates=sample_rates)
+
+
+def read_lines(pipeline: LogPipeline, stream: io.StringIO):
+    pipeline.stop()
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_lines_share_the_request_id():
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream=stream, logger_name="app.test_logging")
+    pipeline.start()
+    try:
+        client = TestClient(make_app(), raise_server_exceptions=False)
+        response = client.get("/api/sync", headers={"X-Request-ID": "req-123"})
+        assert response.headers["x-request-id"] == "req-123"
+        generated = client.get("/api/sync", headers={"X-Request-ID": "com espaco!"}).headers["x-request-id"]
+        assert len(generated) == 32
+        assert client.get("/api/boom").status_code == 500
+        lines = read_lines(pipeline, stream)
+    finally:
+        pipeline.close()
+    
+    route, access = lines[0], lines[1]
+    assert route["message"] == "dentro da rota" and route["client_id"] == "c1"
+    assert route["request_id"] == access["request_id"] == "req-123"
+    assert access["logger"] == "app.test_logging.access"
+    assert access["status"] == 200 and access["path"] == "/api/sync" and access["duration_ms"] >= 0
+    assert lines[2]["request_id"] == lines[3]["request_id"] == generated
+    assert lines[-1]["status"] == 500 and lines[-1]["level"] == "INFO"
+
+
+def test_high_volume_routes_are_sampled():
+    assert parse_sample_rates("/api/calculator/calculate=0.1, /api/x=2") == {
+        "/api/calculator/calculate": 0.1, "/api/x": 1.0
+    }
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream=stream, logger_name="app.test_logging")
+    pipeline.start()
+    try:
+        app = make_app(sample_rates={"/api/calculator/calculate": 0.25})
+        draws = iter([0.1, 0.9, 0.3, 0.2] * 5)
+        app.random = lambda: next(draws)
+        client = TestClient(app, raise_server_exceptions=False)
+        for _ in range(20):
+            client.get("/api/calculator/calculate")
+        client.get("/api/boom")
+        lines = read_lines(pipeline, stream)
+    finally:
+        pipeline.close()
+    
+    calculated = [line for line in lines if line["path"] == "/api/calculator/calculate"]
+    assert len(calculated) == 10 and calculated[0]["sample_rate"] == 0.25
+    # Erros nunca são descartados pela amostragem
+    assert lines[-1]["path"] == "/api/boom"
+
+
+def test_full_queue_drops_instead_of_blocking():
+    stream = io.StringIO()
+    pipeline = LogPipeline(stream=stream, queue_size=2, logger_name="app.test_logging")
+    try:
+        logger = logging.getLogger("app.test_logging.flood")
+        for i in range(5):
+            logger.info("mensagem %s", i)
+        assert pipeline.stats() == {"queued": 2, "dropped": 3, "running": False}
+        
+        pipeline.start()
+        try:
+            raise ValueError("ruim")
+        except ValueError:
+            logger.exception("com erro")
+        lines = read_lines(pipeline, stream)
+    finally:
+        pipeline.close()
+    
+    assert [line["message"] for line in lines] == ["mensagem 0", "mensagem 1", "com erro"]
+    assert "ValueError: ruim" in lines[-1]["exception"]
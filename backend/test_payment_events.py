@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Testes dos eventos de pagamento via SSE (pub/sub em processo, entrega entre
+workers pelo cache compartilhado, Last-Event-ID, heartbeat e limite de conexões)
+"""
+
+import asyncio
+import json
+import threading
+from fastapi.testclient import TestClient
+from app.main import app, payment_events, token_denylist
+from app.services.auth_service import AuthService
+from app.services.payment_events import PaymentEventBroker, ConnectionLimitError, parse_last_event_id
+from app.services.shared_cache import SharedCache
+
+
+def parse(chunk: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+    return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+def test_publish_from_job_thread_reaches_open_stream(tmp_path):
+    broker = PaymentEventBroker(SharedCache(str(tmp_path / "cache"), slots=64), heartbeat_seconds=5)
+    
+    async def scenario():
+        await broker.start()
+        stream = broker.stream("u1")
+        assert await stream.__anext__() == "retry: 3000\n\n"
+        assert broker.stats()["connections"] == 1
+        
+        # Jobs rodam em threads, fora do loop
+        worker = threading.Thread(target=broker.publish, args=("u1", "payment", {"status": "approved"}))
+        worker.start()
+        event = parse(await asyncio.wait_for(stream.__anext__(), timeout=1))
+        worker.join()
+        
+        # Outro usuário não recebe nada
+        broker.publish("u2", "payment", {"status": "approved"})
+        await stream.aclose()
+        await broker.stop()
+        return event
+    
+    event = asyncio.run(scenario())
+    assert event["event"] == "payment" and event["data"] == {"status": "approved"}
+    assert broker.stats()["connections"] == 0 and broker.stats()["users"] == 0
+    assert broker.delivered == 1
+
+
+def test_event_from_another_worker_and_last_event_id(tmp_path):
+    path = str(tmp_path / "cache")
+    publisher = PaymentEventBroker(SharedCache(path, slots=64))
+    listener = PaymentEventBroker(SharedCache(path, slots=64), poll_interval=0.02, heartbeat_seconds=5)
+    
+    async def scenario():
+        await listener.start()
+        stream = listener.stream("u1")
+        await stream.__anext__()
+        # Publicado por outro worker: chega pelo laço de leitura do cache
+        published = publisher.publish("u1", "payment", {"status": "approved", "plan": "monthly"})
+        received = parse(await asyncio.wait_for(stream.__anext__(), timeout=1))
+        
+        # O laço continua lendo o mesmo evento, mas ele não é repetido
+        await asyncio.sleep(0.1)
+        await stream.aclose()
+        
+        # Reconexão com o id recebido: nada novo; com id antigo: o evento volta
+        up_to_date = listener.subscribe("u1", received["id"])
+        behind = listener.subscribe("u1", received["id"] - 1)
+        pending = (up_to_date.queue.qsize(), behind.queue.qsize())
+        await listener.stop()
+        return published, received, pending
+    
+    published, received, pending = asyncio.run(scenario())
+    assert received["id"] == published["id"] and received["data"]["plan"] == "monthly"
+    assert listener.delivered == 2
+    assert pending == (0, 1)
+
+
+def test_heartbeat_connection_cap_and_shutdown(tmp_path):
+    broker = PaymentEventBroker(SharedCache(str(tmp_path / "cache"), slots=64), max_connections=2, heartbeat_seconds=0.05)
+    
+    async def scenario():
+        await broker.start()
+        first, second = broker.stream("u1"), broker.stream("u2")
+        await first.__anext__()
+        await second.__anext__()
+        assert await first.__anext__() == ": ping\n\n"
+        
+        assert broker.is_full()
+        try:
+            broker.subscribe("u3")
+            raise AssertionError("deveria recusar")
+        except ConnectionLimitError:
+            pass
+        # Conexão que passou da checagem da rota só recebe o tempo de retry
+        assert [chunk async for chunk in broker.stream("u3")] == ["retry: 10000\n\n"]
+        
+        # Desligamento encerra as conexões abertas
+        await broker.stop()
+        rest = [chunk async for chunk in second]
+        return rest
+    
+    assert asyncio.run(scenario()) == []
+    assert broker.rejected == 2
+    assert parse_last_event_id("1700000000000") == 1700000000000
+    assert parse_last_event_id("abc") == 0 and parse_last_event_id(None) == 0
+
+
+def test_events_route_rejects_when_worker_is_full(monkeypatch):
+    monkeypatch.setattr(token_denylist, "store", None)
+    monkeypatch.setattr(payment_events, "max_connections", 0)
+    client = TestClient(app)
+    tokens = AuthService.create_token_pair("user-sse", "sse@freela.com.br")
+    
+    response = client.get("/api/subscription/events", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "10"
+    assert client.get("/api/subscription/events").status_code == 403
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Testes da projeção de faturamento (RBT12, faixas do Simples e limite do MEI)
+Roda sem precisar do servidor
+"""
+
+import numpy as np
+from app.models import ProjectionInput
+from app.services.projection_service import ProjectionService
+
+
+def test_rolling_rbt12_matches_full_window_sum():
+    """A soma incremental deve bater com a soma completa da janela de 12 meses"""
+    rng = np.random.default_rng(7)
+    revenues = rng.uniform(0, 50000, size=(50, 36))
+    history = rng.uniform(0, 50000, size=(50, 12))
+    
+    result = ProjectionService.project_matrix(revenues, history, np.full(50, 12))
+    combined = np.hstack([history, revenues])
+    
+    for month in range(36):
+        expected = combined[:, month:month + 12].sum(axis=1)
+        assert np.allclose(result["rbt12"][:, month], expected)
+
+
+def test_new_company_uses_proportional_rbt12():
+    revenues = np.array([[10000.0, 20000.0, 30000.0]])
+    result = ProjectionService.project_matrix(revenues, np.zeros((1, 12)), np.zeros(1))
+    
+    assert result["rbt12"][0].tolist() == [120000.0, 120000.0, 180000.0]
+
+
+def test_mei_limit_and_bracket_progression():
+    projection = ProjectionService.project(ProjectionInput(
+        scenarios=[{"initial_monthly_revenue": 8000, "monthly_growth_percentage": 5}],
+        months=24,
+    ))
+    scenario = projection["scenarios"][0]
+    
+    # 8000 + 8400 + ... passa de R$ 81.000 no 9º mês e de R$ 97.200 no 10º
+    assert scenario["mei_limit_exceeded_month"] == 9
+    assert scenario["mei_limit_exceeded_over_tolerance_month"] == 10
+    assert scenario["bracket_changes"][0]["from"] == 1
+    assert scenario["bracket_changes"][0]["to"] == 2
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Testes da geração de propostas (PDF/HTML)
+Renderiza pelo endpoint com o pool de processos real e armazenamento temporário
+"""
+
+import re
+import zlib
+from fastapi.testclient import TestClient
+from app.main import app
+from app.dependencies import get_current_user
+from app.pdf_writer import PAGE_HEIGHT
+from app.services.proposal_service import ProposalService
+
+PROPOSAL = {
+    "calculation": {
+        "desired_monthly_income": 8000,
+        "hours_per_day": 8,
+        "days_per_week": 5,
+        "tax_regime": "PJ_SIMPLES",
+    },
+    "client": {"name": "Padaria <São João>", "company": "Pão & Cia", "email": "contato@pao.com.br"},
+    "project_title": "Loja virtual (e-commerce)",
+    "project_description": "Catálogo, carrinho e integração com Mercado Pago.",
+}
+
+
+def make_client(tmp_path, monkeypatch) -> TestClient:
+    monkeypatch.setattr(ProposalService, "STORAGE_DIR", tmp_path)
+    app.dependency_overrides[get_current_user] = lambda: {"id": "user-1", "email": "ana@freela.com.br"}
+    return TestClient(app)
+
+
+def test_pdf_is_rendered_once_and_served_by_hash(tmp_path, monkeypatch):
+    with make_client(tmp_path, monkeypatch) as client:
+        first = client.post("/api/proposals", json=PROPOSAL)
+        assert first.status_code == 200
+        assert first.headers["content-type"] == "application/pdf"
+        assert first.headers["x-proposal-cache"] == "miss"
+        
+        pdf = first.content
+        assert pdf.startswith(b"%PDF-1.4") and pdf.rstrip().endswith(b"%%EOF")
+        
+        # A tabela xref aponta para o início de cada objeto
+        xref_at = int(re.search(rb"startxref\n(\d+)", pdf).group(1))
+        offsets = re.findall(rb"(\d{10}) 00000 n", pdf[xref_at:])
+        for number, offset in enumerate(offsets, start=1):
+            assert pdf[int(offset):].startswith(b"%d 0 obj" % number)
+        
+        # Os valores do cálculo estão no conteúdo da página
+        stream = re.search(rb"stream\n(.*?)\nendstream", pdf, re.S).group(1)
+        text = zlib.decompress(stream).decode("cp1252")
+        assert "Pacote Completo" in text
+        assert "Loja virtual \\(e-commerce\\)" in text
+        
+        second = client.post("/api/proposals", json=PROPOSAL)
+        assert second.headers["x-proposal-cache"] == "hit"
+        assert second.content == pdf
+        
+        stored = client.get(first.headers["location"])
+        assert stored.status_code == 200
+        assert stored.content == pdf
+        
+        not_modified = client.get(first.headers["location"], headers={"If-None-Match": first.headers["etag"]})
+        assert not_modified.status_code == 304
+    
+    app.dependency_overrides.clear()
+
+
+def test_html_escapes_user_content(tmp_path, monkeypatch):
+    with make_client(tmp_path, monkeypatch) as client:
+        response = client.post("/api/proposals", json={**PROPOSAL, "format": "html"})
+        assert response.status_code == 200
+        body = response.text
+        
+        assert "Padaria &lt;São João&gt;" in body
+        assert "Pão &amp; Cia" in body
+        assert body.count('<td class="value">R$ ') == 3
+        assert "$" not in body.replace("R$", "")
+        
+        assert client.get("/api/proposals/" + "0" * 64 + ".pdf").status_code == 404
+        assert client.get("/api/proposals/../secret.pdf").status_code == 404
+    
+    app.dependency_overrides.clear()
+
+
+def test_long_description_flows_onto_new_pages(tmp_path, monkeypatch):
+    description = "\n".join(f"Linha {index:02d} do escopo" for index in range(80))
+    with make_client(tmp_path, monkeypatch) as client:
+        response = client.post("/api/proposals", json={**PROPOSAL, "project_description": description})
+        assert response.status_code == 200
+        pdf = response.content
+    
+    app.dependency_overrides.clear()
+    
+    assert int(re.search(rb"/Type /Pages /Kids \[[^\]]*\] /Count (\d+)", pdf).group(1)) >= 2
+    pages = [
+        zlib.decompress(stream).decode("cp1252")
+        for stream in re.findall(rb"stream\n(.*?)\nendstream", pdf, re.S)
+    ]
+    
+    text = "".join(pages)
+    for index in range(80):
+        assert f"(Linha {index:02d} do escopo)" in text
+    assert "Pacote Completo" in text
+    
+    for number, page in enumerate(pages, start=1):
+        # Cabeçalho e rodapé em todas as páginas
+        assert "(Proposta Comercial)" in page
+        assert f"(Página {number})" in page
+        assert "Gerado por FreelaBR." in page
+        # Nenhum texto abaixo do rodapé nem acima da página
+        for y in re.findall(r"([\d.]+) Td \(", page):
+            assert float(y) >= 40
+        for y in re.findall(r"[\d.]+ ([-\d.]+) Td \((?!Valores calculados|Página)", page):
+            assert 70 <= float(y) <= PAGE_HEIGHT
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Testes da reconciliação com o Mercado Pago (API falsa local, busca paginada em paralelo e ativações em lote)
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from app.services.reconciliation_service import MercadoPagoPaymentSearch, ReconciliationService
+
+NOW = datetime(2026, 5, 10, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeMercadoPago:
+    """Mesma interface do SDK (sdk.payment().search), servindo uma lista local de pagamentos"""
+    
+    def __init__(self, payments, max_offset=10000, latency=0.01):
+        self.payments = payments
+        self.max_offset = max_offset
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+    
+    def payment(self):
+        return self
+    
+    def search(self, filters):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.latency)
+            offset, limit = filters["offset"], filters["limit"]
+            if offset + limit > self.max_offset:
+                return {"status": 400, "response": {"message": "offset too large"}}
+            begin = datetime.fromisoformat(filters["begin_date"].replace("-00:00", "+00:00"))
+            end = datetime.fromisoformat(filters["end_date"].replace("-00:00", "+00:00"))
+            matches = sorted(
+                (p for p in self.payments
+                 if p["status"] == filters["status"] and begin <= datetime.fromisoformat(p["date_approved"]) <= end),
+                key=lambda p: p["date_approved"]
+            )
+            return {"status": 200, "response": {
+                "paging": {"total": len(matches), "offset": offset, "limit": limit},
+                "results": matches[offset:offset + limit],
+            }}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class MemorySubscriptionStore:
+    def __init__(self, subscriptions=(), payments=(), users=()):
+        self.subscriptions = list(subscriptions)
+        self.payments = list(payments)
+        self.user_rows = {user["id"]: dict(user) for user in users}
+        self.writes = []
+    
+    def subscriptions_for(self, payment_ids):
+        return [row for row in self.subscriptions if row["mercadopago_payment_id"] in payment_ids]
+    
+    def payments_for(self, payment_ids):
+        return [row for row in self.payments if row.get("mercadopago_payment_id") in payment_ids]
+    
+    def users(self, user_ids):
+        return [row for user_id, row in self.user_rows.items() if user_id in user_ids]
+    
+    @staticmethod
+    def _insert_new(table, rows):
+        # Chave única em mercadopago_payment_id (ON CONFLICT DO NOTHING)
+        existing = {row["mercadopago_payment_id"] for row in table}
+        inserted = [row for row in rows if row["mercadopago_payment_id"] not in existing]
+        table.extend(inserted)
+        return inserted
+    
+    def insert_subscriptions(self, rows):
+        self.writes.append(("subscriptions", len(rows)))
+        return self._insert_new(self.subscriptions, rows)
+    
+    def insert_payments(self, rows):
+        self.writes.append(("payments", len(rows)))
+        return self._insert_new(self.payments, rows)
+    
+    def activate_user(self, user_id, fields):
+        self.user_rows.setdefault(user_id, {"id": user_id}).update(fields)
+
+
+def approved(payment_id, user_id, plan="monthly", hours_ago=5, status="approved"):
+    return {
+        "id": payment_id,
+        "status": status,
+        "status_detail": "accredited",
+        "external_reference": f"{user_id}|{plan}",
+        "transaction_amount": 29.9 if plan == "monthly" else 299.0,
+        "payment_method_id": "pix",
+        "payer": {"id": f"payer-{user_id}"},
+        "date_created": (NOW - timedelta(hours=hours_ago, minutes=1)).isoformat(),
+        "date_approved": (NOW - timedelta(hours=hours_ago)).isoformat(),
+    }
+
+
+def test_paged_search_is_concurrent_and_bounded():
+    payments = [approved(i, f"u{i}", hours_ago=1 + i * 0.01) for i in range(1050)]
+    fake = FakeMercadoPago(payments)
+    search = MercadoPagoPaymentSearch(fake, max_concurrency=3)
+    fetched = search.fetch(NOW - timedelta(days=1), NOW)
+    assert sorted(p["id"] for p in fetched) == list(range(1050))
+    assert fake.calls == 11
+    assert fake.max_active == 3
+    
+    # A API não pagina além do limite de offset: a janela é dividida
+    fake = FakeMercadoPago(payments, max_offset=300)
+    search = MercadoPagoPaymentSearch(fake, max_concurrency=2)
+    search.MAX_OFFSET = 300
+    fetched = search.fetch(NOW - timedelta(days=1), NOW)
+    assert {p["id"] for p in fetched} == set(range(1050))
+
+
+def test_reconcile_applies_only_missing_activations():
+    payments = [
+        approved(1, "ana"),                        # webhook perdido: tudo falta
+        approved(2, "bia", plan="annual"),         # assinatura gravada, pagamento não
+        approved(3, "caio"),                       # já reconciliado
+        approved(4, "dani", status="rejected"),    # não aprovado
+        {**approved(5, "eva"), "external_reference": "sem-plano"},
+        approved(6, "ana", hours_ago=60),          # mais antigo, mesmo usuário
+        approved(7, "fabi", hours_ago=24 * 40),     # fora da janela
+        approved(8, "gil", hours_ago=0.05),        # nos últimos minutos (webhook pode estar na fila)
+    ]
+    store = MemorySubscriptionStore(
+        subscriptions=[{"mercadopago_payment_id": "2"}, {"mercadopago_payment_id": "3"}],
+        payments=[{"mercadopago_payment_id": "3"}],
+        users=[{"id": "bia", "subscription_end_date": (NOW + timedelta(days=300)).isoformat()}],
+    )
+    summary = ReconciliationService.run(MercadoPagoPaymentSearch(FakeMercadoPago(payments)), store, now=NOW)
+    
+    assert summary["fetched"] == 5
+    assert sorted(row["mercadopago_payment_id"] for row in store.subscriptions[2:]) == ["1", "6"]
+    assert sorted(row["mercadopago_payment_id"] for row in store.payments[1:]) == ["1", "2", "6"]
+    # Uma gravação por tabela, mesmo com vários pagamentos
+    assert store.writes == [("payments", 3), ("subscriptions", 2)]
+    
+    # A ativação usa o pagamento que dá o PRO mais longo
+    assert summary["activated_user_ids"] == ["ana"]
+    assert summary["activations"] == [{"user_id": "ana", "payment_id": "1", "plan": "monthly"}]
+    ana = store.user_rows["ana"]
+    assert ana["is_pro"] is True and ana["subscription_plan"] == "monthly"
+    assert ana["subscription_end_date"] == (NOW - timedelta(hours=5) + timedelta(days=30)).isoformat()
+    assert "is_pro" not in store.user_rows["bia"]
+    
+    # Segunda execução não encontra mais nada
+    again = ReconciliationService.run(MercadoPagoPaymentSearch(FakeMercadoPago(payments)), store, now=NOW)
+    assert again["subscriptions_created"] == again["payments_created"] == 0
+    assert again["activated_user_ids"] == []
+
+
+def test_payment_recorded_by_webhook_meanwhile_counts_as_processed():
+    payments = [approved(1, "ana"), approved(2, "bia")]
+    store = MemorySubscriptionStore()
+    
+    # O webhook grava o pagamento 1 entre a leitura e a gravação em lote
+    subscriptions_for = store.subscriptions_for
+    
+    def read_then_webhook(payment_ids):
+        rows = subscriptions_for(payment_ids)
+        store.subscriptions.append({"mercadopago_payment_id": "1"})
+        store.payments.append({"mercadopago_payment_id": "1"})
+        return rows
+    
+    store.subscriptions_for = read_then_webhook
+    summary = ReconciliationService.run(MercadoPagoPaymentSearch(FakeMercadoPago(payments)), store, now=NOW)
+    
+    assert summary["subscriptions_created"] == summary["payments_created"] == 1
+    assert sorted(row["mercadopago_payment_id"] for row in store.subscriptions) == ["1", "2"]
+    assert sorted(row["mercadopago_payment_id"] for row in store.payments) == ["1", "2"]
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Testes do planejador de regimes tributários (janela de troca e teto do MEI)
+Roda sem precisar do servidor
+"""
+
+import pytest
+from app.models import RegimePlanInput
+from app.services.regime_planner_service import RegimePlannerService
+
+
+def test_regime_plan_leaves_mei_only_in_switch_window():
+    """MEI estoura o teto no 1º ano: a troca só pode acontecer em janeiro, então o MEI fica de fora"""
+    plan = RegimePlannerService.plan(RegimePlanInput(
+        scenario={"initial_monthly_revenue": 9000},
+        months=24,
+        start_month=1,
+    ))
+    assert "MEI" not in plan["monthly_regimes"]
+    assert plan["static_regimes"]["MEI"] is None
+    
+    # Faturamento baixo no 1º ano e alto no 2º: MEI até dezembro, depois Simples
+    plan = RegimePlannerService.plan(RegimePlanInput(
+        scenario={"revenues": [5000] * 12 + [15000] * 12},
+        months=24,
+        initial_regime="MEI",
+    ))
+    assert [segment["regime"] for segment in plan["plan"]] == ["MEI", "PJ_SIMPLES"]
+    assert plan["plan"][1]["start_month"] == 13
+
+
+def test_regime_plan_rejects_initial_regime_outside_allowed():
+    """Regime inicial fora dos permitidos não pode ser ignorado em silêncio"""
+    with pytest.raises(ValueError):
+        RegimePlannerService.plan(RegimePlanInput(
+            scenario={"initial_monthly_revenue": 5000},
+            initial_regime="MEI",
+            allowed_regimes=["PJ_SIMPLES", "PJ_PRESUMIDO"],
+        ))
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Testes da busca em clientes e projetos (índice de trigramas por usuário)
+"""
+
+import random
+import statistics
+import time
+from app.services.search_service import SearchService, normalize
+
+FIRST = ["Ana", "Bruno", "Carla", "Diego", "Elaine", "Fábio", "Gisele", "Hugo", "Íris", "João"]
+LAST = ["Souza", "Conceição", "Araújo", "Lima", "Gonçalves", "Pereira", "Ribeiro", "Simões"]
+BUSINESS = ["Padaria", "Clínica", "Estúdio", "Oficina", "Escritório", "Açougue", "Livraria", "Ótica"]
+WORDS = ["site", "loja", "aplicativo", "identidade", "visual", "manutenção", "campanha", "relatório"]
+
+
+def make_loader(total: int):
+    rng = random.Random(42)
+    
+    def load(user_id):
+        for i in range(total):
+            yield "clients", {
+                "id": f"c{i}",
+                "name": f"{rng.choice(FIRST)} {rng.choice(LAST)} {i}",
+                "company": f"{rng.choice(BUSINESS)} {rng.choice(LAST)}",
+                "notes": " ".join(rng.choice(WORDS) for _ in range(6)),
+            }
+            yield "projects", {
+                "id": f"p{i}",
+                "title": f"{rng.choice(WORDS).title()} {rng.choice(BUSINESS)}",
+                "description": " ".join(rng.choice(WORDS) for _ in range(10)),
+                "status": "IN_PROGRESS",
+            }
+    
+    return load
+
+
+def test_accent_insensitive_prefix_search_and_ranking():
+    SearchService.reset()
+    rows = [
+        ("clients", {"id": "1", "name": "José Conceição", "company": "Padaria São João", "notes": None}),
+        ("clients", {"id": "2", "name": "Maria Silva", "company": "Joalheria", "notes": "indicada pelo José"}),
+        ("projects", {"id": "3", "title": "Site da padaria", "description": "Cardápio online", "status": "PROPOSAL"}),
+    ]
+    loader = lambda user_id: iter(rows)
+    
+    assert normalize("Conceição ÓTICA") == "conceicao otica"
+    
+    # Sem acento e digitando pela metade
+    results = SearchService.search("u1", "jose conc", loader)["results"]
+    assert results[0]["id"] == "1"
+    assert results[0]["matched_field"] == "name"
+    
+    # Nome pesa mais que observações
+    results = SearchService.search("u1", "José", loader)["results"]
+    assert [result["id"] for result in results[:2]] == ["1", "2"]
+    
+    results = SearchService.search("u1", "padaria", loader, kind="projects")["results"]
+    assert [result["id"] for result in results] == ["3"]
+
+
+def test_incremental_updates_and_lru_eviction(monkeypatch):
+    SearchService.reset()
+    monkeypatch.setattr(SearchService, "MAX_INDEXES", 2)
+    loads = []
+    
+    def loader(user_id):
+        loads.append(user_id)
+        return iter([("clients", {"id": "1", "name": "Ana Lima", "company": None, "notes": None})])
+    
+    assert SearchService.search("u1", "ana", loader)["indexed"] == 1
+    
+    SearchService.upsert("u1", "clients", {"id": "2", "name": "Anabela Prado", "company": "Ótica Prado", "notes": None})
+    results = SearchService.search("u1", "otica", loader)["results"]
+    assert [result["id"] for result in results] == ["2"]
+    
+    SearchService.upsert("u1", "clients", {"id": "2", "name": "Beatriz Prado", "company": None, "notes": None})
+    assert SearchService.search("u1", "otica", loader)["results"] == []
+    SearchService.remove("u1", "clients", "1")
+    assert SearchService.search("u1", "ana lima", loader)["results"] == []
+    assert loads == ["u1"]
+    
+    # Terceiro usuário tira o menos usado (u2) da memória
+    SearchService.search("u2", "x", loader)
+    SearchService.search("u1", "x", loader)
+    SearchService.search("u3", "x", loader)
+    SearchService.search("u1", "x", loader)
+    SearchService.search("u2", "x", loader)
+    assert loads == ["u1", "u2", "u3", "u2"]
+
+
+def test_search_is_fast_on_large_history():
+    SearchService.reset()
+    loader = make_loader(15000)
+    SearchService.search("big", "a", loader)
+    
+    timings = []
+    for query in ["gonc", "padaria sim", "joão ribeiro 12", "manutenção", "livr", "otica ara"]:
+        started = time.perf_counter()
+        response = SearchService.search("big", query, loader)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response["indexed"] == 30000
+        assert response["results"]
+    
+    assert statistics.median(timings) < 10, timings
+    
+    # Erro de digitação ainda encontra pelos trigramas em comum
+    results = SearchService.search("big", "gonçalvez", loader)["results"]
+    assert results and all("Gonçalves" in f"{r['title']} {r['subtitle']}" for r in results)
+
+
+class ChangeLogStore:
+    """sync_heads e change_log de um usuário, como os triggers mantêm"""
+    
+    def __init__(self):
+        self.seq = 0
+        self.compacted_seq = 0
+        self.tables = {"clients": {}, "projects": {}, "payments": {}}
+        self.log = {}
+        self.reads = 0
+    
+    def write(self, entity, row, deleted=False):
+        self.seq += 1
+        if deleted:
+            self.tables[entity].pop(row["id"], None)
+        else:
+            self.tables[entity][row["id"]] = row
+        self.log[(entity, row["id"])] = {"seq": self.seq, "entity": entity, "row_id": row["id"], "deleted": deleted}
+    
+    def head(self, user_id):
+        return self.seq, self.compacted_seq
+    
+    def changes(self, user_id, since, limit):
+        self.reads += 1
+        return sorted((e for e in self.log.values() if e["seq"] > since), key=lambda e: e["seq"])[:limit]
+    
+    def rows(self, user_id, entity, ids=None):
+        return [row for row_id, row in self.tables[entity].items() if ids is None or row_id in ids]
+    
+    def loader(self, loads):
+        def load(user_id):
+            loads.append(user_id)
+            return [(kind, row) for kind in ("clients", "projects") for row in list(self.tables[kind].values())]
+        return load
+
+
+def test_writes_from_other_workers_reach_the_index_through_the_change_log():
+    SearchService.reset()
+    store, loads = ChangeLogStore(), []
+    loader = store.loader(loads)
+    store.write("clients", {"id": "1", "name": "Ana Lima", "company": None, "notes": None})
+    
+    assert SearchService.search("u1", "ana", loader, store=store)["indexed"] == 1
+    reads = store.reads
+    assert SearchService.search("u1", "lima", loader, store=store)["indexed"] == 1
+    # Sem escrita nova, o change_log nem é lido
+    assert store.reads == reads
+    
+    # Escritas feitas em outro worker
+    store.write("clients", {"id": "2", "name": "Anabela Prado", "company": "Ótica Prado", "notes": None})
+    store.write("projects", {"id": "p1", "title": "Loja Ótica", "description": None, "status": "DRAFT"})
+    store.write("payments", {"id": "pay1", "amount": 100})
+    store.write("clients", {"id": "1"}, deleted=True)
+    
+    results = SearchService.search("u1", "otica", loader, store=store)["results"]
+    assert sorted(result["id"] for result in results) == ["2", "p1"]
+    assert SearchService.search("u1", "ana lima", loader, store=store)["results"] == []
+    assert loads == ["u1"]
+    
+    # Tombstones compactados depois do seq do índice: monta de novo
+    index = SearchService.index_for("u1", loader, store)
+    store.write("clients", {"id": "3", "name": "Caio Souza", "company": None, "notes": None})
+    store.compacted_seq = store.seq
+    assert [r["id"] for r in SearchService.search("u1", "caio", loader, store=store)["results"]] == ["3"]
+    assert loads == ["u1", "u1"]
+    assert SearchService.index_for("u1", loader, store) is not index
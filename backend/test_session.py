@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Testes do carregamento de sessão (uma consulta, status da assinatura e coalescência de chamadas simultâneas)
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from app.services.session_service import RequestCoalescer, SessionService
+
+
+class FakeQuery:
+    def __init__(self, calls, row):
+        self.calls = calls
+        self.row = row
+    
+    def select(self, columns):
+        self.calls.append(("select", columns))
+        return self
+    
+    def eq(self, column, value):
+        self.calls.append(("eq", column, value))
+        return self
+    
+    def execute(self):
+        self.calls.append(("execute",))
+        return type("Result", (), {"data": [self.row]})()
+
+
+class FakeClient:
+    def __init__(self, row):
+        self.calls = []
+        self.row = row
+    
+    def table(self, name):
+        self.calls.append(("table", name))
+        return FakeQuery(self.calls, self.row)
+
+
+def test_bootstrap_reads_profile_subscription_and_counts_in_one_query():
+    end_date = (datetime.now(timezone.utc) + timedelta(days=10)).isoformat()
+    client = FakeClient({
+        "id": "u1", "email": "ana@x.com", "full_name": "Ana", "created_at": "2026-01-01T00:00:00+00:00",
+        "is_pro": True, "subscription_status": "active", "subscription_plan": "monthly",
+        "subscription_end_date": end_date,
+        "clients": [{"count": 4}], "projects": [{"count": 7}], "calculations": [{"count": 2}],
+        "pending_payments": [{"count": 3}], "overdue_payments": [],
+    })
+    row = SessionService.fetch(client, "u1")
+    assert [call[0] for call in client.calls].count("execute") == 1
+    columns = client.calls[1][1]
+    assert "clients(count)" in columns and "pending_payments:payments(count)" in columns
+    assert ("eq", "overdue_payments.status", "OVERDUE") in client.calls
+    
+    session, ttl, newly_expired = SessionService.bootstrap(row, 60)
+    assert session["user"] == {"id": "u1", "email": "ana@x.com", "full_name": "Ana", "created_at": "2026-01-01T00:00:00+00:00"}
+    assert session["subscription"]["is_pro"] is True and session["subscription"]["plan"] == "monthly"
+    assert session["counts"] == {"clients": 4, "projects": 7, "calculations": 2, "pending_payments": 3, "overdue_payments": 0}
+    assert ttl == 60 and newly_expired is False
+
+
+def test_subscription_state_expiry():
+    soon = (datetime.now() + timedelta(seconds=30)).isoformat()
+    state, ttl, newly_expired = SessionService.subscription_state({"is_pro": True, "subscription_end_date": soon}, 60)
+    # O cache não passa da expiração
+    assert state["is_pro"] is True and 0 < ttl <= 30 and not newly_expired
+    
+    past = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat().replace("+00:00", "Z")
+    state, _, newly_expired = SessionService.subscription_state(
+        {"is_pro": True, "subscription_status": "active", "subscription_end_date": past}, 60
+    )
+    assert newly_expired is True
+    assert state == {"is_pro": False, "status": "expired", "plan": None, "end_date": past, "is_expired": True}
+    
+    state, _, _ = SessionService.subscription_state({"is_pro": False, "subscription_status": None}, 60)
+    assert state["status"] == "free" and state["is_expired"] is False
+
+
+def test_concurrent_identical_calls_are_coalesced():
+    coalescer = RequestCoalescer()
+    calls = []
+    
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"user": {"id": "u1"}}
+    
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("banco fora")
+    
+    async def scenario():
+        results = await asyncio.gather(*[coalescer.run("session:u1", load) for _ in range(5)])
+        other = await coalescer.run("session:u2", load)
+        errors = await asyncio.gather(*[coalescer.run("session:u3", failing) for _ in range(3)], return_exceptions=True)
+        again = await coalescer.run("session:u1", load)
+        return results, other, errors, again
+    
+    results, other, errors, again = asyncio.run(scenario())
+    assert all(result == {"user": {"id": "u1"}} for result in results)
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    # u1 (5 juntas), u2, u3 (3 juntas) e u1 de novo depois de terminar
+    assert len(calls) == 4
+    assert coalescer.counters == {"executed": 4, "coalesced": 6}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Testes do cache compartilhado entre workers
+Usa processos reais para verificar que invalidações chegam a todos
+"""
+
+import multiprocessing
+import os
+import time
+from app.services.shared_cache import SharedCache
+
+
+def _worker(path, ready, invalidated, results, increments):
+    cache = SharedCache(path, slots=256)
+    
+    # Cada worker lê o valor gravado pelo processo principal
+    results.put(("before", cache.get("subscription:42")))
+    for _ in range(increments):
+        cache.incr("rate:42", ttl=60)
+    ready.release()
+    
+    # Depois da invalidação, nenhum worker pode ver o valor antigo
+    invalidated.wait(10)
+    results.put(("after", cache.get("subscription:42")))
+
+
+def test_invalidation_reaches_every_worker(tmp_path):
+    path = str(tmp_path / "cache")
+    cache = SharedCache(path, slots=256)
+    cache.set("subscription:42", {"is_pro": True}, ttl=60)
+    
+    context = multiprocessing.get_context("spawn")
+    ready = context.Semaphore(0)
+    invalidated = context.Event()
+    results = context.Queue()
+    workers = [
+        context.Process(target=_worker, args=(path, ready, invalidated, results, 100))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        assert ready.acquire(timeout=30)
+    
+    cache.delete("subscription:42")
+    invalidated.set()
+    for worker in workers:
+        worker.join(30)
+    
+    seen = [results.get(timeout=5) for _ in range(2 * len(workers))]
+    assert [value for phase, value in seen if phase == "before"] == [{"is_pro": True}] * 4
+    assert [value for phase, value in seen if phase == "after"] == [None] * 4
+    
+    # Contadores atômicos: nenhum incremento perdido entre processos
+    assert cache.get("rate:42") == 400
+
+
+def test_ttl_and_bounded_eviction(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache"), slots=32)
+    
+    cache.set("short", 1, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("short") is None
+    
+    for index in range(200):
+        cache.set(f"key:{index}", index)
+    stats = cache.stats()
+    assert stats["used"] <= 32
+    assert stats["evictions"] > 0
+    assert cache.get("key:199") == 199
+
+
+def test_new_layout_reinitialises_in_place_without_shrinking(tmp_path):
+    path = str(tmp_path / "cache")
+    large = SharedCache(path, slots=128)
+    large.set("subscription:1", {"is_pro": True})
+    size = os.path.getsize(path)
+    
+    # Worker com outra configuração: zera no lugar, o arquivo continua do mesmo tamanho
+    small = SharedCache(path, slots=16)
+    assert small.get("subscription:1") is None
+    small.set("subscription:2", {"is_pro": False})
+    assert os.path.getsize(path) == size
+    
+    # O worker antigo percebe o cabeçalho novo e não lê slots no layout errado
+    assert large.get("subscription:2") is None
+    large.set("subscription:1", {"is_pro": True})
+    assert large.get("subscription:1") == {"is_pro": True}
+    assert small.get("subscription:2") is None
+    assert os.path.getsize(path) == size
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Testes do frontend servido pela API (hash no nome, pré-compressão, ETag/Range e gzip dinâmico)
+"""
+
+import asyncio
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+from app.http_cache import CompressionMiddleware
+from app.static_site import StaticSite, StaticSiteMiddleware
+
+APP_JS = "// app\n" + "function calcular(valor) { return valor * 1.2; }\n" * 200
+INDEX = '<html><head><link rel="manifest" href="/manifest.json"></head><body><script src="app.js"></script></body></html>'
+
+
+def make_client(tmp_path):
+    source = tmp_path / "frontend"
+    source.mkdir()
+    (source / "index.html").write_text(INDEX)
+    (source / "app.js").write_text(APP_JS)
+    (source / "manifest.json").write_text('{"name": "FreelaBR"}')
+    (source / "service-worker.js").write_text("const PRECACHE = [{ url: '/app.js' }];")
+    (source / "icon.png").write_bytes(b"\x89PNG" + bytes(range(256)) * 8)
+    site = StaticSite(source, tmp_path / "build").build()
+    
+    app = FastAPI()
+    
+    @app.get("/api/report")
+    async def report():
+        return {"rows": [{"cliente": "Padaria São João", "valor": 1500.5}] * 100}
+    
+    @app.get("/api/small")
+    async def small():
+        return {"ok": True}
+    
+    @app.get("/api/image")
+    async def image():
+        return Response(content=b"\x89PNG" * 1000, media_type="image/png")
+    
+    app.add_middleware(StaticSiteMiddleware, site=site)
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return TestClient(app), site
+
+
+def test_build_fingerprints_and_rewrites_references(tmp_path):
+    client, site = make_client(tmp_path)
+    hashed_js = site.hashed_names["app.js"]
+    assert hashed_js.startswith("app.") and hashed_js.endswith(".js") and len(hashed_js) == len("app.js") + 13
+    
+    page = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert page.headers["cache-control"] == "no-cache"
+    assert f'src="/{hashed_js}"' in page.text
+    assert f'href="/{site.hashed_names["manifest.json"]}"' in page.text
+    assert f"'/{hashed_js}'" in client.get("/service-worker.js").text
+    
+    asset = client.get(f"/{hashed_js}")
+    assert asset.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert "javascript" in asset.headers["content-type"]
+    assert (tmp_path / "build" / f"{hashed_js}.gz").exists()
+    # Nome antigo continua respondendo, mas revalidado
+    assert client.get("/app.js").headers["cache-control"] == "no-cache"
+    assert client.get("/nao-existe.js").status_code == 404
+
+
+def test_precompressed_negotiation_etag_and_range(tmp_path):
+    client, site = make_client(tmp_path)
+    url = f"/{site.hashed_names['app.js']}"
+    
+    gzipped = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+    assert gzipped.text == APP_JS  # comprimido uma vez só (o gzip dinâmico não mexe)
+    assert int(gzipped.headers["content-length"]) < len(APP_JS) / 5
+    
+    plain = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["etag"] != gzipped.headers["etag"]
+    
+    cached = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped.headers["etag"]})
+    assert cached.status_code == 304 and cached.content == b""
+    
+    partial = client.get(url, headers={"Range": "bytes=0-6"})
+    assert partial.status_code == 206
+    assert partial.content == APP_JS[:7].encode()
+    assert partial.headers["content-range"] == f"bytes 0-6/{len(APP_JS)}"
+    assert client.get(url, headers={"Range": "bytes=-4"}).content == APP_JS[-4:].encode()
+    assert client.get(url, headers={"Range": f"bytes={len(APP_JS) + 10}-"}).status_code == 416
+    
+    head = client.head(url, headers={"Accept-Encoding": "identity"})
+    assert head.status_code == 200 and head.content == b""
+    assert head.headers["content-length"] == str(len(APP_JS))
+    
+    # PNG não é pré-comprimido
+    assert "content-encoding" not in client.get("/icon.png", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_dynamic_gzip_only_for_large_text_responses(tmp_path):
+    client, _ = make_client(tmp_path)
+    report = client.get("/api/report", headers={"Accept-Encoding": "gzip"})
+    assert report.headers["content-encoding"] == "gzip"
+    assert report.json()["rows"][0]["cliente"] == "Padaria São João"
+    
+    assert "content-encoding" not in client.get("/api/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/api/image", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/api/report", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_pathsend_passes_through_gzip(tmp_path):
+    client, site = make_client(tmp_path)
+    url = next(url for url in site.assets if url.startswith("/icon."))
+    messages = []
+    
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    
+    async def send(message):
+        messages.append(message)
+    
+    scope = {
+        "type": "http", "method": "GET", "path": url, "query_string": b"", "root_path": "",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "extensions": {"http.response.pathsend": {}},
+    }
+    asyncio.run(asyncio.wait_for(client.app(scope, receive, send), timeout=5))
+    
+    assert [message["type"] for message in messages] == ["http.response.start", "http.response.pathsend"]
+    assert messages[0]["status"] == 200
+    assert (b"content-encoding", b"gzip") not in messages[0]["headers"]
+    assert open(messages[1]["path"], "rb").read().startswith(b"\x89PNG")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Testes da sincronização incremental (cursor por usuário, formato colunar e compactação de tombstones)
+"""
+
+from datetime import datetime, timedelta, timezone
+from app.services.sync_service import SyncService, SYNC_TABLES, TOMBSTONE_RETENTION_DAYS
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+
+
+class MemoryChangeLogStore:
+    """Tabelas do usuário e o change_log, com o mesmo efeito dos triggers"""
+    
+    def __init__(self):
+        self.tables = {entity: {} for entity in SYNC_TABLES}
+        self.heads = {}
+        self.log = {}
+    
+    def write(self, user_id, entity, row, deleted=False, at=NOW):
+        seq, compacted = self.heads.get(user_id, (0, 0))
+        self.heads[user_id] = (seq + 1, compacted)
+        if deleted:
+            self.tables[entity].pop(row["id"], None)
+        else:
+            self.tables[entity][row["id"]] = {**row, "user_id": user_id}
+        self.log[(user_id, entity, row["id"])] = {
+            "user_id": user_id, "seq": seq + 1, "entity": entity, "row_id": row["id"],
+            "deleted": deleted, "changed_at": at.isoformat(),
+        }
+    
+    def head(self, user_id):
+        return self.heads.get(user_id, (0, 0))
+    
+    def changes(self, user_id, since, limit):
+        entries = sorted((e for e in self.log.values() if e["user_id"] == user_id and e["seq"] > since), key=lambda e: e["seq"])
+        return entries[:limit]
+    
+    def rows(self, user_id, entity, ids=None):
+        return [
+            row for row_id, row in sorted(self.tables[entity].items())
+            if row["user_id"] == user_id and (ids is None or row_id in ids)
+        ]
+    
+    def expired_tombstones(self, cutoff, limit):
+        return [e for e in self.log.values() if e["deleted"] and e["changed_at"] < cutoff][:limit]
+    
+    def advance_compacted(self, user_id, seq):
+        head, compacted = self.heads[user_id]
+        self.heads[user_id] = (head, max(compacted, seq))
+    
+    def delete_tombstones(self, user_id, max_seq, cutoff):
+        for key, e in list(self.log.items()):
+            if e["user_id"] == user_id and e["deleted"] and e["seq"] <= max_seq and e["changed_at"] < cutoff:
+                del self.log[key]
+
+
+def unpack(table):
+    return [dict(zip(table["columns"], row)) for row in table["rows"]]
+
+
+def test_incremental_pull_returns_only_changes_after_cursor():
+    store = MemoryChangeLogStore()
+    store.write("u1", "clients", {"id": "c1", "name": "Padaria"})
+    store.write("u1", "projects", {"id": "p1", "client_id": "c1", "title": "Site", "value": 3000})
+    store.write("u2", "clients", {"id": "c9", "name": "Outro usuário"})
+    
+    first = SyncService.pull(store, "u1", None)
+    assert first["reset"] is True and first["cursor"] == "2"
+    assert unpack(first["changes"]["clients"]) == [{column: None for column in SYNC_TABLES["clients"]} | {"id": "c1", "name": "Padaria"}]
+    assert "user_id" not in first["changes"]["projects"]["columns"]
+    
+    # Nada mudou
+    assert SyncService.pull(store, "u1", 2) == {"cursor": "2", "reset": False, "has_more": False, "changes": {}, "deleted": {}}
+    
+    # Várias edições da mesma linha viram uma entrada só
+    store.write("u1", "projects", {"id": "p1", "client_id": "c1", "title": "Site novo", "value": 3500})
+    store.write("u1", "projects", {"id": "p1", "client_id": "c1", "title": "Site final", "value": 4000})
+    store.write("u1", "payments", {"id": "pay1", "project_id": "p1", "amount": 2000})
+    store.write("u1", "clients", {"id": "c1"}, deleted=True)
+    delta = SyncService.pull(store, "u1", 2)
+    assert delta["cursor"] == "6" and delta["reset"] is False
+    assert [row["title"] for row in unpack(delta["changes"]["projects"])] == ["Site final"]
+    assert unpack(delta["changes"]["payments"])[0]["amount"] == 2000
+    assert delta["deleted"] == {"clients": ["c1"]}
+    assert "clients" not in delta["changes"]
+
+
+def test_pagination_and_invalid_cursors():
+    store = MemoryChangeLogStore()
+    for i in range(5):
+        store.write("u1", "calculations", {"id": f"calc{i}", "name": f"Cálculo {i}"})
+    
+    page = SyncService.pull(store, "u1", 0, limit=3)
+    assert page["has_more"] is True and page["cursor"] == "3"
+    assert len(page["changes"]["calculations"]["rows"]) == 3
+    rest = SyncService.pull(store, "u1", int(page["cursor"]), limit=3)
+    assert rest["has_more"] is False and rest["cursor"] == "5"
+    
+    # Cursor à frente do head (outro banco, cursor adulterado) -> reset
+    assert SyncService.pull(store, "u1", 99)["reset"] is True
+    assert SyncService.parse_cursor("") is None
+    try:
+        SyncService.parse_cursor("-1")
+        assert False, "cursor negativo deveria falhar"
+    except ValueError:
+        pass
+
+
+def test_tombstone_compaction_forces_reset_only_for_stale_cursors():
+    store = MemoryChangeLogStore()
+    old = NOW - timedelta(days=TOMBSTONE_RETENTION_DAYS + 5)
+    store.write("u1", "clients", {"id": "c1", "name": "A"}, at=old)
+    store.write("u1", "clients", {"id": "c2", "name": "B"}, at=old)
+    store.write("u1", "clients", {"id": "c1"}, deleted=True, at=old)
+    store.write("u1", "clients", {"id": "c3", "name": "C"})
+    store.write("u1", "clients", {"id": "c2"}, deleted=True)
+    
+    assert SyncService.compact(store, now=NOW) == 1
+    assert ("u1", "clients", "c1") not in store.log
+    assert store.log[("u1", "clients", "c2")]["deleted"] is True
+    
+    # Quem sincronizou antes da exclusão compactada recebe o estado completo
+    stale = SyncService.pull(store, "u1", 2)
+    assert stale["reset"] is True
+    assert [row["id"] for row in unpack(stale["changes"]["clients"])] == ["c3"]
+    
+    recent = SyncService.pull(store, "u1", 3)
+    assert recent["reset"] is False
+    assert recent["deleted"] == {"clients": ["c2"]}
+    assert SyncService.compact(store, now=NOW) == 0
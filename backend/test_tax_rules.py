@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Testes do manifesto de regras tributárias (ETag, 304 e rota versionada)
+"""
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.http_cache import REVALIDATE_CACHE_CONTROL, IMMUTABLE_CACHE_CONTROL
+from app.services.calculator_service import CalculatorService
+from app.services.tax_rules_service import TaxRulesService
+
+
+def test_manifest_revalidates_with_etag():
+    client = TestClient(app)
+    first = client.get("/api/calculator/tax-rules")
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    assert first.headers["x-tax-rules-version"] == CalculatorService.TAX_TABLE_VERSION
+    assert first.json() == CalculatorService.get_tax_rules()
+    etag = first.headers["etag"]
+    
+    # Mesma versão no cliente: 304 sem corpo
+    cached = client.get("/api/calculator/tax-rules", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert client.get("/api/calculator/tax-rules", headers={"If-None-Match": f'"outro", W/{etag}'}).status_code == 304
+    assert client.get("/api/calculator/tax-rules", headers={"If-None-Match": '"outro"'}).status_code == 200
+    
+    # Bytes pré-serializados: mesmo ETag depois de reconstruir
+    TaxRulesService.reset()
+    assert TaxRulesService.manifest()[1] == etag
+
+
+def test_version_route_is_immutable():
+    client = TestClient(app)
+    version = TaxRulesService.version()
+    current = client.get(f"/api/calculator/tax-rules/{version}")
+    assert current.status_code == 200
+    assert current.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert current.headers["etag"] == TaxRulesService.manifest()[1]
+    assert client.get(
+        f"/api/calculator/tax-rules/{version}", headers={"If-None-Match": current.headers["etag"]}
+    ).status_code == 304
+    
+    missing = client.get("/api/calculator/tax-rules/1999.1")
+    assert missing.status_code == 404
+    assert version in missing.json()["detail"]
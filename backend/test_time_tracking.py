@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Testes do registro de horas (lançamentos só de inserção, rollups e valor/hora efetivo)
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from postgrest.exceptions import APIError
+from app.services.time_tracking_service import SupabaseTimeStore, TimeTrackingService, TimeConflictError, split_by_month
+
+
+class MemoryTimeStore:
+    """Tabelas time_entries, time_rollups e time_timers em memória"""
+    
+    def __init__(self):
+        self.entries = []
+        self.rollup_rows = {}
+        self.timers = {}
+    
+    def record(self, user_id, rows, rollups):
+        # Mesmo efeito da função record_time_entries (soma, não sobrescreve)
+        inserted = [{**row, "id": f"e{len(self.entries) + i}"} for i, row in enumerate(rows)]
+        self.entries.extend(inserted)
+        for delta in rollups:
+            key = (user_id, delta["project_id"], delta["month"])
+            row = self.rollup_rows.setdefault(key, {"project_id": delta["project_id"], "month": delta["month"], "seconds": 0, "entries": 0})
+            row["seconds"] += delta["seconds"]
+            row["entries"] += delta["entries"]
+        return inserted
+    
+    def get_entry(self, user_id, entry_id):
+        return next((e for e in self.entries if e["id"] == entry_id and e["user_id"] == user_id), None)
+    
+    def is_voided(self, user_id, entry_id):
+        return any(e["voids"] == entry_id for e in self.entries)
+    
+    def rollups(self, user_id, project_ids=None):
+        return [
+            row for (uid, project_id, _), row in self.rollup_rows.items()
+            if uid == user_id and (project_ids is None or project_id in project_ids)
+        ]
+    
+    def get_timer(self, user_id):
+        return self.timers.get(user_id)
+    
+    def start_timer(self, row):
+        self.timers[row["user_id"]] = row
+    
+    def stop_timer(self, user_id):
+        return self.timers.pop(user_id, None)
+
+
+def test_entries_roll_up_by_month_and_voids_subtract():
+    store = MemoryTimeStore()
+    start = datetime(2026, 1, 31, 22, 0)
+    assert split_by_month(start, start + timedelta(hours=3)) == [("2026-01", 7200), ("2026-02", 3600)]
+    
+    rows = [
+        TimeTrackingService.entry_row("u1", "p1", start, start + timedelta(hours=3)),
+        TimeTrackingService.entry_row("u1", "p1", datetime(2026, 2, 2, 9), datetime(2026, 2, 2, 13)),
+        TimeTrackingService.entry_row("u1", "p2", datetime(2026, 2, 3, 9), datetime(2026, 2, 3, 10)),
+    ]
+    inserted = TimeTrackingService.record(store, "u1", rows)
+    rollups = {(row["project_id"], row["month"]): row for row in store.rollups("u1")}
+    assert rollups[("p1", "2026-01")]["seconds"] == 7200
+    assert rollups[("p1", "2026-02")] == {"project_id": "p1", "month": "2026-02", "seconds": 5 * 3600, "entries": 2}
+    
+    # Correção: o original continua gravado e um lançamento inverso é somado
+    assert TimeTrackingService.void(store, "u1", inserted[1]["id"])["seconds"] == -4 * 3600
+    with pytest.raises(TimeConflictError):
+        TimeTrackingService.void(store, "u1", inserted[1]["id"])
+    assert TimeTrackingService.void(store, "u1", "missing") is None
+    assert len(store.entries) == 4
+    rollups = {(row["project_id"], row["month"]): row for row in store.rollups("u1")}
+    assert rollups[("p1", "2026-02")]["seconds"] == 3600
+    assert rollups[("p1", "2026-02")]["entries"] == 1
+    
+    try:
+        TimeTrackingService.validate(start, start - timedelta(minutes=1))
+        assert False, "lançamento invertido deveria falhar"
+    except ValueError:
+        pass
+
+
+
+def test_record_sends_deltas_without_reading_rollups():
+    store = MemoryTimeStore()
+    store.rollups = lambda *args: (_ for _ in ()).throw(AssertionError("rollups lidos na gravação"))
+    # Outro worker já somou 1h no mesmo mês
+    store.rollup_rows[("u1", "p1", "2026-04")] = {"project_id": "p1", "month": "2026-04", "seconds": 3600, "entries": 1}
+    
+    TimeTrackingService.record(store, "u1", [
+        TimeTrackingService.entry_row("u1", "p1", datetime(2026, 4, 1, 9), datetime(2026, 4, 1, 11)),
+    ])
+    assert store.rollup_rows[("u1", "p1", "2026-04")]["seconds"] == 3 * 3600
+    assert store.rollup_rows[("u1", "p1", "2026-04")]["entries"] == 2
+
+def test_timer_start_stop_records_entry():
+    store = MemoryTimeStore()
+    started = datetime(2026, 3, 10, 14, 0)
+    assert TimeTrackingService.start_timer(store, "u1", "p1", now=started) is not None
+    assert TimeTrackingService.start_timer(store, "u1", "p2", now=started) is None
+    
+    entry = TimeTrackingService.stop_timer(store, "u1", now=started + timedelta(minutes=90))
+    assert entry["seconds"] == 5400 and entry["project_id"] == "p1"
+    assert TimeTrackingService.stop_timer(store, "u1") is None
+    assert store.rollups("u1")[0]["seconds"] == 5400
+
+
+def test_effective_rate_per_project_and_client_from_rollups():
+    rollups = [
+        {"project_id": "site", "month": "2026-01", "seconds": 20 * 3600, "entries": 5},
+        {"project_id": "site", "month": "2026-02", "seconds": 20 * 3600, "entries": 5},
+        {"project_id": "app", "month": "2026-02", "seconds": 100 * 3600, "entries": 30},
+        {"project_id": "logo", "month": "2026-02", "seconds": 10 * 3600, "entries": 2},
+    ]
+    projects = [
+        {"id": "site", "title": "Site", "value": "6000", "client_id": "c1"},
+        {"id": "app", "title": "App", "value": 8000, "client_id": "c1"},
+        {"id": "logo", "title": "Logo", "value": 2000, "client_id": "c2"},
+        {"id": "sem-horas", "title": "Sem horas", "value": 1000, "client_id": "c2"},
+    ]
+    clients = [{"id": "c1", "name": "Padaria"}, {"id": "c2", "name": "Ótica"}]
+    
+    report = TimeTrackingService.analytics(rollups, projects, clients, Decimal("100"))
+    by_project = {item["project_id"]: item for item in report["projects"]}
+    assert set(by_project) == {"site", "app", "logo"}
+    assert by_project["site"]["effective_hourly_rate"] == 150.0
+    assert by_project["app"]["vs_recommended"] == 0.8
+    # O projeto que mais se afasta para baixo vem primeiro
+    assert report["projects"][0]["project_id"] == "app"
+    
+    by_client = {item["client_id"]: item for item in report["clients"]}
+    assert by_client["c1"]["hours"] == 140.0
+    assert by_client["c1"]["effective_hourly_rate"] == 100.0
+    assert by_client["c2"]["name"] == "Ótica"
+    assert report["months"] == [{"month": "2026-01", "hours": 20.0}, {"month": "2026-02", "hours": 130.0}]
+    
+    assert TimeTrackingService.analytics(rollups, projects, clients, None)["projects"][0]["vs_recommended"] is None
+
+
+def test_concurrent_conflicts_surface_from_unique_constraints():
+    """A checagem prévia passou, mas outra requisição gravou antes: a constraint do banco decide"""
+    store = MemoryTimeStore()
+    
+    def conflict(*args):
+        raise TimeConflictError("duplicate key")
+    
+    store.start_timer = conflict
+    assert TimeTrackingService.start_timer(store, "u1", "p1") is None
+    
+    entry = TimeTrackingService.record(store, "u1", [
+        TimeTrackingService.entry_row("u1", "p1", datetime(2026, 5, 4, 9), datetime(2026, 5, 4, 10)),
+    ])[0]
+    store.record = conflict
+    with pytest.raises(TimeConflictError):
+        TimeTrackingService.void(store, "u1", entry["id"])
+    
+    # Unique violation do Postgres vira TimeConflictError no store do Supabase
+    class Client:
+        def table(self, name):
+            return self
+        
+        def insert(self, row):
+            return self
+        
+        def execute(self):
+            raise APIError({"code": "23505", "message": "duplicate key value violates unique constraint"})
+    
+    with pytest.raises(TimeConflictError):
+        SupabaseTimeStore(Client()).start_timer({"user_id": "u1"})
@@ -1,47 +1,43 @@
 // FreelaBR - Calculator Logic (Frontend)
 // Implementa a mesma lógica do backend em JavaScript
+// As regras (DAS MEI, salário mínimo, tabela IR, regimes) vêm do manifesto
+// /api/calculator/tax-rules, gerado a partir do CalculatorService do backend
+
+const TAX_RULES_STORAGE_KEY = 'freelabr_tax_rules';
+const TAX_RULES_ENDPOINT = '/api/calculator/tax-rules';
+
+// Lê o manifesto salvo localmente (permite calcular offline)
+function loadCachedTaxRules() {
+    try {
+        const cached = localStorage.getItem(TAX_RULES_STORAGE_KEY);
+        return cached ? JSON.parse(cached) : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+// Busca o manifesto na API (o navegador revalida via ETag)
+async function fetchTaxRules() {
+    const response = await fetch(`${API_CONFIG.BASE_URL}${TAX_RULES_ENDPOINT}`);
+    if (!response.ok) {
+        throw new Error('Erro ao carregar regras tributárias');
+    }
+    const rules = await response.json();
+    localStorage.setItem(TAX_RULES_STORAGE_KEY, JSON.stringify(rules));
+    return rules;
+}
 
 class FreelaBRCalculator {
-    constructor() {
-        // Valores fixos 2025
-        this.MEI_DAS_VALUE = 81.90;
-        this.MINIMUM_WAGE = 1518.00;
-        
-        // Informações sobre regimes tributários
-        this.taxRegimes = {
-            MEI: {
-                name: "Microempreendedor Individual (MEI)",
-                monthly_cost: this.MEI_DAS_VALUE,
-                description: `Valor fixo mensal de R$ ${this.MEI_DAS_VALUE.toFixed(2)} (DAS 2025)`,
-                limit: "Faturamento anual até R$ 81.000",
-                benefits: ["Simples", "Barato", "Poucas obrigações"],
-                drawbacks: ["Limite de faturamento", "Apenas 1 funcionário"]
-            },
-            PJ_SIMPLES: {
-                name: "Simples Nacional - Anexo III",
-                percentage: "6% a 33%",
-                description: "Alíquota inicial de 6% sobre faturamento",
-                limit: "Faturamento anual até R$ 4,8 milhões",
-                benefits: ["Menos burocracia", "Alíquota progressiva"],
-                drawbacks: ["Aumenta com faturamento", "Obrigações acessórias"]
-            },
-            PJ_PRESUMIDO: {
-                name: "Lucro Presumido",
-                percentage: "~16,33%",
-                description: "IR + CSLL + PIS/COFINS + ISS",
-                limit: "Faturamento anual até R$ 78 milhões",
-                benefits: ["Previsível", "Bom para margens altas"],
-                drawbacks: ["Mais complexo", "Mais caro que Simples inicial"]
-            },
-            AUTONOMO: {
-                name: "Autônomo (Pessoa Física)",
-                percentage: "20% INSS + IR progressivo",
-                description: "INSS 20% sobre salário mínimo + IR progressivo",
-                limit: "Sem limite",
-                benefits: ["Flexível", "Sem burocracia"],
-                drawbacks: ["IR progressivo alto", "Menos benefícios"]
-            }
-        };
+    constructor(rules) {
+        this.setRules(rules);
+    }
+
+    setRules(rules) {
+        this.rules = rules;
+        this.version = rules.version;
+        this.MEI_DAS_VALUE = rules.mei_das_value;
+        this.MINIMUM_WAGE = rules.minimum_wage;
+        this.taxRegimes = rules.regimes;
     }
 
     calculate(input) {
@@ -87,9 +83,10 @@ class FreelaBRCalculator {
         const weeklyRate = dailyRate * workingDaysPerWeek;
         
         // 7. Sugerir valores para projetos
-        const smallProjectValue = hourlyRate * 30;   // ~30h
-        const mediumProjectValue = hourlyRate * 100; // ~100h
-        const largeProjectValue = hourlyRate * 200;  // ~200h
+        const projectHours = this.rules.project_hours;
+        const smallProjectValue = hourlyRate * projectHours.small;   // ~30h
+        const mediumProjectValue = hourlyRate * projectHours.medium; // ~100h
+        const largeProjectValue = hourlyRate * projectHours.large;   // ~200h
         
         // 8. Retornar resultado
         return {
@@ -122,17 +119,16 @@ class FreelaBRCalculator {
             
             case 'PJ_SIMPLES':
                 // Simples Nacional - Anexo III (serviços)
-                // Alíquota inicial de 6%
-                return monthlyIncome * 0.06;
+                return monthlyIncome * (this.rules.rates.PJ_SIMPLES / 100);
             
             case 'PJ_PRESUMIDO':
                 // Lucro Presumido - alíquota média
-                // IR + CSLL + PIS/COFINS + ISS = ~16,33%
-                return monthlyIncome * 0.1633;
+                // IR + CSLL + PIS/COFINS + ISS
+                return monthlyIncome * (this.rules.rates.PJ_PRESUMIDO / 100);
             
             case 'AUTONOMO':
                 // Autônomo - INSS + IR progressivo
-                const inss = this.MINIMUM_WAGE * 0.20; // 20% sobre salário mínimo
+                const inss = this.MINIMUM_WAGE * (this.rules.rates.AUTONOMO_INSS / 100); // 20% sobre salário mínimo
                 const ir = this.calculateProgressiveIR(monthlyIncome);
                 return inss + ir;
             
@@ -142,18 +138,16 @@ class FreelaBRCalculator {
     }
 
     calculateProgressiveIR(monthlyIncome) {
-        // Tabela IR 2025 (simplificada)
-        if (monthlyIncome <= 2259.20) {
-            return 0;
-        } else if (monthlyIncome <= 2828.65) {
-            return (monthlyIncome * 0.075) - 169.44;
-        } else if (monthlyIncome <= 3751.05) {
-            return (monthlyIncome * 0.15) - 381.44;
-        } else if (monthlyIncome <= 4664.68) {
-            return (monthlyIncome * 0.225) - 662.77;
-        } else {
-            return (monthlyIncome * 0.275) - 896.00;
+        // Tabela IR progressiva (faixas do manifesto)
+        for (const bracket of this.rules.ir_brackets) {
+            if (bracket.up_to === null || monthlyIncome <= bracket.up_to) {
+                if (bracket.rate === 0) {
+                    return 0;
+                }
+                return (monthlyIncome * bracket.rate) - bracket.deduction;
+            }
         }
+        return 0;
     }
 
     getTaxInfo(taxRegime) {
@@ -161,8 +155,8 @@ class FreelaBRCalculator {
     }
 }
 
-// Inicializar calculadora
-const calculator = new FreelaBRCalculator();
+// Calculadora é criada assim que houver regras (cache local ou API)
+let calculator = null;
 
 // Elementos do DOM
 const form = document.getElementById('calculatorForm');
@@ -179,12 +173,41 @@ profitMarginInput.addEventListener('input', (e) => {
 
 // Atualizar informação do regime tributário
 taxRegimeSelect.addEventListener('change', (e) => {
+    if (!calculator) return;
     const info = calculator.getTaxInfo(e.target.value);
     regimeInfo.textContent = info.description || '';
 });
 
-// Inicializar info do regime
-regimeInfo.textContent = calculator.getTaxInfo('MEI').description;
+// Aplica um manifesto de regras e recalcula
+function applyTaxRules(rules) {
+    if (calculator && calculator.version === rules.version) {
+        return;
+    }
+    if (calculator) {
+        calculator.setRules(rules);
+    } else {
+        calculator = new FreelaBRCalculator(rules);
+    }
+    regimeInfo.textContent = calculator.getTaxInfo(taxRegimeSelect.value).description || '';
+    form.dispatchEvent(new Event('submit'));
+}
+
+// Inicializar calculadora: usa o cache imediatamente e atualiza em segundo plano
+function initCalculator() {
+    const cachedRules = loadCachedTaxRules();
+    if (cachedRules) {
+        applyTaxRules(cachedRules);
+    }
+
+    fetchTaxRules()
+        .then(applyTaxRules)
+        .catch((error) => {
+            if (!cachedRules) {
+                regimeInfo.textContent = 'Não foi possível carregar as regras tributárias. Verifique sua conexão.';
+            }
+            console.error('Erro ao carregar regras tributárias:', error);
+        });
+}
 
 // Função para formatar moeda
 function formatCurrency(value) {
@@ -194,9 +217,10 @@ function formatCurrency(value) {
     }).format(value);
 }
 
-// Handler do formulário
-form.addEventListener('submit', (e) => {
-    e.preventDefault();
+// Calcula e exibe o resultado com os valores atuais do formulário
+function runCalculation() {
+    // Regras ainda não carregadas
+    if (!calculator) return false;
     
     // Coletar inputs
     const input = {
@@ -217,6 +241,14 @@ form.addEventListener('submit', (e) => {
     
     // Exibir resultados
     displayResults(result, input);
+    return true;
+}
+
+// Handler do formulário
+form.addEventListener('submit', (e) => {
+    e.preventDefault();
+    
+    if (!runCalculation()) return;
     
     // Mostrar seção de resultados com animação
     resultsSection.classList.remove('hidden');
@@ -245,7 +277,11 @@ function displayResults(result, input) {
     document.getElementById('workingHours').textContent = result.workingHoursPerMonth + 'h';
 }
 
-// Inicializar com cálculo automático ao carregar a página
-window.addEventListener('load', () => {
-    form.dispatchEvent(new Event('submit'));
+// Recalcular localmente a cada alteração (sem chamadas à API)
+form.addEventListener('input', () => {
+    if (resultsSection.classList.contains('hidden')) return;
+    runCalculation();
 });
+
+// Inicializar com cálculo automático ao carregar a página
+window.addEventListener('load', initCalculator);
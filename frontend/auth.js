@@ -7,8 +7,69 @@ const API_CONFIG = {
         : 'https://freelabr-backend.onrender.com'
 };
 
+// Renovação em andamento (compartilhada entre requisições simultâneas)
+let refreshInFlight = null;
+
+// Troca o refresh token por um novo par; retorna false se a sessão acabou
+async function refreshSession() {
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (!refreshToken) {
+        return false;
+    }
+
+    if (!refreshInFlight) {
+        refreshInFlight = withRefreshLock(() => rotateRefreshToken(refreshToken))
+            .catch(() => false)
+            .finally(() => {
+                refreshInFlight = null;
+            });
+    }
+    return refreshInFlight;
+}
+
+// Uma aba renova por vez; as outras esperam e usam o par que ela gravou
+function withRefreshLock(callback) {
+    if (navigator.locks) {
+        return navigator.locks.request('freelabr-refresh', callback);
+    }
+    return callback();
+}
+
+async function rotateRefreshToken(refreshToken) {
+    // Outra aba já trocou este token enquanto esperávamos o lock
+    const current = localStorage.getItem('refresh_token');
+    if (current !== refreshToken) {
+        return Boolean(current);
+    }
+
+    const response = await fetch(`${API_CONFIG.BASE_URL}/api/auth/refresh`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ refresh_token: refreshToken }),
+    });
+    if (!response.ok) {
+        clearSession();
+        return false;
+    }
+    saveSession(await response.json());
+    return true;
+}
+
+// Guarda os tokens retornados por login, registro ou renovação
+function saveSession(data) {
+    localStorage.setItem('access_token', data.access_token);
+    if (data.refresh_token) {
+        localStorage.setItem('refresh_token', data.refresh_token);
+    }
+}
+
+function clearSession() {
+    localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+}
+
 // Função auxiliar para fazer requisições à API
-async function apiRequest(endpoint, options = {}) {
+async function apiRequest(endpoint, options = {}, retried = false) {
     const url = `${API_CONFIG.BASE_URL}${endpoint}`;
 
     const defaultOptions = {
@@ -32,6 +93,11 @@ async function apiRequest(endpoint, options = {}) {
 
     const response = await fetch(url, finalOptions);
 
+    // Token de acesso expirado: renova uma vez e repete a requisição
+    if (response.status === 401 && token && !retried && await refreshSession()) {
+        return apiRequest(endpoint, options, true);
+    }
+
     if (!response.ok) {
         const error = await response.json().catch(() => ({ detail: 'Erro na requisição' }));
         throw new Error(error.detail || 'Erro na requisição');
@@ -56,8 +122,8 @@ async function login(email, password) {
             body: formData,
         });
 
-        // Salva o token
-        localStorage.setItem('access_token', data.access_token);
+        // Salva os tokens
+        saveSession(data);
 
         return { success: true, data };
     } catch (error) {
@@ -70,6 +136,8 @@ async function register(email, password, fullName) {
     try {
         const data = await apiRequest('/api/auth/register', {
             method: 'POST',
+            // Duplo clique no cadastro não cria a conta duas vezes
+            headers: { 'Idempotency-Key': `register:${email.toLowerCase()}` },
             body: JSON.stringify({
                 email,
                 password,
@@ -86,19 +154,37 @@ async function register(email, password, fullName) {
     }
 }
 
+// Sessão da página (perfil, assinatura e contagens do painel) em uma
+// requisição, compartilhada por todo mundo que precisar dela
+let sessionPromise = null;
+
+function getSession(refresh = false) {
+    if (!sessionPromise || refresh) {
+        sessionPromise = apiRequest('/api/session').catch((error) => {
+            sessionPromise = null;
+            throw error;
+        });
+    }
+    return sessionPromise;
+}
+
 // Função para obter dados do usuário
-async function getCurrentUser() {
+async function getCurrentUser(refresh = false) {
     try {
-        const data = await apiRequest('/api/auth/me');
-        return { success: true, data };
+        const session = await getSession(refresh);
+        return { success: true, data: session.user };
     } catch (error) {
         return { success: false, error: error.message };
     }
 }
 
 // Função de logout
-function logout() {
-    localStorage.removeItem('access_token');
+async function logout() {
+    // Revoga a sessão no servidor (sem bloquear a saída se falhar)
+    if (getToken()) {
+        await apiRequest('/api/auth/logout', { method: 'POST' }).catch(() => undefined);
+    }
+    clearSession();
     window.location.href = '/login.html';
 }
 
@@ -127,11 +213,11 @@ function redirectIfAuthenticated() {
 }
 
 // Função para exibir nome do usuário
-async function displayUserName() {
+async function displayUserName(refresh = false) {
     const userNameElement = document.getElementById('userName');
     if (!userNameElement) return;
 
-    const result = await getCurrentUser();
+    const result = await getCurrentUser(refresh);
     if (result.success) {
         userNameElement.textContent = result.data.full_name;
     } else {
@@ -140,6 +226,73 @@ async function displayUserName() {
     }
 }
 
+// Eventos de pagamento via SSE (fetch + stream para mandar o token no header,
+// que o EventSource não permite). Reconecta sozinho com Last-Event-ID e
+// devolve uma função que encerra a escuta.
+function subscribePaymentEvents(onEvent) {
+    let stopped = false;
+    let lastEventId = '';
+    let retryMs = 3000;
+    let controller = null;
+
+    const dispatch = (block) => {
+        const event = { id: '', type: 'message', data: '' };
+        for (const line of block.split('\n')) {
+            const [field, ...rest] = line.split(':');
+            const value = rest.join(':').replace(/^ /, '');
+            if (field === 'id') event.id = value;
+            else if (field === 'event') event.type = value;
+            else if (field === 'data') event.data += value;
+            else if (field === 'retry' && /^\d+$/.test(value)) retryMs = Number(value);
+        }
+        if (event.id) lastEventId = event.id;
+        if (event.data) onEvent(event.type, JSON.parse(event.data));
+    };
+
+    const connect = async () => {
+        while (!stopped) {
+            controller = new AbortController();
+            const headers = { 'Authorization': `Bearer ${getToken()}` };
+            if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+            try {
+                const response = await fetch(`${API_CONFIG.BASE_URL}/api/subscription/events`, {
+                    headers,
+                    signal: controller.signal,
+                });
+                if (response.status === 401 && !await refreshSession()) {
+                    return;
+                }
+                if (response.status === 503) {
+                    retryMs = Number(response.headers.get('Retry-After') || 10) * 1000;
+                }
+                if (response.ok) {
+                    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                    let buffer = '';
+                    while (true) {
+                        const { value, done } = await reader.read();
+                        if (done) break;
+                        buffer += value.replace(/\r\n?/g, '\n');
+                        let end;
+                        while ((end = buffer.indexOf('\n\n')) >= 0) {
+                            dispatch(buffer.slice(0, end));
+                            buffer = buffer.slice(end + 2);
+                        }
+                    }
+                }
+            } catch (error) {
+                if (stopped) return;
+            }
+            await new Promise((resolve) => setTimeout(resolve, retryMs));
+        }
+    };
+
+    connect();
+    return () => {
+        stopped = true;
+        if (controller) controller.abort();
+    };
+}
+
 // Função para calcular valores
 async function calculateValues(data) {
     try {
@@ -1,29 +1,94 @@
-const CACHE_NAME = 'freelabr-v1.8.0';
-const urlsToCache = [
-  '/',
-  '/index.html',
-  '/login.html',
-  '/register.html',
-  '/app.js',
-  '/auth.js',
-  '/manifest.json',
-  '/icon-192.png',
-  '/icon-512.png',
+const CACHE_VERSION = 'v2.0.0';
+const PRECACHE_NAME = `freelabr-precache-${CACHE_VERSION}`;
+const RUNTIME_CACHE_NAME = `freelabr-runtime-${CACHE_VERSION}`;
+const API_CACHE_NAME = `freelabr-api-${CACHE_VERSION}`;
+
+// Limites dos caches dinâmicos (entradas mais antigas são removidas)
+const RUNTIME_CACHE_MAX_ENTRIES = 40;
+const API_CACHE_MAX_ENTRIES = 60;
+
+// Assets estáticos com hash de conteúdo (gerado por update-precache.js)
+// Só são baixados de novo na instalação quando o hash muda
+// PRECACHE_MANIFEST:START
+const PRECACHE_MANIFEST = [
+  { url: '/', revision: 'c1750cfc251652bd' },
+  { url: '/index.html', revision: 'c1750cfc251652bd' },
+  { url: '/login.html', revision: 'e20c4966e86b0fec' },
+  { url: '/register.html', revision: '0a3f1647981a8a76' },
+  { url: '/pricing.html', revision: '330e428402e7f941' },
+  { url: '/payment-success.html', revision: '7972aa0116a0e7cf' },
+  { url: '/payment-failure.html', revision: 'a02a1d9c6ab396d8' },
+  { url: '/payment-pending.html', revision: 'f6aead98f24fa9f4' },
+  { url: '/app.js', revision: '41b9a5396478e46f' },
+  { url: '/auth.js', revision: 'd1ef63b0ba9d6d62' },
+  { url: '/manifest.json', revision: '3e5f2ed8a278849e' },
+  { url: '/icon.svg', revision: '7d2a2ecb3677c224' },
+  { url: '/icon-192.png', revision: '8ab8cd8b9ad34272' },
+  { url: '/icon-512.png', revision: '5d6da6e63daa35cd' },
+];
+// PRECACHE_MANIFEST:END
+
+const CDN_ASSETS = [
   'https://cdn.tailwindcss.com'
 ];
 
+// Rotas de leitura da API que podem ser servidas do cache
+// (revalidadas em segundo plano via ETag)
+const CACHEABLE_API_PATHS = [
+  /\/api\/examples$/,
+  /\/api\/calculator\/tax-info\/[A-Z_]+$/,
+  /\/api\/calculator\/tax-rules(\/[^/]+)?$/,
+  /\/api\/calculator\/compare$/
+];
+
+// Chave do cache inclui a revisão para que assets alterados sejam rebaixados
+function precacheKey(entry) {
+  return new URL(`${entry.url}?__rev=${entry.revision}`, self.location.origin).href;
+}
+
+// Mapa URL -> chave com revisão, para localizar assets pré-cacheados
+const precacheKeys = new Map(
+  PRECACHE_MANIFEST.map((entry) => [new URL(entry.url, self.location.origin).href, precacheKey(entry)])
+);
+
+// Remove as entradas mais antigas até respeitar o limite
+async function trimCache(cacheName, maxEntries) {
+  const cache = await caches.open(cacheName);
+  const keys = await cache.keys();
+  const excess = keys.length - maxEntries;
+  for (let i = 0; i < excess; i++) {
+    await cache.delete(keys[i]);
+  }
+}
+
 // Instalação do Service Worker
 self.addEventListener('install', (event) => {
   console.log('[Service Worker] Instalando...');
   event.waitUntil(
-    caches.open(CACHE_NAME)
-      .then((cache) => {
-        console.log('[Service Worker] Cacheando arquivos');
-        return cache.addAll(urlsToCache);
-      })
-      .catch((error) => {
-        console.error('[Service Worker] Erro ao cachear:', error);
-      })
+    (async () => {
+      const cache = await caches.open(PRECACHE_NAME);
+
+      // Baixa apenas os assets cuja revisão ainda não está no cache
+      await Promise.all(PRECACHE_MANIFEST.map(async (entry) => {
+        const key = precacheKey(entry);
+        if (await cache.match(key)) {
+          return;
+        }
+        const response = await fetch(entry.url, { cache: 'reload' });
+        if (response.ok) {
+          await cache.put(key, response);
+        }
+      }));
+
+      const runtime = await caches.open(RUNTIME_CACHE_NAME);
+      await Promise.all(CDN_ASSETS.map(async (url) => {
+        if (!(await runtime.match(url))) {
+          await runtime.add(url);
+        }
+      }));
+    })().catch((error) => {
+      console.error('[Service Worker] Erro ao cachear:', error);
+    })
   );
   self.skipWaiting();
 });
@@ -31,57 +96,97 @@ self.addEventListener('install', (event) => {
 // Ativação do Service Worker
 self.addEventListener('activate', (event) => {
   console.log('[Service Worker] Ativando...');
+  const currentCaches = [PRECACHE_NAME, RUNTIME_CACHE_NAME, API_CACHE_NAME];
+  const currentKeys = new Set(precacheKeys.values());
+
   event.waitUntil(
-    caches.keys().then((cacheNames) => {
-      return Promise.all(
-        cacheNames.map((cacheName) => {
-          if (cacheName !== CACHE_NAME) {
+    (async () => {
+      // Remover caches de versões antigas
+      const cacheNames = await caches.keys();
+      await Promise.all(
+        cacheNames
+          .filter((cacheName) => !currentCaches.includes(cacheName))
+          .map((cacheName) => {
             console.log('[Service Worker] Removendo cache antigo:', cacheName);
             return caches.delete(cacheName);
-          }
-        })
+          })
       );
-    })
+
+      // Remover revisões antigas dos assets pré-cacheados
+      const cache = await caches.open(PRECACHE_NAME);
+      const keys = await cache.keys();
+      await Promise.all(
+        keys
+          .filter((request) => !currentKeys.has(request.url))
+          .map((request) => cache.delete(request))
+      );
+    })()
   );
   return self.clients.claim();
 });
 
-// Interceptação de requisições (Estratégia: Network First, depois Cache)
+// Stale-while-revalidate: responde do cache e atualiza em segundo plano
+async function staleWhileRevalidate(event, cacheName, cacheKey, maxEntries, networkRequest = event.request) {
+  const cache = await caches.open(cacheName);
+  const cached = await cache.match(cacheKey);
+
+  // cache: 'no-cache' faz o navegador revalidar com If-None-Match (ETag)
+  const network = fetch(networkRequest, { cache: 'no-cache' })
+    .then(async (response) => {
+      if (response.ok || response.type === 'opaque') {
+        await cache.put(cacheKey, response.clone());
+        if (maxEntries) {
+          await trimCache(cacheName, maxEntries);
+        }
+      }
+      return response;
+    });
+
+  if (cached) {
+    event.waitUntil(network.catch(() => undefined));
+    return cached;
+  }
+  return network;
+}
+
+function isCacheableApiRequest(url) {
+  return CACHEABLE_API_PATHS.some((pattern) => pattern.test(url.pathname));
+}
+
+// Interceptação de requisições
 self.addEventListener('fetch', (event) => {
-  // Ignorar requisições de API - sempre buscar da rede
-  if (event.request.url.includes('/api/')) {
-    event.respondWith(fetch(event.request));
+  const request = event.request;
+  if (request.method !== 'GET') {
     return;
   }
 
-  // Para outros recursos: Network First, depois Cache
-  event.respondWith(
-    fetch(event.request)
-      .then((response) => {
-        // Clone a resposta antes de cachear
-        const responseToCache = response.clone();
-
-        caches.open(CACHE_NAME).then((cache) => {
-          cache.put(event.request, responseToCache);
-        });
-
-        return response;
-      })
-      .catch(() => {
-        // Se falhar (offline), busca do cache
-        return caches.match(event.request)
-          .then((response) => {
-            if (response) {
-              return response;
-            }
-
-            // Página offline personalizada (opcional)
-            if (event.request.mode === 'navigate') {
-              return caches.match('/index.html');
-            }
-          });
-      })
-  );
+  const url = new URL(request.url);
+
+  // API: apenas leituras idempotentes vão para o cache, o resto sempre da rede
+  if (url.pathname.includes('/api/')) {
+    if (isCacheableApiRequest(url)) {
+      event.respondWith(staleWhileRevalidate(event, API_CACHE_NAME, request, API_CACHE_MAX_ENTRIES));
+    }
+    return;
+  }
+
+  // Assets pré-cacheados (inclusive navegação para as páginas)
+  const key = precacheKeys.get(url.origin + url.pathname);
+  if (key) {
+    event.respondWith(staleWhileRevalidate(event, PRECACHE_NAME, key, null, url.origin + url.pathname));
+    return;
+  }
+
+  // Navegação para outras páginas: rede, com index.html quando offline
+  if (request.mode === 'navigate') {
+    event.respondWith(
+      fetch(request).catch(() => caches.match(precacheKeys.get(new URL('/index.html', self.location.origin).href)))
+    );
+    return;
+  }
+
+  // Demais recursos (CDN, imagens): stale-while-revalidate com limite de tamanho
+  event.respondWith(staleWhileRevalidate(event, RUNTIME_CACHE_NAME, request, RUNTIME_CACHE_MAX_ENTRIES));
 });
 
 // Sincronização em background (opcional - para features futuras)
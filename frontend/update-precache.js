@@ -0,0 +1,49 @@
+// Atualiza o PRECACHE_MANIFEST do service-worker.js com o hash de cada asset
+// Uso: node update-precache.js (rodar sempre que alterar um arquivo do frontend)
+
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+
+const ASSETS = [
+  'index.html',
+  'login.html',
+  'register.html',
+  'pricing.html',
+  'payment-success.html',
+  'payment-failure.html',
+  'payment-pending.html',
+  'app.js',
+  'auth.js',
+  'manifest.json',
+  'icon.svg',
+  'icon-192.png',
+  'icon-512.png'
+];
+
+const SERVICE_WORKER = path.join(__dirname, 'service-worker.js');
+const START = '// PRECACHE_MANIFEST:START';
+const END = '// PRECACHE_MANIFEST:END';
+
+function revision(file) {
+  const content = fs.readFileSync(path.join(__dirname, file));
+  return crypto.createHash('sha256').update(content).digest('hex').slice(0, 16);
+}
+
+const entries = [{ url: '/', revision: revision('index.html') }]
+  .concat(ASSETS.map((file) => ({ url: `/${file}`, revision: revision(file) })));
+
+const block = [
+  START,
+  'const PRECACHE_MANIFEST = [',
+  ...entries.map((entry) => `  { url: '${entry.url}', revision: '${entry.revision}' },`),
+  '];',
+  END
+].join('\n');
+
+const source = fs.readFileSync(SERVICE_WORKER, 'utf8');
+const start = source.indexOf(START);
+const end = source.indexOf(END) + END.length;
+fs.writeFileSync(SERVICE_WORKER, source.slice(0, start) + block + source.slice(end));
+
+console.log(`✅ ${entries.length} assets no precache`);